@@ -38,7 +38,7 @@ def main():
     
     # Crear conexion
     try:
-        connection = OdooConnection(**odoo_config)
+        connection = OdooConnection(**odoo_config, **config_manager.get_rpc_config())
         
         # Autenticar
         print("\n🔐 Autenticando...")
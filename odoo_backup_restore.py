@@ -1,10 +1,26 @@
+import io
 import os
+import sys
+import shutil
+import time
 import requests
 import zipfile
 import psycopg2
 import subprocess
 from dotenv import load_dotenv
+from contextlib import nullcontext
 from datetime import datetime
+from pathlib import Path
+
+# Agregar src al path
+sys.path.append(str(Path(__file__).parent / 'src'))
+
+from database.backup_manager import BackupManager
+from database.downloader import RangedDownloader
+from database.dump_parser import TableFilter, filter_dump
+from database.postgresql_restore import PostgreSQLRestore
+from database.snapshots import SnapshotBuilder, DEFAULT_CONFIG_FILE
+from utils.tracing import Tracer
 
 # Cargar variables de entorno
 load_dotenv()
@@ -22,10 +38,35 @@ PG_PORT = os.getenv("PG_PORT", "5432")
 BACKUP_DIR = "backups"
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
+# Restaurar también el filestore (adjuntos) del backup: RESTORE_FILESTORE=1
+RESTORE_FILESTORE = os.getenv("RESTORE_FILESTORE", "0").lower() in ("1", "true", "yes")
+
+# Restauración parcial: listas separadas por comas (admiten comodines, ej: mail_*)
+RESTORE_TABLES = [t for t in os.getenv("RESTORE_TABLES", "").split(",") if t.strip()]
+RESTORE_EXCLUDE_TABLES = [t for t in os.getenv("RESTORE_EXCLUDE_TABLES", "").split(",")
+                          if t.strip()]
+
+# Conexiones simultáneas para descargar el backup
+DOWNLOAD_CONNECTIONS = int(os.getenv("DOWNLOAD_CONNECTIONS", "4"))
+
+# Retención del almacén local de backups (0 = sin límite)
+BACKUP_KEEP_COUNT = int(os.getenv("BACKUP_KEEP_COUNT", "3")) or None
+BACKUP_KEEP_GB = float(os.getenv("BACKUP_KEEP_GB", "0")) or None
+
+# Construir los snapshots de config/snapshots.yaml tras restaurar: BUILD_SNAPSHOTS=0 lo desactiva
+BUILD_SNAPSHOTS = os.getenv("BUILD_SNAPSHOTS", "1").lower() in ("1", "true", "yes")
+
+# Traza de las etapas (JSON de Chrome, abrir en https://ui.perfetto.dev); vacío la desactiva
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR") or None
+
+# Tamaño del buffer de la tubería hacia psql (16 MB)
+PIPE_BUFFER_SIZE = 16 * 1024 * 1024
+
 # ---------------------------
 # 1. Descargar el dump más reciente
 # ---------------------------
-def download_backup():
+def download_backup(manager):
     url = f"https://www.odoo.sh/project/{PROJECT}/branches/inscodemexico-insco-837013/backups"
     print(f"🔄 Descargando backups desde: {url}")
 
@@ -33,39 +74,33 @@ def download_backup():
     r.raise_for_status()
 
     backups = r.json()
-    latest = backups[0]["url"]  # el más reciente
-    filename = os.path.join(BACKUP_DIR, backups[0]["filename"])
+    latest = backups[0]  # el más reciente
 
-    print(f"⬇️ Descargando dump: {backups[0]['filename']}")
-    with requests.get(latest, auth=(ODOO_USER, ODOO_API_KEY), stream=True) as response:
-        response.raise_for_status()
-        with open(filename, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+    print(f"⬇️ Obteniendo dump: {latest['filename']}")
+    downloader = RangedDownloader(auth=(ODOO_USER, ODOO_API_KEY),
+                                  connections=DOWNLOAD_CONNECTIONS)
+    backup = manager.fetch(latest, latest["url"], downloader)
+    if not backup["downloaded"]:
+        print("♻️ El backup ya estaba descargado, se reutiliza la copia local")
 
-    print(f"✅ Backup descargado en {filename}")
-    return filename
+    print(f"✅ Backup disponible en {backup['path']} "
+          f"({backup['size'] / (1024 * 1024):,.1f} MB, sha256 {backup['sha256'][:12]}…)")
+    return backup
 
 # ---------------------------
-# 2. Extraer y restaurar
+# 2. Restaurar en streaming (sin extraer el zip)
 # ---------------------------
-def restore_backup(zip_path):
-    print("📦 Extrayendo dump...")
-    with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        zip_ref.extractall(BACKUP_DIR)
-
-    sql_file = None
-    for file in os.listdir(BACKUP_DIR):
-        if file.endswith(".sql"):
-            sql_file = os.path.join(BACKUP_DIR, file)
-            break
-
-    if not sql_file:
-        raise FileNotFoundError("❌ No se encontró archivo .sql en el backup")
-
-    print(f"🔄 Restaurando en PostgreSQL → {LOCAL_DB}")
-
-    # Crear la BD si no existe
+def find_dump_member(zip_ref):
+    """Devuelve el miembro dump.sql del zip (o el primer .sql si no existe)"""
+    sql_members = [info for info in zip_ref.infolist()
+                   if info.filename.endswith(".sql") and not info.is_dir()]
+    for info in sql_members:
+        if os.path.basename(info.filename) == "dump.sql":
+            return info
+    return sql_members[0] if sql_members else None
+
+def ensure_database(drop_existing=False):
+    """Crea la BD local si no existe (o la vacía recreándola con drop_existing)"""
     conn = psycopg2.connect(
         dbname="postgres",
         user=PG_USER,
@@ -75,37 +110,131 @@ def restore_backup(zip_path):
     )
     conn.autocommit = True
     cur = conn.cursor()
-    cur.execute(f"SELECT 1 FROM pg_database WHERE datname = '{LOCAL_DB}';")
+    cur.execute("SELECT 1 FROM pg_database WHERE datname = %s;", (LOCAL_DB,))
     exists = cur.fetchone()
+    if exists and drop_existing:
+        # El dump crea todas las tablas: sobre una BD poblada chocaría con los
+        # objetos existentes y duplicaría filas
+        cur.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                    "WHERE datname = %s AND pid <> pg_backend_pid();", (LOCAL_DB,))
+        cur.execute(f'DROP DATABASE "{LOCAL_DB}";')
+        print(f"🗑️ Base de datos {LOCAL_DB} eliminada para restaurar el backup nuevo")
+        exists = None
     if not exists:
-        cur.execute(f"CREATE DATABASE {LOCAL_DB};")
+        cur.execute(f'CREATE DATABASE "{LOCAL_DB}";')
         print(f"✅ Base de datos {LOCAL_DB} creada")
     cur.close()
     conn.close()
 
-    # Restaurar dump
-    cmd = [
-        "psql",
-        "-h", PG_HOST,
-        "-p", PG_PORT,
-        "-U", PG_USER,
-        "-d", LOCAL_DB,
-        "-f", sql_file
-    ]
-    env = os.environ.copy()
-    env["PGPASSWORD"] = PG_PASSWORD
-    subprocess.run(cmd, env=env, check=True)
+def extract_filestore(zip_ref):
+    """Extrae solo los miembros filestore/ del backup"""
+    members = [name for name in zip_ref.namelist() if name.startswith("filestore/")]
+    if not members:
+        print("⚠️ El backup no contiene filestore")
+        return
+    print(f"🗂️ Extrayendo filestore ({len(members)} archivos)...")
+    zip_ref.extractall(BACKUP_DIR, members=members)
+
+def restore_backup(zip_path, include_filestore=RESTORE_FILESTORE):
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        member = find_dump_member(zip_ref)
+        if not member:
+            raise FileNotFoundError("❌ No se encontró archivo .sql en el backup")
+
+        print(f"🔄 Restaurando {member.filename} en PostgreSQL → {LOCAL_DB}")
+        ensure_database(drop_existing=True)
+
+        # Restaurar dump: el .sql se descomprime directo a la entrada de psql.
+        # ON_ERROR_STOP hace que psql salga con error ante el primer fallo de SQL
+        # (por defecto sigue y termina con código 0) y --single-transaction
+        # evita dejar una restauración a medias
+        cmd = [
+            "psql",
+            "-q",
+            "-v", "ON_ERROR_STOP=1",
+            "--single-transaction",
+            "-h", PG_HOST,
+            "-p", PG_PORT,
+            "-U", PG_USER,
+            "-d", LOCAL_DB,
+        ]
+        env = os.environ.copy()
+        env["PGPASSWORD"] = PG_PASSWORD
+
+        start = time.monotonic()
+        process = subprocess.Popen(cmd, env=env, stdin=subprocess.PIPE,
+                                   bufsize=PIPE_BUFFER_SIZE)
+        try:
+            with zip_ref.open(member) as dump:
+                if RESTORE_TABLES or RESTORE_EXCLUDE_TABLES:
+                    # Filtrar el SQL al vuelo: solo las tablas seleccionadas
+                    table_filter = TableFilter(RESTORE_TABLES or None, RESTORE_EXCLUDE_TABLES)
+                    reader = io.BufferedReader(dump, PIPE_BUFFER_SIZE)
+                    process.stdin.writelines(filter_dump(reader, table_filter))
+                    print(f"✂️ Tablas omitidas: {len(table_filter.skipped)}")
+                else:
+                    shutil.copyfileobj(dump, process.stdin, PIPE_BUFFER_SIZE)
+            process.stdin.close()
+        except BrokenPipeError:
+            # psql terminó antes de tiempo; el código de salida indica el error
+            pass
+        returncode = process.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+
+        elapsed = time.monotonic() - start
+        size_mb = member.file_size / (1024 * 1024)
+        print(f"📈 {size_mb:,.1f} MB restaurados en {elapsed:,.1f} s "
+              f"({size_mb / max(elapsed, 1e-6):,.1f} MB/s)")
+
+        if include_filestore:
+            extract_filestore(zip_ref)
 
     print(f"🎉 Restauración completada en {LOCAL_DB}")
 
+def stage(tracer, name, **args):
+    """Span de una etapa del proceso (contexto vacío sin tracer)"""
+    return tracer.span(name, cat="stage", **args) if tracer else nullcontext(args)
+
 # ---------------------------
 # MAIN
 # ---------------------------
 if __name__ == "__main__":
     print("🚀 Iniciando proceso de backup...")
+    tracer = Tracer(TRACE_FILE, profile_dir=PROFILE_DIR,
+                    process_name="odoo_backup_restore") if TRACE_FILE else None
     try:
-        backup_file = download_backup()
-        restore_backup(backup_file)
+        restorer = PostgreSQLRestore(host=PG_HOST, port=PG_PORT,
+                                     user=PG_USER, password=PG_PASSWORD, tracer=tracer)
+        manager = BackupManager(
+            BACKUP_DIR, restorer=restorer, max_count=BACKUP_KEEP_COUNT,
+            max_bytes=int(BACKUP_KEEP_GB * 1024 ** 3) if BACKUP_KEEP_GB else None,
+        )
+        with stage(tracer, "download"):
+            backup = download_backup(manager)
+        if manager.is_restored(LOCAL_DB, backup["sha256"]):
+            print(f"⏭️ {LOCAL_DB} ya contiene este backup, se omite la restauración")
+        else:
+            with stage(tracer, "restore", backup=backup.get("filename")):
+                restore_backup(backup["path"])
+            restorer.record_snapshot(LOCAL_DB, manager.snapshot_time(backup["path"]),
+                                     source=backup.get("filename"))
+            if not (RESTORE_TABLES or RESTORE_EXCLUDE_TABLES):
+                # Una restauración parcial no cuenta como el backup completo
+                manager.mark_restored(LOCAL_DB, backup["sha256"])
+            if BUILD_SNAPSHOTS and DEFAULT_CONFIG_FILE.exists():
+                print("📊 Construyendo snapshots analíticos...")
+                with stage(tracer, "snapshots"):
+                    results = SnapshotBuilder(restorer, LOCAL_DB).build_all()
+                for name, result in results.items():
+                    if "error" in result:
+                        print(f"⚠️ {name}: {result['error']}")
+                    else:
+                        print(f"  {name}: {result['rows']:,} filas en {result['seconds']:,.1f} s")
+        manager.prune()
         print("✅ Proceso terminado correctamente")
     except Exception as e:
         print(f"❌ Error durante el proceso: {e}")
+    finally:
+        if tracer is not None:
+            print(f"🧭 Traza guardada en {tracer.write()}")
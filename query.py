@@ -1,17 +1,23 @@
-import pandas as pd
-from sqlalchemy import create_engine
+import os
+import sys
+from pathlib import Path
 
-# Conexión a PostgreSQL con SQLAlchemy
-db_name = "odoo_backup_restored"
-db_user = "postgres"
-db_password = "root"
-db_host = "localhost"
+# Agregar src al path
+sys.path.append(str(Path(__file__).parent / 'src'))
 
-# Crear motor de conexión
-engine = create_engine(f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}/{db_name}")
+from database.replica import ReplicaPool
+from utils.config_manager import ConfigManager
 
-# Ejemplo: leer clientes/proveedores de Odoo
-query = "SELECT id, name, email FROM res_partner LIMIT 10;"
-df = pd.read_sql(query, engine)
+# Conexión a la réplica restaurada de PostgreSQL (pool reutilizable)
+db_name = os.getenv("LOCAL_DB", "odoo_backup_restored")
+pg_config = ConfigManager().get_postgres_config()
 
-print(df)
+with ReplicaPool(db_name, **pg_config) as replica:
+    # Ejemplo: leer clientes/proveedores de Odoo
+    query = "SELECT id, name, email FROM res_partner LIMIT 10;"
+    df = replica.read_dataframe(query)
+    print(df)
+
+    # Resultados grandes: bloques de tamaño fijo con un cursor del servidor
+    for chunk in replica.iter_dataframes("SELECT id, name FROM res_partner", chunk_size=50_000):
+        print(f"Bloque de {len(chunk):,} filas")
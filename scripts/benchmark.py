@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Benchmarks offline contra un servidor Odoo simulado (sin red ni credenciales)
+
+Mide paginación, lecturas por shards, creación masiva, importación con load,
+exportación, read_group y decodificación de respuestas y binarios. Los
+resultados se guardan por commit en data/benchmarks/ para comparar
+regresiones entre versiones.
+
+Uso:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --records 20000 --latency 0.005 --repeat 5
+    python scripts/benchmark.py --only pagination_keyset sharded_scan
+    python scripts/benchmark.py --compare a1b2c3d
+    python scripts/benchmark.py --cassette data/cassettes/produccion.jsonl --only cassette_replay
+"""
+
+import argparse
+import csv
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+# Agregar src al path
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from odoo_api.cassette import recorded_calls
+from odoo_api.connection import OdooConnection
+from odoo_api.metrics import RpcMetrics
+from odoo_api.mock_server import MockOdooServer
+
+PROJECT_DIR = Path(__file__).parent.parent
+RESULTS_DIR = PROJECT_DIR / 'data' / 'benchmarks'
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+# Cada benchmark recibe (connection, server, args) y devuelve el número de
+# registros procesados; el runner mide el tiempo y los bytes transferidos.
+
+def bench_pagination_offset(connection, server, args):
+    """search_read paginado con offset/limit"""
+    total, offset = 0, 0
+    while True:
+        page = connection.execute_kw('res.partner', 'search_read', [[]], {
+            'fields': ['name', 'email', 'country_id'], 'offset': offset,
+            'limit': args.page_size, 'order': 'id'})
+        total += len(page)
+        if len(page) < args.page_size:
+            return total
+        offset += args.page_size
+
+def bench_pagination_keyset(connection, server, args):
+    """search_read paginado por id (keyset: id > último leído)"""
+    total, last_id = 0, 0
+    while True:
+        page = connection.execute_kw('res.partner', 'search_read', [[['id', '>', last_id]]], {
+            'fields': ['name', 'email', 'country_id'], 'limit': args.page_size,
+            'order': 'id'})
+        total += len(page)
+        if len(page) < args.page_size:
+            return total
+        last_id = page[-1]['id']
+
+def bench_sharded_scan(connection, server, args):
+    """Lectura completa repartida en rangos de id leídos en paralelo"""
+    ids = connection.execute_kw('sale.order', 'search', [[]], {'order': 'id'})
+    if not ids:
+        return 0
+    low, high = ids[0], ids[-1] + 1
+    step = max(1, -(-(high - low) // args.shards))
+    ranges = [(start, min(start + step, high)) for start in range(low, high, step)]
+
+    def _scan(bounds):
+        start, end = bounds
+        count, last_id = 0, start - 1
+        while True:
+            page = connection.execute_kw(
+                'sale.order', 'search_read',
+                [[['id', '>', last_id], ['id', '<', end]]],
+                {'fields': ['name', 'partner_id', 'amount_total', 'state'],
+                 'limit': args.page_size, 'order': 'id'})
+            count += len(page)
+            if len(page) < args.page_size:
+                return count
+            last_id = page[-1]['id']
+
+    with ThreadPoolExecutor(max_workers=args.shards) as executor:
+        return sum(executor.map(_scan, ranges))
+
+def bench_bulk_create(connection, server, args):
+    """create con listas de valores por lote"""
+    total = 0
+    for start in range(0, args.create_records, args.batch_size):
+        values = [{'name': f"Registro {i}", 'value': i * 0.5, 'note': 'benchmark'}
+                  for i in range(start, min(start + args.batch_size, args.create_records))]
+        total += len(connection.execute_kw('x.benchmark.record', 'create', [values]))
+    return total
+
+def bench_bulk_load(connection, server, args):
+    """Importación con load (filas en lugar de diccionarios)"""
+    total = 0
+    for start in range(0, args.create_records, args.batch_size):
+        rows = [[f"Registro {i}", i * 0.5, 'benchmark']
+                for i in range(start, min(start + args.batch_size, args.create_records))]
+        result = connection.execute_kw('x.benchmark.record', 'load',
+                                       [['name', 'value', 'note'], rows])
+        total += len(result['ids'] or [])
+    return total
+
+def bench_export_csv(connection, server, args):
+    """Exportación paginada de pedidos a CSV"""
+    fields = ['name', 'partner_id', 'state', 'amount_total', 'date_order']
+    total, last_id = 0, 0
+    with tempfile.TemporaryFile('w+', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id'] + fields)
+        while True:
+            page = connection.execute_kw('sale.order', 'search_read', [[['id', '>', last_id]]],
+                                         {'fields': fields, 'limit': args.page_size,
+                                          'order': 'id'})
+            for record in page:
+                partner = record['partner_id']
+                writer.writerow([record['id'], record['name'],
+                                 partner[1] if partner else '', record['state'],
+                                 record['amount_total'], record['date_order']])
+            total += len(page)
+            if len(page) < args.page_size:
+                return total
+            last_id = page[-1]['id']
+
+def bench_read_group(connection, server, args):
+    """Agregación en el servidor por cliente y mes"""
+    groups = connection.execute_kw('sale.order', 'read_group',
+                                   [[['state', 'in', ['sale', 'done']]],
+                                    ['amount_total:sum'], ['partner_id', 'date_order:month']],
+                                   {'lazy': False})
+    return len(groups)
+
+def bench_decode_json(connection, server, args):
+    """Decodificación de una respuesta grande (todos los campos, con texto)"""
+    records = connection.execute_kw('res.partner', 'search_read', [[]], {'order': 'id'})
+    return len(records)
+
+def bench_decode_binary(connection, server, args):
+    """Descarga y decodificación en streaming de adjuntos base64"""
+    ids = connection.execute_kw('ir.attachment', 'search', [[]])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = connection.download_attachments(ids, tmp_dir, max_workers=4)
+    failed = [result for result in results if 'error' in result]
+    if failed:
+        raise Exception(f"{len(failed)} descargas fallidas: {failed[0]['error']}")
+    return len(results)
+
+def bench_cassette_replay(connection, server, args):
+    """Llamadas de un cassette grabado (carga real) servidas sin red"""
+    replay = OdooConnection.from_cassette(args.cassette, timing=args.cassette_timing,
+                                          metrics=connection.metrics,
+                                          tracer=connection.tracer)
+    calls = recorded_calls(args.cassette)
+    for service, method, call_args in calls:
+        replay._jsonrpc_request(service, method, call_args)
+    return len(calls)
+
+BENCHMARKS = {
+    'pagination_offset': bench_pagination_offset,
+    'pagination_keyset': bench_pagination_keyset,
+    'sharded_scan': bench_sharded_scan,
+    'bulk_create': bench_bulk_create,
+    'bulk_load': bench_bulk_load,
+    'export_csv': bench_export_csv,
+    'read_group': bench_read_group,
+    'decode_json': bench_decode_json,
+    'decode_binary': bench_decode_binary,
+    'cassette_replay': bench_cassette_replay,
+}
+
+# ---------------------------
+# Ejecución y resultados
+# ---------------------------
+def run_benchmark(name, func, connection, server, args):
+    """Ejecuta un benchmark varias veces y resume la mediana"""
+    timings, records, calls, request_bytes, response_bytes = [], 0, 0, 0, 0
+    for _ in range(args.warmup + args.repeat):
+        connection.metrics.reset()
+        started = time.perf_counter()
+        records = func(connection, server, args)
+        timings.append(time.perf_counter() - started)
+        series = connection.metrics.snapshot()['series']
+        calls = sum(item['count'] for item in series)
+        request_bytes = sum(item['request_bytes'] for item in series)
+        response_bytes = sum(item['response_bytes'] for item in series)
+    timings = timings[args.warmup:]
+    median = statistics.median(timings)
+    return {
+        'seconds': median,
+        'min_seconds': min(timings),
+        'max_seconds': max(timings),
+        'records': records,
+        'records_per_second': records / median if median else None,
+        'calls': calls,
+        'request_bytes': request_bytes,
+        'response_bytes': response_bytes,
+    }
+
+def git_revision():
+    """Commit actual (con sufijo -dirty si hay cambios sin confirmar)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               cwd=PROJECT_DIR, capture_output=True, text=True,
+                               check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}-dirty" if dirty else commit
+
+def load_results(reference):
+    """Resultados guardados a partir de una ruta o de un prefijo de commit"""
+    path = Path(reference)
+    if not path.exists():
+        matches = sorted(RESULTS_DIR.glob(f"{reference}*.json"))
+        if not matches:
+            raise FileNotFoundError(f"No hay resultados para {reference} en {RESULTS_DIR}")
+        path = matches[-1]
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def compare(current, baseline, threshold):
+    """Imprime la variación por benchmark y devuelve las regresiones"""
+    print(f"\n📊 Comparación con {baseline['revision']} "
+          f"(umbral de regresión {threshold:.0%})")
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if not previous or 'error' in result or 'error' in previous:
+            continue
+        change = result['seconds'] / previous['seconds'] - 1 if previous['seconds'] else 0.0
+        marker = '🔴' if change > threshold else ('🟢' if change < -threshold else '⚪')
+        print(f"  {marker} {name:<20} {previous['seconds'] * 1000:>9,.1f} ms → "
+              f"{result['seconds'] * 1000:>9,.1f} ms ({change:+.1%})")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    """Funcion principal"""
+    parser = argparse.ArgumentParser(description="Benchmarks contra un Odoo simulado")
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS),
+                        help="Ejecutar solo estos benchmarks")
+    parser.add_argument('--records', type=int, default=5000,
+                        help="Registros por modelo en los datos sintéticos")
+    parser.add_argument('--attachments', type=int, default=20, help="Adjuntos sintéticos")
+    parser.add_argument('--payload-size', type=int, default=256,
+                        help="Bytes de los campos de texto")
+    parser.add_argument('--binary-size', type=int, default=256 * 1024,
+                        help="Bytes de cada adjunto")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Latencia simulada por llamada (segundos)")
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help="Variación de la latencia (± segundos)")
+    parser.add_argument('--page-size', type=int, default=500, help="Registros por página")
+    parser.add_argument('--batch-size', type=int, default=200,
+                        help="Registros por lote en create/load")
+    parser.add_argument('--create-records', type=int, default=2000,
+                        help="Registros creados en bulk_create/bulk_load")
+    parser.add_argument('--shards', type=int, default=4, help="Shards en sharded_scan")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones medidas")
+    parser.add_argument('--warmup', type=int, default=1, help="Repeticiones de calentamiento")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla de los datos")
+    parser.add_argument('--cassette', help="Cassette grabado para cassette_replay")
+    parser.add_argument('--cassette-timing', choices=['fast', 'original'], default='fast',
+                        help="Reproducir sin esperas o con las duraciones grabadas")
+    parser.add_argument('--output', help="Archivo de resultados (por defecto, por commit)")
+    parser.add_argument('--no-save', action='store_true', help="No guardar los resultados")
+    parser.add_argument('--compare', help="Commit (prefijo) o archivo con el que comparar")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Empeoramiento relativo que se considera regresión")
+    args = parser.parse_args()
+
+    names = args.only or [name for name in BENCHMARKS
+                           if name != 'cassette_replay' or args.cassette]
+    if 'cassette_replay' in names and not args.cassette:
+        parser.error("cassette_replay requiere --cassette")
+    datasets = {'res.partner': args.records, 'product.product': 0,
+                'sale.order': args.records, 'ir.attachment': args.attachments}
+
+    print("⏱️ Benchmarks contra Odoo simulado")
+    print("=" * 50)
+    print(f"📦 Generando datos ({args.records:,} registros por modelo)...")
+    server = MockOdooServer(datasets=datasets, latency=args.latency, jitter=args.jitter,
+                            payload_size=args.payload_size,
+                            binary_size=args.binary_size, seed=args.seed)
+    revision = git_revision()
+    results = {}
+
+    with server:
+        connection = OdooConnection(server.url, server.db, 'benchmark', server.api_key,
+                                    metrics=RpcMetrics())
+        if not connection.authenticate():
+            print("❌ Error de autenticación con el servidor simulado")
+            return False
+
+        for name in names:
+            try:
+                result = run_benchmark(name, BENCHMARKS[name], connection, server, args)
+            except Exception as e:
+                print(f"  ❌ {name:<20} {e}")
+                results[name] = {'error': str(e)}
+                continue
+            results[name] = result
+            rate = result['records_per_second'] or 0
+            print(f"  ✅ {name:<20} {result['seconds'] * 1000:>9,.1f} ms  "
+                  f"{rate:>12,.0f} reg/s  {result['calls']:>5} llamadas  "
+                  f"{result['response_bytes'] / (1024 * 1024):>7,.2f} MB")
+
+    report = {
+        'revision': revision,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'no_save', 'compare', 'threshold')},
+        'results': results,
+    }
+
+    if not args.no_save:
+        output = Path(args.output) if args.output else RESULTS_DIR / f"{revision}.json"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Resultados guardados en {output}")
+
+    success = not any('error' in result for result in results.values())
+    if args.compare:
+        baseline = load_results(args.compare)
+        if baseline['params'] != report['params']:
+            print("⚠️ Los parámetros difieren de los de la referencia")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"❌ Regresiones: {', '.join(regressions)}")
+            success = False
+    return success
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
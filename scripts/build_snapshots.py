@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Construye los snapshots analíticos configurados en config/snapshots.yaml
+
+Uso:
+    python scripts/build_snapshots.py                 # incremental donde sea posible
+    python scripts/build_snapshots.py --full
+    python scripts/build_snapshots.py sales_by_month --db odoo_clone
+    python scripts/build_snapshots.py --status
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Agregar src al path
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from database.postgresql_restore import PostgreSQLRestore
+from database.snapshots import SnapshotBuilder
+from utils.config_manager import ConfigManager
+
+def main():
+    """Funcion principal"""
+    parser = argparse.ArgumentParser(description="Snapshots analíticos sobre la réplica")
+    parser.add_argument('names', nargs='*', help="Snapshots a construir (por defecto, todos)")
+    parser.add_argument('--db', default=os.getenv('LOCAL_DB'), help="Base de datos de la réplica")
+    parser.add_argument('--config', default=None, help="Archivo YAML de snapshots")
+    parser.add_argument('--full', action='store_true', help="Reconstrucción completa")
+    parser.add_argument('--status', action='store_true', help="Mostrar la última construcción")
+    args = parser.parse_args()
+
+    if not args.db:
+        print("❌ Indica la base de datos con --db o LOCAL_DB")
+        return False
+
+    restorer = PostgreSQLRestore(**ConfigManager().get_postgres_config())
+    builder = SnapshotBuilder(restorer, args.db, config_file=args.config)
+
+    if args.status:
+        for row in builder.status():
+            print(f"  {row['name']}: {row['mode']}, {row['rows']:,} filas, "
+                  f"{row['seconds']:,.2f} s ({row['built_at']:%Y-%m-%d %H:%M})")
+        return True
+
+    results = builder.build_all(args.names or None, full=args.full)
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"❌ {name}: {result['error']}")
+        else:
+            print(f"✅ {name} ({result['mode']}): {result['rows']:,} filas en "
+                  f"{result['seconds']:,.2f} s")
+    return not any('error' in result for result in results.values())
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
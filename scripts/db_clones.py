@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Gestión de la base plantilla y de sus clones instantáneos
+
+Uso:
+    python scripts/db_clones.py refresh backups/store/<sha256>.zip
+    python scripts/db_clones.py clone --label pruebas
+    python scripts/db_clones.py list
+    python scripts/db_clones.py reap --max-age-hours 24 --keep 5
+    python scripts/db_clones.py drop <nombre>
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Agregar src al path
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from database.backup_manager import BackupManager
+from database.postgresql_restore import PostgreSQLRestore
+from utils.config_manager import ConfigManager
+
+def build_manager(args) -> BackupManager:
+    """Crea el gestor de backups con la configuración de PostgreSQL"""
+    pg_config = ConfigManager().get_postgres_config()
+    restorer = PostgreSQLRestore(**pg_config, jobs=args.jobs)
+    return BackupManager(args.backup_dir, restorer=restorer, template_db=args.template)
+
+def main():
+    """Funcion principal"""
+    parser = argparse.ArgumentParser(description="Clones instantáneos de la BD restaurada")
+    parser.add_argument('--template', default=os.getenv('TEMPLATE_DB', 'odoo_template'),
+                        help="Base de datos plantilla")
+    parser.add_argument('--backup-dir', default='backups', help="Directorio de backups")
+    parser.add_argument('--jobs', type=int, default=None, help="Conexiones paralelas")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    refresh = commands.add_parser('refresh', help="Restaurar un backup como plantilla")
+    refresh.add_argument('backup', nargs='?', help="Backup (por defecto el más reciente)")
+    refresh.add_argument('--no-fast', action='store_true', help="Restauración normal")
+
+    clone = commands.add_parser('clone', help="Crear un clon de la plantilla")
+    clone.add_argument('--name', help="Nombre del clon")
+    clone.add_argument('--label', help="Etiqueta para identificar el clon")
+
+    commands.add_parser('list', help="Listar clones")
+
+    reap = commands.add_parser('reap', help="Eliminar clones antiguos")
+    reap.add_argument('--max-age-hours', type=float, help="Antigüedad máxima en horas")
+    reap.add_argument('--keep', type=int, help="Conservar los N clones más recientes")
+
+    drop = commands.add_parser('drop', help="Eliminar un clon")
+    drop.add_argument('name', help="Nombre del clon")
+
+    args = parser.parse_args()
+    manager = build_manager(args)
+
+    if args.command == 'refresh':
+        backup = args.backup or manager.latest_backup()
+        if not backup:
+            print("❌ No hay backups locales")
+            return False
+        print(f"🔄 Restaurando {backup} como plantilla {args.template}...")
+        stats = manager.refresh_template(str(backup), fast=not args.no_fast)
+        print(f"✅ Plantilla lista en {stats['total']:,.1f} s ({len(stats['errors'])} errores)")
+
+    elif args.command == 'clone':
+        result = manager.clone(name=args.name, label=args.label)
+        print(f"✅ Clon {result['name']} creado en {result['seconds']:,.2f} s")
+
+    elif args.command == 'list':
+        clones = manager.list_clones()
+        if not clones:
+            print("📭 No hay clones")
+        for clone in clones:
+            label = f" [{clone['label']}]" if clone['label'] else ''
+            print(f"  {clone['name']}{label} - {clone['created_at']} - "
+                  f"{clone['size'] / (1024 * 1024):,.1f} MB")
+
+    elif args.command == 'reap':
+        if args.max_age_hours is None and args.keep is None:
+            print("❌ Indica --max-age-hours y/o --keep")
+            return False
+        removed = manager.reap_clones(max_age_hours=args.max_age_hours, keep=args.keep)
+        print(f"🧹 {len(removed)} clones eliminados")
+        for name in removed:
+            print(f"  - {name}")
+
+    elif args.command == 'drop':
+        manager.drop_clone(args.name)
+        print(f"🗑️ Clon {args.name} eliminado")
+
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
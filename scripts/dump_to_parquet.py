@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Convierte un backup de Odoo (.zip o .sql) en archivos Parquet por tabla,
+sin restaurar en PostgreSQL
+
+Uso:
+    python scripts/dump_to_parquet.py backups/odoo_backup.zip --output data/parquet
+    python scripts/dump_to_parquet.py dump.sql --tables 'sale_order*' res_partner
+    python scripts/dump_to_parquet.py dump.sql --trace data/trace.json --profile-dir data/prof
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar src al path
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from database.backup_manager import BackupManager
+from database.parquet_export import DumpParquetConverter, DEFAULT_ROW_GROUP_SIZE
+from utils.tracing import Tracer
+
+def main():
+    """Funcion principal"""
+    parser = argparse.ArgumentParser(description="Dump de Odoo a Parquet")
+    parser.add_argument('backup', help="Backup .zip o dump .sql")
+    parser.add_argument('--output', default='data/parquet', help="Directorio de salida")
+    parser.add_argument('--tables', nargs='*', help="Tablas a convertir (admite comodines)")
+    parser.add_argument('--exclude', nargs='*', help="Tablas a omitir")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos en paralelo")
+    parser.add_argument('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE,
+                        help="Filas por row group")
+    parser.add_argument('--compression', default='zstd', help="Códec de Parquet")
+    parser.add_argument('--trace', help="Guardar la traza de etapas (JSON de Chrome)")
+    parser.add_argument('--profile-dir', help="Guardar un perfil cProfile por tabla")
+    args = parser.parse_args()
+
+    tracer = None
+    if args.trace or args.profile_dir:
+        tracer = Tracer(args.trace, profile_dir=args.profile_dir,
+                        process_name='dump_to_parquet')
+
+    dump_path = Path(args.backup)
+    if dump_path.suffix == '.zip':
+        print(f"📦 Extrayendo dump de {dump_path}...")
+        dump_path = BackupManager(str(dump_path.parent)).extract_dump(str(dump_path))
+
+    converter = DumpParquetConverter(args.output, workers=args.workers,
+                                     row_group_size=args.row_group_size,
+                                     compression=args.compression, tracer=tracer)
+    result = converter.convert(str(dump_path), tables=args.tables,
+                               exclude_tables=args.exclude)
+    if args.trace:
+        print(f"🧭 Traza guardada en {tracer.write()}")
+
+    for table in result['tables']:
+        print(f"  {table['table']}: {table['rows']:,} filas, "
+              f"{table['output_bytes'] / (1024 * 1024):,.1f} MB")
+    for error in result['errors']:
+        print(f"❌ {error}")
+    print(f"✅ {len(result['tables'])} tablas en {result['total']:,.1f} s")
+    return not result['errors']
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
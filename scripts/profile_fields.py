@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Perfila el coste de cada campo de un modelo y recomienda proyecciones mínimas
+
+Lee una muestra de registros campo a campo y muestra, ordenados de mayor a
+menor coste, los milisegundos extra por cada 1000 registros y los bytes por
+registro de cada campo, junto con la lista de campos recomendada. La
+conexión se toma del .env (o de un servidor simulado con --mock).
+
+Uso:
+    # Campos de las empresas que devuelve Partner.get_companies
+    python scripts/profile_fields.py --helper Partner.get_companies
+
+    # Modelo y dominio arbitrarios, con campos imprescindibles y grupos
+    python scripts/profile_fields.py res.partner --domain '[["customer_rank", ">", 0]]' \\
+        --required name,email --group contacto=name,email,phone --output perfil.json
+
+    # Sin Odoo: servidor simulado con campos calculados lentos
+    python scripts/profile_fields.py --helper Product.get_active_products --mock
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Agregar src al path
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from odoo_api.connection import OdooConnection
+from odoo_api.field_profiler import FieldProfiler
+from odoo_api.mock_server import MockOdooServer
+from odoo_api.models import Partner, Product
+from utils.config_manager import ConfigManager
+from utils.logger import setup_logging
+
+# Helpers perfilables: nombre -> (modelo, dominio)
+HELPERS = {
+    'Partner.get_companies': (Partner, Partner.COMPANY_DOMAIN),
+    'Product.get_active_products': (Product, Product.ACTIVE_DOMAIN),
+}
+
+def connect() -> OdooConnection:
+    """Conexión a Odoo con la configuración del .env"""
+    config = ConfigManager()
+    if not config.validate_odoo_config():
+        raise SystemExit("❌ Configuración de Odoo inválida. Revisa tu archivo .env")
+    connection = OdooConnection(**config.get_odoo_config(), **config.get_rpc_config())
+    if not connection.authenticate():
+        raise SystemExit("❌ Error de autenticación en Odoo")
+    return connection
+
+def split_list(value: str) -> list:
+    """Lista separada por comas (vacía si no se indica)"""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+def print_profile(profile: dict, recommendation: dict, helper: str = None):
+    """Imprime la tabla de costes y la recomendación"""
+    baseline = profile['baseline']
+    print(f"\n🔬 {profile['model']}: {profile['sample']} registros de muestra "
+          f"(solo id: {baseline['seconds'] * 1000:.1f} ms, "
+          f"{baseline['bytes_per_record']:.0f} bytes/registro)")
+    print(f"  {'Campo':<28} {'Tipo':<11} {'Alm.':<5} {'ms/1k':>9} {'bytes/reg':>10}")
+    for item in profile['fields']:
+        stored = 'sí' if item['store'] else 'no'
+        marker = '  ⚠️' if item['name'] in recommendation['excluded'] else ''
+        print(f"  {item['name']:<28} {item['type'] or '':<11} {stored:<5} "
+              f"{item['ms_per_1k']:>9,.1f} {item['bytes_per_record']:>10,.1f}{marker}")
+
+    if profile['groups']:
+        print("\n📦 Grupos de campos:")
+        for name, group in profile['groups'].items():
+            print(f"  {name:<28} {len(group['fields']):>3} campos "
+                  f"{group['ms_per_1k']:>9,.1f} ms/1k {group['bytes_per_record']:>10,.1f} bytes/reg")
+
+    if recommendation['excluded']:
+        print("\n🚫 Excluidos:")
+        for name, reason in recommendation['excluded'].items():
+            print(f"  {name}: {reason}")
+    for warning in recommendation['warnings']:
+        print(f"⚠️ {warning}")
+
+    estimated = recommendation['estimated']
+    print(f"\n✅ Recomendados ({len(recommendation['fields'])} campos, "
+          f"{estimated['ms_per_1k']:,.1f} ms/1k y {estimated['bytes_per_record']:,.0f} bytes/reg"
+          + (f" frente a {estimated['all_ms_per_1k']:,.1f} ms/1k y "
+             f"{estimated['all_bytes_per_record']:,.0f} bytes/reg con todos"
+             if estimated['all_ms_per_1k'] is not None else '') + "):")
+    fields = json.dumps(recommendation['fields'], ensure_ascii=False)
+    if helper:
+        print(f"  {helper}(fields={fields})")
+    else:
+        print(f"  {fields}")
+
+def main():
+    """Funcion principal"""
+    parser = argparse.ArgumentParser(description="Perfilado del coste de cada campo")
+    parser.add_argument('model', nargs='?', help="Modelo a perfilar")
+    parser.add_argument('--helper', choices=sorted(HELPERS),
+                        help="Perfilar el modelo y dominio de un helper existente")
+    parser.add_argument('--domain', help="Dominio JSON de la muestra")
+    parser.add_argument('--fields', help="Campos a perfilar separados por comas (por defecto, todos)")
+    parser.add_argument('--required', help="Campos imprescindibles separados por comas")
+    parser.add_argument('--group', action='append', default=[],
+                        help="Grupo de campos a medir juntos: nombre=campo1,campo2")
+    parser.add_argument('--sample', type=int, default=200, help="Registros de la muestra")
+    parser.add_argument('--repeat', type=int, default=3, help="Lecturas por medición")
+    parser.add_argument('--include-binary', action='store_true',
+                        help="Perfilar también campos binarios")
+    parser.add_argument('--max-ms', type=float, default=20.0,
+                        help="ms extra por 1000 registros tolerados por campo")
+    parser.add_argument('--max-bytes', type=int, default=1024,
+                        help="Bytes por registro tolerados por campo")
+    parser.add_argument('--output', help="Guardar perfil y recomendación en JSON")
+    parser.add_argument('--mock', action='store_true',
+                        help="Usar un servidor Odoo simulado en lugar del .env")
+    parser.add_argument('--log-level', default='WARNING', help="Nivel de logging")
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    if args.helper:
+        model_class, domain = HELPERS[args.helper]
+        model = model_class(None).model_name
+    elif args.model:
+        model, domain = args.model, []
+    else:
+        parser.error("indica un modelo o --helper")
+    if args.domain:
+        domain = json.loads(args.domain)
+
+    groups = {}
+    for spec in args.group:
+        name, _, members = spec.partition('=')
+        if not members:
+            parser.error(f"grupo no válido: {spec} (usar nombre=campo1,campo2)")
+        groups[name] = split_list(members)
+
+    server = MockOdooServer(datasets={model: max(args.sample, 1000)},
+                            computed_fields=True).start() if args.mock else None
+    try:
+        if server:
+            connection = OdooConnection(server.url, server.db, 'profiler', server.api_key)
+            if not connection.authenticate():
+                print("❌ Error de autenticación con el servidor simulado")
+                return False
+        else:
+            connection = connect()
+
+        profiler = FieldProfiler(connection, sample_size=args.sample, repeat=args.repeat,
+                                 include_binary=args.include_binary)
+        print(f"🔍 Perfilando {model} (dominio {json.dumps(domain)})...")
+        profile = profiler.profile(model, domain, fields=split_list(args.fields) or None,
+                                   groups=groups)
+        if not profile['sample']:
+            print("📭 No hay registros que cumplan el dominio")
+            return False
+        recommendation = profiler.recommend(profile, required=split_list(args.required),
+                                            max_ms_per_1k=args.max_ms,
+                                            max_bytes_per_record=args.max_bytes)
+    finally:
+        if server:
+            server.stop()
+
+    print_profile(profile, recommendation, args.helper)
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'profile': profile, 'recommendation': recommendation}, f,
+                      indent=2, ensure_ascii=False)
+        print(f"💾 Perfil guardado en {output}")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
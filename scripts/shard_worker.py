@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Trabajos repartidos en shards: planificar, ejecutar workers y ver el progreso
+
+La cola puede ser un archivo SQLite (varios procesos en una máquina) o un
+directorio compartido (varias máquinas). Cada máquina lanza sus workers
+contra la misma cola; la conexión a Odoo se toma del .env.
+
+Uso:
+    # Planificar una exportación por rangos de id
+    python scripts/shard_worker.py --queue data/jobs/queue.db plan-export export-ventas \\
+        sale.order --fields name,partner_id,amount_total --shard-size 50000 \\
+        --output-dir data/exports/ventas
+
+    # Planificar una importación por fragmentos de un CSV
+    python scripts/shard_worker.py --queue /mnt/compartido/cola plan-import carga-contactos \\
+        res.partner data/imports/contactos.csv --chunk-mb 16
+
+    # Ejecutar 4 procesos worker en esta máquina
+    python scripts/shard_worker.py --queue data/jobs/queue.db work export-ventas --processes 4
+
+    # Progreso agregado (--watch para refrescar)
+    python scripts/shard_worker.py --queue data/jobs/queue.db status export-ventas --watch 5
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+# Agregar src al path
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from odoo_api.connection import OdooConnection
+from odoo_api.sharding import ShardWorker, open_queue, plan_file_chunks, plan_id_ranges
+from utils.config_manager import ConfigManager
+from utils.logger import setup_logging
+
+def connect() -> OdooConnection:
+    """Conexión a Odoo con la configuración del .env"""
+    config = ConfigManager()
+    if not config.validate_odoo_config():
+        raise SystemExit("❌ Configuración de Odoo inválida. Revisa tu archivo .env")
+    connection = OdooConnection(**config.get_odoo_config(), **config.get_rpc_config())
+    if not connection.authenticate():
+        raise SystemExit("❌ Error de autenticación en Odoo")
+    return connection
+
+def plan_export(args) -> bool:
+    """Crea las tareas de exportación por rangos de id"""
+    connection = connect()
+    fields = [field for field in (args.fields or '').split(',') if field]
+    tasks = plan_id_ranges(connection, args.model, shards=args.shards,
+                           shard_size=args.shard_size, count=args.count,
+                           params={'fields': fields, 'output_dir': args.output_dir,
+                                   'page_size': args.page_size})
+    added = args.queue.add_tasks(args.job, 'export_range', tasks, args.max_attempts)
+    print(f"✅ {added} tareas de exportación de {args.model} en '{args.job}'")
+    return True
+
+def plan_import(args) -> bool:
+    """Crea las tareas de importación por fragmentos de archivo"""
+    tasks = plan_file_chunks(args.file, chunk_bytes=int(args.chunk_mb * 1024 * 1024),
+                             params={'model': args.model, 'batch_size': args.batch_size})
+    added = args.queue.add_tasks(args.job, 'import_chunk', tasks, args.max_attempts)
+    print(f"✅ {added} tareas de importación de {Path(args.file).name} en '{args.job}'")
+    return True
+
+def run_worker(queue_spec: str, job: str, lease: float, wait: bool, log_level: str) -> dict:
+    """Un proceso worker (también usado como destino de multiprocessing)"""
+    setup_logging(log_level)
+    worker = ShardWorker(open_queue(queue_spec), connect(), lease_seconds=lease)
+    return worker.run(job, wait=wait)
+
+def work(args) -> bool:
+    """Lanza los workers de esta máquina y espera a que terminen"""
+    print(f"🚀 {args.processes} worker(s) sobre '{args.job or 'todos los trabajos'}'")
+    worker_args = (args.queue_spec, args.job, args.lease, args.wait, args.log_level)
+    if args.processes == 1:
+        run_worker(*worker_args)
+    else:
+        processes = [multiprocessing.Process(target=run_worker, args=worker_args,
+                                             name=f'shard-worker-{n}')
+                     for n in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    return show_status(args.queue, args.job) if args.job else True
+
+def show_status(queue, job: str) -> bool:
+    """Imprime el progreso agregado de un trabajo"""
+    progress = queue.progress(job)
+    tasks = progress['tasks']
+    total = progress['records_total']
+    records = f"{progress['records']:,}" + (f"/{total:,}" if total else '')
+    print(f"📊 {job}: {progress['percent']:.1f}% | {records} registros | "
+          f"tareas: {tasks['done']} hechas, {tasks['running']} en curso, "
+          f"{tasks['pending']} pendientes, {tasks['failed']} fallidas | "
+          f"workers: {len(progress['workers'])}")
+    for error in progress['errors']:
+        print(f"  ⚠️ {error}")
+    return tasks['failed'] == 0
+
+def status(args) -> bool:
+    """Progreso de uno o todos los trabajos (opcionalmente refrescando)"""
+    jobs = [args.job] if args.job else args.queue.jobs()
+    if not jobs:
+        print("📭 La cola está vacía")
+        return True
+    while True:
+        ok = all([show_status(args.queue, job) for job in jobs])
+        if not args.watch or all(args.queue.progress(job)['finished'] for job in jobs):
+            return ok
+        time.sleep(args.watch)
+
+def main():
+    """Funcion principal"""
+    parser = argparse.ArgumentParser(description="Trabajos repartidos en shards")
+    parser.add_argument('--queue', required=True,
+                        help="Cola: archivo .db (SQLite) o directorio compartido")
+    parser.add_argument('--log-level', default='INFO', help="Nivel de logging")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('plan-export', help="Exportación por rangos de id")
+    export_parser.add_argument('job', help="Nombre del trabajo")
+    export_parser.add_argument('model', help="Modelo a exportar")
+    export_parser.add_argument('--fields', help="Campos separados por comas")
+    export_parser.add_argument('--output-dir', required=True, help="Directorio de salida")
+    export_parser.add_argument('--shards', type=int, help="Número de rangos")
+    export_parser.add_argument('--shard-size', type=int, default=50_000, help="Ids por rango")
+    export_parser.add_argument('--page-size', type=int, default=1000, help="Registros por página")
+    export_parser.add_argument('--count', action='store_true',
+                               help="Contar registros por rango (progreso exacto)")
+    export_parser.set_defaults(handler=plan_export)
+
+    import_parser = subparsers.add_parser('plan-import', help="Importación por fragmentos")
+    import_parser.add_argument('job', help="Nombre del trabajo")
+    import_parser.add_argument('model', help="Modelo destino")
+    import_parser.add_argument('file', help="CSV con cabecera (una fila por línea)")
+    import_parser.add_argument('--chunk-mb', type=float, default=8, help="MB por fragmento")
+    import_parser.add_argument('--batch-size', type=int, default=500, help="Filas por load")
+    import_parser.set_defaults(handler=plan_import)
+
+    for plan_parser in (export_parser, import_parser):
+        plan_parser.add_argument('--max-attempts', type=int, default=3,
+                                 help="Intentos por tarea")
+
+    work_parser = subparsers.add_parser('work', help="Ejecutar workers")
+    work_parser.add_argument('job', nargs='?', help="Trabajo (por defecto, todos)")
+    work_parser.add_argument('--processes', type=int, default=1, help="Procesos worker")
+    work_parser.add_argument('--lease', type=float, default=60, help="Segundos de lease")
+    work_parser.add_argument('--wait', action='store_true',
+                             help="Seguir esperando tareas nuevas")
+    work_parser.set_defaults(handler=work)
+
+    status_parser = subparsers.add_parser('status', help="Progreso agregado")
+    status_parser.add_argument('job', nargs='?', help="Trabajo (por defecto, todos)")
+    status_parser.add_argument('--watch', type=float, help="Refrescar cada N segundos")
+    status_parser.set_defaults(handler=status)
+
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+    args.queue_spec = args.queue
+    args.queue = open_queue(args.queue)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -15,6 +15,10 @@ def run_tests():
     # Descobrir y ejecutar pruebas
     loader = unittest.TestLoader()
     start_dir = Path(__file__).parent.parent / 'tests'
+    if not start_dir.is_dir():
+        print(f"⚠️ No existe el directorio de pruebas {start_dir}")
+        print("💡 Para medir rendimiento sin Odoo: python scripts/benchmark.py")
+        return False
     suite = loader.discover(start_dir)
     
     runner = unittest.TextTestRunner(verbosity=2)
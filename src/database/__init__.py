@@ -4,5 +4,13 @@ Módulos para manejo de base de datos
 
 from .postgresql_restore import PostgreSQLRestore
 from .backup_manager import BackupManager
+from .downloader import RangedDownloader, DownloadError
+from .dump_parser import TableFilter, filter_dump
+from .parquet_export import DumpParquetConverter
+from .replica import ReplicaPool
+from .query_router import QueryRouter
+from .snapshots import SnapshotBuilder
 
-__all__ = ['PostgreSQLRestore', 'BackupManager']
+__all__ = ['PostgreSQLRestore', 'BackupManager', 'RangedDownloader', 'DownloadError',
+           'TableFilter', 'filter_dump', 'DumpParquetConverter', 'ReplicaPool',
+           'QueryRouter', 'SnapshotBuilder']
@@ -0,0 +1,473 @@
+"""
+Gestión de backups locales de Odoo.sh
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .downloader import RangedDownloader
+from .postgresql_restore import PostgreSQLRestore
+
+logger = logging.getLogger(__name__)
+
+# Tamaño del buffer al extraer el dump del zip (16 MB)
+EXTRACT_BUFFER_SIZE = 16 * 1024 * 1024
+
+# Campos de los metadatos remotos que no identifican el contenido
+# (las URLs de descarga suelen llevar firmas temporales)
+VOLATILE_METADATA_FIELDS = {'url', 'download_url'}
+
+
+class BackupManager:
+    """Administra los backups descargados y su restauración"""
+
+    def __init__(self, backup_dir: str = 'backups',
+                 restorer: Optional[PostgreSQLRestore] = None,
+                 max_count: Optional[int] = None, max_bytes: Optional[int] = None,
+                 template_db: str = 'odoo_template'):
+        """
+        Inicializar gestor de backups
+
+        Args:
+            backup_dir: Directorio donde se guardan los backups
+            restorer: Instancia de PostgreSQLRestore (opcional)
+            max_count: Máximo de backups a conservar en el almacén (opcional)
+            max_bytes: Máximo de bytes a conservar en el almacén (opcional)
+            template_db: Base de datos plantilla para clones instantáneos
+        """
+        self.backup_dir = Path(backup_dir)
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.restorer = restorer or PostgreSQLRestore()
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.template_db = template_db
+        # Almacén direccionado por contenido: store/<sha256><extensión>
+        self.store_dir = self.backup_dir / 'store'
+        self.store_dir.mkdir(exist_ok=True)
+        self.index_path = self.backup_dir / 'index.json'
+        self._index = self._load_index()
+
+    def list_backups(self) -> List[Path]:
+        """
+        Lista los backups locales (.zip y .sql), del más reciente al más antiguo
+
+        Returns:
+            List[Path]: Rutas de los backups
+        """
+        backups = [path for directory in (self.backup_dir, self.store_dir)
+                   for path in directory.iterdir()
+                   if path.is_file() and path.suffix in ('.zip', '.sql')]
+        return sorted(backups, key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def latest_backup(self) -> Optional[Path]:
+        """Devuelve el backup local más reciente"""
+        backups = self.list_backups()
+        return backups[0] if backups else None
+
+    def extract_dump(self, zip_path: str) -> Path:
+        """
+        Extrae únicamente el dump.sql de un backup de Odoo.sh (sin filestore)
+
+        Args:
+            zip_path: Ruta al archivo .zip
+
+        Returns:
+            Path: Ruta al archivo .sql extraído
+        """
+        zip_path = Path(zip_path)
+        dest = self.backup_dir / f"{zip_path.stem}.sql"
+
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            members = [info for info in zip_ref.infolist()
+                       if info.filename.endswith('.sql') and not info.is_dir()]
+            if not members:
+                raise FileNotFoundError(f"No se encontró archivo .sql en {zip_path}")
+            member = next((info for info in members
+                           if Path(info.filename).name == 'dump.sql'), members[0])
+
+            if dest.exists() and dest.stat().st_size == member.file_size:
+                logger.info(f"Dump ya extraído: {dest}")
+                return dest
+
+            tmp_path = dest.with_name(dest.name + '.part')
+            with zip_ref.open(member) as source, open(tmp_path, 'wb') as target:
+                shutil.copyfileobj(source, target, EXTRACT_BUFFER_SIZE)
+            tmp_path.replace(dest)
+
+        logger.info(f"Dump extraído: {dest} ({member.file_size / (1024 * 1024):,.1f} MB)")
+        return dest
+
+    def restore(self, backup_path: str, dbname: str, drop_existing: bool = False,
+                fast: bool = False, keep_unlogged: bool = True,
+                tables: Optional[List[str]] = None,
+                exclude_tables: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Restaura un backup (.zip de Odoo.sh o .sql plano) con el motor paralelo
+
+        Args:
+            backup_path: Ruta al backup
+            dbname: Base de datos destino
+            drop_existing: Reemplazar la base de datos si ya existe
+            fast: Usar el perfil de restauración rápida (copias desechables)
+            keep_unlogged: En modo rápido, dejar las tablas UNLOGGED
+            tables: Restaurar solo estas tablas (restauración parcial)
+            exclude_tables: Tablas a omitir
+
+        Returns:
+            Dict: Estadísticas de la restauración
+        """
+        path = Path(backup_path)
+        dump_path = self.extract_dump(path) if path.suffix == '.zip' else path
+        if fast:
+            stats = self.restorer.restore_fast(str(dump_path), dbname,
+                                               keep_unlogged=keep_unlogged, tables=tables,
+                                               exclude_tables=exclude_tables)
+        else:
+            stats = self.restorer.restore(str(dump_path), dbname,
+                                          drop_existing=drop_existing, tables=tables,
+                                          exclude_tables=exclude_tables)
+
+        if not stats['errors']:
+            self.restorer.record_snapshot(dbname, self.snapshot_time(path), source=path.name)
+        digest = self._digest_for_path(path)
+        if digest and not stats['errors'] and not (tables or exclude_tables):
+            self.mark_restored(dbname, digest)
+        return stats
+
+    @staticmethod
+    def snapshot_time(backup_path: str) -> datetime:
+        """
+        Fecha en que se generó el backup (momento al que corresponden sus datos)
+
+        En los .zip de Odoo.sh es la fecha del dump dentro del archivo; en un
+        .sql plano, su fecha de modificación.
+
+        Args:
+            backup_path: Ruta al backup
+
+        Returns:
+            datetime: Fecha en UTC
+        """
+        path = Path(backup_path)
+        if path.suffix == '.zip':
+            with zipfile.ZipFile(path, 'r') as zip_ref:
+                members = [info for info in zip_ref.infolist()
+                           if info.filename.endswith('.sql') and not info.is_dir()]
+                member = next((info for info in members
+                               if Path(info.filename).name == 'dump.sql'),
+                              members[0] if members else None)
+            if member:
+                # Los servidores de Odoo.sh trabajan en UTC
+                return datetime(*member.date_time, tzinfo=timezone.utc)
+        return datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
+
+    # ------------------------------------------------------------------
+    # Almacén de backups direccionado por contenido
+    # ------------------------------------------------------------------
+    @staticmethod
+    def backup_key(metadata: Dict[str, Any], etag: Optional[str] = None) -> str:
+        """
+        Calcula la clave de un backup remoto a partir de sus metadatos
+
+        Args:
+            metadata: Entrada del listado de backups de Odoo.sh
+            etag: ETag HTTP del archivo (opcional)
+
+        Returns:
+            str: Clave estable (sha256 de los metadatos no volátiles)
+        """
+        stable = {key: value for key, value in metadata.items()
+                  if key not in VOLATILE_METADATA_FIELDS}
+        if etag:
+            stable['etag'] = etag
+        encoded = json.dumps(stable, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def fetch(self, metadata: Dict[str, Any], url: str,
+              downloader: Optional[RangedDownloader] = None) -> Dict[str, Any]:
+        """
+        Obtiene un backup remoto, descargándolo solo si su contenido no está
+        ya en el almacén local
+
+        Args:
+            metadata: Entrada del listado de backups (debe incluir 'filename')
+            url: URL de descarga
+            downloader: Descargador a utilizar (opcional)
+
+        Returns:
+            Dict: 'path', 'sha256', 'size' y 'downloaded' (False si vino de caché)
+        """
+        downloader = downloader or RangedDownloader()
+        key = self.backup_key(metadata)
+
+        digest = self._index['keys'].get(key)
+        if not digest:
+            # Metadatos nuevos: el ETag puede revelar que el contenido ya existe
+            _, etag, _ = downloader.probe(url)
+            digest = self._index['etags'].get(etag) if etag else None
+            if digest:
+                self._index['keys'][key] = digest
+
+        if digest and self._object_path(digest).exists():
+            logger.info(f"Backup {metadata.get('filename')} ya está en caché ({digest[:12]})")
+            return self._touch(digest, downloaded=False)
+
+        suffix = Path(metadata.get('filename', 'backup.zip')).suffix or '.zip'
+        tmp_path = self.store_dir / f"{key}{suffix}.download"
+        result = downloader.download(url, str(tmp_path))
+        digest = result['sha256']
+
+        target = self.store_dir / f"{digest}{suffix}"
+        if target.exists():
+            # Mismo contenido con otros metadatos: no duplicar
+            tmp_path.unlink()
+        else:
+            tmp_path.replace(target)
+
+        self._index['keys'][key] = digest
+        if result.get('etag'):
+            self._index['etags'][result['etag']] = digest
+        self._index['objects'][digest] = {
+            'filename': metadata.get('filename'),
+            'path': target.name,
+            'size': result['size'],
+            'created': time.time(),
+            'last_used': time.time(),
+        }
+        self._save_index()
+        return self._touch(digest, downloaded=True)
+
+    def is_restored(self, dbname: str, digest: str) -> bool:
+        """
+        Indica si la base de datos ya contiene exactamente este backup
+
+        Args:
+            dbname: Base de datos local
+            digest: sha256 del backup
+
+        Returns:
+            bool: True si se puede omitir la restauración
+        """
+        if self._index['restored'].get(dbname, {}).get('sha256') != digest:
+            return False
+        return self.restorer.database_exists(dbname)
+
+    def mark_restored(self, dbname: str, digest: str):
+        """Registra que un backup fue restaurado en una base de datos"""
+        self._index['restored'][dbname] = {'sha256': digest, 'restored_at': time.time()}
+        self._save_index()
+
+    def prune(self, max_count: Optional[int] = None,
+              max_bytes: Optional[int] = None) -> List[str]:
+        """
+        Aplica la política de retención al almacén (los menos usados primero).
+        Los backups restaurados actualmente nunca se eliminan.
+
+        Args:
+            max_count: Máximo de backups a conservar (por defecto el del gestor)
+            max_bytes: Máximo de bytes a conservar (por defecto el del gestor)
+
+        Returns:
+            List[str]: Digests eliminados
+        """
+        max_count = max_count if max_count is not None else self.max_count
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        if max_count is None and max_bytes is None:
+            return []
+
+        protected = {entry['sha256'] for entry in self._index['restored'].values()}
+        objects = sorted(self._index['objects'].items(),
+                         key=lambda item: item[1]['last_used'], reverse=True)
+
+        kept_count, kept_bytes, removed = 0, 0, []
+        for digest, info in objects:
+            fits = ((max_count is None or kept_count < max_count) and
+                    (max_bytes is None or kept_bytes + info['size'] <= max_bytes))
+            if fits or digest in protected:
+                kept_count += 1
+                kept_bytes += info['size']
+                continue
+            self._remove_object(digest)
+            removed.append(digest)
+
+        if removed:
+            self._save_index()
+            logger.info(f"Retención: {len(removed)} backups eliminados del almacén")
+        return removed
+
+    def _object_path(self, digest: str) -> Path:
+        """Ruta del archivo de un backup en el almacén"""
+        info = self._index['objects'].get(digest)
+        return self.store_dir / (info['path'] if info else digest)
+
+    def _digest_for_path(self, path: Path) -> Optional[str]:
+        """Devuelve el digest si la ruta pertenece al almacén"""
+        for digest, info in self._index['objects'].items():
+            if (self.store_dir / info['path']).resolve() == path.resolve():
+                return digest
+        return None
+
+    def _touch(self, digest: str, downloaded: bool) -> Dict[str, Any]:
+        """Actualiza la fecha de último uso y devuelve la información del backup"""
+        info = self._index['objects'][digest]
+        info['last_used'] = time.time()
+        self._save_index()
+        return {
+            'path': str(self.store_dir / info['path']),
+            'sha256': digest,
+            'size': info['size'],
+            'filename': info.get('filename'),
+            'downloaded': downloaded,
+        }
+
+    def _remove_object(self, digest: str):
+        """Elimina un backup del almacén y sus referencias en el índice"""
+        info = self._index['objects'].pop(digest)
+        (self.store_dir / info['path']).unlink(missing_ok=True)
+        extracted = self.backup_dir / f"{Path(info['path']).stem}.sql"
+        extracted.unlink(missing_ok=True)
+        for mapping in (self._index['keys'], self._index['etags']):
+            for key in [k for k, v in mapping.items() if v == digest]:
+                del mapping[key]
+
+    def _load_index(self) -> Dict[str, Any]:
+        """Carga el índice del almacén"""
+        index = {'keys': {}, 'etags': {}, 'objects': {}, 'restored': {}}
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index.update(json.load(f))
+        return index
+
+    def _save_index(self):
+        """Guarda el índice del almacén de forma atómica"""
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    # ------------------------------------------------------------------
+    # Plantilla restaurada y clones instantáneos
+    # ------------------------------------------------------------------
+    def refresh_template(self, backup_path: str, fast: bool = True) -> Dict[str, Any]:
+        """
+        Restaura un backup como base de datos plantilla
+
+        Args:
+            backup_path: Ruta al backup (.zip o .sql)
+            fast: Usar el perfil de restauración rápida
+
+        Returns:
+            Dict: Estadísticas de la restauración
+        """
+        if self.restorer.database_exists(self.template_db):
+            # Una plantilla no se puede renombrar ni eliminar
+            self.restorer.set_template(self.template_db, False)
+        # Tablas LOGGED: una caída del servidor no debe vaciar la plantilla
+        stats = self.restore(backup_path, self.template_db, drop_existing=True,
+                             fast=fast, keep_unlogged=False)
+        self.restorer.set_template(self.template_db, True)
+        logger.info(f"Plantilla {self.template_db} actualizada")
+        return stats
+
+    def clone(self, name: Optional[str] = None, label: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Crea una copia nueva de la plantilla con CREATE DATABASE ... TEMPLATE
+
+        Args:
+            name: Nombre de la copia (por defecto '<plantilla>_clone_<fecha>_<id>')
+            label: Etiqueta libre para identificar al usuario de la copia
+
+        Returns:
+            Dict: Nombre de la copia y segundos que tomó crearla
+        """
+        created_at = datetime.now()
+        name = name or (f"{self.template_db}_clone_{created_at:%Y%m%d_%H%M%S}_"
+                        f"{uuid.uuid4().hex[:6]}")
+        comment = json.dumps({
+            'clone_of': self.template_db,
+            'created_at': created_at.isoformat(timespec='seconds'),
+            'label': label,
+        })
+
+        started = time.monotonic()
+        self.restorer.clone_database(self.template_db, name, comment=comment)
+        elapsed = time.monotonic() - started
+        logger.info(f"Clon {name} creado en {elapsed:,.2f} s")
+        return {'name': name, 'seconds': elapsed, 'created_at': created_at.isoformat()}
+
+    def list_clones(self) -> List[Dict[str, Any]]:
+        """
+        Lista las copias creadas a partir de la plantilla
+
+        Returns:
+            List[Dict]: Nombre, fecha de creación, etiqueta y tamaño de cada copia
+        """
+        conn = self.restorer.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT datname, shobj_description(oid, 'pg_database'), "
+                            "pg_database_size(oid) FROM pg_database "
+                            "WHERE NOT datistemplate ORDER BY datname")
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+
+        clones = []
+        for name, comment, size in rows:
+            try:
+                info = json.loads(comment) if comment else {}
+            except ValueError:
+                continue
+            if not isinstance(info, dict) or info.get('clone_of') != self.template_db:
+                continue
+            clones.append({
+                'name': name,
+                'created_at': info.get('created_at'),
+                'label': info.get('label'),
+                'size': size,
+            })
+        return sorted(clones, key=lambda clone: clone['created_at'] or '')
+
+    def drop_clone(self, name: str):
+        """Elimina una copia (solo si fue creada desde la plantilla)"""
+        if name not in {clone['name'] for clone in self.list_clones()}:
+            raise ValueError(f"{name} no es un clon de {self.template_db}")
+        self.restorer.drop_database(name)
+        logger.info(f"Clon {name} eliminado")
+
+    def reap_clones(self, max_age_hours: Optional[float] = None,
+                    keep: Optional[int] = None) -> List[str]:
+        """
+        Elimina copias antiguas
+
+        Args:
+            max_age_hours: Eliminar copias con más horas de antigüedad
+            keep: Conservar solo las N copias más recientes
+
+        Returns:
+            List[str]: Nombres de las copias eliminadas
+        """
+        clones = self.list_clones()
+        now = datetime.now()
+        doomed = set()
+        if max_age_hours is not None:
+            for clone in clones:
+                created = datetime.fromisoformat(clone['created_at'])
+                if (now - created).total_seconds() > max_age_hours * 3600:
+                    doomed.add(clone['name'])
+        if keep is not None:
+            doomed.update(clone['name'] for clone in clones[:max(len(clones) - keep, 0)])
+
+        for name in sorted(doomed):
+            self.restorer.drop_database(name)
+        if doomed:
+            logger.info(f"{len(doomed)} clones eliminados")
+        return sorted(doomed)
@@ -0,0 +1,269 @@
+"""
+Descarga paralela y reanudable de backups mediante peticiones HTTP Range
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de cada segmento descargado con una petición Range (32 MB)
+DEFAULT_SEGMENT_SIZE = 32 * 1024 * 1024
+
+# Tamaño de los bloques leídos de la respuesta y escritos a disco (1 MB)
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+_CONTENT_RANGE_RE = re.compile(r'bytes \d+-\d+/(\d+)')
+_MD5_ETAG_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class DownloadError(Exception):
+    """Error durante la descarga o la verificación de integridad"""
+
+
+class RangedDownloader:
+    """Descarga archivos grandes con varias conexiones y reanudación"""
+
+    def __init__(self, session: Optional[requests.Session] = None,
+                 auth: Optional[Tuple[str, str]] = None, connections: int = 4,
+                 segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 timeout: Tuple[float, float] = (10, 60), retries: int = 3):
+        """
+        Inicializar descargador
+
+        Args:
+            session: Sesión de requests a reutilizar (opcional)
+            auth: Credenciales (usuario, api_key) para la descarga
+            connections: Número de peticiones Range simultáneas
+            segment_size: Bytes por segmento (unidad de reanudación)
+            buffer_size: Bytes por bloque de lectura/escritura
+            timeout: Timeouts (conexión, lectura) en segundos
+            retries: Reintentos por segmento antes de abortar
+        """
+        self.connections = max(1, connections)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.connections)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.auth = auth
+        self.segment_size = segment_size
+        self.buffer_size = buffer_size
+        self.timeout = timeout
+        self.retries = retries
+
+    def download(self, url: str, dest_path: str, expected_size: Optional[int] = None,
+                 expected_sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Descarga un archivo, reanudando una descarga previa si es posible
+
+        Args:
+            url: URL del archivo
+            dest_path: Ruta destino
+            expected_size: Tamaño esperado en bytes (opcional)
+            expected_sha256: SHA256 esperado (opcional)
+
+        Returns:
+            Dict: Ruta, tamaño, sha256, etag, tiempos y si hubo reanudación
+
+        Raises:
+            DownloadError: Si el tamaño o el checksum no coinciden
+        """
+        dest = Path(dest_path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part_path = dest.with_name(dest.name + '.part')
+        state_path = dest.with_name(dest.name + '.part.json')
+
+        started = time.monotonic()
+        size, etag, ranges = self.probe(url)
+        if expected_size is not None and size is not None and size != expected_size:
+            raise DownloadError(f"Tamaño remoto {size} distinto al esperado {expected_size}")
+
+        if ranges and size:
+            resumed = self._download_ranged(url, size, etag, part_path, state_path)
+        else:
+            logger.info("El servidor no admite Range: descarga en una sola conexión")
+            resumed = False
+            self._download_single(url, part_path)
+            size = part_path.stat().st_size
+
+        result = self._verify(part_path, size, etag, expected_size, expected_sha256)
+        part_path.replace(dest)
+        state_path.unlink(missing_ok=True)
+
+        elapsed = time.monotonic() - started
+        result.update({
+            'path': str(dest),
+            'etag': etag,
+            'resumed': resumed,
+            'elapsed': elapsed,
+            'throughput_mb_s': size / (1024 * 1024) / max(elapsed, 1e-6),
+        })
+        logger.info(f"Descargado {dest} ({size / (1024 * 1024):,.1f} MB en {elapsed:,.1f} s, "
+                    f"{result['throughput_mb_s']:,.1f} MB/s)")
+        return result
+
+    # ------------------------------------------------------------------
+    # Detección de capacidades del servidor
+    # ------------------------------------------------------------------
+    def probe(self, url: str) -> Tuple[Optional[int], Optional[str], bool]:
+        """
+        Consulta tamaño, ETag y soporte de Range con un GET de un solo byte
+        (las URLs firmadas no suelen aceptar HEAD)
+        """
+        with self.session.get(url, auth=self.auth, headers={'Range': 'bytes=0-0'},
+                              stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            etag = response.headers.get('ETag')
+            if response.status_code == 206:
+                match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+                if match:
+                    return int(match.group(1)), etag, True
+            length = response.headers.get('Content-Length')
+            return (int(length) if length else None), etag, False
+
+    # ------------------------------------------------------------------
+    # Descarga por segmentos
+    # ------------------------------------------------------------------
+    def _download_ranged(self, url: str, size: int, etag: Optional[str],
+                         part_path: Path, state_path: Path) -> bool:
+        """Descarga los segmentos pendientes en paralelo; indica si reanudó"""
+        state = self._load_state(state_path, size, etag)
+        resumed = bool(state['done']) and part_path.exists()
+        if not resumed:
+            state['done'] = []
+            with open(part_path, 'wb') as f:
+                # Reservar el tamaño final para escribir cada segmento en su posición
+                f.truncate(size)
+
+        segments = self._segments(size)
+        done = set(state['done'])
+        pending = [seg for seg in segments if seg[0] not in done]
+        if resumed:
+            logger.info(f"Reanudando descarga: {len(segments) - len(pending)}/"
+                        f"{len(segments)} segmentos ya completos")
+
+        lock = threading.Lock()
+
+        def _fetch(segment: Tuple[int, int, int]):
+            self._fetch_segment(url, etag, part_path, segment)
+            with lock:
+                state['done'].append(segment[0])
+                self._save_state(state_path, state)
+
+        with ThreadPoolExecutor(max_workers=self.connections) as executor:
+            for future in [executor.submit(_fetch, seg) for seg in pending]:
+                future.result()
+        return resumed
+
+    def _segments(self, size: int) -> List[Tuple[int, int, int]]:
+        """Divide el archivo en segmentos (índice, inicio, fin inclusivo)"""
+        return [(i, start, min(start + self.segment_size, size) - 1)
+                for i, start in enumerate(range(0, size, self.segment_size))]
+
+    def _fetch_segment(self, url: str, etag: Optional[str], part_path: Path,
+                       segment: Tuple[int, int, int]):
+        """Descarga un segmento con reintentos y lo escribe en su posición"""
+        index, start, end = segment
+        headers = {'Range': f'bytes={start}-{end}'}
+        if etag and not etag.startswith('W/'):
+            # Si el archivo cambió, el servidor responde 200 en vez de 206
+            headers['If-Range'] = etag
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                with self.session.get(url, auth=self.auth, headers=headers, stream=True,
+                                      timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise DownloadError("El archivo remoto cambió durante la descarga")
+                    written = 0
+                    with open(part_path, 'r+b') as f:
+                        f.seek(start)
+                        for chunk in response.iter_content(chunk_size=self.buffer_size):
+                            f.write(chunk)
+                            written += len(chunk)
+                if written != end - start + 1:
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"Segmento {index} incompleto: {written}/{end - start + 1} bytes")
+                return
+            except DownloadError:
+                raise
+            except requests.exceptions.RequestException as e:
+                if attempt == self.retries:
+                    raise
+                delay = min(2 ** attempt, 30)
+                logger.warning(f"Segmento {index} falló ({e}); reintento {attempt} "
+                               f"en {delay} s")
+                time.sleep(delay)
+
+    def _download_single(self, url: str, part_path: Path):
+        """Descarga completa en una sola conexión (servidores sin Range)"""
+        with self.session.get(url, auth=self.auth, stream=True,
+                              timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.buffer_size):
+                    f.write(chunk)
+
+    # ------------------------------------------------------------------
+    # Estado de reanudación e integridad
+    # ------------------------------------------------------------------
+    def _load_state(self, state_path: Path, size: int, etag: Optional[str]) -> Dict:
+        """Carga el estado previo si corresponde al mismo archivo remoto"""
+        fresh = {'size': size, 'etag': etag, 'segment_size': self.segment_size, 'done': []}
+        if not state_path.exists():
+            return fresh
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return fresh
+        if (state.get('size'), state.get('etag'), state.get('segment_size')) != \
+                (size, etag, self.segment_size):
+            logger.info("El archivo remoto cambió: se descarta la descarga parcial")
+            return fresh
+        return state
+
+    def _save_state(self, state_path: Path, state: Dict):
+        """Guarda el estado de forma atómica"""
+        tmp_path = state_path.with_name(state_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    def _verify(self, path: Path, size: Optional[int], etag: Optional[str],
+                expected_size: Optional[int], expected_sha256: Optional[str]) -> Dict:
+        """Verifica tamaño y checksums (SHA256 y, si el ETag es un MD5, también MD5)"""
+        actual_size = path.stat().st_size
+        for expected in (size, expected_size):
+            if expected is not None and actual_size != expected:
+                raise DownloadError(f"Tamaño descargado {actual_size} != {expected}")
+
+        etag_md5 = (etag or '').strip('"').lower()
+        check_md5 = bool(_MD5_ETAG_RE.match(etag_md5))
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5() if check_md5 else None
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(8 * self.buffer_size), b''):
+                sha256.update(block)
+                if md5:
+                    md5.update(block)
+
+        digest = sha256.hexdigest()
+        if expected_sha256 and digest != expected_sha256.lower():
+            raise DownloadError("SHA256 del archivo descargado no coincide")
+        if md5 and md5.hexdigest() != etag_md5:
+            raise DownloadError("MD5 del archivo descargado no coincide con el ETag")
+        return {'size': actual_size, 'sha256': digest}
@@ -0,0 +1,396 @@
+"""
+Análisis de dumps SQL planos de PostgreSQL (formato de pg_dump -Fp)
+"""
+import fnmatch
+import logging
+import mmap
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Cabecera de cada objeto del TOC, ej:
+# -- Name: res_partner; Type: TABLE; Schema: public; Owner: odoo
+# -- Data for Name: res_partner; Type: TABLE DATA; Schema: public; Owner: odoo
+_HEADER_RE = re.compile(
+    rb'^-- (?:Data for )?Name: (?P<name>.*?); Type: (?P<type>.*?); '
+    rb'Schema: (?P<schema>.*?)(?:; Owner: .*)?$'
+)
+_COPY_RE = re.compile(rb'^COPY (?P<table>\S+) .*FROM stdin;$')
+
+# Tipos de objeto que pg_dump emite en la sección de datos
+DATA_TYPES = {'TABLE DATA', 'SEQUENCE SET', 'BLOB', 'BLOBS', 'BLOB DATA',
+              'LARGE OBJECT'}
+
+# Tipos de objeto de la sección post-data
+POST_DATA_TYPES = {'CONSTRAINT', 'FK CONSTRAINT', 'INDEX', 'INDEX ATTACH',
+                   'TRIGGER', 'EVENT TRIGGER', 'RULE', 'POLICY', 'ROW SECURITY',
+                   'MATERIALIZED VIEW DATA', 'STATISTICS', 'PUBLICATION',
+                   'PUBLICATION TABLE', 'SUBSCRIPTION'}
+
+# Objetos post-data que se pueden crear en paralelo (construyen índices)
+PARALLEL_INDEX_TYPES = {'INDEX', 'CONSTRAINT'}
+
+# Tipos cuyo nombre en el TOC empieza por la tabla a la que pertenecen
+# (ej: 'res_partner res_partner_pkey')
+TABLE_BOUND_TYPES = {'TABLE', 'TABLE DATA', 'DEFAULT', 'CONSTRAINT', 'FK CONSTRAINT',
+                     'TRIGGER', 'RULE', 'POLICY', 'ROW SECURITY'}
+
+# Vistas: se omiten si consultan alguna tabla excluida
+VIEW_TYPES = {'VIEW', 'MATERIALIZED VIEW', 'MATERIALIZED VIEW DATA'}
+
+_INDEX_TABLE_RE = re.compile(r'\bON (?:ONLY )?([\w"]+\.[\w"]+)')
+_REFERENCES_RE = re.compile(r'\bREFERENCES ([\w"]+\.[\w"]+)')
+_OWNED_BY_RE = re.compile(r'\bOWNED BY ([\w"]+\.[\w"]+)\.')
+_QUALIFIED_NAME_RE = re.compile(r'\b[\w"]+\.("?\w+"?)')
+
+
+def table_name(qualified: str) -> str:
+    """Nombre de tabla sin esquema ni comillas ('public."x"' -> 'x')"""
+    return qualified.split('.', 1)[-1].strip('"')
+
+
+class TableFilter:
+    """
+    Selección de tablas a restaurar
+
+    Los nombres admiten comodines (fnmatch) y nombres de modelo de Odoo:
+    'res.partner' equivale a la tabla 'res_partner'.
+    """
+
+    def __init__(self, include: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None):
+        """
+        Args:
+            include: Tablas a restaurar (None = todas)
+            exclude: Tablas a omitir (se aplica después de include)
+        """
+        self.include = [self._normalize(p) for p in include] if include else None
+        self.exclude = [self._normalize(p) for p in exclude or []]
+        # Tablas y vistas omitidas hasta el momento
+        self.skipped: Set[str] = set()
+
+    @staticmethod
+    def _normalize(pattern: str) -> str:
+        return pattern.strip().replace('.', '_').lower()
+
+    def matches(self, table: str) -> bool:
+        """Indica si la tabla debe restaurarse"""
+        name = table_name(table).lower()
+        if self.include is not None and not any(fnmatch.fnmatchcase(name, p)
+                                                for p in self.include):
+            return False
+        return not any(fnmatch.fnmatchcase(name, p) for p in self.exclude)
+
+    def keep(self, entry: 'DumpEntry') -> bool:
+        """
+        Decide si un objeto del dump se conserva, manteniendo la coherencia:
+        se omiten índices, restricciones, triggers, comentarios y permisos de
+        tablas excluidas, las claves foráneas hacia ellas y las vistas que las
+        consultan. Secuencias, tipos y funciones se conservan siempre.
+        """
+        if entry.type in TABLE_BOUND_TYPES:
+            table = entry.name.split(' ', 1)[0]
+            if entry.type == 'TABLE':
+                if not self.matches(table):
+                    self.skipped.add(table)
+                    return False
+                return True
+            if table in self.skipped or (entry.type == 'TABLE DATA'
+                                         and not self.matches(table)):
+                return False
+            if entry.type == 'FK CONSTRAINT':
+                referenced = _REFERENCES_RE.search(entry.sql)
+                return not (referenced and table_name(referenced.group(1)) in self.skipped)
+            return True
+
+        if entry.type == 'INDEX':
+            match = _INDEX_TABLE_RE.search(entry.sql)
+            return not (match and table_name(match.group(1)) in self.skipped)
+
+        if entry.type == 'SEQUENCE OWNED BY':
+            match = _OWNED_BY_RE.search(entry.sql)
+            return not (match and table_name(match.group(1)) in self.skipped)
+
+        if entry.type in ('COMMENT', 'ACL'):
+            # 'TABLE res_partner', 'COLUMN res_partner.name', 'VIEW x'
+            kind, _, target = entry.name.partition(' ')
+            if kind in ('TABLE', 'COLUMN', 'VIEW', 'MATERIALIZED VIEW'):
+                return target.split('.', 1)[0] not in self.skipped
+            return True
+
+        if entry.type in VIEW_TYPES:
+            if entry.type == 'MATERIALIZED VIEW DATA' and entry.name in self.skipped:
+                return False
+            used = {table_name(name) for name in _QUALIFIED_NAME_RE.findall(entry.sql)}
+            if used & self.skipped:
+                self.skipped.add(entry.name)
+                return False
+            return True
+
+        return True
+
+
+class DumpEntry:
+    """Objeto del dump: bloque SQL que sigue a una cabecera '-- Name:'"""
+
+    __slots__ = ('name', 'type', 'schema', 'sql')
+
+    def __init__(self, name: str, type: str, schema: str, sql: str = ''):
+        self.name = name
+        self.type = type
+        self.schema = schema
+        self.sql = sql
+
+    def __repr__(self):
+        return f"DumpEntry({self.type}: {self.schema}.{self.name})"
+
+
+class TableData:
+    """Bloque COPY de una tabla, localizado por posición dentro del dump"""
+
+    __slots__ = ('table', 'copy_sql', 'offset', 'length')
+
+    def __init__(self, table: str, copy_sql: str, offset: int, length: int):
+        """
+        Args:
+            table: Nombre calificado de la tabla (ej: 'public.res_partner')
+            copy_sql: Sentencia COPY ... FROM stdin
+            offset: Posición del primer byte de datos en el archivo
+            length: Longitud en bytes de los datos (sin el terminador '\\.')
+        """
+        self.table = table
+        self.copy_sql = copy_sql
+        self.offset = offset
+        self.length = length
+
+    @property
+    def name(self) -> str:
+        """Nombre de la tabla sin esquema"""
+        return self.table.split('.', 1)[-1].strip('"')
+
+    def __repr__(self):
+        return f"TableData({self.table}, {self.length} bytes)"
+
+
+class DumpIndex:
+    """Resultado del análisis: el dump dividido en fases de restauración"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Sentencias SET iniciales que deben aplicarse en cada conexión
+        self.preamble = ''
+        self.pre_data: List[DumpEntry] = []
+        self.data: List[TableData] = []
+        # SEQUENCE SET y objetos grandes: tras cargar los datos
+        self.after_data: List[DumpEntry] = []
+        self.post_data: List[DumpEntry] = []
+
+    @property
+    def data_bytes(self) -> int:
+        """Tamaño total de los datos COPY"""
+        return sum(block.length for block in self.data)
+
+    def summary(self) -> dict:
+        """Resumen de las fases del dump"""
+        return {
+            'pre_data': len(self.pre_data),
+            'tables': len(self.data),
+            'data_bytes': self.data_bytes,
+            'after_data': len(self.after_data),
+            'post_data': len(self.post_data),
+        }
+
+
+def clean_sql(lines: List[bytes]) -> str:
+    """Une líneas SQL omitiendo comentarios y metacomandos de psql"""
+    kept = [line for line in lines
+            if not line.startswith(b'--') and not line.startswith(b'\\')]
+    return b''.join(kept).decode('utf-8').strip()
+
+
+def scan_dump(dump_path: str, table_filter: Optional[TableFilter] = None) -> DumpIndex:
+    """
+    Recorre un dump plano y lo divide en pre-data, bloques COPY por tabla y
+    post-data. Los datos COPY no se copian: solo se registra su posición,
+    buscando el terminador con mmap para no iterar línea por línea.
+
+    Args:
+        dump_path: Ruta al archivo .sql generado por pg_dump
+        table_filter: Selección de tablas a restaurar (opcional)
+
+    Returns:
+        DumpIndex: Índice del dump
+    """
+    path = Path(dump_path)
+    index = DumpIndex(path)
+    if path.stat().st_size == 0:
+        return index
+
+    preamble: List[bytes] = []
+    current: Optional[DumpEntry] = None
+    current_lines: List[bytes] = []
+    seen_post = False
+
+    def flush():
+        if current is None:
+            return
+        current.sql = clean_sql(current_lines)
+        if current.type == 'TABLE DATA':
+            return
+        if table_filter and not table_filter.keep(current):
+            return
+        if current.type in DATA_TYPES:
+            index.after_data.append(current)
+        elif current.type in POST_DATA_TYPES or seen_post:
+            index.post_data.append(current)
+        elif index.data:
+            # Objeto tardío (ej: ACL/COMMENT tras los datos)
+            index.post_data.append(current)
+        else:
+            index.pre_data.append(current)
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos = 0
+        while pos < size:
+            end = mm.find(b'\n', pos)
+            end = size if end < 0 else end + 1
+            line = mm[pos:end]
+            stripped = line.rstrip(b'\r\n')
+
+            header = _HEADER_RE.match(stripped)
+            copy = _COPY_RE.match(stripped) if not header else None
+
+            if header:
+                flush()
+                entry_type = header.group('type').decode()
+                current = DumpEntry(header.group('name').decode(), entry_type,
+                                    header.group('schema').decode())
+                current_lines = []
+                if entry_type in POST_DATA_TYPES:
+                    seen_post = True
+            elif copy:
+                data_start = end
+                if mm[data_start:data_start + 3] in (b'\\.\n', b'\\.\r'):
+                    data_end = data_start
+                else:
+                    terminator = mm.find(b'\n\\.\n', data_start - 1)
+                    if terminator < 0:
+                        raise ValueError(f"Bloque COPY sin terminar en {path}: "
+                                         f"{stripped.decode(errors='replace')}")
+                    data_end = terminator + 1
+                table = copy.group('table').decode()
+                if not table_filter or table_filter.matches(table):
+                    index.data.append(TableData(table, stripped.decode(), data_start,
+                                                data_end - data_start))
+                end = mm.find(b'\n', data_end) + 1 or size
+            elif current is None:
+                preamble.append(line)
+            else:
+                current_lines.append(line)
+            pos = end
+
+        flush()
+
+    index.preamble = clean_sql(preamble)
+    logger.debug(f"Dump analizado: {index.summary()}")
+    return index
+
+
+def filter_dump(lines: Iterable[bytes], table_filter: TableFilter) -> Iterator[bytes]:
+    """
+    Filtra un dump plano al vuelo, sin archivos intermedios
+
+    Cada objeto del TOC (salvo los datos COPY, que se descartan o transmiten
+    sin acumularlos) se retiene hasta conocer su SQL y se decide con
+    TableFilter.keep().
+
+    Args:
+        lines: Líneas del dump (ej: un archivo abierto en modo binario)
+        table_filter: Selección de tablas
+
+    Yields:
+        bytes: Líneas del dump filtrado
+    """
+    entry: Optional[DumpEntry] = None
+    block: List[bytes] = []
+    copying = False
+    keep_data = True
+
+    def decide() -> List[bytes]:
+        if entry is None or entry.type == 'TABLE DATA':
+            return block
+        entry.sql = clean_sql(block[1:])
+        return block if table_filter.keep(entry) else []
+
+    for line in lines:
+        if copying:
+            if keep_data:
+                yield line
+            if line.rstrip(b'\r\n') == b'\\.':
+                copying = False
+            continue
+
+        stripped = line.rstrip(b'\r\n')
+        header = _HEADER_RE.match(stripped)
+        if header:
+            yield from decide()
+            entry = DumpEntry(header.group('name').decode(), header.group('type').decode(),
+                              header.group('schema').decode())
+            # La línea '--' previa a la cabecera ya se emitió con el bloque anterior
+            block = [line]
+            keep_data = True
+            continue
+
+        if entry is not None and entry.type == 'TABLE DATA' and _COPY_RE.match(stripped):
+            keep_data = table_filter.matches(_COPY_RE.match(stripped).group('table').decode())
+            if keep_data:
+                yield from block
+                yield line
+            block = []
+            copying = True
+            continue
+
+        if entry is None:
+            yield line
+        else:
+            block.append(line)
+
+    yield from decide()
+
+
+class RangeReader:
+    """Archivo de solo lectura limitado a un rango de bytes (para copy_expert)"""
+
+    def __init__(self, path: Path, offset: int, length: int):
+        self._file = open(path, 'rb')
+        self._file.seek(offset)
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b''
+        limit = self._remaining if size < 0 else min(size, self._remaining)
+        data = self._file.readline(limit)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
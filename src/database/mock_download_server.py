@@ -0,0 +1,167 @@
+"""
+Servidor HTTP local que simula la descarga de un backup para pruebas offline
+
+Sirve un contenido en memoria con soporte de Range, If-Range y ETag, como
+el almacenamiento de Odoo.sh, y permite simular cortes de conexión a mitad
+de respuesta y cambios del archivo durante la descarga.
+
+Uso:
+    with MockDownloadServer(b'...' * 1000, interrupt_after=4096, interruptions=1) as server:
+        RangedDownloader(segment_size=8192).download(server.url, 'backups/dump.zip')
+"""
+import hashlib
+import logging
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_RANGE_RE = re.compile(r'^bytes=(\d+)-(\d*)$')
+
+
+class MockDownloadServer:
+    """Servidor de un único archivo con Range, If-Range y ETag"""
+
+    def __init__(self, content: bytes, ranges: bool = True, etag: Optional[str] = None,
+                 interrupt_after: Optional[int] = None, interruptions: int = 0,
+                 on_request: Optional[Callable[['MockDownloadServer', int], None]] = None,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        Inicializar servidor
+
+        Args:
+            content: Bytes del archivo servido
+            ranges: Aceptar peticiones Range (False responde siempre 200 completo)
+            etag: ETag fijo (por defecto, el MD5 del contenido entre comillas)
+            interrupt_after: Bytes enviados antes de cortar la conexión en las
+                respuestas interrumpidas
+            interruptions: Número de respuestas (sin contar la sonda de un
+                byte) que se cortan tras interrupt_after bytes
+            on_request: Función llamada con (servidor, nº de petición) antes de
+                responder cada petición, ej: para cambiar el archivo a mitad
+            host: Interfaz de escucha
+            port: Puerto (0 elige uno libre)
+        """
+        self.ranges = ranges
+        self.interrupt_after = interrupt_after
+        self.interruptions = interruptions
+        self.on_request = on_request
+        # (Range, If-Range, estado) de cada petición atendida
+        self.requests: List[Tuple[Optional[str], Optional[str], int]] = []
+        self._fixed_etag = etag
+        self._lock = threading.Lock()
+        self.replace(content)
+
+        self._httpd = ThreadingHTTPServer((host, port), _handler_class(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL del archivo servido"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/backup.zip"
+
+    def replace(self, content: bytes):
+        """Sustituye el archivo servido (cambia el ETag salvo que sea fijo)"""
+        with self._lock:
+            self.content = content
+            self.etag = self._fixed_etag or f'"{hashlib.md5(content).hexdigest()}"'
+
+    def start(self) -> 'MockDownloadServer':
+        """Arranca el servidor en un hilo en segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                            name='mock-download', daemon=True)
+            self._thread.start()
+            logger.info(f"Servidor de descargas simulado en {self.url}")
+        return self
+
+    def stop(self):
+        """Detiene el servidor"""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def respond(self, range_header: Optional[str], if_range: Optional[str]) -> Dict[str, Any]:
+        """
+        Decide la respuesta a un GET
+
+        Args:
+            range_header: Cabecera Range de la petición
+            if_range: Cabecera If-Range de la petición
+
+        Returns:
+            Dict: status, headers, body y cut (bytes tras los que cortar, o None)
+        """
+        with self._lock:
+            number = len(self.requests) + 1
+        if self.on_request is not None:
+            self.on_request(self, number)
+
+        with self._lock:
+            content, etag = self.content, self.etag
+            size = len(content)
+            headers = {'ETag': etag, 'Accept-Ranges': 'bytes' if self.ranges else 'none'}
+            match = _RANGE_RE.match(range_header or '') if self.ranges else None
+            # If-Range con otro ETag: el archivo cambió y se envía completo
+            if match and (if_range is None or if_range == etag):
+                start = int(match.group(1))
+                end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+                if start >= size or start > end:
+                    self.requests.append((range_header, if_range, 416))
+                    return {'status': 416, 'body': b'', 'cut': None,
+                            'headers': {**headers, 'Content-Range': f'bytes */{size}'}}
+                status, body = 206, content[start:end + 1]
+                headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            else:
+                status, body = 200, content
+
+            cut = None
+            probe = range_header == 'bytes=0-0'
+            if self.interruptions and self.interrupt_after is not None and not probe:
+                self.interruptions -= 1
+                cut = min(self.interrupt_after, len(body))
+            self.requests.append((range_header, if_range, status))
+        return {'status': status, 'headers': headers, 'body': body, 'cut': cut}
+
+
+def _handler_class(server: MockDownloadServer):
+    """Clase de handler HTTP ligada a una instancia del servidor"""
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+        def do_GET(self):
+            response = server.respond(self.headers.get('Range'), self.headers.get('If-Range'))
+            body = response['body']
+            self.send_response(response['status'])
+            for name, value in response['headers'].items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                if response['cut'] is None:
+                    self.wfile.write(body)
+                else:
+                    # Corte de conexión: menos bytes que los anunciados
+                    self.wfile.write(body[:response['cut']])
+                    self.wfile.flush()
+                    self.close_connection = True
+            except (BrokenPipeError, ConnectionResetError):
+                logger.debug("Cliente desconectado antes de la respuesta")
+
+    return _Handler
@@ -0,0 +1,338 @@
+"""
+Conversión directa de dumps SQL planos a archivos Parquet (sin PostgreSQL)
+"""
+import cProfile
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .dump_parser import DumpIndex, RangeReader, TableFilter, scan_dump
+
+logger = logging.getLogger(__name__)
+
+# Filas por row group: limita la memoria usada por cada tabla en conversión
+DEFAULT_ROW_GROUP_SIZE = 100_000
+
+# Tipos de PostgreSQL -> tipo de Arrow (por nombre, ver _arrow_type)
+_PG_TYPES = {
+    'smallint': 'int16',
+    'integer': 'int32',
+    'bigint': 'int64',
+    'real': 'float32',
+    'double precision': 'float64',
+    'boolean': 'bool',
+    'date': 'date32',
+    'timestamp without time zone': 'timestamp',
+    'timestamp with time zone': 'timestamptz',
+}
+
+# numeric(precisión[, escala]): decimal exacto (sin restricción se exporta como texto)
+_NUMERIC_RE = re.compile(r'^numeric\((\d+)(?:,\s*(\d+))?\)$')
+_DECIMAL_RE = re.compile(r'^decimal(\d+)\((\d+),(\d+)\)$')
+
+_COLUMN_RE = re.compile(r'^\s+("(?:[^"]|"")+"|\w+) (.+?)(?: NOT NULL)?(?: DEFAULT .*)?,?$')
+_COPY_COLUMNS_RE = re.compile(r'^COPY (\S+) \((.*)\) FROM stdin;$')
+_ESCAPE_RE = re.compile(r'\\(?:([0-7]{1,3})|x([0-9a-fA-F]{1,2})|(.))')
+_SIMPLE_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+
+
+def parse_table_columns(create_sql: str) -> Dict[str, str]:
+    """
+    Obtiene los tipos de columna de una sentencia CREATE TABLE de pg_dump
+
+    Args:
+        create_sql: SQL de la entrada TABLE del dump
+
+    Returns:
+        Dict[str, str]: {columna: tipo de PostgreSQL}
+    """
+    columns = {}
+    in_table = False
+    for line in create_sql.splitlines():
+        stripped = line.strip()
+        if not in_table:
+            in_table = stripped.startswith(('CREATE TABLE', 'CREATE UNLOGGED TABLE'))
+            continue
+        if stripped.startswith(')'):
+            break
+        if not stripped or stripped.startswith('CONSTRAINT'):
+            continue
+        match = _COLUMN_RE.match(line)
+        if match:
+            name = match.group(1)
+            if name.startswith('"'):
+                name = name[1:-1].replace('""', '"')
+            columns[name] = match.group(2).strip()
+    return columns
+
+
+def _arrow_type(pg_type: str) -> str:
+    """Nombre del tipo Arrow para un tipo de PostgreSQL (texto por defecto)"""
+    if pg_type.endswith('[]'):
+        return 'string'
+    numeric = _NUMERIC_RE.match(pg_type.strip())
+    if numeric:
+        # Importes y cantidades de Odoo: decimal para no perder precisión
+        precision, scale = int(numeric.group(1)), int(numeric.group(2) or 0)
+        return f"decimal{128 if precision <= 38 else 256}({precision},{scale})"
+    base = re.sub(r'\(.*?\)', '', pg_type).strip()
+    return _PG_TYPES.get(base, 'string')
+
+
+def _unescape(value: str) -> str:
+    """Decodifica los escapes del formato de texto de COPY"""
+    def replace(match):
+        octal, hexa, char = match.groups()
+        if octal:
+            return chr(int(octal, 8))
+        if hexa:
+            return chr(int(hexa, 16))
+        return _SIMPLE_ESCAPES.get(char, char)
+    return _ESCAPE_RE.sub(replace, value)
+
+
+def _split_copy_columns(copy_sql: str) -> List[str]:
+    """Columnas en el orden de la sentencia COPY"""
+    match = _COPY_COLUMNS_RE.match(copy_sql)
+    if not match:
+        return []
+    return [name.strip().strip('"') for name in match.group(2).split(',')]
+
+
+def _to_arrow(values: List[Optional[str]], arrow_type: str):
+    """Convierte una columna de texto al tipo Arrow (vectorizado)"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    strings = pa.array(values, type=pa.string())
+    if arrow_type == 'string':
+        return strings
+    if arrow_type == 'bool':
+        return pc.equal(strings, 't')
+
+    decimal = _DECIMAL_RE.match(arrow_type)
+    if decimal:
+        bits, precision, scale = (int(group) for group in decimal.groups())
+        target = (pa.decimal128 if bits == 128 else pa.decimal256)(precision, scale)
+    else:
+        target = {
+            'timestamp': pa.timestamp('us'),
+            'timestamptz': pa.timestamp('us', tz='UTC'),
+        }.get(arrow_type) or getattr(pa, arrow_type)()
+    try:
+        return strings.cast(target)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # Valores fuera de rango (ej: 'infinity', 'NaN'): se convierten a nulos
+        converted = []
+        for value in values:
+            try:
+                converted.append(pa.array([value], type=pa.string()).cast(target)[0].as_py())
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                converted.append(None)
+        return pa.array(converted, type=target)
+
+
+def convert_table(dump_path: str, table: str, copy_sql: str, offset: int, length: int,
+                  column_types: Dict[str, str], output_path: str,
+                  row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+                  compression: str = 'zstd',
+                  profile_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Convierte el bloque COPY de una tabla a un archivo Parquet
+
+    Se ejecuta en un proceso independiente: recibe solo tipos simples.
+
+    Args:
+        dump_path: Ruta del dump
+        table: Nombre calificado de la tabla
+        copy_sql: Sentencia COPY del bloque
+        offset: Posición de los datos en el dump
+        length: Tamaño de los datos
+        column_types: {columna: tipo de PostgreSQL}
+        output_path: Archivo Parquet destino
+        row_group_size: Filas por row group
+        compression: Códec de compresión de Parquet
+        profile_path: Guardar aquí el perfil cProfile de la conversión (opcional)
+
+    Returns:
+        Dict: Tabla, filas, bytes leídos/escritos, segundos, inicio y pid
+    """
+    started_at = time.time()
+    args = (dump_path, table, copy_sql, offset, length, column_types, output_path,
+            row_group_size, compression)
+    if profile_path is None:
+        result = _convert_table(*args)
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = _convert_table(*args)
+        finally:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+    result.update(started_at=started_at, pid=os.getpid())
+    return result
+
+
+def _convert_table(dump_path: str, table: str, copy_sql: str, offset: int, length: int,
+                   column_types: Dict[str, str], output_path: str,
+                   row_group_size: int, compression: str) -> Dict[str, Any]:
+    """Conversión de convert_table (sin perfilado)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    started = time.monotonic()
+    columns = _split_copy_columns(copy_sql)
+    arrow_types = [_arrow_type(column_types.get(name, 'text')) for name in columns]
+    schema = pa.schema([
+        (name, _to_arrow([], arrow_type).type) for name, arrow_type in zip(columns, arrow_types)
+    ])
+
+    tmp_path = Path(output_path).with_suffix('.parquet.part')
+    rows = 0
+    with pq.ParquetWriter(tmp_path, schema, compression=compression) as writer, \
+            RangeReader(Path(dump_path), offset, length) as reader:
+        buffers: List[List[Optional[str]]] = [[] for _ in columns]
+
+        def flush():
+            arrays = [_to_arrow(values, arrow_type)
+                      for values, arrow_type in zip(buffers, arrow_types)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            for values in buffers:
+                values.clear()
+
+        pending = 0
+        for raw in iter(reader.readline, b''):
+            fields = raw.decode('utf-8').rstrip('\n').split('\t')
+            for values, field in zip(buffers, fields):
+                if field == '\\N':
+                    values.append(None)
+                elif '\\' in field:
+                    values.append(_unescape(field))
+                else:
+                    values.append(field)
+            pending += 1
+            if pending >= row_group_size:
+                flush()
+                rows += pending
+                pending = 0
+        if pending or not rows:
+            flush()
+            rows += pending
+
+    tmp_path.replace(output_path)
+    return {
+        'table': table,
+        'rows': rows,
+        'input_bytes': length,
+        'output_bytes': os.path.getsize(output_path),
+        'seconds': time.monotonic() - started,
+    }
+
+
+class DumpParquetConverter:
+    """Convierte un dump plano de Odoo en un archivo Parquet por tabla"""
+
+    def __init__(self, output_dir: str, workers: Optional[int] = None,
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+                 compression: str = 'zstd', tracer=None):
+        """
+        Inicializar convertidor
+
+        Args:
+            output_dir: Directorio de salida
+            workers: Procesos en paralelo (por defecto, núcleos de CPU)
+            row_group_size: Filas por row group (limita la memoria por tabla)
+            compression: Códec de Parquet ('zstd', 'snappy', 'gzip', ...)
+            tracer: Tracer (utils.tracing) para registrar las etapas; con
+                profile_dir activo, cada tabla genera su perfil cProfile
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("La conversión a Parquet requiere pyarrow: pip install pyarrow")
+        self.output_dir = Path(output_dir)
+        self.workers = workers or os.cpu_count() or 4
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.tracer = tracer
+
+    def convert(self, dump_path: str, tables: Optional[List[str]] = None,
+                exclude_tables: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Convierte las tablas del dump en paralelo
+
+        Args:
+            dump_path: Ruta al archivo .sql
+            tables: Tablas a convertir (admite comodines y 'res.partner')
+            exclude_tables: Tablas a omitir
+
+        Returns:
+            Dict: Resultado por tabla, errores y duración total
+        """
+        started = time.monotonic()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        table_filter = TableFilter(tables, exclude_tables) if (tables or exclude_tables) else None
+        with self._span('scan', dump=str(dump_path)):
+            index = scan_dump(dump_path, table_filter)
+            column_types = self._column_types(index)
+
+        results, errors_found = [], []
+        blocks = sorted(index.data, key=lambda block: block.length, reverse=True)
+        with self._span('convert', tables=len(blocks), workers=self.workers), \
+                ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(
+                    convert_table, str(index.path), block.table, block.copy_sql,
+                    block.offset, block.length, column_types.get(block.name, {}),
+                    str(self.output_dir / f"{block.name}.parquet"),
+                    self.row_group_size, self.compression,
+                    self._profile_path(f"parquet_{block.name}")
+                ): block
+                for block in blocks
+            }
+            for future in as_completed(futures):
+                block = futures[future]
+                try:
+                    result = future.result()
+                    results.append(result)
+                    logger.info(f"{block.name}: {result['rows']:,} filas en "
+                                f"{result['seconds']:,.1f} s")
+                    if self.tracer is not None:
+                        # Medido en el proceso del pool: se registra desde aquí
+                        self.tracer.add_span(
+                            block.name, result['started_at'], result['seconds'],
+                            cat='parquet', pid=result['pid'], rows=result['rows'],
+                            input_bytes=result['input_bytes'],
+                            output_bytes=result['output_bytes'])
+                except Exception as e:
+                    logger.error(f"Error convirtiendo {block.table}: {e}")
+                    errors_found.append(f"{block.table}: {e}")
+
+        return {
+            'tables': sorted(results, key=lambda result: result['table']),
+            'errors': errors_found,
+            'total': time.monotonic() - started,
+        }
+
+    def _span(self, name: str, **args):
+        """Span del tracer, o un contexto vacío si no hay tracer"""
+        if self.tracer is None:
+            return nullcontext(args)
+        return self.tracer.span(name, cat='parquet', **args)
+
+    def _profile_path(self, name: str) -> Optional[str]:
+        """Archivo .prof de una tabla si el tracer tiene el perfilado activo"""
+        path = self.tracer.profile_path(name) if self.tracer is not None else None
+        return str(path) if path else None
+
+    @staticmethod
+    def _column_types(index: DumpIndex) -> Dict[str, Dict[str, str]]:
+        """Tipos de columna de cada tabla a partir de las entradas CREATE TABLE"""
+        return {entry.name: parse_table_columns(entry.sql)
+                for entry in index.pre_data if entry.type == 'TABLE'}
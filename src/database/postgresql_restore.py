@@ -0,0 +1,503 @@
+"""
+Restauración paralela de dumps SQL planos en PostgreSQL
+"""
+import logging
+import os
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import psycopg2
+from psycopg2 import errors, sql
+
+from .dump_parser import (DumpIndex, DumpEntry, TableData, TableFilter, RangeReader,
+                          scan_dump, PARALLEL_INDEX_TYPES)
+from .replica import REPLICA_INFO_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque leído del dump en cada COPY (1 MB)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Parámetros de sesión/base de datos del perfil de restauración rápida
+FAST_RESTORE_SETTINGS = {
+    'synchronous_commit': 'off',
+    'maintenance_work_mem': '1GB',
+    'max_parallel_maintenance_workers': '4',
+    'work_mem': '64MB',
+    'statement_timeout': '0',
+}
+
+# Sufijos de las bases temporales usadas por la restauración rápida
+RESTORING_SUFFIX = '__restoring'
+REPLACED_SUFFIX = '__old'
+
+_CREATE_TABLE_RE = re.compile(r'^CREATE TABLE ', re.MULTILINE)
+
+
+class PostgreSQLRestore:
+    """Restaura dumps planos de Odoo usando varias conexiones en paralelo"""
+
+    def __init__(self, host: str = 'localhost', port: int = 5432,
+                 user: str = 'postgres', password: Optional[str] = None,
+                 jobs: Optional[int] = None, stop_on_error: bool = False,
+                 tracer=None):
+        """
+        Inicializar restaurador
+
+        Args:
+            host: Host de PostgreSQL
+            port: Puerto de PostgreSQL
+            user: Usuario de PostgreSQL
+            password: Contraseña de PostgreSQL
+            jobs: Número de conexiones paralelas (por defecto, núcleos de CPU)
+            stop_on_error: Abortar ante el primer error (como psql -v ON_ERROR_STOP=1)
+            tracer: Tracer (utils.tracing) para registrar fases y tablas (opcional)
+        """
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.jobs = jobs or os.cpu_count() or 4
+        self.stop_on_error = stop_on_error
+        self.tracer = tracer
+
+    # ------------------------------------------------------------------
+    # Conexiones y gestión de bases de datos
+    # ------------------------------------------------------------------
+    def connect(self, dbname: str = 'postgres', autocommit: bool = True):
+        """Abre una conexión a la base de datos indicada"""
+        conn = psycopg2.connect(dbname=dbname, user=self.user, password=self.password,
+                                host=self.host, port=self.port)
+        conn.autocommit = autocommit
+        return conn
+
+    def database_exists(self, dbname: str) -> bool:
+        """Indica si la base de datos existe"""
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
+                return cur.fetchone() is not None
+        finally:
+            conn.close()
+
+    def create_database(self, dbname: str, drop_existing: bool = False):
+        """
+        Crea una base de datos vacía
+
+        Args:
+            dbname: Nombre de la base de datos
+            drop_existing: Eliminarla antes si ya existe
+        """
+        if drop_existing:
+            self.drop_database(dbname)
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(dbname)))
+        finally:
+            conn.close()
+        logger.info(f"Base de datos {dbname} creada")
+
+    def drop_database(self, dbname: str):
+        """Elimina una base de datos (cerrando las conexiones activas)"""
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                            "WHERE datname = %s AND pid <> pg_backend_pid()", (dbname,))
+                cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(
+                    sql.Identifier(dbname)))
+        finally:
+            conn.close()
+
+    def set_template(self, dbname: str, is_template: bool):
+        """
+        Marca (o desmarca) una base de datos como plantilla
+
+        Las plantillas no aceptan conexiones, requisito para clonarlas con
+        CREATE DATABASE ... TEMPLATE sin interferencias.
+        """
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("ALTER DATABASE {} WITH IS_TEMPLATE {} "
+                                    "ALLOW_CONNECTIONS {}").format(
+                    sql.Identifier(dbname), sql.Literal(is_template),
+                    sql.Literal(not is_template)))
+                if is_template:
+                    cur.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                                "WHERE datname = %s AND pid <> pg_backend_pid()", (dbname,))
+        finally:
+            conn.close()
+
+    def clone_database(self, template: str, dbname: str, comment: Optional[str] = None):
+        """
+        Crea una base de datos copiando una plantilla a nivel de archivos
+
+        Args:
+            template: Base de datos plantilla
+            dbname: Nombre de la copia
+            comment: Comentario a guardar en la copia (opcional)
+        """
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                query = sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                    sql.Identifier(dbname), sql.Identifier(template))
+                if conn.server_version >= 150000:
+                    # WAL_LOG (por defecto desde PG 15) es más lento con plantillas grandes
+                    query += sql.SQL(" STRATEGY FILE_COPY")
+                cur.execute(query)
+                if comment:
+                    cur.execute(sql.SQL("COMMENT ON DATABASE {} IS {}").format(
+                        sql.Identifier(dbname), sql.Literal(comment)))
+        finally:
+            conn.close()
+
+    def record_snapshot(self, dbname: str, snapshot_at: datetime,
+                        source: Optional[str] = None):
+        """
+        Registra en la base restaurada el momento al que corresponden sus datos
+
+        La réplica lo consulta para decidir si está lo bastante actualizada
+        (ver ReplicaPool.snapshot_time).
+
+        Args:
+            dbname: Base de datos restaurada
+            snapshot_at: Fecha del backup (con zona horaria)
+            source: Backup de origen (opcional)
+        """
+        conn = self.connect(dbname, autocommit=False)
+        try:
+            with conn, conn.cursor() as cur:
+                table = sql.Identifier(REPLICA_INFO_TABLE)
+                cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} ("
+                                    "snapshot_at timestamptz NOT NULL, "
+                                    "restored_at timestamptz NOT NULL DEFAULT now(), "
+                                    "source text)").format(table))
+                cur.execute(sql.SQL("TRUNCATE {}").format(table))
+                cur.execute(sql.SQL("INSERT INTO {} (snapshot_at, source) VALUES (%s, %s)")
+                            .format(table), (snapshot_at, source))
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Restauración
+    # ------------------------------------------------------------------
+    def restore(self, dump_path: str, dbname: str, create: bool = True,
+                drop_existing: bool = False, tables: Optional[List[str]] = None,
+                exclude_tables: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Restaura un dump plano dividiéndolo en fases
+
+        1. pre-data (tablas, tipos, funciones) en una conexión
+        2. datos COPY de cada tabla en `jobs` conexiones paralelas
+        3. secuencias y objetos grandes
+        4. índices y restricciones PK/UNIQUE en paralelo
+        5. claves foráneas en paralelo, resto de objetos en serie
+
+        Args:
+            dump_path: Ruta al archivo .sql (debe ser un archivo en disco)
+            dbname: Base de datos destino
+            create: Crear la base de datos si no existe
+            drop_existing: Eliminar la base de datos destino si existe
+            tables: Restaurar solo estas tablas (admite comodines y 'res.partner')
+            exclude_tables: Tablas a omitir (ej: ['mail_*', 'bus_bus'])
+
+        Returns:
+            Dict: Tiempos por fase, tablas, bytes cargados y errores
+        """
+        started = time.monotonic()
+        stats = {'database': dbname, 'phases': {}, 'errors': []}
+
+        if drop_existing or (create and not self.database_exists(dbname)):
+            self.create_database(dbname, drop_existing=drop_existing)
+
+        index = self._scan(dump_path, dbname, stats, tables, exclude_tables)
+        self._restore_phases(dbname, index, stats)
+
+        stats['total'] = time.monotonic() - started
+        logger.info(f"Restauración de {dbname} completada en {stats['total']:,.1f} s "
+                    f"({len(stats['errors'])} errores)")
+        return stats
+
+    def restore_fast(self, dump_path: str, dbname: str,
+                     settings: Optional[Dict[str, str]] = None,
+                     keep_unlogged: bool = True, tables: Optional[List[str]] = None,
+                     exclude_tables: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Perfil de restauración rápida para copias analíticas desechables
+
+        - Restaura en una base temporal '<dbname>__restoring'
+        - Aplica FAST_RESTORE_SETTINGS a nivel de base y de sesión
+          (synchronous_commit=off, maintenance_work_mem alto, ...)
+        - Crea las tablas UNLOGGED (sin WAL) durante la carga
+        - Construye índices tras los datos y ejecuta ANALYZE en paralelo
+        - Reemplaza la base destino con un doble RENAME en una transacción
+
+        Las tablas UNLOGGED se vacían si el servidor se cae: usar solo para
+        copias que se pueden volver a restaurar.
+
+        Args:
+            dump_path: Ruta al archivo .sql
+            dbname: Base de datos destino (se reemplaza si existe)
+            settings: Parámetros que sobrescriben FAST_RESTORE_SETTINGS
+            keep_unlogged: Dejar las tablas UNLOGGED (False las pasa a LOGGED)
+            tables: Restaurar solo estas tablas
+            exclude_tables: Tablas a omitir
+
+        Returns:
+            Dict: Tiempos por fase, tablas, bytes cargados y errores
+        """
+        started = time.monotonic()
+        staging = f"{dbname}{RESTORING_SUFFIX}"
+        stats = {'database': dbname, 'staging_database': staging,
+                 'phases': {}, 'errors': []}
+        settings = {**FAST_RESTORE_SETTINGS, **(settings or {})}
+
+        self.create_database(staging, drop_existing=True)
+        self._set_database_settings(staging, settings)
+
+        index = self._scan(dump_path, staging, stats, tables, exclude_tables)
+        index.preamble = '\n'.join(
+            [index.preamble] + [f"SET {name} = '{value}';" for name, value in settings.items()]
+        )
+        for entry in index.pre_data:
+            if entry.type == 'TABLE':
+                entry.sql = _CREATE_TABLE_RE.sub('CREATE UNLOGGED TABLE ', entry.sql)
+
+        try:
+            self._restore_phases(staging, index, stats, keep_unlogged=keep_unlogged)
+            self._run_phase(stats, 'analyze', self._analyze, staging, index)
+            self._set_database_settings(staging, settings, reset=True)
+            self._run_phase(stats, 'swap', self._swap_database, staging, dbname)
+        except Exception:
+            logger.error(f"Restauración rápida fallida; se conserva {staging} para revisión")
+            raise
+
+        stats['total'] = time.monotonic() - started
+        logger.info(f"Restauración rápida de {dbname} completada en {stats['total']:,.1f} s "
+                    f"({len(stats['errors'])} errores)")
+        return stats
+
+    def _scan(self, dump_path: str, dbname: str, stats: Dict,
+              tables: Optional[List[str]] = None,
+              exclude_tables: Optional[List[str]] = None) -> DumpIndex:
+        """Analiza el dump (aplicando la selección de tablas) y mide la fase"""
+        table_filter = TableFilter(tables, exclude_tables) if (tables or exclude_tables) else None
+        phase_start = time.monotonic()
+        with self._span('scan', dump=str(dump_path)):
+            index = scan_dump(dump_path, table_filter)
+        stats['phases']['scan'] = time.monotonic() - phase_start
+        stats.update(index.summary())
+        if table_filter:
+            stats['skipped'] = sorted(table_filter.skipped)
+        logger.info(f"Restaurando {dump_path} → {dbname}: {len(index.data)} tablas, "
+                    f"{index.data_bytes / (1024 * 1024):,.1f} MB de datos, {self.jobs} conexiones")
+        return index
+
+    def _restore_phases(self, dbname: str, index: DumpIndex, stats: Dict,
+                        keep_unlogged: bool = True):
+        """Ejecuta las fases de restauración del dump ya analizado"""
+        self._run_phase(stats, 'pre_data', self._execute_serial,
+                        dbname, index, index.pre_data)
+        self._run_phase(stats, 'data', self._load_data, dbname, index)
+        self._run_phase(stats, 'after_data', self._execute_serial,
+                        dbname, index, index.after_data)
+
+        if not keep_unlogged:
+            # Antes de las claves foráneas: una tabla LOGGED no puede
+            # referenciar a una UNLOGGED
+            self._run_phase(stats, 'set_logged', self._execute_parallel, dbname, index,
+                            [DumpEntry(block.table, 'SET LOGGED', '',
+                                       f"ALTER TABLE {block.table} SET LOGGED;")
+                             for block in index.data])
+
+        indexes = [e for e in index.post_data if e.type in PARALLEL_INDEX_TYPES]
+        foreign_keys = [e for e in index.post_data if e.type == 'FK CONSTRAINT']
+        remaining = [e for e in index.post_data
+                     if e.type not in PARALLEL_INDEX_TYPES and e.type != 'FK CONSTRAINT']
+
+        self._run_phase(stats, 'indexes', self._execute_parallel,
+                        dbname, index, indexes)
+        self._run_phase(stats, 'foreign_keys', self._execute_parallel,
+                        dbname, index, foreign_keys)
+        self._run_phase(stats, 'post_data', self._execute_serial,
+                        dbname, index, remaining)
+
+    def _analyze(self, dbname: str, index: DumpIndex) -> List[str]:
+        """Actualiza las estadísticas del planificador tabla por tabla en paralelo"""
+        return self._execute_parallel(dbname, index, [
+            DumpEntry(block.table, 'ANALYZE', '', f"ANALYZE {block.table};")
+            for block in index.data
+        ])
+
+    def _set_database_settings(self, dbname: str, settings: Dict[str, str],
+                               reset: bool = False):
+        """Aplica (o restablece) parámetros por defecto de una base de datos"""
+        conn = self.connect()
+        try:
+            with conn.cursor() as cur:
+                for name, value in settings.items():
+                    if reset:
+                        cur.execute(sql.SQL("ALTER DATABASE {} RESET {}").format(
+                            sql.Identifier(dbname), sql.Identifier(name)))
+                    else:
+                        cur.execute(sql.SQL("ALTER DATABASE {} SET {} = {}").format(
+                            sql.Identifier(dbname), sql.Identifier(name),
+                            sql.Literal(value)))
+        finally:
+            conn.close()
+
+    def _swap_database(self, staging: str, dbname: str) -> List[str]:
+        """Reemplaza dbname por la base restaurada con dos RENAME atómicos"""
+        replaced = f"{dbname}{REPLACED_SUFFIX}"
+        self.drop_database(replaced)
+
+        conn = self.connect(autocommit=False)
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                            "WHERE datname IN (%s, %s) AND pid <> pg_backend_pid()",
+                            (dbname, staging))
+                cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
+                if cur.fetchone():
+                    cur.execute(sql.SQL("ALTER DATABASE {} RENAME TO {}").format(
+                        sql.Identifier(dbname), sql.Identifier(replaced)))
+                cur.execute(sql.SQL("ALTER DATABASE {} RENAME TO {}").format(
+                    sql.Identifier(staging), sql.Identifier(dbname)))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        self.drop_database(replaced)
+        return []
+
+    def _run_phase(self, stats: Dict, name: str, func, *args):
+        """Ejecuta una fase midiendo su duración"""
+        phase_start = time.monotonic()
+        with self._span(name) as span_args:
+            errors_found = func(*args)
+            span_args['errors'] = len(errors_found)
+        stats['phases'][name] = time.monotonic() - phase_start
+        stats['errors'].extend(errors_found)
+        logger.info(f"Fase {name}: {stats['phases'][name]:,.2f} s")
+
+    def _span(self, name: str, **args):
+        """Span del tracer, o un contexto vacío si no hay tracer"""
+        if self.tracer is None:
+            return nullcontext(args)
+        return self.tracer.span(name, cat='restore', **args)
+
+    def _session(self, dbname: str, index: DumpIndex):
+        """Abre una conexión con las opciones SET del encabezado del dump"""
+        conn = self.connect(dbname)
+        if index.preamble:
+            with conn.cursor() as cur:
+                cur.execute(index.preamble)
+        return conn
+
+    def _execute_entry(self, cur, entry: DumpEntry, retries: int = 3) -> Optional[str]:
+        """Ejecuta un objeto del dump; devuelve el mensaje de error si falla"""
+        if not entry.sql:
+            return None
+        for attempt in range(retries):
+            try:
+                cur.execute(entry.sql)
+                return None
+            except psycopg2.Error as e:
+                if isinstance(e, errors.DeadlockDetected) and attempt < retries - 1:
+                    # Claves foráneas en paralelo sobre tablas compartidas
+                    time.sleep(0.1 * (attempt + 1))
+                    continue
+                message = f"{entry.type} {entry.name}: {str(e).strip()}"
+                if self.stop_on_error:
+                    raise
+                logger.warning(f"Error restaurando {message}")
+                return message
+        return None
+
+    def _execute_serial(self, dbname: str, index: DumpIndex,
+                        entries: List[DumpEntry]) -> List[str]:
+        """Ejecuta objetos en orden en una única conexión"""
+        if not entries:
+            return []
+        found = []
+        conn = self._session(dbname, index)
+        try:
+            with conn.cursor() as cur:
+                for entry in entries:
+                    error = self._execute_entry(cur, entry)
+                    if error:
+                        found.append(error)
+        finally:
+            conn.close()
+        return found
+
+    def _execute_parallel(self, dbname: str, index: DumpIndex,
+                          entries: List[DumpEntry]) -> List[str]:
+        """Ejecuta objetos independientes repartidos entre varias conexiones"""
+        if not entries:
+            return []
+        workers = min(self.jobs, len(entries))
+        sessions = queue.Queue()
+        for _ in range(workers):
+            sessions.put(self._session(dbname, index))
+
+        def _run(entry: DumpEntry) -> Optional[str]:
+            conn = sessions.get()
+            try:
+                with conn.cursor() as cur:
+                    return self._execute_entry(cur, entry)
+            finally:
+                sessions.put(conn)
+
+        found = []
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for error in executor.map(_run, entries):
+                    if error:
+                        found.append(error)
+        finally:
+            while not sessions.empty():
+                sessions.get().close()
+        return found
+
+    def _copy_table(self, dbname: str, index: DumpIndex, block: TableData) -> Optional[str]:
+        """Carga el bloque COPY de una tabla en su propia conexión"""
+        conn = self._session(dbname, index)
+        try:
+            with self._span(block.table, bytes=block.length), conn.cursor() as cur, \
+                    RangeReader(index.path, block.offset, block.length) as reader:
+                cur.copy_expert(block.copy_sql, reader, size=COPY_BUFFER_SIZE)
+            return None
+        except psycopg2.Error as e:
+            message = f"TABLE DATA {block.table}: {str(e).strip()}"
+            if self.stop_on_error:
+                raise
+            logger.warning(f"Error restaurando {message}")
+            return message
+        finally:
+            conn.close()
+
+    def _load_data(self, dbname: str, index: DumpIndex) -> List[str]:
+        """Carga los datos de todas las tablas en paralelo (las mayores primero)"""
+        blocks = sorted(index.data, key=lambda block: block.length, reverse=True)
+        found = []
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(self._copy_table, dbname, index, block)
+                       for block in blocks if block.length]
+            for future in as_completed(futures):
+                error = future.result()
+                if error:
+                    found.append(error)
+        return found
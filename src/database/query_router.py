@@ -0,0 +1,680 @@
+"""
+Enrutador de consultas: resuelve lecturas de Odoo en la réplica local
+cuando está lo bastante actualizada, y por JSON-RPC en caso contrario
+"""
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+
+import psycopg2
+from psycopg2 import sql
+
+logger = logging.getLogger(__name__)
+
+# Métodos que pueden resolverse en la réplica
+READ_METHODS = {'search', 'search_read', 'search_count', 'read_group'}
+
+# Argumentos posicionales de cada método (mismo orden que en Odoo)
+_SIGNATURES = {
+    'search': ('domain', 'offset', 'limit', 'order', 'count'),
+    'search_read': ('domain', 'fields', 'offset', 'limit', 'order'),
+    'search_count': ('domain', 'limit'),
+    'read_group': ('domain', 'fields', 'groupby', 'offset', 'limit', 'orderby', 'lazy'),
+}
+
+_NUMERIC_TYPES = {'integer', 'float', 'monetary'}
+_TEXT_TYPES = {'char', 'text', 'html', 'selection'}
+_SCALAR_TYPES = _NUMERIC_TYPES | _TEXT_TYPES | {'boolean', 'date', 'datetime', 'many2one'}
+
+# Negación de operadores (como expression.distribute_not de Odoo)
+_NEGATIONS = {
+    '=': '!=', '!=': '=', '<': '>=', '>=': '<', '>': '<=', '<=': '>',
+    'in': 'not in', 'not in': 'in', 'like': 'not like', 'not like': 'like',
+    'ilike': 'not ilike', 'not ilike': 'ilike',
+}
+_LIKE_OPERATORS = {
+    'like': 'LIKE', 'ilike': 'ILIKE', 'not like': 'NOT LIKE', 'not ilike': 'NOT ILIKE',
+    '=like': 'LIKE', '=ilike': 'ILIKE',
+}
+_COMPARISONS = {'<', '<=', '>', '>='}
+_AGGREGATES = {'sum', 'avg', 'min', 'max', 'count', 'count_distinct'}
+_AGGREGATE_SPEC_RE = re.compile(r'^(\w+)(?::(\w+)(?:\((\w+)\))?)?$')
+
+# Columnas candidatas para el nombre visible de un many2one
+_DISPLAY_COLUMNS = ('display_name', 'complete_name', 'name')
+
+
+class _Unsupported(Exception):
+    """La llamada no se puede traducir a SQL: se resuelve por RPC"""
+
+
+def _seconds(value: Union[None, float, timedelta]) -> Optional[float]:
+    """Normaliza un límite de antigüedad a segundos"""
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return value
+
+
+def normalize_domain(domain: List) -> List:
+    """Hace explícitos los '&' implícitos de un dominio (como en Odoo)"""
+    result, expected = [], 1
+    for token in domain:
+        if expected == 0:
+            result[0:0] = ['&']
+            expected = 1
+        if isinstance(token, (list, tuple)):
+            expected -= 1
+        elif token in ('&', '|'):
+            expected += 1
+        elif token != '!':
+            raise _Unsupported(f"elemento de dominio no válido: {token!r}")
+        result.append(token)
+    return result
+
+
+def and_domains(domains: Iterable[List]) -> List:
+    """Combina dominios con AND (equivalente a expression.AND)"""
+    result, count = [], 0
+    for domain in domains:
+        if domain:
+            result += normalize_domain(list(domain))
+            count += 1
+    return ['&'] * (count - 1) + result
+
+
+class QueryRouter:
+    """
+    Resuelve search/search_read/search_count/read_group en la réplica
+
+    Se usa igual que OdooConnection (incluso como conexión de OdooModel): las
+    lecturas soportadas se traducen a SQL si la réplica cumple el límite de
+    antigüedad; el resto de llamadas, y las que no se pueden traducir, van
+    por JSON-RPC.
+
+    La réplica no aplica reglas de acceso de Odoo: limitar `models` a los
+    modelos que el usuario de la API puede leer por completo.
+    """
+
+    def __init__(self, connection, replica, max_staleness: Union[None, float, timedelta] = None,
+                 models: Optional[Iterable[str]] = None, lang: str = 'en_US',
+                 freshness_ttl: float = 60):
+        """
+        Inicializar enrutador
+
+        Args:
+            connection: Instancia de OdooConnection
+            replica: Instancia de ReplicaPool sobre la base restaurada
+            max_staleness: Antigüedad máxima aceptada por defecto (segundos o
+                timedelta); None = siempre por RPC salvo que la llamada lo indique
+            models: Modelos que se pueden resolver localmente (None = todos)
+            lang: Idioma para los campos traducibles
+            freshness_ttl: Segundos que se reutiliza la fecha de la réplica
+        """
+        self.connection = connection
+        self.replica = replica
+        self.max_staleness = max_staleness
+        self.models = set(models) if models else None
+        self.lang = lang
+        self.freshness_ttl = freshness_ttl
+        self.stats = {'local': 0, 'rpc': 0, 'fallback': 0}
+        self._lock = threading.Lock()
+        self._columns: Dict[str, Dict[str, str]] = {}
+        self._snapshot: Tuple[float, Optional[datetime]] = (float('-inf'), None)
+        self._aliases = threading.local()
+
+    def __getattr__(self, name):
+        # Métodos no enrutados (download_binary, upload_attachment, ...)
+        if name == 'connection':
+            raise AttributeError(name)
+        return getattr(self.connection, name)
+
+    # ------------------------------------------------------------------
+    # Frescura de la réplica
+    # ------------------------------------------------------------------
+    def snapshot_time(self) -> Optional[datetime]:
+        """Fecha de los datos de la réplica (consultada cada freshness_ttl s)"""
+        checked, snapshot = self._snapshot
+        if time.monotonic() - checked > self.freshness_ttl:
+            snapshot = self.replica.snapshot_time()
+            self._snapshot = (time.monotonic(), snapshot)
+        return snapshot
+
+    def staleness(self) -> Optional[float]:
+        """Antigüedad de la réplica en segundos (None si es desconocida)"""
+        snapshot = self.snapshot_time()
+        if snapshot is None:
+            return None
+        return (datetime.now(timezone.utc) - snapshot).total_seconds()
+
+    def is_fresh(self, max_staleness: Union[None, float, timedelta] = None) -> bool:
+        """
+        Indica si la réplica cumple el límite de antigüedad
+
+        Args:
+            max_staleness: Límite para esta consulta (por defecto el del enrutador)
+        """
+        bound = _seconds(max_staleness if max_staleness is not None else self.max_staleness)
+        if bound is None:
+            return False
+        age = self.staleness()
+        return age is not None and age <= bound
+
+    # ------------------------------------------------------------------
+    # Interfaz compatible con OdooConnection
+    # ------------------------------------------------------------------
+    def execute_kw(self, model: str, method: str, args: List, kwargs: Dict = None,
+                   max_staleness: Union[None, float, timedelta] = None) -> Any:
+        """
+        Ejecuta el método localmente si es posible; si no, por RPC
+
+        Args:
+            model: Nombre del modelo
+            method: Método de Odoo
+            args: Argumentos posicionales
+            kwargs: Argumentos con nombre
+            max_staleness: Antigüedad máxima aceptada para esta llamada
+        """
+        if (method in READ_METHODS and (self.models is None or model in self.models)
+                and self.is_fresh(max_staleness)):
+            try:
+                result = self._execute_local(model, method, args, kwargs or {})
+                self._count('local')
+                return result
+            except _Unsupported as e:
+                logger.debug(f"{model}.{method} se resuelve por RPC: {e}")
+                self._count('fallback')
+            except psycopg2.Error as e:
+                logger.warning(f"Error en la réplica, se usa RPC para {model}.{method}: {e}")
+                self._count('fallback')
+        self._count('rpc')
+        return self.connection.execute_kw(model, method, args, kwargs)
+
+    def search_read(self, model: str, domain: List = None, fields: List = None,
+                    limit: int = None, order: str = None,
+                    max_staleness: Union[None, float, timedelta] = None) -> List[Dict]:
+        """Busca y lee registros de un modelo"""
+        kwargs = {}
+        if fields:
+            kwargs['fields'] = fields
+        if limit:
+            kwargs['limit'] = limit
+        if order:
+            kwargs['order'] = order
+        return self.execute_kw(model, 'search_read', [domain or []], kwargs,
+                               max_staleness=max_staleness)
+
+    def search_count(self, model: str, domain: List = None,
+                     max_staleness: Union[None, float, timedelta] = None) -> int:
+        """Cuenta los registros que cumplen el dominio"""
+        return self.execute_kw(model, 'search_count', [domain or []],
+                               max_staleness=max_staleness)
+
+    def read_group(self, model: str, domain: List, fields: List[str], groupby: List[str],
+                   lazy: bool = True,
+                   max_staleness: Union[None, float, timedelta] = None) -> List[Dict]:
+        """Agrupa registros y agrega campos numéricos"""
+        return self.execute_kw(model, 'read_group', [domain or [], fields, groupby],
+                               {'lazy': lazy}, max_staleness=max_staleness)
+
+    def verify_parity(self, model: str, method: str, args: List,
+                      kwargs: Dict = None) -> Dict[str, Any]:
+        """
+        Compara el resultado local con el de RPC para la misma llamada
+
+        Args:
+            model: Nombre del modelo
+            method: Método de Odoo
+            args: Argumentos posicionales
+            kwargs: Argumentos con nombre
+
+        Returns:
+            Dict: 'match', 'local', 'remote' y las diferencias encontradas
+
+        Raises:
+            ValueError: Si la llamada no se puede resolver localmente
+        """
+        kwargs = kwargs or {}
+        try:
+            local = self._execute_local(model, method, args, kwargs)
+        except _Unsupported as e:
+            raise ValueError(f"{model}.{method} no se puede resolver en la réplica: {e}")
+        remote = self.connection.execute_kw(model, method, args, kwargs)
+
+        result = {'local': local, 'remote': remote}
+        if method in ('search_read', 'read_group'):
+            key = (lambda row: row['id']) if method == 'search_read' else \
+                (lambda row: repr([v for k, v in sorted(row.items())
+                                   if not k.startswith('__') and not k.endswith('_count')]))
+            local_rows = {key(row): row for row in local}
+            remote_rows = {key(row): row for row in remote}
+            result['missing'] = sorted(str(k) for k in remote_rows.keys() - local_rows.keys())
+            result['extra'] = sorted(str(k) for k in local_rows.keys() - remote_rows.keys())
+            result['different'] = sorted(
+                str(k) for k in local_rows.keys() & remote_rows.keys()
+                if local_rows[k] != remote_rows[k]
+            )
+            result['match'] = not (result['missing'] or result['extra'] or result['different'])
+        elif method == 'search':
+            result['match'] = sorted(local) == sorted(remote) if isinstance(local, list) \
+                else local == remote
+        else:
+            result['match'] = local == remote
+        return result
+
+    # ------------------------------------------------------------------
+    # Traducción a SQL
+    # ------------------------------------------------------------------
+    def _execute_local(self, model: str, method: str, args: List, kwargs: Dict) -> Any:
+        """Resuelve la llamada en la réplica (lanza _Unsupported si no puede)"""
+        names = _SIGNATURES[method]
+        if len(args) > len(names):
+            raise _Unsupported("demasiados argumentos")
+        params = dict(zip(names, args))
+        for key, value in kwargs.items():
+            if key != 'context' and key not in names:
+                raise _Unsupported(f"argumento no soportado: {key}")
+            params[key] = value
+
+        context = params.pop('context', None) or {}
+        lang = context.get('lang') or self.lang
+        domain = list(params.get('domain') or [])
+        search_domain = self._active_domain(model, domain, context.get('active_test', True))
+        self._aliases.counter = 0
+
+        table = self._table(model)
+        alias = self._alias()
+        where = self._where(model, alias, search_domain, lang)
+        source = sql.SQL("{} AS {}").format(sql.Identifier(table), sql.Identifier(alias))
+
+        if method == 'search_count' or (method == 'search' and params.get('count')):
+            query = sql.SQL("SELECT count(*) AS count FROM {} WHERE {}").format(source, where)
+            if params.get('limit'):
+                query = sql.SQL("SELECT count(*) AS count FROM (SELECT 1 FROM {} WHERE {} "
+                                "LIMIT {}) AS q").format(source, where,
+                                                         sql.Literal(params['limit']))
+            return self.replica.fetch_all(query)[0]['count']
+
+        if method == 'read_group':
+            return self._read_group(model, alias, source, where, domain, params, lang)
+
+        order = self._order_by(model, alias, params.get('order'), lang)
+        if (params.get('limit') or params.get('offset')) and order is None:
+            # Sin orden explícito Odoo usa el _order del modelo, que no se conoce aquí
+            raise _Unsupported("paginación sin orden explícito")
+
+        if method == 'search':
+            query = sql.SQL("SELECT {}.id FROM {} WHERE {}").format(
+                sql.Identifier(alias), source, where)
+            query = self._paginate(query, order, params)
+            return [row['id'] for row in self.replica.fetch_all(query)]
+
+        fields = params.get('fields')
+        if not fields:
+            raise _Unsupported("search_read sin lista de campos")
+        columns, joins, readers = self._select(model, alias, fields, lang)
+        query = sql.SQL("SELECT {} FROM {}{} WHERE {}").format(
+            sql.SQL(', ').join(columns), source, sql.SQL('').join(joins), where)
+        query = self._paginate(query, order, params)
+
+        records = []
+        for columns, rows in self.replica.iter_batches(query):
+            for row in rows:
+                records.append({name: reader(row) for name, reader in readers})
+        return records
+
+    def _read_group(self, model: str, alias: str, source: sql.Composable,
+                    where: sql.Composable, domain: List, params: Dict,
+                    lang: str) -> List[Dict]:
+        """Traduce read_group a GROUP BY"""
+        fields_info = self._fields(model)
+        groupby = params.get('groupby') or []
+        if isinstance(groupby, str):
+            groupby = [groupby]
+        if not groupby:
+            raise _Unsupported("read_group sin agrupación")
+        lazy = params.get('lazy', True)
+        remaining = groupby[1:] if lazy else []
+        groupby = groupby[:1] if lazy else list(groupby)
+
+        if params.get('limit') or params.get('offset') or params.get('orderby'):
+            raise _Unsupported("read_group con paginación u orden")
+
+        group_columns, joins = [], []
+        for name in groupby:
+            if ':' in name:
+                raise _Unsupported(f"agrupación por fecha: {name}")
+            field = fields_info.get(name)
+            if not field or field['type'] not in _SCALAR_TYPES - {'date', 'datetime'}:
+                raise _Unsupported(f"agrupación por {name}")
+            column = self._column(model, alias, name, lang)
+            group_columns.append(column)
+            if field['type'] == 'many2one':
+                label, join = self._display_join(field['relation'], column, lang)
+                joins.append(join)
+                group_columns.append(label)
+
+        aggregates = []
+        for spec in params.get('fields') or []:
+            match = _AGGREGATE_SPEC_RE.match(spec)
+            if not match:
+                raise _Unsupported(f"agregado no soportado: {spec}")
+            name, func, field_name = match.groups()
+            field_name = field_name or name
+            if name == '__count' or (name in groupby and not func):
+                continue
+            field = fields_info.get(field_name)
+            if not field:
+                raise _Unsupported(f"campo desconocido: {field_name}")
+            if func is None:
+                if field['type'] not in _NUMERIC_TYPES or field_name == 'id':
+                    continue
+                func = 'sum'
+            if func not in _AGGREGATES:
+                raise _Unsupported(f"agregado no soportado: {func}")
+            column = self._column(model, alias, field_name, lang)
+            if func == 'count_distinct':
+                aggregates.append((name, sql.SQL("count(DISTINCT {})").format(column)))
+            else:
+                aggregates.append((name, sql.SQL("{}({})").format(sql.SQL(func), column)))
+
+        # Alias posicionales: las columnas de distintas tablas pueden llamarse igual
+        select = [sql.SQL("{} AS {}").format(column, sql.Identifier(f"g{i}"))
+                  for i, column in enumerate(group_columns)]
+        select.append(sql.SQL("count(*) AS __count"))
+        select += [sql.SQL("{} AS {}").format(expression, sql.Identifier(f"agg_{name}"))
+                   for name, expression in aggregates]
+        query = sql.SQL("SELECT {} FROM {}{} WHERE {} GROUP BY {} ORDER BY {}").format(
+            sql.SQL(', ').join(select), source, sql.SQL('').join(joins), where,
+            sql.SQL(', ').join(group_columns), sql.SQL(', ').join(group_columns))
+
+        count_key = f"{groupby[0]}_count" if lazy else '__count'
+        groups = []
+        for row in self.replica.fetch_all(query):
+            group, group_domain, position = {}, [], 0
+            for name in groupby:
+                field = fields_info[name]
+                raw = row[f"g{position}"]
+                if field['type'] == 'many2one':
+                    group[name] = [raw, row[f"g{position + 1}"] or ''] if raw else False
+                    position += 2
+                else:
+                    group[name] = _to_odoo(field['type'], raw)
+                    position += 1
+                group_domain.append([name, '=', raw if raw is not None else False])
+            group[count_key] = row['__count']
+            for name, _ in aggregates:
+                value = row[f"agg_{name}"]
+                group[name] = float(value) if isinstance(value, Decimal) else value
+            group['__domain'] = and_domains([group_domain, domain])
+            if remaining:
+                group['__context'] = {'group_by': remaining}
+            groups.append(group)
+        return groups
+
+    def _active_domain(self, model: str, domain: List, active_test: bool) -> List:
+        """Añade ('active', '=', True) si el modelo lo tiene y el dominio no lo usa"""
+        if not active_test or 'active' not in self._fields(model):
+            return domain
+        if any(isinstance(leaf, (list, tuple)) and leaf and leaf[0] == 'active'
+               for leaf in domain):
+            return domain
+        return and_domains([[['active', '=', True]], domain])
+
+    def _where(self, model: str, alias: str, domain: List, lang: str) -> sql.Composable:
+        """Traduce un dominio completo a una condición SQL"""
+        if not domain:
+            return sql.SQL('TRUE')
+        tokens = normalize_domain(domain)
+        condition, position = self._parse(tokens, 0, model, alias, lang, False)
+        if position != len(tokens):
+            raise _Unsupported("dominio mal formado")
+        return condition
+
+    def _parse(self, tokens: List, position: int, model: str, alias: str, lang: str,
+               negate: bool) -> Tuple[sql.Composable, int]:
+        """Recorre el dominio en notación prefija propagando las negaciones"""
+        if position >= len(tokens):
+            raise _Unsupported("dominio mal formado")
+        token = tokens[position]
+        if token == '!':
+            return self._parse(tokens, position + 1, model, alias, lang, not negate)
+        if token in ('&', '|'):
+            operator = token if not negate else ('|' if token == '&' else '&')
+            left, position = self._parse(tokens, position + 1, model, alias, lang, negate)
+            right, position = self._parse(tokens, position, model, alias, lang, negate)
+            joiner = sql.SQL(' AND ' if operator == '&' else ' OR ')
+            return sql.SQL("({})").format(joiner.join([left, right])), position
+        return self._leaf(model, alias, token, lang, negate), position + 1
+
+    def _leaf(self, model: str, alias: str, leaf, lang: str,
+              negate: bool = False) -> sql.Composable:
+        """Traduce una condición (campo, operador, valor)"""
+        if not isinstance(leaf, (list, tuple)) or len(leaf) != 3:
+            raise _Unsupported(f"condición no válida: {leaf!r}")
+        left, operator, right = leaf
+        if negate:
+            if operator not in _NEGATIONS:
+                return sql.SQL("(NOT {})").format(self._leaf(model, alias, leaf, lang))
+            operator = _NEGATIONS[operator]
+
+        if left in (0, 1) and operator == '=' and right == 1:
+            # TRUE_LEAF / FALSE_LEAF de Odoo
+            return sql.SQL('TRUE' if left == 1 else 'FALSE')
+        if not isinstance(left, str):
+            raise _Unsupported(f"condición no válida: {leaf!r}")
+
+        fields = self._fields(model)
+        name, _, path = left.partition('.')
+        field = fields.get(name)
+        if not field:
+            raise _Unsupported(f"campo desconocido: {model}.{name}")
+        column = self._column(model, alias, name, lang)
+
+        if path:
+            # Camino many2one (ej: partner_id.country_id.code) como subconsulta
+            if field['type'] != 'many2one':
+                raise _Unsupported(f"camino por un campo {field['type']}: {left}")
+            comodel = field['relation']
+            sub_alias = self._alias()
+            inner = self._leaf(comodel, sub_alias, [path, operator, right], lang)
+            return sql.SQL("{} IN (SELECT {}.id FROM {} AS {} WHERE {})").format(
+                column, sql.Identifier(sub_alias), sql.Identifier(self._table(comodel)),
+                sql.Identifier(sub_alias), inner)
+
+        ftype = field['type']
+        if ftype not in _SCALAR_TYPES:
+            raise _Unsupported(f"condición sobre un campo {ftype}: {left}")
+        if ftype == 'many2one' and (isinstance(right, str) or (
+                isinstance(right, (list, tuple)) and any(isinstance(v, str) for v in right))):
+            # Odoo haría un name_search sobre el modelo relacionado
+            raise _Unsupported(f"búsqueda por nombre en {left}")
+
+        if operator in ('=', '!='):
+            if isinstance(right, (list, tuple)):
+                raise _Unsupported(f"lista con el operador {operator}")
+            if ftype == 'boolean':
+                wanted = bool(right) if operator == '=' else not bool(right)
+                if wanted:
+                    return sql.SQL("{} = TRUE").format(column)
+                return sql.SQL("({} IS NULL OR {} = FALSE)").format(column, column)
+            if right is False or right is None:
+                return sql.SQL("{} IS NULL" if operator == '=' else "{} IS NOT NULL").format(column)
+            if operator == '=':
+                return sql.SQL("{} = {}").format(column, sql.Literal(right))
+            return sql.SQL("({} != {} OR {} IS NULL)").format(column, sql.Literal(right), column)
+
+        if operator in ('in', 'not in'):
+            if ftype == 'boolean':
+                raise _Unsupported(f"'{operator}' sobre un booleano")
+            right = right if isinstance(right, (list, tuple)) else [right]
+            values = tuple(v for v in right if v is not False and v is not None)
+            has_null = len(values) != len(right)
+            if operator == 'in':
+                condition = sql.SQL("{} IN {}").format(column, sql.Literal(values)) \
+                    if values else sql.SQL('FALSE')
+                if has_null:
+                    condition = sql.SQL("({} OR {} IS NULL)").format(condition, column)
+                return condition
+            condition = sql.SQL("{} NOT IN {}").format(column, sql.Literal(values)) \
+                if values else sql.SQL('TRUE')
+            if has_null:
+                return sql.SQL("({} AND {} IS NOT NULL)").format(condition, column)
+            return sql.SQL("({} OR {} IS NULL)").format(condition, column)
+
+        if right is False or right is None or isinstance(right, (list, tuple)):
+            raise _Unsupported(f"valor no soportado para {operator}: {right!r}")
+
+        if operator in _COMPARISONS:
+            return sql.SQL("{} {} {}").format(column, sql.SQL(operator), sql.Literal(right))
+
+        if operator in _LIKE_OPERATORS:
+            pattern = str(right) if operator.startswith('=') else f"%{right}%"
+            condition = sql.SQL("{}::text {} {}").format(
+                column, sql.SQL(_LIKE_OPERATORS[operator]), sql.Literal(pattern))
+            if operator.startswith('not'):
+                return sql.SQL("({} OR {} IS NULL)").format(condition, column)
+            return condition
+
+        raise _Unsupported(f"operador no soportado: {operator}")
+
+    def _select(self, model: str, alias: str, fields: List[str], lang: str):
+        """Columnas, JOINs y conversores de los campos pedidos en search_read"""
+        fields_info = self._fields(model)
+        columns, joins, readers = [], [], []
+        for name in ['id'] + [f for f in fields if f != 'id']:
+            field = fields_info.get(name)
+            if not field or field['type'] not in _SCALAR_TYPES:
+                raise _Unsupported(f"campo no soportado en la réplica: {name}")
+            column = self._column(model, alias, name, lang)
+            position = len(columns)
+            columns.append(column)
+            if field['type'] == 'many2one':
+                label, join = self._display_join(field['relation'], column, lang)
+                columns.append(label)
+                joins.append(join)
+                readers.append((name, lambda row, i=position:
+                                [row[i], row[i + 1] or ''] if row[i] else False))
+            else:
+                readers.append((name, lambda row, i=position, ftype=field['type']:
+                                _to_odoo(ftype, row[i])))
+        return columns, joins, readers
+
+    def _display_join(self, comodel: str, column: sql.Composable,
+                      lang: str) -> Tuple[sql.Composable, sql.Composable]:
+        """LEFT JOIN al modelo relacionado y la columna con su nombre visible"""
+        available = self._table_columns(self._table(comodel))
+        name = next((name for name in _DISPLAY_COLUMNS if name in available), None)
+        if name is None:
+            raise _Unsupported(f"{comodel} no tiene una columna de nombre")
+        join_alias = self._alias()
+        join = sql.SQL(" LEFT JOIN {} AS {} ON {}.id = {}").format(
+            sql.Identifier(self._table(comodel)), sql.Identifier(join_alias),
+            sql.Identifier(join_alias), column)
+        return self._column(comodel, join_alias, name, lang, check_field=False), join
+
+    def _order_by(self, model: str, alias: str, order: Optional[str],
+                  lang: str) -> Optional[sql.Composable]:
+        """Traduce 'campo asc, campo2 desc' (solo campos no relacionales)"""
+        if not order:
+            return None
+        fields_info = self._fields(model)
+        terms = []
+        for part in order.split(','):
+            tokens = part.split()
+            if not tokens:
+                continue
+            name = tokens[0]
+            direction = tokens[1].upper() if len(tokens) > 1 else 'ASC'
+            field = fields_info.get(name)
+            if len(tokens) > 2 or direction not in ('ASC', 'DESC') or not field or \
+                    field['type'] not in _SCALAR_TYPES - {'many2one'}:
+                raise _Unsupported(f"orden no soportado: {part.strip()}")
+            terms.append(sql.SQL("{} {}").format(
+                self._column(model, alias, name, lang), sql.SQL(direction)))
+        return sql.SQL(', ').join(terms) if terms else None
+
+    @staticmethod
+    def _paginate(query: sql.Composable, order: Optional[sql.Composable],
+                  params: Dict) -> sql.Composable:
+        """Añade ORDER BY, LIMIT y OFFSET"""
+        if order is not None:
+            query += sql.SQL(" ORDER BY {}").format(order)
+        if params.get('limit'):
+            query += sql.SQL(" LIMIT {}").format(sql.Literal(int(params['limit'])))
+        if params.get('offset'):
+            query += sql.SQL(" OFFSET {}").format(sql.Literal(int(params['offset'])))
+        return query
+
+    # ------------------------------------------------------------------
+    # Metadatos
+    # ------------------------------------------------------------------
+    def _fields(self, model: str) -> Dict[str, Dict]:
+        """Definición de campos del modelo (caché de OdooConnection.fields_get)"""
+        return self.connection.fields_get(model, attributes=['type', 'relation', 'store'])
+
+    def _table(self, model: str) -> str:
+        """Tabla del modelo en la réplica"""
+        table = model.replace('.', '_')
+        if not self._table_columns(table):
+            raise _Unsupported(f"la tabla {table} no está en la réplica")
+        return table
+
+    def _table_columns(self, table: str) -> Dict[str, str]:
+        """Columnas y tipos de una tabla de la réplica (con caché)"""
+        with self._lock:
+            if table in self._columns:
+                return self._columns[table]
+        rows = self.replica.fetch_all(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = %s", (table,))
+        columns = {row['column_name']: row['data_type'] for row in rows}
+        with self._lock:
+            self._columns[table] = columns
+        return columns
+
+    def _column(self, model: str, alias: str, name: str, lang: str,
+                check_field: bool = True) -> sql.Composable:
+        """Expresión SQL de un campo almacenado (traducido según el idioma)"""
+        columns = self._table_columns(self._table(model))
+        field = self._fields(model).get(name, {}) if check_field else {}
+        if name not in columns or field.get('store') is False:
+            raise _Unsupported(f"{model}.{name} no está almacenado en la réplica")
+        identifier = sql.Identifier(alias, name)
+        if columns[name] == 'jsonb' and field.get('type', 'char') in _TEXT_TYPES:
+            # Campos traducibles (Odoo 16+): {"en_US": ..., "es_MX": ...}
+            return sql.SQL("COALESCE({}->>{}, {}->>'en_US')").format(
+                identifier, sql.Literal(lang), identifier)
+        return identifier
+
+    def _alias(self) -> str:
+        """Alias único de tabla dentro de la consulta en construcción"""
+        counter = getattr(self._aliases, 'counter', 0)
+        self._aliases.counter = counter + 1
+        return f"t{counter}"
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+
+def _to_odoo(ftype: str, value: Any) -> Any:
+    """Convierte un valor de PostgreSQL al formato que devuelve Odoo"""
+    if ftype == 'boolean':
+        return bool(value)
+    if ftype == 'integer':
+        return value or 0
+    if ftype in ('float', 'monetary'):
+        return float(value) if value is not None else 0.0
+    if value is None:
+        return False
+    if ftype == 'datetime':
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if ftype == 'date':
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
@@ -0,0 +1,303 @@
+"""
+Consultas sobre la réplica local restaurada con un pool de conexiones
+"""
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Filas por lote leídas del cursor del servidor
+DEFAULT_BATCH_SIZE = 10_000
+
+# Tamaño de bloque al copiar resultados con COPY TO (1 MB)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Tabla donde la restauración registra la fecha de los datos
+REPLICA_INFO_TABLE = 'odoo_replica_info'
+
+
+class ReplicaPool:
+    """Pool de conexiones de solo lectura a la réplica de Odoo"""
+
+    def __init__(self, dbname: str, host: str = 'localhost', port: int = 5432,
+                 user: str = 'postgres', password: Optional[str] = None,
+                 minconn: int = 1, maxconn: int = 8,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 statement_timeout: Optional[int] = None,
+                 application_name: str = 'odoo-replica'):
+        """
+        Inicializar pool
+
+        Args:
+            dbname: Base de datos restaurada
+            host: Servidor PostgreSQL
+            port: Puerto
+            user: Usuario
+            password: Contraseña
+            minconn: Conexiones abiertas desde el inicio
+            maxconn: Conexiones máximas (las peticiones extra esperan turno)
+            batch_size: Filas por lote por defecto en las lecturas en streaming
+            statement_timeout: Límite por consulta en milisegundos (opcional)
+            application_name: Nombre visible en pg_stat_activity
+        """
+        self.dbname = dbname
+        self.batch_size = batch_size
+        self.statement_timeout = statement_timeout
+        self._pool = ThreadedConnectionPool(
+            minconn, maxconn, dbname=dbname, host=host, port=port, user=user,
+            password=password, application_name=application_name
+        )
+        # ThreadedConnectionPool falla al agotarse; el semáforo hace esperar
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    # ------------------------------------------------------------------
+    # Conexiones
+    # ------------------------------------------------------------------
+    @contextmanager
+    def connection(self):
+        """
+        Presta una conexión del pool en una transacción de solo lectura
+
+        La transacción se revierte al devolverla, de modo que ningún estado
+        queda pendiente para el siguiente usuario de la conexión.
+        """
+        with self._slots:
+            conn = self._pool.getconn()
+            broken = False
+            try:
+                if conn.closed:
+                    raise psycopg2.InterfaceError("Conexión cerrada")
+                conn.set_session(readonly=True, autocommit=False)
+                if self.statement_timeout is not None:
+                    with conn.cursor() as cur:
+                        cur.execute("SET LOCAL statement_timeout = %s",
+                                    (self.statement_timeout,))
+                yield conn
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                broken = True
+                raise
+            finally:
+                if not conn.closed:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        broken = True
+                self._pool.putconn(conn, close=broken or bool(conn.closed))
+
+    def close(self):
+        """Cierra todas las conexiones del pool"""
+        self._pool.closeall()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def fetch_all(self, query: Union[str, sql.Composable],
+                  params: Optional[Sequence] = None) -> List[Dict[str, Any]]:
+        """
+        Ejecuta una consulta pequeña y devuelve todas las filas
+
+        Args:
+            query: Consulta SQL
+            params: Parámetros de la consulta
+
+        Returns:
+            List[Dict]: Filas como diccionarios
+        """
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            columns = [col.name for col in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    def iter_batches(self, query: Union[str, sql.Composable],
+                     params: Optional[Sequence] = None,
+                     batch_size: Optional[int] = None
+                     ) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Recorre el resultado con un cursor del servidor, lote a lote
+
+        La memoria usada depende del tamaño del lote, no del resultado.
+
+        Args:
+            query: Consulta SQL
+            params: Parámetros de la consulta
+            batch_size: Filas por lote
+
+        Yields:
+            Tuple[List[str], List[tuple]]: Nombres de columna y filas del lote
+        """
+        batch_size = batch_size or self.batch_size
+        with self.connection() as conn:
+            name = f"replica_{uuid.uuid4().hex}"
+            with conn.cursor(name=name) as cur:
+                cur.itersize = batch_size
+                cur.execute(query, params)
+                columns = None
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = [col.name for col in cur.description]
+                    yield columns, rows
+
+    def iter_records(self, query: Union[str, sql.Composable],
+                     params: Optional[Sequence] = None,
+                     batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Recorre el resultado fila a fila como diccionarios (en streaming)"""
+        for columns, rows in self.iter_batches(query, params, batch_size):
+            for row in rows:
+                yield dict(zip(columns, row))
+
+    def iter_dataframes(self, query: Union[str, sql.Composable],
+                        params: Optional[Sequence] = None,
+                        chunk_size: Optional[int] = None):
+        """
+        Recorre el resultado como DataFrames de tamaño fijo
+
+        Args:
+            query: Consulta SQL
+            params: Parámetros de la consulta
+            chunk_size: Filas por DataFrame
+
+        Yields:
+            pandas.DataFrame: Un bloque del resultado
+        """
+        pd = _import_pandas()
+        for columns, rows in self.iter_batches(query, params, chunk_size):
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def read_dataframe(self, query: Union[str, sql.Composable],
+                       params: Optional[Sequence] = None):
+        """
+        Lee el resultado completo en un DataFrame (construido por bloques)
+
+        Args:
+            query: Consulta SQL
+            params: Parámetros de la consulta
+
+        Returns:
+            pandas.DataFrame: Resultado de la consulta
+        """
+        pd = _import_pandas()
+        chunks = list(self.iter_dataframes(query, params))
+        if not chunks:
+            with self.connection() as conn, conn.cursor() as cur:
+                # Solo para obtener las columnas del resultado vacío
+                cur.execute(sql.SQL("SELECT * FROM ({}) AS q LIMIT 0").format(
+                    self._as_sql(cur, query, params)))
+                return pd.DataFrame(columns=[col.name for col in cur.description])
+        return pd.concat(chunks, ignore_index=True)
+
+    def snapshot_time(self) -> Optional[datetime]:
+        """
+        Fecha a la que corresponden los datos de la réplica
+
+        Returns:
+            Optional[datetime]: Fecha del backup restaurado, o None si la
+            restauración no la registró
+        """
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", (REPLICA_INFO_TABLE,))
+            if cur.fetchone()[0] is None:
+                return None
+            cur.execute(sql.SQL("SELECT max(snapshot_at) FROM {}").format(
+                sql.Identifier(REPLICA_INFO_TABLE)))
+            return cur.fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Extracción masiva con COPY
+    # ------------------------------------------------------------------
+    def copy_to(self, query: Union[str, sql.Composable], dest,
+                params: Optional[Sequence] = None, fmt: str = 'csv',
+                header: bool = True) -> Dict[str, Any]:
+        """
+        Exporta el resultado con COPY TO STDOUT (la vía más rápida para
+        resultados muy grandes: sin conversión fila a fila en Python)
+
+        Args:
+            query: Consulta SQL
+            dest: Ruta destino o archivo binario abierto
+            params: Parámetros de la consulta
+            fmt: Formato de COPY ('csv', 'text' o 'binary')
+            header: Incluir encabezados (solo csv)
+
+        Returns:
+            Dict: Filas y bytes exportados
+        """
+        if fmt not in ('csv', 'text', 'binary'):
+            raise ValueError(f"Formato de COPY no soportado: {fmt}")
+        options = [sql.SQL("FORMAT {}").format(sql.SQL(fmt))]
+        if header and fmt == 'csv':
+            options.append(sql.SQL("HEADER"))
+
+        with self.connection() as conn, conn.cursor() as cur:
+            statement = sql.SQL("COPY ({}) TO STDOUT WITH ({})").format(
+                self._as_sql(cur, query, params), sql.SQL(', ').join(options)
+            ).as_string(conn)
+
+            if isinstance(dest, (str, Path)):
+                with open(dest, 'wb') as f:
+                    cur.copy_expert(statement, f, size=COPY_BUFFER_SIZE)
+                    written = f.tell()
+            else:
+                start = dest.tell() if dest.seekable() else 0
+                cur.copy_expert(statement, dest, size=COPY_BUFFER_SIZE)
+                written = dest.tell() - start if dest.seekable() else None
+            rows = cur.rowcount
+
+        logger.info(f"COPY TO: {rows:,} filas exportadas")
+        return {'rows': rows, 'bytes': written}
+
+    def copy_to_dataframe(self, query: Union[str, sql.Composable],
+                          params: Optional[Sequence] = None, **read_csv_kwargs):
+        """
+        Lee un resultado muy grande vía COPY a CSV y pandas.read_csv
+
+        Args:
+            query: Consulta SQL
+            params: Parámetros de la consulta
+            **read_csv_kwargs: Argumentos adicionales para pandas.read_csv
+
+        Returns:
+            pandas.DataFrame: Resultado de la consulta
+        """
+        import tempfile
+
+        pd = _import_pandas()
+        with tempfile.TemporaryFile() as buffer:
+            self.copy_to(query, buffer, params=params, fmt='csv', header=True)
+            buffer.seek(0)
+            return pd.read_csv(buffer, **read_csv_kwargs)
+
+    @staticmethod
+    def _as_sql(cur, query: Union[str, sql.Composable],
+                params: Optional[Sequence]) -> sql.Composable:
+        """Incrusta los parámetros en la consulta (COPY no admite parámetros)"""
+        if isinstance(query, sql.Composable):
+            query = query.as_string(cur)
+        text = cur.mogrify(query, params).decode() if params else query
+        return sql.SQL(text.strip().rstrip(';'))
+
+
+def _import_pandas():
+    """Importa pandas (dependencia opcional)"""
+    try:
+        import pandas as pd
+    except ImportError:
+        raise ImportError("Las consultas a DataFrame requieren pandas: pip install pandas")
+    return pd
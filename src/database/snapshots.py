@@ -0,0 +1,385 @@
+"""
+Snapshots analíticos (tablas agregadas y vistas materializadas) sobre la réplica
+"""
+import hashlib
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+from .postgresql_restore import PostgreSQLRestore
+
+logger = logging.getLogger(__name__)
+
+# Configuración por defecto de los snapshots
+DEFAULT_CONFIG_FILE = Path(__file__).parent.parent.parent / 'config' / 'snapshots.yaml'
+
+# Tabla con la marca de agua y los tiempos de cada snapshot
+SNAPSHOT_STATE_TABLE = 'odoo_snapshot_state'
+
+# Marcador de `query` que el modo incremental sustituye por `incremental.filter`
+CHANGED_PLACEHOLDER = '{changed}'
+
+# Tabla temporal con las claves afectadas (visible para `incremental.filter`)
+CHANGED_KEYS_TABLE = 'snapshot_changed_keys'
+
+# Tabla temporal con la clave actual de cada registro origen (`incremental.source_keys`)
+SOURCE_KEYS_TABLE = 'snapshot_source_keys'
+
+# Sufijo de la tabla que guarda la clave de cada registro origen en el snapshot
+SOURCE_KEYS_SUFFIX = '__source_keys'
+
+BUILDING_SUFFIX = '__building'
+SNAPSHOT_KINDS = ('table', 'materialized_view')
+
+
+class SnapshotBuilder:
+    """Construye y refresca los snapshots configurados en la réplica"""
+
+    def __init__(self, restorer: PostgreSQLRestore, dbname: str,
+                 snapshots: Optional[Dict[str, Dict]] = None,
+                 config_file: Optional[str] = None):
+        """
+        Inicializar constructor
+
+        Args:
+            restorer: Restaurador con la configuración de PostgreSQL
+            dbname: Base de datos de la réplica
+            snapshots: Definiciones de snapshots (por defecto, config_file)
+            config_file: YAML con la clave 'snapshots' (config/snapshots.yaml)
+        """
+        self.restorer = restorer
+        self.dbname = dbname
+        if snapshots is None:
+            snapshots = self.load_config(config_file or DEFAULT_CONFIG_FILE)
+        for name, definition in snapshots.items():
+            self._validate(name, definition)
+        self.snapshots = snapshots
+
+    @staticmethod
+    def load_config(config_file: str) -> Dict[str, Dict]:
+        """
+        Lee las definiciones de snapshots de un archivo YAML
+
+        Args:
+            config_file: Ruta al archivo
+
+        Returns:
+            Dict: {nombre: definición}
+        """
+        import yaml
+
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        return config.get('snapshots') or {}
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    def build_all(self, names: Optional[List[str]] = None,
+                  full: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Construye o refresca varios snapshots (los errores no detienen el resto)
+
+        Args:
+            names: Snapshots a construir (por defecto, todos)
+            full: Forzar reconstrucción completa
+
+        Returns:
+            Dict: Resultado por snapshot ('mode', 'rows', 'seconds' o 'error')
+        """
+        results = {}
+        for name in names or list(self.snapshots):
+            try:
+                results[name] = self.build(name, full=full)
+            except (psycopg2.Error, KeyError, ValueError) as e:
+                logger.error(f"Error construyendo el snapshot {name}: {e}")
+                results[name] = {'error': str(e)}
+        return results
+
+    def build(self, name: str, full: bool = False) -> Dict[str, Any]:
+        """
+        Construye o refresca un snapshot
+
+        Las tablas con `incremental` se refrescan solo para las claves con
+        cambios desde la última marca de agua; si el snapshot no existe, su
+        consulta cambió o se pide `full`, se reconstruyen por completo. Con
+        `incremental.source_keys` también se refrescan las claves que un
+        registro origen tenía antes de modificarse o eliminarse.
+
+        Args:
+            name: Nombre del snapshot
+            full: Forzar reconstrucción completa
+
+        Returns:
+            Dict: Modo usado, filas afectadas, marca de agua y segundos
+        """
+        definition = self.snapshots[name]
+        started = time.monotonic()
+        conn = self.restorer.connect(self.dbname, autocommit=False)
+        try:
+            # Una sola foto de los datos para la marca de agua y el cálculo
+            conn.set_session(isolation_level='REPEATABLE READ')
+            with conn, conn.cursor() as cur:
+                self._ensure_state_table(cur)
+                state = self._load_state(cur, name)
+                exists = self._relation_exists(cur, name)
+                query_hash = self._query_hash(definition)
+
+                incremental = (not full and exists and state is not None
+                               and state['query_hash'] == query_hash
+                               and state['watermark'] is not None
+                               and definition.get('kind', 'table') == 'table'
+                               and definition.get('incremental'))
+                watermark = self._watermark(cur, definition)
+
+                if incremental:
+                    mode = 'incremental'
+                    rows = self._refresh_incremental(cur, name, definition,
+                                                     state['watermark'])
+                elif definition.get('kind', 'table') == 'materialized_view':
+                    mode = 'refresh' if not full and exists and state and \
+                        state['query_hash'] == query_hash else 'full'
+                    rows = self._build_view(cur, name, definition, refresh=mode == 'refresh')
+                else:
+                    mode = 'full'
+                    rows = self._build_table(cur, name, definition)
+
+                seconds = time.monotonic() - started
+                self._save_state(cur, name, watermark, query_hash, mode, rows, seconds)
+        finally:
+            conn.close()
+
+        seconds = time.monotonic() - started
+        logger.info(f"Snapshot {name} ({mode}): {rows:,} filas en {seconds:,.2f} s")
+        return {'mode': mode, 'rows': rows, 'watermark': watermark, 'seconds': seconds}
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        Estado de los snapshots construidos en la réplica
+
+        Returns:
+            List[Dict]: Nombre, modo, filas, segundos y fechas de la última construcción
+        """
+        conn = self.restorer.connect(self.dbname)
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regclass(%s)", (SNAPSHOT_STATE_TABLE,))
+                if cur.fetchone()[0] is None:
+                    return []
+                cur.execute(sql.SQL("SELECT name, mode, rows, seconds, watermark, built_at "
+                                    "FROM {} ORDER BY name").format(
+                    sql.Identifier(SNAPSHOT_STATE_TABLE)))
+                columns = [col.name for col in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Tablas
+    # ------------------------------------------------------------------
+    def _build_table(self, cur, name: str, definition: Dict) -> int:
+        """Crea la tabla en una copia y la intercambia (los lectores no esperan)"""
+        building = f"{name}{BUILDING_SUFFIX}"
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(building)))
+        cur.execute(sql.SQL("CREATE TABLE {} AS {}").format(
+            sql.Identifier(building), sql.SQL(self._query(definition, incremental=False))))
+        rows = cur.rowcount
+        if definition.get('key'):
+            cur.execute(sql.SQL("CREATE UNIQUE INDEX {} ON {} ({})").format(
+                sql.Identifier(f"{name}_key_idx{BUILDING_SUFFIX}"), sql.Identifier(building),
+                sql.SQL(', ').join(sql.Identifier(k) for k in definition['key'])))
+        cur.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(building)))
+
+        self._drop_relation(cur, name)
+        cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+            sql.Identifier(building), sql.Identifier(name)))
+        self._build_source_keys(cur, name, definition)
+        if definition.get('key'):
+            cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                sql.Identifier(f"{name}_key_idx{BUILDING_SUFFIX}"),
+                sql.Identifier(f"{name}_key_idx")))
+        return rows
+
+    def _build_source_keys(self, cur, name: str, definition: Dict):
+        """Guarda la clave de cada registro origen (si hay `incremental.source_keys`)"""
+        source_keys = (definition.get('incremental') or {}).get('source_keys')
+        table = sql.Identifier(f"{name}{SOURCE_KEYS_SUFFIX}")
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(table))
+        if not source_keys:
+            return
+        cur.execute(sql.SQL("CREATE TABLE {} AS {}").format(
+            table, sql.SQL(source_keys.strip().rstrip(';'))))
+        cur.execute(sql.SQL("CREATE UNIQUE INDEX ON {} (source_id)").format(table))
+
+    def _refresh_source_keys(self, cur, name: str, definition: Dict) -> int:
+        """
+        Añade a las claves afectadas las claves anteriores de los registros
+        origen cuya clave cambió o que ya no existen, y actualiza las guardadas
+
+        Returns:
+            int: Claves anteriores añadidas
+        """
+        keys = [sql.Identifier(key) for key in definition['key']]
+        stored = sql.Identifier(f"{name}{SOURCE_KEYS_SUFFIX}")
+        cur.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS {}").format(
+            sql.Identifier(SOURCE_KEYS_TABLE),
+            sql.SQL(definition['incremental']['source_keys'].strip().rstrip(';'))))
+        cur.execute(sql.SQL(
+            "INSERT INTO {changed} ({keys}) "
+            "SELECT DISTINCT {old_keys} FROM {stored} AS old "
+            "LEFT JOIN {current} AS new ON new.source_id = old.source_id "
+            "WHERE new.source_id IS NULL OR ({old_keys}) IS DISTINCT FROM ({new_keys})").format(
+            changed=sql.Identifier(CHANGED_KEYS_TABLE), keys=sql.SQL(', ').join(keys),
+            stored=stored, current=sql.Identifier(SOURCE_KEYS_TABLE),
+            old_keys=sql.SQL(', ').join(sql.SQL('old.{}').format(key) for key in keys),
+            new_keys=sql.SQL(', ').join(sql.SQL('new.{}').format(key) for key in keys)))
+        previous = cur.rowcount
+        cur.execute(sql.SQL("TRUNCATE {}").format(stored))
+        cur.execute(sql.SQL("INSERT INTO {} SELECT * FROM {}").format(
+            stored, sql.Identifier(SOURCE_KEYS_TABLE)))
+        return previous
+
+    def _refresh_incremental(self, cur, name: str, definition: Dict, since) -> int:
+        """Recalcula solo los grupos de las claves con cambios"""
+        incremental = definition['incremental']
+        keys = definition['key']
+        cur.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS "
+                            "SELECT DISTINCT {} FROM ({}) AS changed").format(
+            sql.Identifier(CHANGED_KEYS_TABLE),
+            sql.SQL(', ').join(sql.Identifier(key) for key in keys),
+            sql.SQL(incremental['changed_keys'])),
+            {'since': since})
+        changed = cur.rowcount
+        if incremental.get('source_keys'):
+            changed += self._refresh_source_keys(cur, name, definition)
+        if not changed:
+            return 0
+        cur.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(CHANGED_KEYS_TABLE)))
+
+        def _matches(alias: str) -> sql.Composable:
+            return sql.SQL(' AND ').join(
+                sql.SQL("{} IS NOT DISTINCT FROM {}").format(
+                    sql.Identifier(alias, key), sql.Identifier('k', key))
+                for key in keys)
+
+        cur.execute(sql.SQL("DELETE FROM {} AS s USING {} AS k WHERE {}").format(
+            sql.Identifier(name), sql.Identifier(CHANGED_KEYS_TABLE), _matches('s')))
+        cur.execute(sql.SQL("INSERT INTO {} SELECT q.* FROM ({}) AS q "
+                            "WHERE EXISTS (SELECT 1 FROM {} AS k WHERE {})").format(
+            sql.Identifier(name), sql.SQL(self._query(definition, incremental=True)),
+            sql.Identifier(CHANGED_KEYS_TABLE), _matches('q')))
+        logger.debug(f"Snapshot {name}: {changed:,} claves modificadas")
+        return cur.rowcount
+
+    # ------------------------------------------------------------------
+    # Vistas materializadas
+    # ------------------------------------------------------------------
+    def _build_view(self, cur, name: str, definition: Dict, refresh: bool) -> int:
+        """Crea la vista materializada, o la refresca si ya existe con la misma consulta"""
+        if refresh:
+            # CONCURRENTLY (requiere índice único) no bloquea a los lectores
+            concurrently = sql.SQL("CONCURRENTLY ") if definition.get('key') else sql.SQL('')
+            cur.execute(sql.SQL("REFRESH MATERIALIZED VIEW {}{}").format(
+                concurrently, sql.Identifier(name)))
+        else:
+            self._drop_relation(cur, name)
+            cur.execute(sql.SQL("CREATE MATERIALIZED VIEW {} AS {}").format(
+                sql.Identifier(name), sql.SQL(self._query(definition, incremental=False))))
+            if definition.get('key'):
+                cur.execute(sql.SQL("CREATE UNIQUE INDEX {} ON {} ({})").format(
+                    sql.Identifier(f"{name}_key_idx"), sql.Identifier(name),
+                    sql.SQL(', ').join(sql.Identifier(k) for k in definition['key'])))
+        cur.execute(sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(name)))
+        return cur.fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Estado y utilidades
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _validate(name: str, definition: Dict):
+        """Comprueba que la definición tenga lo necesario"""
+        if not definition.get('query'):
+            raise ValueError(f"El snapshot {name} no tiene 'query'")
+        if definition.get('kind', 'table') not in SNAPSHOT_KINDS:
+            raise ValueError(f"Tipo de snapshot no soportado en {name}: {definition['kind']}")
+        incremental = definition.get('incremental')
+        if incremental:
+            missing = [k for k in ('watermark', 'changed_keys') if not incremental.get(k)]
+            if missing or not definition.get('key'):
+                raise ValueError(f"El snapshot incremental {name} requiere 'key', "
+                                 f"'watermark' y 'changed_keys'")
+
+    @staticmethod
+    def _query(definition: Dict, incremental: bool) -> str:
+        """Consulta del snapshot con el marcador {changed} resuelto"""
+        condition = 'TRUE'
+        if incremental and definition['incremental'].get('filter'):
+            condition = f"({definition['incremental']['filter'].strip()})"
+        return definition['query'].replace(CHANGED_PLACEHOLDER, condition).strip().rstrip(';')
+
+    @staticmethod
+    def _query_hash(definition: Dict) -> str:
+        """Huella de la definición: si cambia, el snapshot se reconstruye"""
+        text = repr((definition['query'], definition.get('key'), definition.get('kind'),
+                     (definition.get('incremental') or {}).get('source_keys')))
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _watermark(cur, definition: Dict):
+        """Valor actual de la marca de agua (None si no es incremental)"""
+        incremental = definition.get('incremental')
+        if not incremental:
+            return None
+        cur.execute(incremental['watermark'])
+        return cur.fetchone()[0]
+
+    @staticmethod
+    def _relation_exists(cur, name: str) -> bool:
+        cur.execute("SELECT to_regclass(%s)", (sql.Identifier(name).as_string(cur),))
+        return cur.fetchone()[0] is not None
+
+    @staticmethod
+    def _drop_relation(cur, name: str):
+        """Elimina la tabla o vista materializada existente con ese nombre"""
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+                    (sql.Identifier(name).as_string(cur),))
+        row = cur.fetchone()
+        if row is None:
+            return
+        kind = 'MATERIALIZED VIEW' if row[0] == 'm' else 'TABLE'
+        cur.execute(sql.SQL("DROP {} {}").format(sql.SQL(kind), sql.Identifier(name)))
+
+    @staticmethod
+    def _ensure_state_table(cur):
+        cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} ("
+                            "name text PRIMARY KEY, "
+                            "watermark timestamp, "
+                            "query_hash text NOT NULL, "
+                            "mode text NOT NULL, "
+                            "rows bigint, "
+                            "seconds double precision, "
+                            "built_at timestamptz NOT NULL DEFAULT now())").format(
+            sql.Identifier(SNAPSHOT_STATE_TABLE)))
+
+    @staticmethod
+    def _load_state(cur, name: str) -> Optional[Dict[str, Any]]:
+        cur.execute(sql.SQL("SELECT watermark, query_hash FROM {} WHERE name = %s").format(
+            sql.Identifier(SNAPSHOT_STATE_TABLE)), (name,))
+        row = cur.fetchone()
+        return {'watermark': row[0], 'query_hash': row[1]} if row else None
+
+    @staticmethod
+    def _save_state(cur, name: str, watermark, query_hash: str, mode: str,
+                    rows: int, seconds: float):
+        cur.execute(sql.SQL(
+            "INSERT INTO {} (name, watermark, query_hash, mode, rows, seconds, built_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s, now()) "
+            "ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark, "
+            "query_hash = EXCLUDED.query_hash, mode = EXCLUDED.mode, rows = EXCLUDED.rows, "
+            "seconds = EXCLUDED.seconds, built_at = EXCLUDED.built_at").format(
+            sql.Identifier(SNAPSHOT_STATE_TABLE)),
+            (name, watermark, query_hash, mode, rows, seconds))
@@ -6,6 +6,14 @@ from .connection import OdooConnection
 from .auth import OdooAuth
 from .models import OdooModel, Partner, Product, SaleOrder
 from .utils import OdooUtils
+from .external_ids import ExternalIdResolver
+from .metrics import RpcMetrics
+from .retry import RetryPolicy, HedgePolicy
+from .governor import RequestGovernor
+from .scheduler import PriorityScheduler
+from .fetch_planner import FetchPlanner
+from .field_profiler import FieldProfiler
+from .mock_server import MockOdooServer
 
 __all__ = [
     'OdooConnection', 
@@ -14,5 +22,14 @@ __all__ = [
     'Partner', 
     'Product', 
     'SaleOrder',
-    'OdooUtils'
+    'OdooUtils',
+    'ExternalIdResolver',
+    'RpcMetrics',
+    'RetryPolicy',
+    'HedgePolicy',
+    'RequestGovernor',
+    'PriorityScheduler',
+    'FetchPlanner',
+    'FieldProfiler',
+    'MockOdooServer'
 ]
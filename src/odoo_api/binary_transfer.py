@@ -0,0 +1,312 @@
+"""
+Transferencia de campos binarios en streaming entre Odoo y disco
+"""
+import base64
+import hashlib
+import json
+import logging
+import re
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator
+
+from .metrics import RpcCall
+
+logger = logging.getLogger(__name__)
+
+# Tamaño por defecto de los bloques leídos/escritos (1 MB)
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Marcador reemplazado por el contenido base64 al construir el cuerpo JSON
+_DATA_PLACEHOLDER = '__odoo_api_binary_data__'
+
+
+class Base64FieldDecoder:
+    """
+    Decodifica incrementalmente el valor base64 de un campo dentro de una
+    respuesta JSON-RPC, sin cargar la respuesta completa en memoria.
+    """
+
+    def __init__(self, field: str):
+        """
+        Args:
+            field: Nombre del campo binario a extraer (ej: 'datas')
+        """
+        self._pattern = re.compile(rb'"' + re.escape(field.encode()) + rb'"\s*:\s*')
+        self._buffer = b''
+        self._state = 'search'
+        self.found = False
+
+    def feed(self, chunk: bytes) -> Iterator[bytes]:
+        """
+        Procesa un bloque de la respuesta HTTP
+
+        Args:
+            chunk: Bytes recibidos
+
+        Yields:
+            bytes: Datos binarios ya decodificados
+        """
+        self._buffer += chunk
+
+        if self._state == 'search':
+            match = self._pattern.search(self._buffer)
+            if not match or match.end() >= len(self._buffer):
+                return
+            if self._buffer[match.end():match.end() + 1] != b'"':
+                # Valor false/null: campo vacío
+                self._state = 'done'
+                self.found = True
+                return
+            self._buffer = self._buffer[match.end() + 1:]
+            self._state = 'data'
+            self.found = True
+
+        if self._state == 'data':
+            end = self._buffer.find(b'"')
+            if end < 0:
+                data, keep = self._buffer, b''
+                if data.endswith(b'\\'):
+                    # Escape JSON partido entre dos bloques
+                    data, keep = data[:-1], b'\\'
+                data = data.replace(b'\\/', b'/')
+                # Conservar el grupo base64 incompleto para el siguiente bloque
+                usable = len(data) - len(data) % 4
+                self._buffer = data[usable:] + keep
+                data = data[:usable]
+            else:
+                data = self._buffer[:end].replace(b'\\/', b'/')
+                self._buffer = b''
+                self._state = 'done'
+            if data:
+                yield base64.b64decode(data)
+
+    def finish(self):
+        """
+        Valida el final de la respuesta
+
+        Raises:
+            Exception: Si la respuesta era un error de Odoo o no contenía el campo
+        """
+        if self._state == 'data':
+            raise Exception("Respuesta truncada al leer campo binario")
+        if not self.found:
+            try:
+                result = json.loads(self._buffer)
+            except ValueError:
+                raise Exception("Respuesta JSON-RPC inválida al leer campo binario")
+            if "error" in result:
+                raise Exception(f"Odoo Error: {result['error']}")
+            raise Exception("El registro no existe o no tiene el campo binario solicitado")
+
+
+class Base64UploadBody:
+    """
+    Cuerpo de petición JSON-RPC que codifica un archivo en base64 al vuelo.
+
+    Expone read() y __len__() para que requests lo envíe con Content-Length
+    conocido sin materializar el archivo completo en memoria.
+    """
+
+    def __init__(self, payload: Dict[str, Any], file_path: Path,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            payload: Payload JSON-RPC con _DATA_PLACEHOLDER en lugar de los datos
+            file_path: Archivo a subir
+            chunk_size: Tamaño de los bloques leídos del archivo
+        """
+        encoded = json.dumps(payload).encode()
+        marker = json.dumps(_DATA_PLACEHOLDER).encode()
+        self._prefix, self._suffix = encoded.split(marker)
+        self._prefix += b'"'
+        self._suffix = b'"' + self._suffix
+
+        self.file_path = Path(file_path)
+        self.file_size = self.file_path.stat().st_size
+        # Leer múltiplos de 3 bytes para que cada bloque base64 sea independiente
+        self._read_size = max(3, chunk_size // 3 * 3)
+        self._length = (len(self._prefix) + 4 * ((self.file_size + 2) // 3)
+                        + len(self._suffix))
+        self._parts = self._iter_parts()
+        self._pending = b''
+        self.sha1 = hashlib.sha1()
+
+    def _iter_parts(self) -> Iterator[bytes]:
+        yield self._prefix
+        with open(self.file_path, 'rb') as f:
+            while True:
+                block = f.read(self._read_size)
+                if not block:
+                    break
+                self.sha1.update(block)
+                yield base64.b64encode(block)
+        yield self._suffix
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        chunk = self.read(self._read_size)
+        if not chunk:
+            raise StopIteration
+        return chunk
+
+    def read(self, size: int = -1) -> bytes:
+        """Lee hasta size bytes del cuerpo codificado"""
+        while size < 0 or len(self._pending) < size:
+            try:
+                self._pending += next(self._parts)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._pending)
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+
+def download_binary(connection, model: str, record_id: int, field: str,
+                    dest_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    expected_checksum: Optional[str] = None,
+                    expected_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Descarga un campo binario directamente a disco
+
+    Args:
+        connection: Instancia de OdooConnection
+        model: Nombre del modelo
+        record_id: ID del registro
+        field: Campo binario (ej: 'datas', 'image_1920')
+        dest_path: Ruta del archivo destino
+        chunk_size: Tamaño de los bloques de lectura HTTP
+        expected_checksum: SHA1 esperado del contenido (opcional)
+        expected_size: Tamaño esperado en bytes (opcional)
+
+    Returns:
+        Dict: Ruta, tamaño y SHA1 del archivo descargado
+    """
+    payload = connection._jsonrpc_payload(
+        "object", "execute_kw",
+        connection._execute_kw_args(model, 'read', [[record_id]], {'fields': [field]})
+    )
+    dest = Path(dest_path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_name(dest.name + '.part')
+
+    decoder = Base64FieldDecoder(field)
+    sha1 = hashlib.sha1()
+    size = 0
+
+    # El turno del scheduler se mantiene hasta recibir todo el cuerpo
+    with _slot(connection), _track(connection, model, 'read') as call, \
+            connection._span(f"{model}.read", field=field) as span_args:
+        call.request_bytes = len(json.dumps(payload))
+        with connection._span('network'):
+            response = connection._post_jsonrpc(payload, stream=True)
+        try:
+            # La descarga del cuerpo y la decodificación base64 van intercaladas
+            with connection._span('decode'), open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    call.response_bytes += len(chunk)
+                    for data in decoder.feed(chunk):
+                        f.write(data)
+                        sha1.update(data)
+                        size += len(data)
+            decoder.finish()
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            response.close()
+        span_args['response_bytes'] = call.response_bytes
+
+    checksum = sha1.hexdigest()
+    if expected_size is not None and size != expected_size:
+        tmp_path.unlink(missing_ok=True)
+        raise Exception(f"Tamaño inesperado para {model}({record_id}).{field}: "
+                        f"{size} != {expected_size}")
+    if expected_checksum and checksum != expected_checksum:
+        tmp_path.unlink(missing_ok=True)
+        raise Exception(f"Checksum inválido para {model}({record_id}).{field}")
+
+    tmp_path.replace(dest)
+    logger.debug(f"Descargado {model}({record_id}).{field} → {dest} ({size} bytes)")
+    return {'id': record_id, 'path': str(dest), 'size': size, 'checksum': checksum}
+
+
+def upload_attachment(connection, file_path: str, res_model: Optional[str] = None,
+                      res_id: Optional[int] = None, name: Optional[str] = None,
+                      mimetype: Optional[str] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Crea un ir.attachment enviando el archivo en streaming
+
+    Args:
+        connection: Instancia de OdooConnection
+        file_path: Archivo a subir
+        res_model: Modelo al que se asocia el adjunto (opcional)
+        res_id: ID del registro asociado (opcional)
+        name: Nombre del adjunto (por defecto el nombre del archivo)
+        mimetype: Tipo MIME (opcional, Odoo lo detecta si se omite)
+        chunk_size: Tamaño de los bloques leídos del archivo
+
+    Returns:
+        Dict: ID, tamaño y SHA1 del adjunto creado
+    """
+    path = Path(file_path)
+    values = {'name': name or path.name, 'datas': _DATA_PLACEHOLDER}
+    if res_model:
+        values['res_model'] = res_model
+    if res_id:
+        values['res_id'] = res_id
+    if mimetype:
+        values['mimetype'] = mimetype
+
+    payload = connection._jsonrpc_payload(
+        "object", "execute_kw",
+        connection._execute_kw_args('ir.attachment', 'create', [values])
+    )
+    body = Base64UploadBody(payload, path, chunk_size=chunk_size)
+
+    with _slot(connection), _track(connection, 'ir.attachment', 'create') as call, \
+            connection._span('ir.attachment.create', request_bytes=len(body)):
+        call.request_bytes = len(body)
+        # El cuerpo se serializa y codifica en base64 mientras se envía
+        with connection._span('network'):
+            response = connection._post_jsonrpc(body)
+        call.response_bytes = len(response.content)
+        with connection._span('deserialize'):
+            result = response.json()
+        if "error" in result:
+            raise Exception(f"Odoo Error: {result['error']}")
+    attachment_id = result.get("result")
+
+    checksum = body.sha1.hexdigest()
+    stored = connection.execute_kw('ir.attachment', 'read', [[attachment_id]],
+                                   {'fields': ['checksum', 'file_size']})
+    if stored and stored[0].get('checksum') and stored[0]['checksum'] != checksum:
+        raise Exception(f"Checksum inválido tras subir {path} (adjunto {attachment_id})")
+
+    logger.debug(f"Subido {path} → ir.attachment({attachment_id}) ({body.file_size} bytes)")
+    return {'id': attachment_id, 'path': str(path), 'size': body.file_size,
+            'checksum': checksum}
+
+
+def _slot(connection):
+    """Turno del PriorityScheduler de la conexión, como en execute_kw"""
+    scheduler = getattr(connection, 'scheduler', None)
+    return scheduler.slot() if scheduler is not None else nullcontext()
+
+
+def _track(connection, model: str, method: str):
+    """Mide la transferencia si la conexión tiene métricas activas"""
+    metrics = getattr(connection, 'metrics', None)
+    return metrics.track(model, method) if metrics is not None else nullcontext(RpcCall())
+
+
+def safe_filename(name: str) -> str:
+    """Normaliza un nombre de archivo para escribirlo en disco"""
+    return re.sub(r'[^\w.\-]+', '_', name or '').strip('._') or 'adjunto'
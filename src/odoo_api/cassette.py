@@ -0,0 +1,362 @@
+"""
+Grabación y reproducción de llamadas JSON-RPC (cassettes)
+
+Un cassette es un archivo JSON Lines: la primera línea describe la conexión
+grabada y cada línea siguiente es una interacción (petición y respuesta,
+con su duración). Las credenciales se ocultan antes de escribir y los
+cuerpos grandes se guardan comprimidos con gzip.
+
+Uso:
+    with connection.recording('data/cassettes/ventas.jsonl'):
+        ejecutar_carga(connection)
+
+    replay = OdooConnection.from_cassette('data/cassettes/ventas.jsonl', timing='original')
+    ejecutar_carga(replay)
+"""
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+# Cuerpos mayores que esto se guardan comprimidos (64 KB)
+DEFAULT_COMPRESS_THRESHOLD = 64 * 1024
+
+# Valor que sustituye a las credenciales en el cassette
+REDACTED = '***'
+
+# Posición de la clave en los argumentos de cada método con credenciales
+_SECRET_POSITIONS = {
+    ('common', 'authenticate'): 2,
+    ('common', 'login'): 2,
+    ('object', 'execute_kw'): 2,
+    ('object', 'execute'): 2,
+}
+
+
+class CassetteMiss(Exception):
+    """La petición no está en el cassette que se reproduce"""
+
+
+class RecordingTransport:
+    """Transporte que envía las peticiones con requests y las graba"""
+
+    def __init__(self, path: str, secrets: Optional[List[str]] = None,
+                 metadata: Optional[Dict[str, Any]] = None,
+                 compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+                 session: Optional[requests.Session] = None):
+        """
+        Inicializar grabación (el archivo se sobrescribe)
+
+        Args:
+            path: Archivo del cassette
+            secrets: Valores a ocultar donde aparezcan (ej: la API key)
+            metadata: Datos de la cabecera (url, db, user, ...)
+            compress_threshold: Tamaño a partir del cual se comprime un cuerpo
+            session: Sesión HTTP (por defecto, requests.post)
+        """
+        self.path = Path(path)
+        self.secrets = [secret for secret in (secrets or []) if secret]
+        self.compress_threshold = compress_threshold
+        self.session = session
+        self.count = 0
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        header = {'cassette': CASSETTE_VERSION,
+                  'recorded_at': datetime.now().isoformat(timespec='seconds'),
+                  **(metadata or {})}
+        self._write(header)
+
+    def post(self, url: str, data: Any = None, headers: Optional[Dict] = None,
+             stream: bool = False, timeout: Any = None):
+        """Envía la petición (misma firma que requests.post) y la graba"""
+        body = data if isinstance(data, (str, bytes)) else None
+        started = time.perf_counter()
+        sender = self.session.post if self.session is not None else requests.post
+        response = sender(url, data=data, headers=headers, stream=stream, timeout=timeout)
+        # Las respuestas en streaming se leen completas para poder grabarlas
+        content = response.content
+        duration = time.perf_counter() - started
+
+        interaction = {
+            'offset': round(started - self._started, 6),
+            'duration': round(duration, 6),
+            'status': response.status_code,
+            'request': self._encode(self.redact(body)) if body is not None
+            else {'streamed': True, 'bytes': _length(data)},
+            'response': self._encode(content),
+        }
+        if body is not None:
+            interaction.update(_describe(body))
+        with self._lock:
+            interaction['seq'] = self.count
+            self.count += 1
+            self._write(interaction)
+        return response
+
+    def close(self):
+        """Cierra el archivo del cassette"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        logger.info(f"Cassette {self.path}: {self.count} interacciones grabadas")
+
+    def redact(self, body) -> str:
+        """Cuerpo de la petición sin credenciales"""
+        text = body.decode('utf-8') if isinstance(body, bytes) else body
+        return redact_body(text, self.secrets)
+
+    def _encode(self, content) -> Dict[str, Any]:
+        raw = content.encode('utf-8') if isinstance(content, str) else content
+        if len(raw) > self.compress_threshold:
+            return {'encoding': 'gzip+base64',
+                    'data': base64.b64encode(gzip.compress(raw, 6)).decode('ascii'),
+                    'bytes': len(raw)}
+        try:
+            return {'encoding': 'utf-8', 'data': raw.decode('utf-8')}
+        except UnicodeDecodeError:
+            return {'encoding': 'base64', 'data': base64.b64encode(raw).decode('ascii')}
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+
+class ReplayTransport:
+    """Transporte que responde con las interacciones de un cassette"""
+
+    def __init__(self, path: str, timing: str = 'fast', speed: float = 1.0,
+                 strict: bool = True):
+        """
+        Inicializar reproducción
+
+        Args:
+            path: Archivo del cassette
+            timing: 'fast' responde de inmediato; 'original' espera la
+                duración grabada de cada llamada
+            speed: Factor de velocidad en modo 'original' (2.0 = el doble de rápido)
+            strict: Lanzar CassetteMiss si una petición no está grabada
+                (False responde con la siguiente interacción en el orden grabado)
+        """
+        if timing not in ('fast', 'original'):
+            raise ValueError(f"Modo de tiempo no válido: {timing}")
+        self.path = Path(path)
+        self.timing = timing
+        self.speed = speed
+        self.strict = strict
+        self.header, interactions = read_cassette(self.path)
+        self.interactions = interactions
+        self.served = 0
+        self._by_key: Dict[Optional[str], deque] = defaultdict(deque)
+        for interaction in interactions:
+            self._by_key[interaction.get('key')].append(interaction)
+        self._next = 0  # primera interacción pendiente en orden de grabación
+        self._used = set()
+        self._lock = threading.Lock()
+
+    def post(self, url: str, data: Any = None, headers: Optional[Dict] = None,
+             stream: bool = False, timeout: Any = None) -> 'ReplayResponse':
+        """Devuelve la respuesta grabada para la petición (timeout se ignora)"""
+        key = None
+        if isinstance(data, (str, bytes)):
+            text = data.decode('utf-8') if isinstance(data, bytes) else data
+            key = request_key(redact_body(text))
+        elif hasattr(data, 'read'):
+            # Consumir el cuerpo como lo haría requests (checksums, codificación)
+            while data.read(1024 * 1024):
+                pass
+
+        with self._lock:
+            interaction = self._take(key)
+
+        if interaction is None:
+            raise CassetteMiss(f"Petición no grabada en {self.path}: {_summary(data)}")
+        if self.timing == 'original' and interaction.get('duration'):
+            time.sleep(interaction['duration'] / self.speed)
+        return ReplayResponse(url, interaction['status'], decode_body(interaction['response']))
+
+    def _take(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Siguiente interacción grabada para la petición (None si no hay)"""
+        queue = self._by_key.get(key)
+        while queue and queue[0]['seq'] in self._used:
+            queue.popleft()
+        if queue:
+            interaction = queue.popleft()
+        elif self.strict:
+            return None
+        else:
+            # Sin coincidencia exacta: la siguiente en el orden grabado
+            while (self._next < len(self.interactions)
+                   and self.interactions[self._next]['seq'] in self._used):
+                self._next += 1
+            if self._next == len(self.interactions):
+                return None
+            interaction = self.interactions[self._next]
+        self._used.add(interaction['seq'])
+        self.served += 1
+        return interaction
+
+    @property
+    def remaining(self) -> int:
+        """Interacciones grabadas que no se han reproducido"""
+        with self._lock:
+            return len(self.interactions) - self.served
+
+    def close(self):
+        if self.remaining:
+            logger.info(f"Cassette {self.path}: {self.remaining} interacciones sin reproducir")
+
+
+class ReplayResponse:
+    """Respuesta con la interfaz de requests.Response usada por el cliente"""
+
+    def __init__(self, url: str, status_code: int, content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = {'Content-Type': 'application/json',
+                        'Content-Length': str(len(content))}
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8')
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 1) -> Iterator[bytes]:
+        for start in range(0, len(self.content), chunk_size or len(self.content) or 1):
+            yield self.content[start:start + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} en {self.url} (cassette)",
+                                     response=self)
+
+    def close(self):
+        pass
+
+
+# ----------------------------------------------------------------------
+# Utilidades
+# ----------------------------------------------------------------------
+def read_cassette(path: str) -> tuple:
+    """
+    Lee un cassette
+
+    Returns:
+        Tuple[Dict, List[Dict]]: Cabecera e interacciones (ordenadas por seq)
+    """
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or 'cassette' not in lines[0]:
+        raise ValueError(f"{path} no es un cassette válido")
+    header = lines[0]
+    if header['cassette'] > CASSETTE_VERSION:
+        raise ValueError(f"Versión de cassette no soportada: {header['cassette']}")
+    interactions = sorted(lines[1:], key=lambda interaction: interaction['seq'])
+    for interaction in interactions:
+        if 'request' in interaction and 'data' in interaction['request']:
+            interaction['key'] = request_key(decode_body(interaction['request']).decode('utf-8'))
+    return header, interactions
+
+
+def recorded_calls(path: str) -> List[tuple]:
+    """
+    Llamadas grabadas en un cassette, en orden, para volver a ejecutarlas
+
+    Las peticiones enviadas en streaming (subidas) no se incluyen.
+
+    Returns:
+        List[Tuple[str, str, List]]: (servicio, método, args) de cada llamada
+    """
+    calls = []
+    for interaction in read_cassette(path)[1]:
+        if 'data' not in interaction['request']:
+            continue
+        params = json.loads(decode_body(interaction['request']))['params']
+        calls.append((params['service'], params['method'], params['args']))
+    return calls
+
+
+def redact_body(text: str, secrets: Optional[List[str]] = None) -> str:
+    """Oculta la clave en los argumentos JSON-RPC y los secretos indicados"""
+    for secret in secrets or []:
+        text = text.replace(secret, REDACTED)
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return text
+    params = payload.get('params') if isinstance(payload, dict) else None
+    if not isinstance(params, dict):
+        return text
+    position = _SECRET_POSITIONS.get((params.get('service'), params.get('method')))
+    args = params.get('args')
+    if position is None or not isinstance(args, list) or len(args) <= position:
+        return text
+    args[position] = REDACTED
+    return json.dumps(payload)
+
+
+def request_key(redacted_text: str) -> str:
+    """Huella de una petición (sin el id de JSON-RPC) para emparejarla al reproducir"""
+    try:
+        payload = json.loads(redacted_text)
+        if isinstance(payload, dict):
+            payload.pop('id', None)
+        canonical = json.dumps(payload, sort_keys=True)
+    except ValueError:
+        canonical = redacted_text
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def decode_body(entry: Dict[str, Any]) -> bytes:
+    """Contenido de un cuerpo grabado"""
+    encoding = entry.get('encoding')
+    if encoding == 'gzip+base64':
+        return gzip.decompress(base64.b64decode(entry['data']))
+    if encoding == 'base64':
+        return base64.b64decode(entry['data'])
+    return entry['data'].encode('utf-8')
+
+
+def _describe(body) -> Dict[str, Any]:
+    """Servicio, modelo y método de la petición (para inspeccionar el cassette)"""
+    try:
+        params = json.loads(body)['params']
+    except (ValueError, KeyError, TypeError):
+        return {}
+    args = params.get('args') or []
+    if params.get('service') == 'object' and len(args) >= 5:
+        return {'model': args[3], 'method': args[4]}
+    return {'model': params.get('service'), 'method': params.get('method')}
+
+
+def _length(data) -> Optional[int]:
+    try:
+        return len(data)
+    except TypeError:
+        return None
+
+
+def _summary(data) -> str:
+    if isinstance(data, (str, bytes)):
+        description = _describe(data)
+        if description:
+            return f"{description['model']}.{description['method']}"
+    return type(data).__name__
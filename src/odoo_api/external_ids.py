@@ -0,0 +1,293 @@
+"""
+Resolución masiva de IDs externos (xmlids) con caché local
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Tuple, Union
+
+from .utils import AdaptiveBatcher, OdooUtils
+
+logger = logging.getLogger(__name__)
+
+class ExternalIdResolver:
+    """Resuelve xmlids <-> IDs de base de datos en lote usando ir.model.data"""
+
+    DEFAULT_MODULE = '__import__'
+
+    def __init__(self, connection, cache_file: Optional[str] = None,
+                 batch_size: Union[int, AdaptiveBatcher] = 2000,
+                 default_module: str = DEFAULT_MODULE):
+        """
+        Inicializar resolvedor
+
+        Args:
+            connection: Instancia de OdooConnection
+            cache_file: Ruta al archivo JSON de caché persistente (opcional).
+                Guarda la URL y la base de datos de la conexión; si no
+                coinciden con las actuales, su contenido se descarta
+            batch_size: Número máximo de xmlids por llamada RPC, o un
+                AdaptiveBatcher que lo ajusta según la latencia observada
+            default_module: Módulo usado para xmlids sin prefijo de módulo
+        """
+        self.connection = connection
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.batch_size = batch_size
+        self.default_module = default_module
+        # xmlid completo -> (modelo, res_id)
+        self._cache: Dict[str, Tuple[str, int]] = {}
+        # (modelo, res_id) -> xmlid completo
+        self._reverse: Dict[Tuple[str, int], str] = {}
+        self._dirty = False
+
+        if self.cache_file and self.cache_file.exists():
+            self.load()
+
+    def qualify(self, xmlid: str) -> str:
+        """
+        Agrega el módulo por defecto a un xmlid sin prefijo
+
+        Args:
+            xmlid: ID externo ('modulo.nombre' o 'nombre')
+
+        Returns:
+            str: xmlid completo en formato 'modulo.nombre'
+        """
+        if '.' in xmlid:
+            return xmlid
+        return f"{self.default_module}.{xmlid}"
+
+    def resolve(self, xmlids: Iterable[str], model: Optional[str] = None) -> Dict[str, int]:
+        """
+        Resuelve xmlids a IDs de base de datos
+
+        Args:
+            xmlids: IDs externos a resolver
+            model: Modelo esperado (opcional, filtra resultados de otros modelos)
+
+        Returns:
+            Dict[str, int]: Mapa {xmlid: id} (los no encontrados se omiten)
+        """
+        requested = {xmlid: self.qualify(xmlid) for xmlid in xmlids}
+        missing = sorted({full for full in requested.values() if full not in self._cache})
+
+        if missing:
+            self._fetch(missing)
+
+        result = {}
+        for xmlid, full in requested.items():
+            cached = self._cache.get(full)
+            if cached and (model is None or cached[0] == model):
+                result[xmlid] = cached[1]
+        return result
+
+    def resolve_one(self, xmlid: str, model: Optional[str] = None) -> Optional[int]:
+        """Resuelve un único xmlid (usa la caché si está disponible)"""
+        return self.resolve([xmlid], model=model).get(xmlid)
+
+    def reverse(self, model: str, ids: Iterable[int]) -> Dict[int, str]:
+        """
+        Obtiene los xmlids de registros de un modelo
+
+        Args:
+            model: Nombre del modelo (ej: 'res.partner')
+            ids: IDs de los registros
+
+        Returns:
+            Dict[int, str]: Mapa {id: xmlid} (los registros sin xmlid se omiten)
+        """
+        ids = list(dict.fromkeys(ids))
+        missing = [res_id for res_id in ids if (model, res_id) not in self._reverse]
+
+        def _search(chunk: List[int]) -> List[Dict]:
+            return self.connection.execute_kw(
+                'ir.model.data', 'search_read',
+                [[['model', '=', model], ['res_id', 'in', chunk]]],
+                {'fields': ['module', 'name', 'model', 'res_id']}
+            )
+
+        for _chunk, records in OdooUtils.run_batches(missing, self.batch_size, _search,
+                                                     self.connection):
+            self._store_records(records)
+
+        return {res_id: self._reverse[(model, res_id)]
+                for res_id in ids if (model, res_id) in self._reverse}
+
+    def register(self, xmlid: str, model: str, res_id: int):
+        """
+        Agrega manualmente una entrada a la caché (ej: tras crear un registro)
+
+        Args:
+            xmlid: ID externo
+            model: Nombre del modelo
+            res_id: ID del registro en base de datos
+        """
+        full = self.qualify(xmlid)
+        self._cache[full] = (model, res_id)
+        self._reverse[(model, res_id)] = full
+        self._dirty = True
+
+    def create(self, model: str, values: Dict[str, Any], xmlid: str) -> int:
+        """
+        Crea un registro junto con su xmlid y actualiza la caché
+
+        Args:
+            model: Nombre del modelo
+            values: Valores del nuevo registro
+            xmlid: ID externo a asignar
+
+        Returns:
+            int: ID del registro creado
+        """
+        full = self.qualify(xmlid)
+        module, name = full.split('.', 1)
+
+        res_id = self.connection.execute_kw(model, 'create', [values])
+        self.connection.execute_kw('ir.model.data', 'create', [{
+            'module': module,
+            'name': name,
+            'model': model,
+            'res_id': res_id,
+        }])
+        self.register(full, model, res_id)
+        return res_id
+
+    def convert_references(self, rows: List[Dict[str, Any]],
+                           fields: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Reemplaza xmlids por IDs en campos relacionales de muchos registros
+
+        Todos los xmlids de todas las filas se resuelven en una sola pasada,
+        evitando una consulta por fila al importar datos.
+
+        Args:
+            rows: Valores de registros (se modifican en sitio)
+            fields: Mapa {campo: modelo relacionado} de campos many2one/many2many
+
+        Returns:
+            List[Dict]: Las mismas filas con los IDs resueltos
+
+        Example:
+            convert_references(rows, {'partner_id': 'res.partner'})
+            # {'partner_id': 'base.main_partner'} -> {'partner_id': 1}
+        """
+        pending = set()
+        for row in rows:
+            for field in fields:
+                value = row.get(field)
+                if isinstance(value, str):
+                    pending.add(value)
+                elif self._is_xmlid_list(value):
+                    pending.update(v for v in value if isinstance(v, str))
+
+        resolved = self.resolve(pending) if pending else {}
+
+        for row in rows:
+            for field, model in fields.items():
+                value = row.get(field)
+                if isinstance(value, str):
+                    row[field] = self._checked(resolved, value, model)
+                elif self._is_xmlid_list(value):
+                    ids = [self._checked(resolved, v, model) if isinstance(v, str) else v
+                           for v in value]
+                    row[field] = [(6, 0, ids)]
+        return rows
+
+    @staticmethod
+    def _is_xmlid_list(value: Any) -> bool:
+        """Indica si el valor es una lista de xmlids/IDs (no comandos x2many)"""
+        return (isinstance(value, (list, tuple))
+                and all(isinstance(v, (str, int)) for v in value)
+                and any(isinstance(v, str) for v in value))
+
+    def _checked(self, resolved: Dict[str, int], xmlid: str, model: str) -> int:
+        """Valida que el xmlid exista y pertenezca al modelo esperado"""
+        if xmlid not in resolved:
+            raise KeyError(f"ID externo no encontrado: {xmlid}")
+        cached_model = self._cache[self.qualify(xmlid)][0]
+        if cached_model != model:
+            raise ValueError(f"ID externo {xmlid} pertenece a {cached_model}, no a {model}")
+        return resolved[xmlid]
+
+    def _fetch(self, xmlids: List[str]):
+        """Consulta ir.model.data en lotes, agrupando los nombres por módulo"""
+        def _search(chunk: List[str]) -> Tuple[List[Dict], int]:
+            by_module: Dict[str, List[str]] = {}
+            for full in chunk:
+                module, name = full.split('.', 1)
+                by_module.setdefault(module, []).append(name)
+
+            # Un único dominio OR con una condición por módulo
+            domain = ['|'] * (len(by_module) - 1)
+            for module, names in by_module.items():
+                domain += ['&', ['module', '=', module], ['name', 'in', names]]
+
+            records = self.connection.execute_kw(
+                'ir.model.data', 'search_read', [domain],
+                {'fields': ['module', 'name', 'model', 'res_id']}
+            )
+            return records, len(by_module)
+
+        for chunk, (records, modules) in OdooUtils.run_batches(
+                xmlids, self.batch_size, _search, self.connection):
+            self._store_records(records)
+            logger.debug(f"Resueltos {len(records)}/{len(chunk)} xmlids "
+                         f"en {modules} módulos")
+
+    def _store_records(self, records: List[Dict]):
+        """Guarda registros de ir.model.data en la caché"""
+        for record in records:
+            full = f"{record['module']}.{record['name']}"
+            key = (record['model'], record['res_id'])
+            self._cache[full] = key
+            self._reverse.setdefault(key, full)
+        if records:
+            self._dirty = True
+
+    def _origin(self) -> Dict[str, Optional[str]]:
+        """Instancia y base de datos a las que pertenecen los IDs de la caché"""
+        return {'url': getattr(self.connection, 'url', None),
+                'db': getattr(self.connection, 'db', None)}
+
+    def load(self):
+        """Carga la caché desde el archivo persistente (si es de esta base de datos)"""
+        with open(self.cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        origin = {'url': data.get('url'), 'db': data.get('db')} if 'entries' in data else None
+        if origin != self._origin():
+            logger.warning(f"Caché de xmlids {self.cache_file} descartada: pertenece a "
+                           f"{origin or 'un formato sin origen'}, no a {self._origin()}")
+            self._dirty = True
+            return
+        for full, (model, res_id) in data['entries'].items():
+            self._cache[full] = (model, res_id)
+            self._reverse.setdefault((model, res_id), full)
+        logger.debug(f"Caché de xmlids cargada: {len(self._cache)} entradas")
+
+    def save(self):
+        """Guarda la caché en el archivo persistente (escritura atómica)"""
+        if not self.cache_file or not self._dirty:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_file.with_suffix(self.cache_file.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({**self._origin(),
+                       'entries': {full: list(value) for full, value in self._cache.items()}}, f)
+        os.replace(tmp_path, self.cache_file)
+        self._dirty = False
+
+    def clear(self):
+        """Vacía la caché en memoria"""
+        self._cache.clear()
+        self._reverse.clear()
+        self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
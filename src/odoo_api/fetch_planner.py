@@ -0,0 +1,241 @@
+"""
+Planificador de lecturas: elige cómo traer un conjunto de registros según
+su tamaño estimado
+
+Antes de leer se cuenta el dominio con search_count y se estima el volumen
+con los bytes por registro observados en lecturas anteriores del mismo
+modelo y campos. Con esa estimación se elige entre una sola llamada, páginas
+keyset o un escaneo en paralelo por rangos de id. Cada lectura actualiza
+las estadísticas (opcionalmente persistidas en JSON), de modo que las
+siguientes estimaciones son más precisas.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SINGLE = 'single'
+KEYSET = 'keyset'
+SHARDED = 'sharded'
+
+STRATEGIES = (SINGLE, KEYSET, SHARDED)
+
+# Bytes por campo y registro supuestos sin estadísticas previas
+DEFAULT_FIELD_BYTES = 64
+
+# Bytes por registro supuestos al leer todos los campos sin estadísticas
+DEFAULT_ALL_FIELDS_BYTES = 4096
+
+
+class FetchPlanner:
+    """Estimación de volumen y elección de estrategia de lectura"""
+
+    def __init__(self, stats_file: Optional[str] = None, single_max_rows: int = 2000,
+                 single_max_bytes: int = 8 * 1024 * 1024,
+                 page_bytes: int = 4 * 1024 * 1024, min_page: int = 100,
+                 max_page: int = 10_000, shard_min_rows: int = 100_000,
+                 shard_rows: int = 50_000, workers: int = 4, smoothing: float = 0.3):
+        """
+        Inicializar planificador
+
+        Args:
+            stats_file: Archivo JSON donde persistir las estadísticas (opcional)
+            single_max_rows: Registros máximos para leer en una sola llamada
+            single_max_bytes: Bytes estimados máximos para una sola llamada
+            page_bytes: Bytes objetivo por página keyset
+            min_page: Registros mínimos por página
+            max_page: Registros máximos por página
+            shard_min_rows: Registros a partir de los cuales se escanea en paralelo
+            shard_rows: Registros estimados por shard
+            workers: Hilos del escaneo en paralelo (1 desactiva los shards)
+            smoothing: Peso de la última lectura en la media de bytes por registro
+        """
+        self.stats_file = Path(stats_file) if stats_file else None
+        self.single_max_rows = single_max_rows
+        self.single_max_bytes = single_max_bytes
+        self.page_bytes = page_bytes
+        self.min_page = min_page
+        self.max_page = max_page
+        self.shard_min_rows = shard_min_rows
+        self.shard_rows = shard_rows
+        self.workers = workers
+        self.smoothing = smoothing
+        # "modelo|campos" -> {'bytes_per_row', 'seconds_per_row', 'samples'}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self.history = deque(maxlen=100)
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        if self.stats_file and self.stats_file.exists():
+            self.load()
+
+    # ------------------------------------------------------------------
+    # Planificación
+    # ------------------------------------------------------------------
+    def plan(self, count: int, model: str, fields: Optional[List[str]],
+             limit: Optional[int] = None, strategy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Decide la estrategia para leer 'count' registros
+
+        Args:
+            count: Registros que cumplen el dominio (search_count)
+            model: Modelo
+            fields: Campos a leer (None para todos)
+            limit: Límite pedido por el llamador
+            strategy: Forzar una estrategia ('single', 'keyset', 'sharded')
+
+        Returns:
+            Dict: strategy, rows, bytes_per_row, estimated_bytes,
+            estimated_seconds, page_size, shards y reason
+        """
+        rows = min(count, limit) if limit else count
+        stats = self.stats(model, fields)
+        if stats:
+            bytes_per_row = stats['bytes_per_row']
+        elif fields:
+            bytes_per_row = DEFAULT_FIELD_BYTES * (len(fields) + 1)
+        else:
+            bytes_per_row = DEFAULT_ALL_FIELDS_BYTES
+        estimated_bytes = int(rows * bytes_per_row)
+        page_size = int(max(self.min_page, min(self.max_page,
+                                               self.page_bytes // max(bytes_per_row, 1))))
+
+        if strategy:
+            if strategy not in STRATEGIES:
+                raise ValueError(f"Estrategia no válida: {strategy}")
+            reason = 'forzada'
+        elif rows <= self.single_max_rows and estimated_bytes <= self.single_max_bytes:
+            strategy, reason = SINGLE, 'resultado pequeño'
+        elif limit or self.workers <= 1 or rows < self.shard_min_rows:
+            strategy, reason = KEYSET, ('con límite' if limit else 'volumen medio')
+        else:
+            strategy, reason = SHARDED, 'volumen grande'
+
+        shards = 1
+        if strategy == SHARDED:
+            shards = max(2, min(self.workers * 4, -(-rows // self.shard_rows)))
+        return {
+            'strategy': strategy,
+            'reason': reason,
+            'rows': rows,
+            'bytes_per_row': round(bytes_per_row, 1),
+            'estimated_bytes': estimated_bytes,
+            'estimated_seconds': (round(rows * stats['seconds_per_row'], 3)
+                                  if stats else None),
+            'page_size': page_size,
+            'shards': shards,
+            'from_stats': bool(stats),
+        }
+
+    # ------------------------------------------------------------------
+    # Estadísticas
+    # ------------------------------------------------------------------
+    @staticmethod
+    def key(model: str, fields: Optional[List[str]]) -> str:
+        """Clave de estadísticas de un modelo y conjunto de campos"""
+        return f"{model}|{','.join(sorted(fields)) if fields else '*'}"
+
+    def stats(self, model: str, fields: Optional[List[str]]) -> Optional[Dict[str, float]]:
+        """Estadísticas observadas para el modelo y campos (None si no hay)"""
+        with self._lock:
+            stats = self._stats.get(self.key(model, fields))
+            return dict(stats) if stats else None
+
+    def observe(self, model: str, fields: Optional[List[str]], rows: int,
+                response_bytes: int, seconds: float):
+        """
+        Incorpora el resultado de una lectura a las estadísticas
+
+        Args:
+            model: Modelo leído
+            fields: Campos leídos
+            rows: Registros recibidos
+            response_bytes: Bytes de respuesta recibidos
+            seconds: Duración total de la lectura
+        """
+        if rows <= 0:
+            return
+        key = self.key(model, fields)
+        with self._lock:
+            stats = self._stats.get(key)
+            bytes_per_row = response_bytes / rows if response_bytes else None
+            seconds_per_row = seconds / rows
+            if stats is None:
+                if bytes_per_row is None:
+                    return
+                self._stats[key] = {'bytes_per_row': bytes_per_row,
+                                    'seconds_per_row': seconds_per_row, 'samples': 1}
+            else:
+                weight = self.smoothing
+                if bytes_per_row is not None:
+                    stats['bytes_per_row'] += weight * (bytes_per_row - stats['bytes_per_row'])
+                stats['seconds_per_row'] += weight * (seconds_per_row - stats['seconds_per_row'])
+                stats['samples'] += 1
+            self._dirty = True
+
+    def record_outcome(self, plan: Dict[str, Any], model: str, rows: int,
+                       response_bytes: int, seconds: float, calls: int):
+        """Guarda el plan ejecutado con su resultado real y lo registra en el log"""
+        outcome = {**plan, 'model': model, 'actual_rows': rows,
+                   'actual_bytes': response_bytes, 'seconds': round(seconds, 3),
+                   'calls': calls, 'at': time.time()}
+        with self._lock:
+            self.history.append(outcome)
+        error = ''
+        if plan['estimated_bytes'] and response_bytes:
+            error = f", estimación {response_bytes / plan['estimated_bytes'] - 1:+.0%}"
+        logger.info(f"Lectura de {model} ({plan['strategy']}): {rows:,} registros, "
+                    f"{response_bytes / (1024 * 1024):,.1f} MB en {seconds:.2f} s, "
+                    f"{calls} llamadas{error}")
+
+    def load(self):
+        """Carga las estadísticas desde el archivo persistente"""
+        with open(self.stats_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        with self._lock:
+            self._stats.update(data)
+        logger.debug(f"Estadísticas de lectura cargadas: {len(data)} entradas")
+
+    def save(self):
+        """Guarda las estadísticas en el archivo persistente (escritura atómica)"""
+        if not self.stats_file or not self._dirty:
+            return
+        self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.stats_file.with_suffix(self.stats_file.suffix + '.tmp')
+        with self._lock:
+            data = json.dumps(self._stats, indent=2)
+            self._dirty = False
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.stats_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
+
+
+_default_planner: Optional[FetchPlanner] = None
+_default_lock = threading.Lock()
+
+
+def default_planner() -> FetchPlanner:
+    """Planificador compartido del proceso (estadísticas solo en memoria)"""
+    global _default_planner
+    with _default_lock:
+        if _default_planner is None:
+            _default_planner = FetchPlanner()
+        return _default_planner
+
+
+def id_ranges(low: int, high: int, shards: int) -> List[Tuple[int, int]]:
+    """Divide [low, high) en 'shards' rangos contiguos"""
+    step = max(1, -(-(high - low) // shards))
+    return [(start, min(start + step, high)) for start in range(low, high, step)]
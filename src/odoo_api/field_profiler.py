@@ -0,0 +1,245 @@
+"""
+Perfilado del coste de cada campo para elegir proyecciones mínimas
+
+Algunos campos calculados (totales de facturación, disponibilidad de
+stock...) hacen que un search_read sea mucho más lento, y sin medirlo no se
+sabe cuáles. El perfilador toma una muestra de registros del dominio y lee
+cada campo por separado (y grupos de campos), restando el coste de leer
+solo el id. Con los metadatos de fields_get (cacheados en la conexión)
+indica si el campo está almacenado, y con los bytes de la respuesta calcula
+la carga por registro. recommend() propone la lista de campos a pedir.
+
+Uso:
+    profiler = FieldProfiler(connection, sample_size=200)
+    profile = profiler.profile('res.partner', Partner.COMPANY_DOMAIN)
+    recommendation = profiler.recommend(profile, required=['name', 'email'])
+    Partner(connection).get_companies(fields=recommendation['fields'])
+"""
+import json
+import logging
+import statistics
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Atributos de fields_get que necesita el perfilador
+FIELD_ATTRIBUTES = ['type', 'string', 'store', 'relation']
+
+# Tipos que no se perfilan salvo que se pida (contenido grande en base64)
+BINARY_TYPES = frozenset({'binary', 'image'})
+
+# Relaciones que devuelven listas de ids de tamaño variable
+X2MANY_TYPES = frozenset({'one2many', 'many2many'})
+
+
+class FieldProfiler:
+    """Mide el tiempo y el tamaño de la respuesta de cada campo de un modelo"""
+
+    def __init__(self, connection, sample_size: int = 200, repeat: int = 3,
+                 include_binary: bool = False):
+        """
+        Inicializar perfilador
+
+        Args:
+            connection: Instancia de OdooConnection
+            sample_size: Registros de la muestra leída en cada medición
+            repeat: Lecturas por medición (se usa la mediana)
+            include_binary: Perfilar también campos binarios e imágenes
+        """
+        self.connection = connection
+        self.sample_size = max(1, sample_size)
+        self.repeat = max(1, repeat)
+        self.include_binary = include_binary
+
+    # ------------------------------------------------------------------
+    # Perfilado
+    # ------------------------------------------------------------------
+    def profile(self, model: str, domain: List = None, fields: List[str] = None,
+                groups: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """
+        Perfila los campos de un modelo sobre una muestra del dominio
+
+        Args:
+            model: Modelo a perfilar
+            domain: Dominio del que se toma la muestra
+            fields: Campos a perfilar (por defecto, todos los de fields_get)
+            groups: Grupos de campos a medir juntos {nombre: [campos]}; se
+                añaden siempre 'stored', 'computed' y 'all'
+
+        Returns:
+            Dict: model, domain, sample, baseline, fields (ordenados de mayor
+            a menor coste), groups y skipped (campos no perfilados y motivo)
+        """
+        domain = domain or []
+        metadata = self.connection.fields_get(model, attributes=FIELD_ATTRIBUTES)
+        names, skipped = self._select_fields(metadata, fields)
+        ids = self.connection.execute_kw(model, 'search', [domain],
+                                         {'limit': self.sample_size, 'order': 'id'})
+        result = {'model': model, 'domain': domain, 'sample': len(ids),
+                  'baseline': None, 'fields': [], 'groups': {}, 'skipped': skipped}
+        if not ids:
+            logger.warning(f"Sin registros de {model} para perfilar con {domain}")
+            return result
+
+        baseline_seconds, baseline_bytes = self._measure(model, ids, ['id'])
+        result['baseline'] = {'seconds': round(baseline_seconds, 6),
+                              'bytes_per_record': round(baseline_bytes / len(ids), 1)}
+
+        for name in names:
+            try:
+                seconds, size = self._measure(model, ids, [name])
+            except Exception as e:
+                skipped[name] = f"error al leer: {e}"
+                continue
+            definition = metadata[name]
+            result['fields'].append(self._costs(name, seconds, size, ids, baseline_seconds,
+                                                baseline_bytes, definition))
+        result['fields'].sort(key=lambda item: item['seconds'], reverse=True)
+
+        profiled = [item['name'] for item in result['fields']]
+        all_groups = {
+            'stored': [item['name'] for item in result['fields'] if item['store']],
+            'computed': [item['name'] for item in result['fields'] if not item['store']],
+            'all': profiled,
+        }
+        all_groups.update(groups or {})
+        for group, members in all_groups.items():
+            members = [name for name in members if name in profiled]
+            if not members:
+                continue
+            seconds, size = self._measure(model, ids, members)
+            costs = self._costs(group, seconds, size, ids, baseline_seconds, baseline_bytes)
+            costs['fields'] = members
+            result['groups'][group] = costs
+
+        logger.info(f"Perfil de {model}: {len(profiled)} campos sobre {len(ids)} registros, "
+                    f"{len(skipped)} omitidos")
+        return result
+
+    def _select_fields(self, metadata: Dict[str, Dict],
+                       fields: Optional[List[str]]) -> Tuple[List[str], Dict[str, str]]:
+        """Campos a perfilar y campos omitidos con su motivo"""
+        skipped = {}
+        names = []
+        for name in fields or sorted(metadata):
+            definition = metadata.get(name)
+            if name == 'id':
+                continue
+            if definition is None:
+                skipped[name] = 'no existe en el modelo'
+            elif definition.get('type') in BINARY_TYPES and not self.include_binary:
+                skipped[name] = 'binario (usar include_binary)'
+            else:
+                names.append(name)
+        return names, skipped
+
+    def _measure(self, model: str, ids: List[int], fields: List[str]) -> Tuple[float, int]:
+        """
+        Lee los campos de la muestra 'repeat' veces
+
+        Returns:
+            Tuple[float, int]: Mediana de segundos y de bytes de la respuesta
+        """
+        timings = []
+        sizes = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            records = self.connection.execute_kw(model, 'read', [ids], {'fields': fields})
+            timings.append(time.perf_counter() - started)
+            last_call = self.connection.last_call
+            if last_call and last_call.get('response_bytes'):
+                sizes.append(last_call['response_bytes'])
+            else:
+                sizes.append(len(json.dumps(records)))
+        return statistics.median(timings), int(statistics.median(sizes))
+
+    @staticmethod
+    def _costs(name: str, seconds: float, size: int, ids: List[int],
+               baseline_seconds: float, baseline_bytes: int,
+               definition: Optional[Dict] = None) -> Dict[str, Any]:
+        """Coste de una medición descontando la lectura de solo el id"""
+        extra_seconds = max(0.0, seconds - baseline_seconds)
+        costs = {
+            'name': name,
+            'seconds': round(extra_seconds, 6),
+            'ms_per_1k': round(extra_seconds / len(ids) * 1_000_000, 2),
+            'bytes_per_record': round(max(0, size - baseline_bytes) / len(ids), 1),
+            'cost_ratio': round(extra_seconds / baseline_seconds, 2) if baseline_seconds else None,
+        }
+        if definition is not None:
+            costs.update({'type': definition.get('type'),
+                          'string': definition.get('string', name),
+                          'store': definition.get('store', True),
+                          'relation': definition.get('relation')})
+        return costs
+
+    # ------------------------------------------------------------------
+    # Recomendación
+    # ------------------------------------------------------------------
+    def recommend(self, profile: Dict[str, Any], required: List[str] = None,
+                  max_ms_per_1k: float = 20.0, max_bytes_per_record: int = 1024,
+                  include_x2many: bool = False) -> Dict[str, Any]:
+        """
+        Propone la proyección mínima a partir de un perfil
+
+        Se descartan los campos cuyo coste o carga supera los umbrales y, salvo
+        que se pida, las relaciones x2many. Los campos requeridos se incluyen
+        siempre (con aviso si son caros).
+
+        Args:
+            profile: Resultado de profile()
+            required: Campos que el llamador necesita sí o sí
+            max_ms_per_1k: Milisegundos extra por cada 1000 registros tolerados
+            max_bytes_per_record: Bytes por registro tolerados
+            include_x2many: Mantener campos one2many/many2many
+
+        Returns:
+            Dict: fields (lista recomendada), excluded {campo: motivo},
+            warnings y estimated (ms_per_1k y bytes_per_record de la lista
+            frente a leer todos los campos)
+        """
+        required = list(required or [])
+        fields = []
+        excluded = {}
+        warnings = []
+        for item in profile['fields']:
+            name = item['name']
+            reasons = []
+            if item['ms_per_1k'] > max_ms_per_1k:
+                kind = 'calculado' if not item.get('store', True) else 'almacenado'
+                reasons.append(f"{kind}, {item['ms_per_1k']:,.1f} ms/1k registros")
+            if item['bytes_per_record'] > max_bytes_per_record:
+                reasons.append(f"{item['bytes_per_record']:,.0f} bytes/registro")
+            if item.get('type') in X2MANY_TYPES and not include_x2many:
+                reasons.append(f"relación {item['type']}")
+            if name in required:
+                fields.append(name)
+                if reasons:
+                    warnings.append(f"{name} es requerido pero caro: {'; '.join(reasons)}")
+            elif reasons:
+                excluded[name] = '; '.join(reasons)
+            else:
+                fields.append(name)
+        for name, reason in profile['skipped'].items():
+            if name in required:
+                warnings.append(f"{name} es requerido pero no se perfiló: {reason}")
+            else:
+                excluded.setdefault(name, reason)
+
+        fields.sort(key=lambda name: (name not in required, name))
+        costs = {item['name']: item for item in profile['fields']}
+        all_group = profile['groups'].get('all', {})
+        return {
+            'fields': fields,
+            'excluded': excluded,
+            'warnings': warnings,
+            'estimated': {
+                'ms_per_1k': round(sum(costs[name]['ms_per_1k'] for name in fields
+                                       if name in costs), 2),
+                'bytes_per_record': round(sum(costs[name]['bytes_per_record']
+                                              for name in fields if name in costs), 1),
+                'all_ms_per_1k': all_group.get('ms_per_1k'),
+                'all_bytes_per_record': all_group.get('bytes_per_record'),
+            },
+        }
@@ -0,0 +1,316 @@
+"""
+Control de carga del lado del cliente: límite de peticiones por segundo
+(token bucket) y concurrencia adaptativa (AIMD)
+
+Un mismo RequestGovernor se comparte entre todas las conexiones, hilos y
+pipelines de un proceso que atacan la misma instancia de Odoo, de modo que
+todos respetan un único presupuesto. La concurrencia permitida sube de uno
+en uno mientras la latencia se mantiene cerca de la de referencia y se
+reduce a la mitad ante un 429/503, un timeout o una latencia disparada
+(comparada con la de referencia del mismo modelo y método, para que mezclar
+llamadas rápidas y lentas no parezca congestión); así converge al máximo
+rendimiento que el servidor sostiene.
+
+Uso:
+    governor = RequestGovernor.shared(url, rate=20, max_concurrency=16)
+    connection = OdooConnection(url, db, user, api_key, governor=governor)
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, Deque, Hashable, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Estados HTTP que indican sobrecarga del servidor
+OVERLOAD_STATUSES = frozenset({429, 503})
+
+
+class TokenBucket:
+    """Límite de peticiones por segundo con ráfagas, seguro entre hilos"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Inicializar bucket
+
+        Args:
+            rate: Peticiones por segundo sostenidas
+            burst: Peticiones que se pueden hacer de golpe (por defecto, rate)
+        """
+        if rate <= 0:
+            raise ValueError(f"rate debe ser positivo: {rate}")
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """
+        Toma un token si hay disponible
+
+        Returns:
+            float: 0 si se tomó el token; si no, segundos hasta que haya uno
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def acquire(self) -> float:
+        """
+        Espera hasta tomar un token
+
+        Returns:
+            float: Segundos esperados
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float):
+        """No emite tokens durante los próximos segundos (ej: Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class AdaptiveConcurrency:
+    """
+    Límite de peticiones simultáneas con ajuste AIMD
+
+    Crecimiento aditivo (+increase por cada 'limit' respuestas buenas, es
+    decir, por ronda completa) y reducción multiplicativa ante congestión,
+    como mucho una vez por 'cooldown' segundos.
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 64,
+                 increase: float = 1.0, decrease: float = 0.5,
+                 latency_tolerance: float = 2.0, window: int = 100,
+                 cooldown: float = 1.0):
+        """
+        Inicializar límite
+
+        Args:
+            initial: Concurrencia inicial
+            min_limit: Concurrencia mínima
+            max_limit: Concurrencia máxima
+            increase: Incremento por ronda sin congestión
+            decrease: Factor aplicado al detectar congestión (0-1)
+            latency_tolerance: Congestión si la latencia supera la de
+                referencia (mínima reciente del mismo tipo de llamada)
+                multiplicada por este factor
+            window: Latencias recientes por tipo de llamada usadas para la referencia
+            cooldown: Segundos mínimos entre dos reducciones
+        """
+        if not 0 < min_limit <= max_limit:
+            raise ValueError(f"Límites de concurrencia no válidos: {min_limit}-{max_limit}")
+        if not 0.0 < decrease < 1.0:
+            raise ValueError(f"decrease debe estar entre 0 y 1: {decrease}")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.in_flight = 0
+        self.decreases = 0
+        self.window = window
+        # Tipo de llamada (ej: (modelo, método)) -> latencias recientes
+        self._latencies: Dict[Optional[Hashable], Deque[float]] = {}
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        """Ocupa un hueco si hay alguno libre"""
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que haya un hueco libre y lo ocupa"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < int(self.limit),
+                                            timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, seconds: Optional[float] = None, congested: bool = False,
+                key: Optional[Hashable] = None):
+        """
+        Libera el hueco y ajusta el límite
+
+        Args:
+            seconds: Latencia de la petición (None si falló sin respuesta)
+            congested: El servidor indicó sobrecarga (429/503, timeout)
+            key: Tipo de llamada (ej: (modelo, método)); la latencia solo se
+                compara con la de referencia de llamadas del mismo tipo
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if seconds is not None and not congested:
+                latencies = self._latencies.get(key)
+                if latencies is None:
+                    latencies = self._latencies[key] = deque(maxlen=self.window)
+                baseline = min(latencies) if latencies else seconds
+                latencies.append(seconds)
+                congested = (len(latencies) >= 10
+                             and seconds > baseline * self.latency_tolerance)
+            if congested:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.decreases += 1
+                    self.limit = max(float(self.min_limit), self.limit * self.decrease)
+                    logger.debug(f"Congestión: concurrencia reducida a {int(self.limit)}")
+            elif seconds is not None:
+                self.limit = min(float(self.max_limit),
+                                 self.limit + self.increase / max(self.limit, 1.0))
+            self._condition.notify_all()
+
+
+class RequestGovernor:
+    """Presupuesto común de peticiones: token bucket + concurrencia adaptativa"""
+
+    _shared: Dict[str, 'RequestGovernor'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None,
+                 initial_concurrency: int = 4, min_concurrency: int = 1,
+                 max_concurrency: int = 32, **aimd):
+        """
+        Inicializar governor
+
+        Args:
+            rate: Peticiones por segundo máximas (None sin límite de tasa)
+            burst: Ráfaga máxima del token bucket
+            initial_concurrency: Peticiones simultáneas al empezar
+            min_concurrency: Mínimo de peticiones simultáneas
+            max_concurrency: Máximo de peticiones simultáneas
+            **aimd: Opciones adicionales de AdaptiveConcurrency
+                (increase, decrease, latency_tolerance, window, cooldown)
+        """
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, min_concurrency,
+                                               max_concurrency, **aimd)
+        self.requests = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, key: str = 'default', **kwargs) -> 'RequestGovernor':
+        """
+        Governor compartido del proceso para una clave (ej: la URL de Odoo)
+
+        La primera llamada lo crea con kwargs; las siguientes devuelven el
+        mismo objeto e ignoran kwargs.
+        """
+        with cls._shared_lock:
+            governor = cls._shared.get(key)
+            if governor is None:
+                governor = cls._shared[key] = cls(**kwargs)
+            return governor
+
+    @contextmanager
+    def slot(self, key: Optional[Hashable] = None):
+        """
+        Espera turno (tasa y concurrencia) para una petición y la mide
+
+        Una excepción de sobrecarga (429/503 o timeout) dentro del bloque
+        reduce la concurrencia; si trae Retry-After, también pausa la tasa.
+
+        Args:
+            key: Tipo de llamada (ej: (modelo, método)) cuya latencia de
+                referencia se usa para detectar congestión
+        """
+        started = time.perf_counter()
+        if self.bucket is not None:
+            self.bucket.acquire()
+        self.concurrency.acquire()
+        self._count(time.perf_counter() - started)
+        sent = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self._release_error(e)
+            raise
+        self.concurrency.release(time.perf_counter() - sent, key=key)
+
+    @asynccontextmanager
+    async def async_slot(self, key: Optional[Hashable] = None):
+        """Versión de slot() para corrutinas (espera sin bloquear el event loop)"""
+        started = time.perf_counter()
+        if self.bucket is not None:
+            while True:
+                wait = self.bucket.try_acquire()
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+        delay = 0.001
+        while not self.concurrency.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.01)
+        self._count(time.perf_counter() - started)
+        sent = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self._release_error(e)
+            raise
+        self.concurrency.release(time.perf_counter() - sent, key=key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado actual del governor"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'wait_seconds': self.wait_seconds,
+                'concurrency_limit': int(self.concurrency.limit),
+                'in_flight': self.concurrency.in_flight,
+                'decreases': self.concurrency.decreases,
+                'rate': self.bucket.rate if self.bucket is not None else None,
+            }
+
+    def _count(self, waited: float):
+        with self._lock:
+            self.requests += 1
+            if waited > 0.001:
+                self.throttled += 1
+                self.wait_seconds += waited
+
+    def _release_error(self, error: BaseException):
+        """Libera el hueco de una petición fallida, indicando si fue sobrecarga"""
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        overloaded = (status in OVERLOAD_STATUSES
+                      or isinstance(error, requests.Timeout))
+        if overloaded and self.bucket is not None and response is not None:
+            retry_after = response.headers.get('Retry-After')
+            try:
+                if retry_after is not None:
+                    self.bucket.pause(float(retry_after))
+            except ValueError:
+                pass
+        self.concurrency.release(None, congested=overloaded)
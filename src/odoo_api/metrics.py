@@ -0,0 +1,327 @@
+"""
+Métricas de llamadas JSON-RPC: latencia, bytes, errores, reintentos y duplicados
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+# Límites superiores de los buckets del histograma de latencia (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Series:
+    """Acumuladores de una combinación (modelo, método)"""
+
+    __slots__ = ('buckets', 'count', 'seconds', 'max_seconds', 'request_bytes',
+                 'response_bytes', 'errors', 'retries', 'hedges', 'in_flight')
+
+    def __init__(self, size: int):
+        self.buckets = [0] * (size + 1)  # el último es +Inf
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.in_flight = 0
+
+
+class RpcCall:
+    """Datos de una llamada en curso (los completa quien la ejecuta)"""
+
+    __slots__ = ('request_bytes', 'response_bytes', 'error')
+
+    def __init__(self):
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.error = False
+
+
+class RpcMetrics:
+    """Registro de métricas por modelo y método, seguro entre hilos"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Inicializar registro
+
+        Args:
+            buckets: Límites del histograma de latencia en segundos
+        """
+        self.bucket_bounds = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._queue_waits: Dict[str, _Series] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _get(self, model: str, method: str) -> _Series:
+        key = (model, method)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series.setdefault(key, _Series(len(self.bucket_bounds)))
+        return series
+
+    # ------------------------------------------------------------------
+    # Registro
+    # ------------------------------------------------------------------
+    @contextmanager
+    def track(self, model: str, method: str):
+        """
+        Mide una llamada: latencia, en curso y error si se lanza una excepción
+
+        Uso:
+            with metrics.track('res.partner', 'search_read') as call:
+                call.request_bytes = len(body)
+                ...
+        """
+        call = RpcCall()
+        with self._lock:
+            self._get(model, method).in_flight += 1
+        started = time.perf_counter()
+        try:
+            yield call
+        except BaseException:
+            call.error = True
+            raise
+        finally:
+            self.observe(model, method, time.perf_counter() - started,
+                         call.request_bytes, call.response_bytes, call.error,
+                         finished=True)
+
+    def observe(self, model: str, method: str, seconds: float, request_bytes: int = 0,
+                response_bytes: int = 0, error: bool = False, finished: bool = False):
+        """
+        Registra una llamada ya completada
+
+        Args:
+            model: Modelo (o servicio, ej: 'common')
+            method: Método
+            seconds: Duración
+            request_bytes: Bytes enviados
+            response_bytes: Bytes recibidos
+            error: Si la llamada falló
+            finished: Descontar la llamada de las que están en curso
+        """
+        index = bisect.bisect_left(self.bucket_bounds, seconds)
+        with self._lock:
+            series = self._get(model, method)
+            if finished:
+                series.in_flight -= 1
+            series.buckets[index] += 1
+            series.count += 1
+            series.seconds += seconds
+            series.max_seconds = max(series.max_seconds, seconds)
+            series.request_bytes += request_bytes
+            series.response_bytes += response_bytes
+            if error:
+                series.errors += 1
+
+    def record_retry(self, model: str, method: str):
+        """Cuenta un reintento de la llamada"""
+        with self._lock:
+            self._get(model, method).retries += 1
+
+    def record_hedge(self, model: str, method: str):
+        """Cuenta una petición duplicada (hedging) de la llamada"""
+        with self._lock:
+            self._get(model, method).hedges += 1
+
+    def observe_queue_wait(self, priority: str, seconds: float):
+        """
+        Registra la espera en cola de una llamada antes de enviarse
+
+        Args:
+            priority: Clase de prioridad (ej: 'interactive', 'bulk')
+            seconds: Tiempo en cola
+        """
+        index = bisect.bisect_left(self.bucket_bounds, seconds)
+        with self._lock:
+            series = self._queue_waits.get(priority)
+            if series is None:
+                series = self._queue_waits[priority] = _Series(len(self.bucket_bounds))
+            series.buckets[index] += 1
+            series.count += 1
+            series.seconds += seconds
+            series.max_seconds = max(series.max_seconds, seconds)
+
+    def reset(self):
+        """Borra todas las métricas acumuladas"""
+        with self._lock:
+            self._series.clear()
+            self._queue_waits.clear()
+            self.started_at = time.time()
+
+    # ------------------------------------------------------------------
+    # Exportación
+    # ------------------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Resumen de las métricas en un dict serializable a JSON
+
+        Returns:
+            Dict: 'series' (una entrada por modelo/método, con percentiles
+            estimados del histograma), 'queue_wait' (espera en cola por
+            prioridad) y marcas de tiempo
+        """
+        with self._lock:
+            items = [(key, self._copy(series)) for key, series in self._series.items()]
+            waits = [(key, self._copy(series)) for key, series in self._queue_waits.items()]
+
+        series_list = []
+        for (model, method), series in sorted(items):
+            series_list.append({
+                'model': model,
+                'method': method,
+                'count': series.count,
+                'errors': series.errors,
+                'retries': series.retries,
+                'hedges': series.hedges,
+                'in_flight': series.in_flight,
+                'request_bytes': series.request_bytes,
+                'response_bytes': series.response_bytes,
+                'seconds_total': series.seconds,
+                'seconds_avg': series.seconds / series.count if series.count else 0.0,
+                'seconds_max': series.max_seconds,
+                'p50': self._quantile(series, 0.50),
+                'p95': self._quantile(series, 0.95),
+                'p99': self._quantile(series, 0.99),
+            })
+        queue_wait = [{
+            'priority': priority,
+            'count': series.count,
+            'seconds_total': series.seconds,
+            'seconds_avg': series.seconds / series.count if series.count else 0.0,
+            'seconds_max': series.max_seconds,
+            'p50': self._quantile(series, 0.50),
+            'p95': self._quantile(series, 0.95),
+            'p99': self._quantile(series, 0.99),
+        } for priority, series in sorted(waits)]
+        return {'started_at': self.started_at, 'generated_at': time.time(),
+                'series': series_list, 'queue_wait': queue_wait}
+
+    def top(self, limit: int = 10, by: str = 'seconds_total') -> List[Dict[str, Any]]:
+        """
+        Llamadas que más pesan según un criterio
+
+        Args:
+            limit: Número de entradas
+            by: Campo del resumen ('seconds_total', 'p95', 'response_bytes', ...)
+        """
+        series = self.snapshot()['series']
+        return sorted(series, key=lambda item: item[by], reverse=True)[:limit]
+
+    def to_prometheus(self, prefix: str = 'odoo_rpc') -> str:
+        """
+        Métricas en formato de texto de Prometheus
+
+        Args:
+            prefix: Prefijo de los nombres de métrica
+
+        Returns:
+            str: Texto listo para el textfile collector de node_exporter
+        """
+        with self._lock:
+            items = sorted((key, self._copy(series)) for key, series in self._series.items())
+            waits = sorted((key, self._copy(series))
+                           for key, series in self._queue_waits.items())
+
+        lines = [f"# HELP {prefix}_duration_seconds Latencia de las llamadas JSON-RPC",
+                 f"# TYPE {prefix}_duration_seconds histogram"]
+        for (model, method), series in items:
+            labels = f'model="{_escape(model)}",method="{_escape(method)}"'
+            lines.extend(self._histogram_lines(f"{prefix}_duration_seconds", labels, series))
+
+        if waits:
+            lines.append(f"# HELP {prefix}_queue_wait_seconds Espera en cola antes de enviar")
+            lines.append(f"# TYPE {prefix}_queue_wait_seconds histogram")
+            for priority, series in waits:
+                lines.extend(self._histogram_lines(f"{prefix}_queue_wait_seconds",
+                                                   f'priority="{_escape(priority)}"', series))
+
+        for name, kind, help_text, attribute in (
+            ('request_bytes_total', 'counter', 'Bytes enviados', 'request_bytes'),
+            ('response_bytes_total', 'counter', 'Bytes recibidos', 'response_bytes'),
+            ('errors_total', 'counter', 'Llamadas con error', 'errors'),
+            ('retries_total', 'counter', 'Reintentos', 'retries'),
+            ('hedges_total', 'counter', 'Peticiones duplicadas', 'hedges'),
+            ('in_flight', 'gauge', 'Llamadas en curso', 'in_flight'),
+        ):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for (model, method), series in items:
+                lines.append(f'{prefix}_{name}{{model="{_escape(model)}",'
+                             f'method="{_escape(method)}"}} {getattr(series, attribute)}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str, prefix: str = 'odoo_rpc'):
+        """Escribe el archivo de Prometheus de forma atómica"""
+        _write_atomic(Path(path), self.to_prometheus(prefix))
+
+    def write_json(self, path: str):
+        """Escribe el resumen JSON de forma atómica"""
+        _write_atomic(Path(path), json.dumps(self.snapshot(), indent=2))
+
+    # ------------------------------------------------------------------
+    # Utilidades
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _copy(series: _Series) -> _Series:
+        copy = _Series(len(series.buckets) - 1)
+        for attribute in _Series.__slots__:
+            value = getattr(series, attribute)
+            setattr(copy, attribute, list(value) if attribute == 'buckets' else value)
+        return copy
+
+    def _histogram_lines(self, name: str, labels: str, series: _Series) -> List[str]:
+        """Líneas bucket/sum/count de Prometheus para una serie"""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bucket_bounds + (float('inf'),), series.buckets):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {series.seconds!r}")
+        lines.append(f"{name}_count{{{labels}}} {series.count}")
+        return lines
+
+    def _quantile(self, series: _Series, q: float) -> float:
+        """Percentil estimado por interpolación lineal dentro del bucket"""
+        if not series.count:
+            return 0.0
+        target = q * series.count
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.bucket_bounds, series.buckets):
+            if count and cumulative + count >= target:
+                estimate = lower + (bound - lower) * (target - cumulative) / count
+                return min(estimate, series.max_seconds)
+            cumulative += count
+            lower = bound
+        # Por encima del último límite: el máximo observado es la mejor estimación
+        return series.max_seconds
+
+
+def rpc_labels(service: str, method: str, args: List) -> Tuple[str, str]:
+    """Modelo y método de una llamada JSON-RPC (los de execute_kw si aplica)"""
+    if service == 'object' and method == 'execute_kw' and len(args) >= 5:
+        return str(args[3]), str(args[4])
+    return service, method
+
+
+def _escape(value: str) -> str:
+    """Escapa un valor de etiqueta de Prometheus"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
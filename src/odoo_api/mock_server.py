@@ -0,0 +1,740 @@
+"""
+Servidor JSON-RPC local que simula Odoo para pruebas y benchmarks offline
+
+Implementa common.authenticate/version y object.execute_kw (search,
+search_count, read, search_read, create, write, unlink, load, read_group y
+fields_get) sobre datos sintéticos en memoria, con latencia, jitter y tamaño
+de payload configurables.
+
+Uso:
+    with MockOdooServer(datasets={'res.partner': 10_000}, latency=0.02) as server:
+        connection = OdooConnection(server.url, server.db, 'admin', server.api_key)
+        connection.search_read('res.partner', [['is_company', '=', True]], ['name'])
+"""
+import base64
+import fnmatch
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Campos de cada modelo simulado: tipo o (tipo, modelo relacionado)
+MODEL_SCHEMAS = {
+    'res.partner': {
+        'name': 'char', 'email': 'char', 'is_company': 'boolean', 'active': 'boolean',
+        'country_id': ('many2one', 'res.country'), 'credit_limit': 'float',
+        'comment': 'text', 'write_date': 'datetime',
+    },
+    'product.product': {
+        'name': 'char', 'default_code': 'char', 'active': 'boolean',
+        'categ_id': ('many2one', 'product.category'), 'list_price': 'float',
+        'description': 'text', 'write_date': 'datetime',
+    },
+    'sale.order': {
+        'name': 'char', 'partner_id': ('many2one', 'res.partner'), 'state': 'selection',
+        'amount_total': 'float', 'date_order': 'datetime', 'note': 'text',
+        'write_date': 'datetime',
+    },
+    'ir.attachment': {
+        'name': 'char', 'res_model': 'char', 'res_id': 'integer', 'type': 'selection',
+        'mimetype': 'char', 'file_size': 'integer', 'checksum': 'char',
+        'datas': 'binary', 'write_date': 'datetime',
+    },
+    # Modelo vacío para medir creaciones e importaciones
+    'x.benchmark.record': {
+        'name': 'char', 'value': 'float', 'note': 'text', 'write_date': 'datetime',
+    },
+}
+
+# Campos calculados no almacenados: (tipo, segundos de cálculo por registro)
+COMPUTED_FIELDS = {
+    'res.partner': {'total_invoiced': ('monetary', 0.0002)},
+    'product.product': {'qty_available': ('float', 0.0003),
+                        'virtual_available': ('float', 0.0004)},
+}
+
+# Registros generados por modelo si no se indica otra cosa
+DEFAULT_DATASETS = {
+    'res.partner': 5_000,
+    'product.product': 2_000,
+    'sale.order': 5_000,
+    'ir.attachment': 20,
+    'x.benchmark.record': 0,
+}
+
+# Tamaño por defecto de los campos text y binary generados (bytes)
+DEFAULT_PAYLOAD_SIZE = 256
+
+_STATES = ('draft', 'sent', 'sale', 'done', 'cancel')
+_COUNTRIES = [(i, name) for i, name in enumerate(
+    ('España', 'México', 'Argentina', 'Colombia', 'Chile', 'Perú'), start=1)]
+_DATE_GRANULARITY = ('day', 'week', 'month', 'quarter', 'year')
+_EPOCH = datetime(2024, 1, 1)
+
+
+class MockOdooError(Exception):
+    """Error devuelto al cliente en el formato de error de Odoo"""
+
+
+class MockOdooServer:
+    """Servidor HTTP en segundo plano que responde como el endpoint /jsonrpc"""
+
+    def __init__(self, datasets: Optional[Dict[str, int]] = None,
+                 latency: float = 0.0, jitter: float = 0.0,
+                 payload_size: int = DEFAULT_PAYLOAD_SIZE,
+                 binary_size: Optional[int] = None, seed: int = 0,
+                 host: str = '127.0.0.1', port: int = 0, db: str = 'mock',
+                 api_key: Optional[str] = 'mock-api-key', uid: int = 2,
+                 error_rate: float = 0.0, slow_rate: float = 0.0,
+                 slow_latency: float = 1.0, capacity: Optional[int] = None,
+                 computed_fields: bool = False):
+        """
+        Inicializar servidor
+
+        Args:
+            datasets: {modelo: registros a generar} (por defecto DEFAULT_DATASETS)
+            latency: Latencia añadida a cada llamada en segundos
+            jitter: Variación aleatoria de la latencia (± segundos)
+            payload_size: Bytes de los campos text generados
+            binary_size: Bytes de cada binario generado (por defecto, payload_size)
+            seed: Semilla de los datos y de la latencia (resultados reproducibles)
+            host: Interfaz de escucha
+            port: Puerto (0 elige uno libre)
+            db: Nombre de la base de datos simulada
+            api_key: Clave aceptada (None acepta cualquiera)
+            uid: UID devuelto al autenticar
+            error_rate: Fracción de peticiones respondidas con HTTP 503
+            slow_rate: Fracción de llamadas con latencia de cola (slow_latency)
+            slow_latency: Latencia de las llamadas lentas en segundos
+            capacity: Peticiones simultáneas atendidas; las que excedan se
+                responden con HTTP 429 (None sin límite)
+            computed_fields: Añadir los campos calculados no almacenados de
+                COMPUTED_FIELDS, con su coste por registro
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.capacity = capacity
+        self.computed_fields = computed_fields
+        self.active = 0
+        self.payload_size = payload_size
+        self.binary_size = payload_size if binary_size is None else binary_size
+        self.db = db
+        self.api_key = api_key
+        self.uid = uid
+        self.calls: Counter = Counter()
+        self.records: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._next_id: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._random = random.Random(seed)
+
+        data_random = random.Random(seed)
+        for model, count in {**DEFAULT_DATASETS, **(datasets or {})}.items():
+            if model not in MODEL_SCHEMAS:
+                raise ValueError(f"Modelo no simulado: {model}")
+            self.records[model] = {}
+            self._next_id[model] = 1
+            for _ in range(count):
+                self._insert(model, self._generate(model, data_random))
+
+        self._httpd = ThreadingHTTPServer((host, port), _handler_class(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL base para OdooConnection"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockOdooServer':
+        """Arranca el servidor en un hilo en segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                            name='mock-odoo', daemon=True)
+            self._thread.start()
+            logger.info(f"Servidor Odoo simulado en {self.url}")
+        return self
+
+    def stop(self):
+        """Detiene el servidor"""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def admit(self) -> Optional[int]:
+        """
+        Admite una petición o decide el error HTTP simulado que recibe
+
+        Returns:
+            Optional[int]: None si se atiende (llamar luego a release()),
+            o el estado HTTP con el que se rechaza (429 o 503)
+        """
+        with self._lock:
+            if self.capacity is not None and self.active >= self.capacity:
+                self.calls[('http', '429')] += 1
+                return 429
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.calls[('http', '503')] += 1
+                return 503
+            self.active += 1
+            return None
+
+    def release(self):
+        """Marca como terminada una petición admitida"""
+        with self._lock:
+            self.active -= 1
+
+    def reset_stats(self):
+        """Pone a cero el contador de llamadas"""
+        with self._lock:
+            self.calls.clear()
+
+    # ------------------------------------------------------------------
+    # Despacho JSON-RPC
+    # ------------------------------------------------------------------
+    def dispatch(self, service: str, method: str, args: List) -> Any:
+        """
+        Ejecuta una llamada JSON-RPC ya decodificada
+
+        Returns:
+            Any: Valor del campo 'result' de la respuesta
+        """
+        delay = self.latency
+        if self.jitter or self.slow_rate:
+            with self._lock:
+                delay += self._random.uniform(-self.jitter, self.jitter)
+                if self._random.random() < self.slow_rate:
+                    delay = self.slow_latency
+        if delay > 0:
+            time.sleep(delay)
+
+        if service == 'common':
+            with self._lock:
+                self.calls[('common', method)] += 1
+            if method == 'authenticate':
+                db, _login, key = args[:3]
+                valid = db == self.db and (self.api_key is None or key == self.api_key)
+                return self.uid if valid else False
+            if method == 'version':
+                return {'server_version': '17.0', 'server_serie': '17.0',
+                        'protocol_version': 1}
+        elif service == 'object' and method == 'execute_kw':
+            db, uid, key, model, name = args[:5]
+            call_args = args[5] if len(args) > 5 else []
+            kwargs = args[6] if len(args) > 6 else {}
+            if db != self.db or uid != self.uid or (self.api_key is not None
+                                                     and key != self.api_key):
+                raise MockOdooError("Access Denied")
+            if model not in self.records:
+                raise MockOdooError(f"Object {model} doesn't exist")
+            handler = getattr(self, f"_rpc_{name}", None)
+            if handler is None:
+                raise MockOdooError(f"The method '{name}' does not exist on the model '{model}'")
+            with self._lock:
+                self.calls[(model, name)] += 1
+            return handler(model, *call_args, **(kwargs or {}))
+        raise MockOdooError(f"Servicio no soportado: {service}.{method}")
+
+    # ------------------------------------------------------------------
+    # Métodos de execute_kw
+    # ------------------------------------------------------------------
+    def _rpc_search(self, model: str, domain: List = None, offset: int = 0,
+                    limit: Optional[int] = None, order: Optional[str] = None,
+                    count: bool = False, context: Dict = None) -> Any:
+        records = self._search(model, domain, offset, limit, order)
+        return len(records) if count else [record['id'] for record in records]
+
+    def _rpc_search_count(self, model: str, domain: List = None,
+                          context: Dict = None, **_) -> int:
+        return len(self._search(model, domain))
+
+    def _rpc_read(self, model: str, ids: List[int], fields: List[str] = None,
+                  context: Dict = None, **_) -> List[Dict]:
+        ids = [ids] if isinstance(ids, int) else ids
+        with self._lock:
+            table = self.records[model]
+            result = [self._project(model, table[record_id], fields)
+                      for record_id in ids if record_id in table]
+        time.sleep(self._compute_delay(model, fields, len(result)))
+        return result
+
+    def _rpc_search_read(self, model: str, domain: List = None, fields: List[str] = None,
+                         offset: int = 0, limit: Optional[int] = None,
+                         order: Optional[str] = None, context: Dict = None) -> List[Dict]:
+        result = [self._project(model, record, fields)
+                  for record in self._search(model, domain, offset, limit, order)]
+        time.sleep(self._compute_delay(model, fields, len(result)))
+        return result
+
+    def _rpc_create(self, model: str, values, context: Dict = None) -> Any:
+        many = isinstance(values, list)
+        created = [self._insert(model, self._normalize(model, vals))
+                   for vals in (values if many else [values])]
+        return created if many else created[0]
+
+    def _rpc_write(self, model: str, ids: List[int], values: Dict,
+                   context: Dict = None) -> bool:
+        values = self._normalize(model, values)
+        with self._lock:
+            for record_id in ids:
+                if record_id not in self.records[model]:
+                    raise MockOdooError(f"Record does not exist: {model}({record_id})")
+                self.records[model][record_id].update(values)
+        return True
+
+    def _rpc_unlink(self, model: str, ids: List[int], context: Dict = None) -> bool:
+        with self._lock:
+            for record_id in ids:
+                self.records[model].pop(record_id, None)
+        return True
+
+    def _rpc_load(self, model: str, fields: List[str], data: List[List],
+                  context: Dict = None) -> Dict[str, Any]:
+        ids, messages = [], []
+        for row_number, row in enumerate(data):
+            values = {field: value for field, value in zip(fields, row)
+                      if field not in ('id', '.id')}
+            try:
+                ids.append(self._insert(model, self._normalize(model, values)))
+            except MockOdooError as e:
+                messages.append({'type': 'error', 'message': str(e),
+                                 'rows': {'from': row_number, 'to': row_number}})
+        return {'ids': False if messages else ids, 'messages': messages}
+
+    def _rpc_fields_get(self, model: str, allfields: List[str] = None,
+                        attributes: List[str] = None, context: Dict = None) -> Dict:
+        result = {'id': {'type': 'integer', 'string': 'ID', 'store': True}}
+        for field, spec in MODEL_SCHEMAS[model].items():
+            field_type, relation = spec if isinstance(spec, tuple) else (spec, None)
+            definition = {'type': field_type, 'string': field.replace('_', ' ').title(),
+                          'store': True}
+            if relation:
+                definition['relation'] = relation
+            result[field] = definition
+        for field, (field_type, _cost) in self._computed(model).items():
+            result[field] = {'type': field_type, 'string': field.replace('_', ' ').title(),
+                             'store': False, 'readonly': True}
+        if allfields:
+            result = {name: value for name, value in result.items() if name in allfields}
+        if attributes:
+            result = {name: {key: value for key, value in definition.items()
+                             if key in attributes}
+                      for name, definition in result.items()}
+        return result
+
+    def _rpc_read_group(self, model: str, domain: List, fields: List[str],
+                        groupby, offset: int = 0, limit: Optional[int] = None,
+                        orderby: Optional[str] = None, lazy: bool = True,
+                        context: Dict = None) -> List[Dict]:
+        groupby = [groupby] if isinstance(groupby, str) else list(groupby)
+        if not groupby:
+            raise MockOdooError("read_group requiere al menos un groupby")
+        active = groupby[:1] if lazy else groupby
+        aggregates = self._aggregates(model, fields, active)
+        records = self._search(model, domain)
+
+        groups: Dict[Tuple, List[Dict]] = {}
+        for record in records:
+            key = tuple(self._group_value(model, record, spec) for spec in active)
+            groups.setdefault(key, []).append(record)
+
+        result = []
+        for key, members in groups.items():
+            group = {}
+            group_domain = list(domain or [])
+            for spec, value in zip(active, key):
+                group[spec] = list(value) if isinstance(value, tuple) else value
+                field = spec.split(':')[0]
+                if ':' not in spec:
+                    comparable = value[0] if isinstance(value, tuple) else value
+                    group_domain.append([field, '=', comparable])
+            count_key = f"{active[0].split(':')[0]}_count" if lazy else '__count'
+            group[count_key] = len(members)
+            for name, (field, function) in aggregates.items():
+                values = [member[field] for member in members
+                          if member.get(field) not in (None, False)]
+                group[name] = _aggregate(function, values)
+            group['__domain'] = group_domain
+            if lazy and len(groupby) > 1:
+                group['__context'] = {'group_by': groupby[1:]}
+            result.append(group)
+
+        order = orderby or ', '.join(active)
+        result = _sort(result, order, key_of=lambda group, field: _sort_value(
+            group.get(field, group.get(f"{field}_count"))))
+        return result[offset:offset + limit if limit else None]
+
+    # ------------------------------------------------------------------
+    # Búsqueda y proyección
+    # ------------------------------------------------------------------
+    def _search(self, model: str, domain: List = None, offset: int = 0,
+                limit: Optional[int] = None, order: Optional[str] = None) -> List[Dict]:
+        domain = list(domain or [])
+        schema = MODEL_SCHEMAS[model]
+        if 'active' in schema and not any(
+                isinstance(term, (list, tuple)) and term[0] == 'active' for term in domain):
+            domain.append(['active', '=', True])
+        with self._lock:
+            records = list(self.records[model].values())
+        matched = [record for record in records if _evaluate(domain, record)]
+        matched = _sort(matched, order or 'id', key_of=lambda record, field: _sort_value(
+            record.get(field)))
+        return matched[offset:offset + limit if limit else None]
+
+    def _computed(self, model: str) -> Dict[str, Tuple[str, float]]:
+        """Campos calculados simulados del modelo (vacío si están desactivados)"""
+        return COMPUTED_FIELDS.get(model, {}) if self.computed_fields else {}
+
+    def _project(self, model: str, record: Dict, fields: Optional[List[str]]) -> Dict:
+        computed = self._computed(model)
+        if not fields:
+            result = dict(record)
+            fields = list(computed)
+        else:
+            unknown = [field for field in fields if field != 'id'
+                       and field not in MODEL_SCHEMAS[model] and field not in computed]
+            if unknown:
+                raise MockOdooError(f"Invalid field {unknown[0]!r} on model {model!r}")
+            result = {'id': record['id']}
+        for field in fields:
+            if field in computed:
+                # Valor determinista a partir del id (el coste se simula aparte)
+                result[field] = round((record['id'] * 7919 % 100_000) / 100, 2)
+            else:
+                result[field] = record.get(field, False)
+        return result
+
+    def _compute_delay(self, model: str, fields: Optional[List[str]], records: int) -> float:
+        """Segundos que tardaría Odoo en calcular los campos no almacenados"""
+        computed = self._computed(model)
+        names = computed if not fields else [field for field in fields if field in computed]
+        return records * sum(computed[name][1] for name in names)
+
+    def _aggregates(self, model: str, fields: List[str],
+                    groupby: List[str]) -> Dict[str, Tuple[str, str]]:
+        """{nombre en el resultado: (campo, función)} a partir de la spec de Odoo"""
+        schema = MODEL_SCHEMAS[model]
+        grouped = {spec.split(':')[0] for spec in groupby}
+        aggregates = {}
+        for spec in fields or []:
+            name, _, function = spec.partition(':')
+            if '(' in function:
+                # 'total:sum(amount_total)'
+                function, field = function.rstrip(')').split('(')
+            else:
+                field = name
+            if field in grouped or field == '__count':
+                continue
+            if field not in schema:
+                raise MockOdooError(f"Invalid field {field!r} on model {model!r}")
+            if not function:
+                if schema[field] not in ('integer', 'float'):
+                    continue
+                function = 'sum'
+            aggregates[name] = (field, function)
+        return aggregates
+
+    def _group_value(self, model: str, record: Dict, spec: str) -> Any:
+        field, _, granularity = spec.partition(':')
+        if field not in MODEL_SCHEMAS[model]:
+            raise MockOdooError(f"Invalid groupby {spec!r} on model {model!r}")
+        value = record.get(field, False)
+        if isinstance(value, list):
+            # many2one: tupla para poder usarlo como clave del grupo
+            return tuple(value)
+        if granularity and value:
+            if granularity not in _DATE_GRANULARITY:
+                raise MockOdooError(f"Granularidad no soportada: {granularity}")
+            return _truncate_date(value, granularity)
+        return value
+
+    # ------------------------------------------------------------------
+    # Datos
+    # ------------------------------------------------------------------
+    def _insert(self, model: str, values: Dict[str, Any]) -> int:
+        with self._lock:
+            record_id = self._next_id[model]
+            self._next_id[model] += 1
+            record = {'id': record_id}
+            for field, spec in MODEL_SCHEMAS[model].items():
+                record[field] = True if field == 'active' else False
+            record.update(values)
+            record['write_date'] = values.get('write_date') or _now()
+            self.records[model][record_id] = record
+        return record_id
+
+    def _normalize(self, model: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Valida los campos y convierte los many2one al formato [id, nombre]"""
+        schema = MODEL_SCHEMAS[model]
+        normalized = {}
+        for field, value in values.items():
+            if field not in schema:
+                raise MockOdooError(f"Invalid field {field!r} on model {model!r}")
+            spec = schema[field]
+            if isinstance(spec, tuple) and isinstance(value, int) and value:
+                value = [value, self._display_name(spec[1], value)]
+            normalized[field] = value
+        return normalized
+
+    def _display_name(self, model: str, record_id: int) -> str:
+        record = self.records.get(model, {}).get(record_id)
+        if record:
+            return record.get('name') or f"{model},{record_id}"
+        if model == 'res.country' and 0 < record_id <= len(_COUNTRIES):
+            return _COUNTRIES[record_id - 1][1]
+        return f"{model},{record_id}"
+
+    def _generate(self, model: str, rng: random.Random) -> Dict[str, Any]:
+        """Valores sintéticos de un registro nuevo"""
+        number = self._next_id[model]
+        size = self.payload_size
+        written = _EPOCH + timedelta(minutes=number * 7 + rng.randrange(60))
+        if model == 'res.partner':
+            return {
+                'name': f"Contacto {number:06d}",
+                'email': f"contacto{number}@example.com",
+                'is_company': rng.random() < 0.3,
+                'active': rng.random() < 0.95,
+                'country_id': list(rng.choice(_COUNTRIES)),
+                'credit_limit': round(rng.uniform(0, 50_000), 2),
+                'comment': _text(rng, size),
+                'write_date': _format_datetime(written),
+            }
+        if model == 'product.product':
+            category = rng.randrange(1, 20)
+            return {
+                'name': f"Producto {number:06d}",
+                'default_code': f"P{number:06d}",
+                'active': rng.random() < 0.9,
+                'categ_id': [category, f"Categoría {category}"],
+                'list_price': round(rng.uniform(1, 2_000), 2),
+                'description': _text(rng, size),
+                'write_date': _format_datetime(written),
+            }
+        if model == 'sale.order':
+            partners = self.records.get('res.partner') or {}
+            partner_id = rng.randrange(1, len(partners) + 1) if partners else False
+            return {
+                'name': f"S{number:05d}",
+                'partner_id': ([partner_id, partners[partner_id]['name']]
+                               if partner_id else False),
+                'state': rng.choice(_STATES),
+                'amount_total': round(rng.uniform(10, 10_000), 2),
+                'date_order': _format_datetime(_EPOCH + timedelta(hours=number * 3)),
+                'note': _text(rng, size),
+                'write_date': _format_datetime(written),
+            }
+        if model == 'ir.attachment':
+            content = rng.randbytes(self.binary_size)
+            return {
+                'name': f"adjunto_{number:05d}.bin",
+                'res_model': 'res.partner',
+                'res_id': rng.randrange(1, 1000),
+                'type': 'binary',
+                'mimetype': 'application/octet-stream',
+                'file_size': len(content),
+                'checksum': hashlib.sha1(content).hexdigest(),
+                'datas': base64.b64encode(content).decode(),
+                'write_date': _format_datetime(written),
+            }
+        return {'name': f"Registro {number}", 'value': rng.random(),
+                'note': _text(rng, size), 'write_date': _format_datetime(written)}
+
+
+def _handler_class(server: MockOdooServer):
+    """Clase de handler HTTP ligada a una instancia del servidor"""
+
+    class _Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 para reutilizar conexiones como con un servidor real
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            request_id = None
+            status = server.admit()
+            if status is not None:
+                self.rfile.read(length)
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            try:
+                body = json.loads(self.rfile.read(length))
+                request_id = body.get('id')
+                params = body.get('params') or {}
+                result = server.dispatch(params.get('service'), params.get('method'),
+                                         params.get('args') or [])
+                response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+            except Exception as e:
+                response = {'jsonrpc': '2.0', 'id': request_id, 'error': {
+                    'code': 200, 'message': 'Odoo Server Error',
+                    'data': {'name': type(e).__name__, 'message': str(e)},
+                }}
+            finally:
+                server.release()
+            payload = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            try:
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                # El cliente dejó de esperar (timeout o petición duplicada)
+                logger.debug("Cliente desconectado antes de la respuesta")
+
+    return _Handler
+
+
+# ----------------------------------------------------------------------
+# Evaluación de dominios
+# ----------------------------------------------------------------------
+def _evaluate(domain: List, record: Dict) -> bool:
+    """Evalúa un dominio en notación prefija ('&', '|', '!') sobre un registro"""
+    stack = []
+    for term in reversed(domain):
+        if term == '!':
+            stack.append(not stack.pop())
+        elif term in ('&', '|'):
+            first, second = stack.pop(), stack.pop()
+            stack.append(first and second if term == '&' else first or second)
+        else:
+            stack.append(_leaf(record, term))
+    return all(stack)
+
+
+def _leaf(record: Dict, term) -> bool:
+    field, operator, expected = term
+    if field not in record:
+        raise MockOdooError(f"Invalid field {field!r} in leaf {term!r}")
+    value = record[field]
+    if isinstance(value, list):
+        # many2one: se compara por ID
+        value = value[0]
+    if operator in ('=', '!='):
+        equal = (not value) if expected is False else value == expected
+        return equal if operator == '=' else not equal
+    if operator in ('in', 'not in'):
+        contained = value in expected or (not value and False in expected)
+        return contained if operator == 'in' else not contained
+    if operator in ('like', 'ilike', 'not like', 'not ilike', '=like', '=ilike'):
+        text, pattern = str(value or ''), str(expected)
+        if 'ilike' in operator:
+            text, pattern = text.lower(), pattern.lower()
+        if operator.startswith('='):
+            found = _like(text, pattern)
+        else:
+            found = pattern in text
+        return not found if operator.startswith('not') else found
+    if value is False or value is None:
+        return False
+    if operator == '<':
+        return value < expected
+    if operator == '<=':
+        return value <= expected
+    if operator == '>':
+        return value > expected
+    if operator == '>=':
+        return value >= expected
+    raise MockOdooError(f"Operador no soportado: {operator}")
+
+
+def _like(text: str, pattern: str) -> bool:
+    """Coincidencia con comodines SQL (% y _)"""
+    return fnmatch.fnmatchcase(text, pattern.replace('%', '*').replace('_', '?'))
+
+
+def _sort(items: List[Dict], order: str, key_of) -> List[Dict]:
+    """Ordena por una cláusula 'campo [asc|desc], ...' (ordenaciones estables)"""
+    result = list(items)
+    for clause in reversed([part.strip() for part in order.split(',') if part.strip()]):
+        parts = clause.split()
+        field = parts[0]
+        descending = len(parts) > 1 and parts[1].lower() == 'desc'
+        result.sort(key=lambda item: key_of(item, field), reverse=descending)
+    return result
+
+
+def _sort_value(value: Any) -> Tuple:
+    """Clave de orden: vacíos primero y many2one por nombre"""
+    if isinstance(value, list):
+        value = value[1] if len(value) > 1 else value[0]
+    if value is False or value is None:
+        return (0, '')
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+def _aggregate(function: str, values: List) -> Any:
+    if function == 'count':
+        return len(values)
+    if function == 'count_distinct':
+        return len(set(map(str, values)))
+    if not values:
+        return False
+    if function == 'sum':
+        return sum(values)
+    if function == 'avg':
+        return sum(values) / len(values)
+    if function == 'min':
+        return min(values)
+    if function == 'max':
+        return max(values)
+    if function in ('bool_and', 'bool_or'):
+        return all(values) if function == 'bool_and' else any(values)
+    raise MockOdooError(f"Agregación no soportada: {function}")
+
+
+def _truncate_date(value: str, granularity: str) -> str:
+    """Etiqueta del grupo de fecha, como las devuelve read_group"""
+    moment = datetime.strptime(value[:10], '%Y-%m-%d')
+    if granularity == 'day':
+        return moment.strftime('%d %b %Y')
+    if granularity == 'week':
+        return f"W{moment.isocalendar()[1]:02d} {moment.isocalendar()[0]}"
+    if granularity == 'month':
+        return moment.strftime('%B %Y')
+    if granularity == 'quarter':
+        return f"Q{(moment.month - 1) // 3 + 1} {moment.year}"
+    return str(moment.year)
+
+
+def _text(rng: random.Random, size: int) -> str:
+    words = ('lorem', 'ipsum', 'dolor', 'sit', 'amet', 'odoo', 'factura', 'pedido')
+    parts, length = [], 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    return ' '.join(parts)[:size]
+
+
+def _format_datetime(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _now() -> str:
+    return _format_datetime(datetime.now(timezone.utc))
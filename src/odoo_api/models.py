@@ -1,8 +1,17 @@
 """
 Módulo para trabajar con modelos de Odoo
 """
+import contextvars
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Union
+
+import requests
+
+from .fetch_planner import KEYSET, SHARDED, FetchPlanner, default_planner, id_ranges
+from .utils import AdaptiveBatcher, OdooUtils, is_batch_overload
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +28,8 @@ class OdooModel:
         """
         self.connection = connection
         self.model_name = model_name
+        # FetchPlanner de fetch() (None: el planificador compartido del proceso)
+        self.planner: Optional[FetchPlanner] = None
     
     def search(self, domain: List = None, limit: int = None, 
                offset: int = 0, order: str = None) -> List[int]:
@@ -152,10 +163,248 @@ class OdooModel:
         """
         return self.connection.execute_kw(self.model_name, 'fields_get', [])
 
+    
+    # ------------------------------------------------------------------
+    # Operaciones por lotes (tamaño fijo o AdaptiveBatcher)
+    # ------------------------------------------------------------------
+    def read_batched(self, ids: Iterable[int], fields: List[str] = None,
+                     batch_size: Union[int, AdaptiveBatcher] = 500) -> Iterator[Dict]:
+        """
+        Lee registros en lotes sin cargar todos los IDs en memoria
+        
+        Con un AdaptiveBatcher, un lote que agota el tiempo de espera se
+        reduce a la mitad y se reintenta (hasta el tamaño mínimo).
+        
+        Args:
+            ids: IDs a leer (cualquier iterable)
+            fields: Campos a leer (None para todos)
+            batch_size: Tamaño fijo o AdaptiveBatcher
+            
+        Yields:
+            Dict: Datos de cada registro
+        """
+        def _read(batch: List[int]) -> List[Dict]:
+            return self._read_splitting(batch, fields, batch_size)
+        
+        for _batch, records in OdooUtils.run_batches(ids, batch_size, _read, self.connection):
+            yield from records
+    
+    def iter_search_read(self, domain: List = None, fields: List[str] = None,
+                         batch_size: Union[int, AdaptiveBatcher] = 500) -> Iterator[Dict]:
+        """
+        Recorre todos los registros del dominio paginando por ID (keyset)
+        
+        Cada página pide tantos registros como el tamaño actual del lote,
+        de modo que un AdaptiveBatcher ajusta el tamaño de página; un
+        timeout o un 413 lo reduce antes de propagar el error.
+        
+        Args:
+            domain: Condiciones de búsqueda
+            fields: Campos a leer
+            batch_size: Tamaño fijo o AdaptiveBatcher
+            
+        Yields:
+            Dict: Datos de cada registro, en orden de ID
+        """
+        adaptive = isinstance(batch_size, AdaptiveBatcher)
+        fields = list(fields) if fields else None
+        if fields and 'id' not in fields:
+            fields.append('id')
+        last_id = 0
+        while True:
+            limit = batch_size.size if adaptive else batch_size
+            page_domain = [['id', '>', last_id]] + list(domain or [])
+            started = time.perf_counter()
+            try:
+                records = self.search_read(page_domain, fields=fields, limit=limit, order='id')
+            except requests.RequestException as e:
+                if adaptive and is_batch_overload(e):
+                    batch_size.record_failure()
+                raise
+            if adaptive:
+                self._record_batch(batch_size, len(records) or 1, started)
+            yield from records
+            if len(records) < limit:
+                return
+            last_id = records[-1]['id']
+    
+    def create_batched(self, values: Iterable[Dict[str, Any]],
+                       batch_size: Union[int, AdaptiveBatcher] = 200) -> List[int]:
+        """
+        Crea registros en lotes (una llamada create con una lista por lote)
+        
+        Args:
+            values: Valores de cada registro (cualquier iterable)
+            batch_size: Tamaño fijo o AdaptiveBatcher
+            
+        Returns:
+            List[int]: IDs creados, en el orden de values
+        """
+        def _create(batch: List[Dict[str, Any]]) -> List[int]:
+            return self.connection.execute_kw(self.model_name, 'create', [batch])
+        
+        created = []
+        for _batch, ids in OdooUtils.run_batches(values, batch_size, _create, self.connection):
+            created.extend(ids)
+        return created
+    
+    def write_batched(self, ids: Iterable[int], values: Dict[str, Any],
+                      batch_size: Union[int, AdaptiveBatcher] = 500) -> int:
+        """
+        Aplica los mismos valores a muchos registros en lotes
+        
+        Args:
+            ids: IDs a actualizar (cualquier iterable)
+            values: Nuevos valores
+            batch_size: Tamaño fijo o AdaptiveBatcher
+            
+        Returns:
+            int: Número de registros actualizados
+        """
+        written = 0
+        for batch, _result in OdooUtils.run_batches(
+                ids, batch_size, lambda batch: self.write(batch, values), self.connection):
+            written += len(batch)
+        return written
+    
+    # ------------------------------------------------------------------
+    # Lectura planificada
+    # ------------------------------------------------------------------
+    def explain_fetch(self, domain: List = None, fields: List[str] = None,
+                      limit: int = None, strategy: str = None) -> Dict[str, Any]:
+        """
+        Plan que usaría fetch() sin ejecutar la lectura (hace un search_count)
+        
+        Returns:
+            Dict: Estrategia elegida, motivo y estimaciones
+        """
+        planner = self.planner or default_planner()
+        return planner.plan(self.count(domain), self.model_name, fields, limit, strategy)
+    
+    def fetch(self, domain: List = None, fields: List[str] = None, limit: int = None,
+              strategy: str = None) -> List[Dict]:
+        """
+        Lee todos los registros del dominio eligiendo la estrategia por volumen
+        
+        Estima el resultado con search_count y los bytes por registro
+        observados antes, y lee en una sola llamada, en páginas keyset o con
+        un escaneo en paralelo por rangos de id. El resultado real alimenta
+        las estadísticas del planificador.
+        
+        Args:
+            domain: Condiciones de búsqueda
+            fields: Campos a leer (None para todos)
+            limit: Límite de registros
+            strategy: Forzar 'single', 'keyset' o 'sharded'
+            
+        Returns:
+            List[Dict]: Registros en orden de ID
+        """
+        planner = self.planner or default_planner()
+        plan = self.explain_fetch(domain, fields, limit, strategy)
+        logger.info(f"Plan de lectura de {self.model_name}: {plan['strategy']} "
+                    f"({plan['reason']}), ~{plan['rows']:,} registros, "
+                    f"~{plan['estimated_bytes'] / (1024 * 1024):,.1f} MB")
+        
+        tally = {'calls': 0, 'bytes': 0, 'lock': threading.Lock()}
+        started = time.perf_counter()
+        if plan['strategy'] == KEYSET:
+            records = self._fetch_keyset(domain, fields, plan['page_size'], tally, limit=limit)
+        elif plan['strategy'] == SHARDED:
+            records = self._fetch_sharded(domain, fields, plan, planner.workers, tally,
+                                          limit=limit)
+        else:
+            records = self._tracked_search_read(domain or [], fields, limit, tally)
+        seconds = time.perf_counter() - started
+        
+        planner.observe(self.model_name, fields, len(records), tally['bytes'], seconds)
+        planner.record_outcome(plan, self.model_name, len(records), tally['bytes'],
+                               seconds, tally['calls'])
+        return records
+    
+    def _tracked_search_read(self, domain: List, fields: Optional[List[str]],
+                             limit: Optional[int], tally: Dict[str, Any]) -> List[Dict]:
+        """search_read ordenado por ID que suma llamadas y bytes recibidos"""
+        records = self.search_read(domain, fields=fields, limit=limit, order='id')
+        stats = getattr(self.connection, 'last_call', None) or {}
+        with tally['lock']:
+            tally['calls'] += 1
+            tally['bytes'] += stats.get('response_bytes', 0)
+        return records
+    
+    def _fetch_keyset(self, domain: Optional[List], fields: Optional[List[str]],
+                      page_size: int, tally: Dict[str, Any], limit: Optional[int] = None,
+                      start: int = 0, end: Optional[int] = None) -> List[Dict]:
+        """Páginas keyset (id > último) dentro de [start, end)"""
+        fields = list(fields) if fields else None
+        if fields and 'id' not in fields:
+            fields.append('id')
+        records, last_id = [], start - 1
+        while True:
+            bounds = [['id', '>', last_id]] + ([['id', '<', end]] if end else [])
+            size = min(page_size, limit - len(records)) if limit else page_size
+            page = self._tracked_search_read(bounds + list(domain or []), fields, size, tally)
+            records.extend(page)
+            if len(page) < size or (limit and len(records) >= limit):
+                return records
+            last_id = page[-1]['id']
+    
+    def _fetch_sharded(self, domain: Optional[List], fields: Optional[List[str]],
+                       plan: Dict[str, Any], workers: int, tally: Dict[str, Any],
+                       limit: Optional[int] = None) -> List[Dict]:
+        """
+        Escaneo en paralelo por rangos de id, cada uno con páginas keyset
+
+        Con límite, ningún rango lee más de 'limit' registros y el resultado
+        (en orden de ID) se recorta a los primeros 'limit'. Cada rango se lee
+        con una copia del contexto del llamador, para conservar la prioridad
+        y el trabajo del PriorityScheduler.
+        """
+        first = self.search(domain, limit=1, order='id')
+        last = self.search(domain, limit=1, order='id desc')
+        if not first:
+            return []
+        ranges = id_ranges(first[0], last[0] + 1, plan['shards'])
+        
+        def _scan(bounds):
+            return self._fetch_keyset(domain, fields, plan['page_size'], tally, limit=limit,
+                                      start=bounds[0], end=bounds[1])
+        
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+            shards = [executor.submit(context.copy().run, _scan, bounds) for bounds in ranges]
+            records = [record for shard in shards for record in shard.result()]
+        return records[:limit] if limit else records
+    
+    def _read_splitting(self, ids: List[int], fields: Optional[List[str]],
+                        batch_size: Union[int, AdaptiveBatcher]) -> List[Dict]:
+        """Lee un lote; si agota el tiempo, lo parte en dos (solo con AdaptiveBatcher)"""
+        try:
+            return self.read(ids, fields)
+        except requests.Timeout:
+            if (not isinstance(batch_size, AdaptiveBatcher)
+                    or len(ids) <= batch_size.min_size):
+                raise
+            batch_size.record_failure()
+            half = len(ids) // 2
+            logger.warning(f"Tiempo agotado leyendo {len(ids)} registros de "
+                           f"{self.model_name}; reintentando en lotes de {half}")
+            return (self._read_splitting(ids[:half], fields, batch_size)
+                    + self._read_splitting(ids[half:], fields, batch_size))
+    
+    def _record_batch(self, batcher: AdaptiveBatcher, size: int, started: float):
+        """Registra en el batcher la duración y los bytes de la última llamada"""
+        stats = getattr(self.connection, 'last_call', None) or {}
+        batcher.record(size, time.perf_counter() - started,
+                       stats.get('response_bytes', 0), stats.get('request_bytes', 0))
+
 # Clases específicas para modelos comunes
 class Partner(OdooModel):
     """Modelo para res.partner (Contactos)"""
     
+    # Dominio de get_companies (también lo usa scripts/profile_fields.py)
+    COMPANY_DOMAIN = [['is_company', '=', True]]
+    
     def __init__(self, connection):
         super().__init__(connection, 'res.partner')
     
@@ -163,13 +412,22 @@ class Partner(OdooModel):
         """Busca contacto por email"""
         return self.search_read([['email', '=', email]])
     
-    def get_companies(self, limit: int = None) -> List[Dict]:
-        """Obtiene empresas (is_company=True)"""
-        return self.search_read([['is_company', '=', True]], limit=limit)
+    def get_companies(self, limit: int = None, fields: List[str] = None) -> List[Dict]:
+        """
+        Obtiene empresas (is_company=True)
+        
+        Args:
+            limit: Límite de registros
+            fields: Campos a leer (por defecto, todos; ver FieldProfiler.recommend)
+        """
+        return self.search_read(self.COMPANY_DOMAIN, fields=fields, limit=limit)
 
 class Product(OdooModel):
     """Modelo para product.product (Productos)"""
     
+    # Dominio de get_active_products (también lo usa scripts/profile_fields.py)
+    ACTIVE_DOMAIN = [['active', '=', True]]
+    
     def __init__(self, connection):
         super().__init__(connection, 'product.product')
     
@@ -177,9 +435,15 @@ class Product(OdooModel):
         """Busca producto por código de barras"""
         return self.search_read([['barcode', '=', barcode]])
     
-    def get_active_products(self, limit: int = None) -> List[Dict]:
-        """Obtiene productos activos"""
-        return self.search_read([['active', '=', True]], limit=limit)
+    def get_active_products(self, limit: int = None, fields: List[str] = None) -> List[Dict]:
+        """
+        Obtiene productos activos
+        
+        Args:
+            limit: Límite de registros
+            fields: Campos a leer (por defecto, todos; ver FieldProfiler.recommend)
+        """
+        return self.search_read(self.ACTIVE_DOMAIN, fields=fields, limit=limit)
 
 class SaleOrder(OdooModel):
     """Modelo para sale.order (Órdenes de Venta)"""
@@ -0,0 +1,211 @@
+"""
+Reintentos con backoff exponencial y peticiones duplicadas (hedging)
+
+Solo se reintenta lo que no puede duplicar efectos en Odoo: un fallo de
+conexión (la petición no llegó a enviarse) o un 429/503 se reintenta en
+cualquier método; un tiempo de lectura agotado, un 502/504 o una respuesta
+cortada solo en métodos de lectura, porque el servidor pudo haber aplicado
+una escritura aunque el cliente no vea la respuesta.
+"""
+import random
+import socket
+import threading
+from collections import deque
+from typing import Dict, Deque, FrozenSet, Iterable, Optional, Tuple
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+# Métodos sin efectos en la base de datos (reintentables y duplicables)
+READ_METHODS = frozenset({
+    'read', 'search', 'search_read', 'search_count', 'read_group', 'fields_get',
+    'name_search', 'name_get', 'default_get', 'check_access_rights',
+    'web_search_read', 'web_read', 'export_data', 'get_views', 'fields_view_get',
+    # Servicio 'common' (rpc_labels devuelve el servicio como modelo)
+    'version', 'login', 'authenticate', 'about',
+})
+
+# Estados HTTP que indican que Odoo rechazó la petición sin procesarla
+REJECTED_STATUSES = frozenset({429, 503})
+
+# Estados HTTP en los que la petición pudo llegar a procesarse
+GATEWAY_STATUSES = frozenset({502, 504})
+
+# Errores que solo ocurren al abrir la conexión, antes de enviar nada
+# (NewConnectionError incluye NameResolutionError)
+NOT_SENT_ERRORS = (NewConnectionError, ConnectionRefusedError, socket.gaierror)
+
+
+class RetryPolicy:
+    """Decide si una llamada fallida se reintenta y cuánto se espera"""
+
+    def __init__(self, retries: int = 3, backoff: float = 0.5, max_backoff: float = 30.0,
+                 read_methods: Iterable[str] = READ_METHODS):
+        """
+        Inicializar política
+
+        Args:
+            retries: Reintentos máximos por llamada (0 desactiva los reintentos)
+            backoff: Espera base en segundos; se duplica en cada intento
+            max_backoff: Espera máxima entre intentos
+            read_methods: Métodos seguros de repetir tras un fallo ambiguo
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.read_methods: FrozenSet[str] = frozenset(read_methods)
+
+    def is_safe(self, method: str) -> bool:
+        """Si el método puede repetirse aunque el servidor ya lo ejecutara"""
+        return method in self.read_methods
+
+    def should_retry(self, error: Exception, attempt: int, method: str) -> bool:
+        """
+        Si se reintenta la llamada tras el error
+
+        Args:
+            error: Excepción del intento fallido
+            attempt: Número de intentos ya hechos (1 tras el primer fallo)
+            method: Método Odoo de la llamada
+        """
+        if attempt > self.retries:
+            return False
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if isinstance(error, (requests.ReadTimeout, requests.exceptions.ChunkedEncodingError)):
+            return self.is_safe(method)
+        if isinstance(error, requests.ConnectionError):
+            # Incluye conexiones cerradas a mitad de respuesta: solo lecturas
+            return self.is_safe(method) or _not_sent(error)
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            if status in REJECTED_STATUSES:
+                return True
+            if status in GATEWAY_STATUSES:
+                return self.is_safe(method)
+        return False
+
+    def delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """
+        Espera antes del siguiente intento (backoff exponencial con jitter completo)
+
+        Si el servidor envió Retry-After (en segundos), se respeta.
+        """
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+class HedgePolicy:
+    """
+    Lanza una petición duplicada para lecturas que tardan más de lo habitual
+
+    La latencia de referencia es el percentil indicado de las últimas
+    llamadas del mismo modelo y método. El presupuesto limita la carga
+    extra: como mucho 'budget' duplicados por cada llamada.
+    """
+
+    def __init__(self, percentile: float = 0.95, min_samples: int = 20,
+                 window: int = 200, budget: float = 0.05, min_delay: float = 0.05,
+                 read_methods: Iterable[str] = READ_METHODS):
+        """
+        Inicializar política
+
+        Args:
+            percentile: Percentil de latencia a partir del cual se duplica (0-1)
+            min_samples: Llamadas observadas antes de empezar a duplicar
+            window: Latencias recientes guardadas por modelo y método
+            budget: Fracción máxima de llamadas duplicadas
+            min_delay: Espera mínima antes de duplicar (segundos)
+            read_methods: Métodos que se pueden duplicar
+        """
+        if not 0.0 < percentile < 1.0:
+            raise ValueError(f"percentile debe estar entre 0 y 1: {percentile}")
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.budget = budget
+        self.min_delay = min_delay
+        self.read_methods: FrozenSet[str] = frozenset(read_methods)
+        self.calls = 0
+        self.hedged = 0
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, method: str, seconds: float):
+        """Registra la latencia de una llamada completada"""
+        if method not in self.read_methods:
+            return
+        with self._lock:
+            latencies = self._latencies.get((model, method))
+            if latencies is None:
+                latencies = self._latencies[(model, method)] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def hedge_delay(self, model: str, method: str) -> Optional[float]:
+        """
+        Segundos a esperar antes de duplicar la llamada (None si no se duplica)
+
+        Cuenta la llamada para el presupuesto de duplicados.
+        """
+        if method not in self.read_methods:
+            return None
+        with self._lock:
+            self.calls += 1
+            latencies = self._latencies.get((model, method))
+            if not latencies or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    def acquire(self) -> bool:
+        """Reserva un duplicado si el presupuesto lo permite"""
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def stats(self) -> Dict[str, float]:
+        """Llamadas vistas y duplicados lanzados"""
+        with self._lock:
+            return {'calls': self.calls, 'hedged': self.hedged,
+                    'ratio': self.hedged / self.calls if self.calls else 0.0}
+
+
+def _not_sent(error: Exception) -> bool:
+    """
+    Si el fallo de conexión ocurrió antes de enviar la petición
+
+    Recorre la cadena de excepciones (requests envuelve un MaxRetryError de
+    urllib3 cuyo 'reason' es el error original) buscando un error de
+    apertura de conexión. No se mira el texto: un mensaje que mencione
+    'Connection refused' no prueba que la petición no llegara al servidor.
+    """
+    pending, seen = [error], set()
+    while pending:
+        current = pending.pop()
+        if not isinstance(current, BaseException) or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, NOT_SENT_ERRORS):
+            return True
+        pending.extend(current.args)
+        pending.extend([getattr(current, 'reason', None), current.__cause__,
+                        current.__context__])
+    return False
+
+
+def _retry_after(error: Optional[Exception]) -> Optional[float]:
+    """Valor de Retry-After de la respuesta (solo en segundos)"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
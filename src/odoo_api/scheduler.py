@@ -0,0 +1,196 @@
+"""
+Planificador de llamadas por prioridad para conexiones compartidas
+
+Las llamadas esperan turno en tres clases: 'interactive' (consultas de
+usuario), 'normal' y 'bulk' (exportaciones y cargas). Se atienden en ese
+orden estricto, y una parte de la concurrencia queda reservada para las
+interactivas: aunque una exportación llene la cola, una consulta de
+usuario encuentra hueco de inmediato. Dentro de cada clase, los trabajos
+('job') se atienden por turnos, de modo que un trabajo largo no bloquea a
+los demás.
+
+Uso:
+    scheduler = PriorityScheduler(max_concurrency=8, interactive_share=0.25)
+    connection = OdooConnection(url, db, user, api_key, scheduler=scheduler)
+
+    with scheduler.context('bulk', job='export-ventas'):
+        exportar(connection)          # sus execute_kw esperan como 'bulk'
+"""
+import contextvars
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Any, Deque, Optional, Tuple
+
+INTERACTIVE = 'interactive'
+NORMAL = 'normal'
+BULK = 'bulk'
+
+# Orden de atención de las clases
+PRIORITIES = (INTERACTIVE, NORMAL, BULK)
+
+# Prioridad y trabajo de las llamadas hechas en el contexto actual
+_current: contextvars.ContextVar = contextvars.ContextVar('odoo_priority',
+                                                          default=(NORMAL, None))
+
+
+class _Ticket:
+    """Petición de turno de una llamada en espera"""
+
+    __slots__ = ('priority', 'job', 'enqueued', 'granted')
+
+    def __init__(self, priority: str, job: Optional[str]):
+        self.priority = priority
+        self.job = job
+        self.enqueued = time.perf_counter()
+        self.granted = False
+
+
+class PriorityScheduler:
+    """Cola de llamadas con clases de prioridad, reserva interactiva y reparto justo"""
+
+    def __init__(self, max_concurrency: int = 8, interactive_share: float = 0.25,
+                 governor=None, metrics=None):
+        """
+        Inicializar planificador
+
+        Args:
+            max_concurrency: Llamadas simultáneas como máximo
+            interactive_share: Fracción de la concurrencia reservada para
+                llamadas interactivas (al menos un hueco si es > 0)
+            governor: RequestGovernor cuyo límite adaptativo sustituye a
+                max_concurrency (opcional)
+            metrics: RpcMetrics donde registrar la espera en cola (opcional)
+        """
+        if not 0.0 <= interactive_share < 1.0:
+            raise ValueError(f"interactive_share debe estar entre 0 y 1: {interactive_share}")
+        self.max_concurrency = max(1, max_concurrency)
+        self.interactive_share = interactive_share
+        self.governor = governor
+        self.metrics = metrics
+        self.in_flight = 0
+        self.in_flight_shared = 0  # llamadas no interactivas en curso
+        self._queues: Dict[str, 'OrderedDict[Optional[str], Deque[_Ticket]]'] = {
+            priority: OrderedDict() for priority in PRIORITIES}
+        self._waits: Dict[str, Tuple[int, float, float]] = {}
+        self._condition = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Contexto de prioridad
+    # ------------------------------------------------------------------
+    @staticmethod
+    @contextmanager
+    def context(priority: str = NORMAL, job: Optional[str] = None):
+        """
+        Prioridad y trabajo de las llamadas hechas dentro del bloque
+
+        Se hereda en corrutinas; los hilos nuevos empiezan en 'normal'
+        (usar contextvars.copy_context() para propagarlo).
+
+        Args:
+            priority: 'interactive', 'normal' o 'bulk'
+            job: Identificador del trabajo para el reparto justo dentro de la clase
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Prioridad no válida: {priority}")
+        token = _current.set((priority, job))
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+    # ------------------------------------------------------------------
+    # Turnos
+    # ------------------------------------------------------------------
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, job: Optional[str] = None):
+        """
+        Espera turno para una llamada y lo libera al terminar
+
+        Args:
+            priority: Clase de prioridad (por defecto, la del contexto)
+            job: Trabajo (por defecto, el del contexto)
+        """
+        context_priority, context_job = _current.get()
+        priority = priority or context_priority
+        job = job if job is not None else context_job
+        if priority not in PRIORITIES:
+            raise ValueError(f"Prioridad no válida: {priority}")
+
+        ticket = _Ticket(priority, job)
+        with self._condition:
+            self._queues[priority].setdefault(job, deque()).append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                self._condition.wait()
+        self._observe(priority, time.perf_counter() - ticket.enqueued)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                if priority != INTERACTIVE:
+                    self.in_flight_shared -= 1
+                self._dispatch()
+
+    def capacity(self) -> Tuple[int, int]:
+        """
+        Huecos totales y huecos que pueden usar las clases no interactivas
+
+        Returns:
+            Tuple[int, int]: (total, compartidos)
+        """
+        total = self.max_concurrency
+        if self.governor is not None:
+            total = max(1, int(self.governor.concurrency.limit))
+        reserved = math.ceil(total * self.interactive_share) if self.interactive_share else 0
+        return total, max(1, total - reserved)
+
+    def _dispatch(self):
+        """Concede turnos mientras haya capacidad (con el lock tomado)"""
+        total, shared = self.capacity()
+        granted = False
+        for priority in PRIORITIES:
+            jobs = self._queues[priority]
+            while jobs and self.in_flight < total:
+                if priority != INTERACTIVE and self.in_flight_shared >= shared:
+                    break
+                # Turno rotatorio: el primer trabajo atiende una llamada y pasa al final
+                job, tickets = next(iter(jobs.items()))
+                ticket = tickets.popleft()
+                if tickets:
+                    jobs.move_to_end(job)
+                else:
+                    del jobs[job]
+                ticket.granted = True
+                granted = True
+                self.in_flight += 1
+                if priority != INTERACTIVE:
+                    self.in_flight_shared += 1
+        if granted:
+            self._condition.notify_all()
+
+    # ------------------------------------------------------------------
+    # Estadísticas
+    # ------------------------------------------------------------------
+    def _observe(self, priority: str, seconds: float):
+        with self._condition:
+            count, total, maximum = self._waits.get(priority, (0, 0.0, 0.0))
+            self._waits[priority] = (count + 1, total + seconds, max(maximum, seconds))
+        if self.metrics is not None:
+            self.metrics.observe_queue_wait(priority, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Llamadas en curso, en cola y espera media/máxima por prioridad"""
+        with self._condition:
+            total, shared = self.capacity()
+            queued = {priority: sum(len(tickets) for tickets in self._queues[priority].values())
+                      for priority in PRIORITIES}
+            waits = {priority: {'calls': count,
+                                'wait_avg': total_wait / count if count else 0.0,
+                                'wait_max': maximum}
+                     for priority, (count, total_wait, maximum) in self._waits.items()}
+            return {'capacity': total, 'shared_capacity': shared,
+                    'in_flight': self.in_flight, 'queued': queued, 'waits': waits}
@@ -0,0 +1,863 @@
+"""
+Reparto de trabajos grandes (exportación, importación, sincronización) en
+tareas ('shards') ejecutadas por varios procesos y máquinas
+
+Un planificador divide el trabajo por rangos de id o por fragmentos de un
+archivo y deja las tareas en una cola persistente (SQLite o un directorio
+compartido). Cada worker reclama tareas con un lease que renueva mientras
+trabaja; si el proceso muere, el lease caduca y otro worker la retoma. La
+entrega es al menos una vez: los handlers deben ser idempotentes (las
+exportaciones sobrescriben su archivo y las importaciones con load usan
+xmlids en la columna 'id').
+
+Uso:
+    queue = open_queue('sqlite:///data/jobs/queue.db')
+    tasks = plan_id_ranges(connection, 'sale.order', shard_size=50_000,
+                           params={'fields': ['name', 'amount_total'],
+                                   'output_dir': 'data/exports/ventas'})
+    queue.add_tasks('export-ventas', 'export_range', tasks)
+
+    ShardWorker(queue, connection).run('export-ventas')   # en cada proceso
+    print(queue.progress('export-ventas'))
+"""
+import csv
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Estados en el orden en que se muestran
+STATUSES = (PENDING, RUNNING, DONE, FAILED)
+
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Espera antes de reintentar una tarea fallida (se multiplica por el intento)
+DEFAULT_RETRY_DELAY = 10.0
+
+
+class TaskQueue:
+    """
+    Interfaz de las colas de tareas
+
+    Cada tarea es un dict con 'id', 'job', 'kind', 'params', 'attempts' y
+    'total' (registros estimados, opcional).
+    """
+
+    def add_tasks(self, job: str, kind: str, tasks: List[Dict[str, Any]],
+                  max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+        """
+        Encola las tareas de un trabajo
+
+        Args:
+            job: Nombre del trabajo
+            kind: Handler que ejecuta las tareas (ej: 'export_range')
+            tasks: Parámetros de cada tarea (la clave 'total' es la estimación
+                de registros para el progreso)
+            max_attempts: Intentos por tarea antes de darla por fallida
+
+        Returns:
+            int: Tareas añadidas
+        """
+        raise NotImplementedError
+
+    def claim(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              job: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Reclama la siguiente tarea disponible (o con lease caducado)"""
+        raise NotImplementedError
+
+    def heartbeat(self, task: Dict[str, Any], worker: str, lease_seconds: float,
+                  progress: Optional[int] = None) -> bool:
+        """Renueva el lease y guarda el progreso; False si el lease se perdió"""
+        raise NotImplementedError
+
+    def complete(self, task: Dict[str, Any], worker: str, result: Dict[str, Any]) -> bool:
+        """Marca la tarea como terminada; False si el lease se perdió"""
+        raise NotImplementedError
+
+    def fail(self, task: Dict[str, Any], worker: str, error: str,
+             retry_delay: float = DEFAULT_RETRY_DELAY) -> str:
+        """
+        Registra un intento fallido
+
+        Returns:
+            str: Nuevo estado ('pending' si se reintentará, 'failed' si no)
+        """
+        raise NotImplementedError
+
+    def progress(self, job: str) -> Dict[str, Any]:
+        """
+        Progreso agregado de un trabajo
+
+        Returns:
+            Dict: Tareas por estado, registros procesados y estimados,
+            workers activos y errores recientes
+        """
+        raise NotImplementedError
+
+    def jobs(self) -> List[str]:
+        """Trabajos presentes en la cola"""
+        raise NotImplementedError
+
+
+# ----------------------------------------------------------------------
+# Cola SQLite
+# ----------------------------------------------------------------------
+class SQLiteTaskQueue(TaskQueue):
+    """
+    Cola en una base SQLite (modo WAL)
+
+    Adecuada para varios procesos en una máquina. Entre máquinas, SQLite
+    sobre un sistema de archivos de red no garantiza el bloqueo: usar
+    FileTaskQueue en un directorio compartido.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            available_at REAL NOT NULL DEFAULT 0,
+            worker TEXT,
+            lease_until REAL,
+            progress INTEGER NOT NULL DEFAULT 0,
+            total INTEGER,
+            result TEXT,
+            error TEXT,
+            updated_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS tasks_job_status ON tasks (job, status);
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        Args:
+            path: Archivo de la base de datos (se crea si no existe)
+            timeout: Espera máxima por el bloqueo de escritura (segundos)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connect() as db:
+            db.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(str(self.path), timeout=self.timeout,
+                                 isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def add_tasks(self, job, kind, tasks, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        now = time.time()
+        rows = [(job, kind, json.dumps(params), max_attempts, params.get('total'), now)
+                for params in tasks]
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.executemany(
+                'INSERT INTO tasks (job, kind, params, max_attempts, total, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return len(rows)
+
+    def claim(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS, job=None):
+        db = self._connect()
+        while True:
+            now = time.time()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                row = db.execute(
+                    "SELECT * FROM tasks WHERE (job = ? OR ? IS NULL) AND ("
+                    " (status = 'pending' AND available_at <= ?)"
+                    " OR (status = 'running' AND lease_until < ?)) "
+                    "ORDER BY id LIMIT 1", (job, job, now, now)).fetchone()
+                if row is None:
+                    db.execute('COMMIT')
+                    return None
+                if row['status'] == RUNNING and row['attempts'] >= row['max_attempts']:
+                    # El último intento murió sin liberar la tarea
+                    db.execute("UPDATE tasks SET status = 'failed', worker = NULL, "
+                               "error = ?, updated_at = ? WHERE id = ?",
+                               (f"Lease caducado ({row['worker']})", now, row['id']))
+                    db.execute('COMMIT')
+                    continue
+                db.execute("UPDATE tasks SET status = 'running', worker = ?, lease_until = ?, "
+                           "attempts = attempts + 1, progress = 0, updated_at = ? "
+                           "WHERE id = ?", (worker, now + lease_seconds, now, row['id']))
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            if row['status'] == RUNNING:
+                logger.warning(f"Tarea {row['id']} retomada: lease de {row['worker']} caducado")
+            return {'id': row['id'], 'job': row['job'], 'kind': row['kind'],
+                    'params': json.loads(row['params']), 'attempts': row['attempts'] + 1,
+                    'total': row['total']}
+
+    def heartbeat(self, task, worker, lease_seconds, progress=None):
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE tasks SET lease_until = ?, progress = COALESCE(?, progress), "
+            "updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (now + lease_seconds, progress, now, task['id'], worker))
+        return cursor.rowcount == 1
+
+    def complete(self, task, worker, result):
+        cursor = self._connect().execute(
+            "UPDATE tasks SET status = 'done', result = ?, progress = ?, lease_until = NULL, "
+            "error = NULL, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (json.dumps(result), result.get('records', 0), time.time(), task['id'], worker))
+        return cursor.rowcount == 1
+
+    def fail(self, task, worker, error, retry_delay=DEFAULT_RETRY_DELAY):
+        db = self._connect()
+        now = time.time()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT attempts, max_attempts FROM tasks '
+                             "WHERE id = ? AND worker = ? AND status = 'running'",
+                             (task['id'], worker)).fetchone()
+            if row is None:
+                db.execute('COMMIT')
+                return RUNNING  # otro worker la tiene ahora
+            status = FAILED if row['attempts'] >= row['max_attempts'] else PENDING
+            db.execute("UPDATE tasks SET status = ?, error = ?, lease_until = NULL, "
+                       "available_at = ?, updated_at = ? WHERE id = ?",
+                       (status, error, now + retry_delay * row['attempts'], now, task['id']))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return status
+
+    def progress(self, job):
+        db = self._connect()
+        now = time.time()
+        counts = {status: 0 for status in STATUSES}
+        for row in db.execute('SELECT status, COUNT(*) AS n FROM tasks WHERE job = ? '
+                              'GROUP BY status', (job,)):
+            counts[row['status']] = row['n']
+        totals = db.execute(
+            "SELECT SUM(CASE WHEN status IN ('done', 'running') THEN progress ELSE 0 END) "
+            "AS records, SUM(total) AS total, COUNT(total) AS estimated, "
+            "MIN(updated_at) AS first_update FROM tasks WHERE job = ?", (job,)).fetchone()
+        workers = [row['worker'] for row in db.execute(
+            "SELECT DISTINCT worker FROM tasks WHERE job = ? AND status = 'running' "
+            "AND lease_until >= ?", (job, now))]
+        errors = [f"{row['id']}: {row['error']}" for row in db.execute(
+            'SELECT id, error FROM tasks WHERE job = ? AND error IS NOT NULL '
+            'ORDER BY updated_at DESC LIMIT 5', (job,))]
+        return _progress_summary(counts, totals['records'] or 0,
+                                 totals['total'] if totals['estimated'] else None,
+                                 workers, errors)
+
+    def jobs(self):
+        return [row['job'] for row in self._connect().execute(
+            'SELECT DISTINCT job FROM tasks ORDER BY job')]
+
+
+# ----------------------------------------------------------------------
+# Cola en un directorio compartido
+# ----------------------------------------------------------------------
+class FileTaskQueue(TaskQueue):
+    """
+    Cola en un directorio (local o compartido por NFS/SMB entre máquinas)
+
+    El estado de cada tarea es el subdirectorio donde está su archivo
+    (pending, leased, done, failed) y las transiciones son renombrados
+    atómicos: solo un worker gana cada reclamación. El lease se renueva
+    actualizando la fecha de modificación del archivo.
+
+    Estructura: <root>/<job>/{tasks,pending,leased,done,failed,progress}/<id>
+    """
+
+    # Reclamación a medio escribir: se considera abandonada tras este tiempo
+    STALE_CLAIM_SECONDS = 600
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: Directorio de la cola (se crea si no existe)
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _dir(self, job: str, state: str) -> Path:
+        return self.root / job / state
+
+    def add_tasks(self, job, kind, tasks, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        for state in ('tasks',) + (PENDING, 'leased', DONE, FAILED, 'progress'):
+            self._dir(job, state).mkdir(parents=True, exist_ok=True)
+        start = len(_entries(self._dir(job, 'tasks')))
+        for number, params in enumerate(tasks, start + 1):
+            task_id = f"{number:08d}"
+            _write_json(self._dir(job, 'tasks') / task_id,
+                        {'kind': kind, 'params': params, 'max_attempts': max_attempts})
+            _write_json(self._dir(job, PENDING) / task_id,
+                        {'attempts': 0, 'available_at': 0})
+        return len(tasks)
+
+    def claim(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS, job=None):
+        for name in ([job] if job else self.jobs()):
+            self._reclaim_expired(name)
+            pending = self._dir(name, PENDING)
+            if not pending.is_dir():
+                continue
+            now = time.time()
+            for path in _entries(pending):
+                state = _read_json(path)
+                if state is None or state.get('available_at', 0) > now:
+                    continue
+                leased = self._dir(name, 'leased') / path.name
+                try:
+                    os.rename(path, leased)
+                except FileNotFoundError:
+                    continue  # otro worker la reclamó antes
+                attempts = state.get('attempts', 0) + 1
+                _write_json(leased, {'worker': worker, 'attempts': attempts,
+                                     'lease_seconds': lease_seconds})
+                definition = _read_json(self._dir(name, 'tasks') / path.name)
+                return {'id': path.name, 'job': name, 'kind': definition['kind'],
+                        'params': definition['params'], 'attempts': attempts,
+                        'total': definition['params'].get('total')}
+        return None
+
+    def _reclaim_expired(self, job: str):
+        """Devuelve a pending (o a failed) las tareas con lease caducado"""
+        leased_dir = self._dir(job, 'leased')
+        if not leased_dir.is_dir():
+            return
+        now = time.time()
+        for path in _entries(leased_dir):
+            try:
+                modified = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            lease = _read_json(path) or {}
+            timeout = lease.get('lease_seconds') if 'worker' in lease else self.STALE_CLAIM_SECONDS
+            if modified + (timeout or DEFAULT_LEASE_SECONDS) >= now:
+                continue
+            definition = _read_json(self._dir(job, 'tasks') / path.name) or {}
+            attempts = lease.get('attempts', 0)
+            exhausted = attempts >= definition.get('max_attempts', DEFAULT_MAX_ATTEMPTS)
+            target = self._dir(job, FAILED if exhausted else PENDING) / path.name
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue
+            error = f"Lease caducado ({lease.get('worker')})"
+            _write_json(target, {'attempts': attempts, 'available_at': 0, 'error': error})
+            logger.warning(f"Tarea {job}/{path.name}: {error}")
+
+    def _owned(self, task, worker) -> Optional[Path]:
+        path = self._dir(task['job'], 'leased') / task['id']
+        lease = _read_json(path)
+        return path if lease and lease.get('worker') == worker else None
+
+    def heartbeat(self, task, worker, lease_seconds, progress=None):
+        path = self._owned(task, worker)
+        if path is None:
+            return False
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        if progress is not None:
+            _write_json(self._dir(task['job'], 'progress') / task['id'],
+                        {'records': progress, 'worker': worker})
+        return True
+
+    def complete(self, task, worker, result):
+        path = self._owned(task, worker)
+        if path is None:
+            return False
+        _write_json(self._dir(task['job'], DONE) / task['id'],
+                    {'worker': worker, 'attempts': task['attempts'], 'result': result,
+                     'finished_at': time.time()})
+        _remove(path)
+        _remove(self._dir(task['job'], 'progress') / task['id'])
+        return True
+
+    def fail(self, task, worker, error, retry_delay=DEFAULT_RETRY_DELAY):
+        path = self._owned(task, worker)
+        if path is None:
+            return RUNNING
+        definition = _read_json(self._dir(task['job'], 'tasks') / task['id']) or {}
+        exhausted = task['attempts'] >= definition.get('max_attempts', DEFAULT_MAX_ATTEMPTS)
+        status = FAILED if exhausted else PENDING
+        target = self._dir(task['job'], status) / task['id']
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            return RUNNING
+        _write_json(target, {'attempts': task['attempts'], 'error': error,
+                             'available_at': time.time() + retry_delay * task['attempts']})
+        _remove(self._dir(task['job'], 'progress') / task['id'])
+        return status
+
+    def progress(self, job):
+        counts = {status: 0 for status in STATUSES}
+        records = 0
+        workers = set()
+        errors = []
+        for state, status in ((PENDING, PENDING), ('leased', RUNNING), (DONE, DONE),
+                              (FAILED, FAILED)):
+            directory = self._dir(job, state)
+            if not directory.is_dir():
+                continue
+            for path in _entries(directory):
+                counts[status] += 1
+                if status == DONE:
+                    records += ((_read_json(path) or {}).get('result') or {}).get('records', 0)
+                elif status in (PENDING, FAILED):
+                    error = (_read_json(path) or {}).get('error')
+                    if error:
+                        errors.append(f"{path.name}: {error}")
+                else:
+                    workers.add((_read_json(path) or {}).get('worker'))
+        progress_dir = self._dir(job, 'progress')
+        if progress_dir.is_dir():
+            for path in _entries(progress_dir):
+                records += (_read_json(path) or {}).get('records', 0)
+
+        total, estimated = 0, False
+        tasks_dir = self._dir(job, 'tasks')
+        if tasks_dir.is_dir():
+            for path in _entries(tasks_dir):
+                value = ((_read_json(path) or {}).get('params') or {}).get('total')
+                if value is not None:
+                    total += value
+                    estimated = True
+        return _progress_summary(counts, records, total if estimated else None,
+                                 sorted(worker for worker in workers if worker), errors[:5])
+
+    def jobs(self):
+        return sorted(path.name for path in _entries(self.root) if path.is_dir())
+
+
+def open_queue(spec: str) -> TaskQueue:
+    """
+    Abre una cola a partir de su especificación
+
+    Args:
+        spec: 'sqlite:///ruta/cola.db', 'file:///ruta/directorio', o una ruta
+            (terminada en .db para SQLite; si no, directorio)
+
+    Returns:
+        TaskQueue: Cola abierta
+    """
+    if spec.startswith('sqlite://'):
+        return SQLiteTaskQueue(spec[len('sqlite://'):])
+    if spec.startswith('file://'):
+        return FileTaskQueue(spec[len('file://'):])
+    if spec.endswith(('.db', '.sqlite', '.sqlite3')):
+        return SQLiteTaskQueue(spec)
+    return FileTaskQueue(spec)
+
+
+# ----------------------------------------------------------------------
+# Planificadores
+# ----------------------------------------------------------------------
+def plan_id_ranges(connection, model: str, domain: Optional[List] = None,
+                   shards: Optional[int] = None, shard_size: int = 50_000,
+                   count: bool = False,
+                   params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Divide un modelo en rangos de id [start, end)
+
+    Args:
+        connection: OdooConnection
+        model: Modelo a repartir
+        domain: Filtro de los registros
+        shards: Número de rangos (si se indica, ignora shard_size)
+        shard_size: Ids por rango
+        count: Contar los registros de cada rango (una llamada por rango)
+            para que el progreso tenga un total exacto
+        params: Parámetros comunes añadidos a cada tarea
+
+    Returns:
+        List[Dict]: Parámetros de cada tarea (model, domain, start, end, total)
+    """
+    domain = domain or []
+    first = connection.execute_kw(model, 'search', [domain], {'limit': 1, 'order': 'id'})
+    if not first:
+        return []
+    last = connection.execute_kw(model, 'search', [domain], {'limit': 1, 'order': 'id desc'})
+    low, high = first[0], last[0] + 1
+    step = -(-(high - low) // shards) if shards else shard_size
+    tasks = []
+    for start in range(low, high, max(1, step)):
+        end = min(start + step, high)
+        task = {**(params or {}), 'model': model, 'domain': domain,
+                'start': start, 'end': end}
+        if count:
+            task['total'] = connection.execute_kw(
+                model, 'search_count', [[['id', '>=', start], ['id', '<', end]] + domain])
+        tasks.append(task)
+    return tasks
+
+
+def plan_file_chunks(path: str, chunk_bytes: int = 8 * 1024 * 1024,
+                     header: bool = True,
+                     params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Divide un archivo de texto (CSV o JSONL) en fragmentos de líneas completas
+
+    Los límites se ajustan al siguiente salto de línea, por lo que cada
+    registro debe ocupar una sola línea (sin saltos dentro de campos CSV).
+
+    Args:
+        path: Archivo a repartir (debe ser accesible por todos los workers)
+        chunk_bytes: Tamaño aproximado de cada fragmento
+        header: La primera línea es la cabecera (se guarda en cada tarea)
+        params: Parámetros comunes añadidos a cada tarea
+
+    Returns:
+        List[Dict]: Parámetros de cada tarea (path, start, end, header)
+    """
+    path = str(Path(path).resolve())
+    size = os.path.getsize(path)
+    columns = None
+    with open(path, 'rb') as f:
+        start = 0
+        if header:
+            line = f.readline()
+            start = f.tell()
+            columns = next(csv.reader([line.decode('utf-8-sig')]), [])
+        tasks = []
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            end = f.tell()
+            tasks.append({**(params or {}), 'path': path, 'start': start, 'end': end,
+                          'header': columns})
+            start = end
+    return tasks
+
+
+def read_file_chunk(task_params: Dict[str, Any]) -> Iterator[bytes]:
+    """Líneas de un fragmento planificado con plan_file_chunks"""
+    with open(task_params['path'], 'rb') as f:
+        f.seek(task_params['start'])
+        while f.tell() < task_params['end']:
+            line = f.readline()
+            if not line:
+                return
+            if line.strip():
+                yield line
+
+
+# ----------------------------------------------------------------------
+# Handlers
+# ----------------------------------------------------------------------
+class TaskContext:
+    """Lo que recibe un handler: conexión y notificación de progreso"""
+
+    def __init__(self, connection, worker: str, task: Dict[str, Any],
+                 report: Callable[[int], bool]):
+        self.connection = connection
+        self.worker = worker
+        self.task = task
+        self._report = report
+
+    def report(self, records: int):
+        """
+        Notifica los registros procesados hasta ahora en la tarea
+
+        Raises:
+            LeaseLost: Si otro worker ha retomado la tarea
+        """
+        if not self._report(records):
+            raise LeaseLost(f"Lease perdido en la tarea {self.task['id']}")
+
+
+class LeaseLost(Exception):
+    """El lease de la tarea caducó y otro worker puede haberla retomado"""
+
+
+def export_range(params: Dict[str, Any], context: TaskContext) -> Dict[str, Any]:
+    """
+    Exporta un rango de ids a JSON Lines (paginación keyset)
+
+    Params: model, start, end, domain, fields, output_dir, page_size
+    """
+    connection = context.connection
+    output_dir = Path(params['output_dir'])
+    output_dir.mkdir(parents=True, exist_ok=True)
+    target = output_dir / f"{params['model']}-{params['start']:010d}-{params['end']:010d}.jsonl"
+    tmp_path = target.with_name(target.name + '.part')
+    page_size = params.get('page_size', 1000)
+    kwargs = {'limit': page_size, 'order': 'id'}
+    if params.get('fields'):
+        kwargs['fields'] = params['fields']
+
+    records, last_id = 0, params['start'] - 1
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        while True:
+            domain = ([['id', '>', last_id], ['id', '<', params['end']]]
+                      + list(params.get('domain') or []))
+            page = connection.execute_kw(params['model'], 'search_read', [domain], kwargs)
+            for record in page:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            records += len(page)
+            context.report(records)
+            if len(page) < page_size:
+                break
+            last_id = page[-1]['id']
+    os.replace(tmp_path, target)
+    return {'records': records, 'path': str(target)}
+
+
+def import_chunk(params: Dict[str, Any], context: TaskContext) -> Dict[str, Any]:
+    """
+    Importa un fragmento de CSV con load (idempotente si incluye la columna 'id')
+
+    Params: model, path, start, end, header, batch_size
+    """
+    connection = context.connection
+    columns = params.get('fields') or params['header']
+    batch_size = params.get('batch_size', 500)
+    records, batch = 0, []
+
+    def _load(rows):
+        result = connection.execute_kw(params['model'], 'load', [columns, rows])
+        errors = [message for message in result.get('messages') or []
+                  if message.get('type') == 'error']
+        if errors:
+            raise Exception(f"load rechazó {len(errors)} filas: {errors[0].get('message')}")
+        return len(result.get('ids') or [])
+
+    lines = (line.decode('utf-8') for line in read_file_chunk(params))
+    for row in csv.reader(lines):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            records += _load(batch)
+            batch = []
+            context.report(records)
+    if batch:
+        records += _load(batch)
+        context.report(records)
+    return {'records': records}
+
+
+# Handlers por tipo de tarea; se pueden añadir con register_handler
+HANDLERS: Dict[str, Callable[[Dict[str, Any], TaskContext], Dict[str, Any]]] = {
+    'export_range': export_range,
+    'import_chunk': import_chunk,
+}
+
+
+def register_handler(kind: str):
+    """
+    Decorador que registra un handler de tareas
+
+    Uso:
+        @register_handler('sync_partners')
+        def sync_partners(params, context):
+            ...
+            return {'records': n}
+    """
+    def _register(func):
+        HANDLERS[kind] = func
+        return func
+    return _register
+
+
+# ----------------------------------------------------------------------
+# Worker
+# ----------------------------------------------------------------------
+class ShardWorker:
+    """Reclama tareas de una cola y las ejecuta, renovando su lease"""
+
+    def __init__(self, queue: TaskQueue, connection,
+                 handlers: Optional[Dict[str, Callable]] = None,
+                 worker_id: Optional[str] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 retry_delay: float = DEFAULT_RETRY_DELAY):
+        """
+        Inicializar worker
+
+        Args:
+            queue: Cola de tareas
+            connection: OdooConnection usada por los handlers
+            handlers: Handlers adicionales o que sustituyen a HANDLERS
+            worker_id: Identificador (por defecto, host:pid:aleatorio)
+            lease_seconds: Duración del lease; se renueva cada tercio
+            retry_delay: Espera base antes de reintentar una tarea fallida
+        """
+        self.queue = queue
+        self.connection = connection
+        self.handlers = {**HANDLERS, **(handlers or {})}
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self.completed = 0
+        self.failed = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Termina tras la tarea en curso"""
+        self._stop.set()
+
+    def run(self, job: Optional[str] = None, max_tasks: Optional[int] = None,
+            wait: bool = False, poll_seconds: float = 5.0) -> Dict[str, int]:
+        """
+        Ejecuta tareas hasta vaciar la cola
+
+        Args:
+            job: Solo tareas de este trabajo (None: cualquiera)
+            max_tasks: Tareas máximas a ejecutar
+            wait: Seguir esperando tareas nuevas en lugar de terminar
+            poll_seconds: Espera entre consultas con la cola vacía
+
+        Returns:
+            Dict: Tareas completadas y fallidas por este worker
+        """
+        executed = 0
+        while not self._stop.is_set() and (max_tasks is None or executed < max_tasks):
+            task = self.queue.claim(self.worker_id, self.lease_seconds, job=job)
+            if task is None:
+                if not wait and not self._has_running(job):
+                    break
+                # Puede quedar trabajo si caduca el lease de una tarea en curso
+                self._stop.wait(poll_seconds)
+                continue
+            self.execute(task)
+            executed += 1
+        return {'completed': self.completed, 'failed': self.failed}
+
+    def _has_running(self, job: Optional[str]) -> bool:
+        """Si quedan tareas en curso (de otros workers) o a la espera de reintento"""
+        for name in ([job] if job else self.queue.jobs()):
+            counts = self.queue.progress(name)['tasks']
+            if counts[RUNNING] or counts[PENDING]:
+                return True
+        return False
+
+    def execute(self, task: Dict[str, Any]) -> bool:
+        """Ejecuta una tarea reclamada; True si terminó bien"""
+        handler = self.handlers.get(task['kind'])
+        label = f"{task['job']}/{task['id']}"
+        if handler is None:
+            self.queue.fail(task, self.worker_id, f"Handler desconocido: {task['kind']}", 0)
+            self.failed += 1
+            return False
+
+        progress = {'records': None}
+        lease_ok = threading.Event()
+        lease_ok.set()
+        stop_heartbeat = threading.Event()
+
+        def _heartbeat():
+            while not stop_heartbeat.wait(self.lease_seconds / 3):
+                if not self.queue.heartbeat(task, self.worker_id, self.lease_seconds,
+                                            progress['records']):
+                    lease_ok.clear()
+                    return
+
+        def _report(records: int) -> bool:
+            progress['records'] = records
+            return lease_ok.is_set()
+
+        heartbeat = threading.Thread(target=_heartbeat, name=f'lease-{task["id"]}',
+                                     daemon=True)
+        heartbeat.start()
+        started = time.perf_counter()
+        logger.info(f"{self.worker_id}: tarea {label} ({task['kind']}, "
+                    f"intento {task['attempts']})")
+        try:
+            result = handler(task['params'], TaskContext(self.connection, self.worker_id,
+                                                         task, _report)) or {}
+        except Exception as e:
+            stop_heartbeat.set()
+            heartbeat.join()
+            status = self.queue.fail(task, self.worker_id, f"{type(e).__name__}: {e}",
+                                     self.retry_delay)
+            logger.error(f"Tarea {label} falló ({e}); estado: {status}")
+            self.failed += 1
+            return False
+        stop_heartbeat.set()
+        heartbeat.join()
+
+        result.setdefault('seconds', round(time.perf_counter() - started, 3))
+        if not self.queue.complete(task, self.worker_id, result):
+            logger.warning(f"Tarea {label} terminada sin lease (otro worker la retomó)")
+            return False
+        self.completed += 1
+        logger.info(f"Tarea {label} completada: {result.get('records', 0):,} registros "
+                    f"en {result['seconds']:.1f} s")
+        return True
+
+
+# ----------------------------------------------------------------------
+# Utilidades
+# ----------------------------------------------------------------------
+def _progress_summary(counts: Dict[str, int], records: int, total: Optional[int],
+                      workers: List[str], errors: List[str]) -> Dict[str, Any]:
+    tasks = sum(counts.values())
+    return {
+        'tasks': counts,
+        'task_count': tasks,
+        'finished': tasks > 0 and counts[DONE] + counts[FAILED] == tasks,
+        'records': records,
+        'records_total': total,
+        'percent': (100.0 * records / total if total
+                    else 100.0 * counts[DONE] / tasks if tasks else 0.0),
+        'workers': workers,
+        'errors': errors,
+    }
+
+
+def _entries(directory: Path) -> List[Path]:
+    """Archivos de un directorio de la cola, sin los temporales (ocultos)"""
+    return sorted(path for path in directory.iterdir() if not path.name.startswith('.'))
+
+
+def _write_json(path: Path, data: Dict[str, Any]):
+    """Escribe un JSON de forma atómica (archivo temporal + replace)"""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _remove(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
@@ -2,11 +2,19 @@
 Utilidades para trabajar con Odoo API
 """
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from itertools import islice
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
 from datetime import datetime, date
 
+import requests
+
 logger = logging.getLogger(__name__)
 
+# Estados HTTP de un lote demasiado grande para el servidor
+PAYLOAD_TOO_LARGE_STATUSES = frozenset({413})
+
 class OdooUtils:
     """Utilidades generales para Odoo"""
     
@@ -35,19 +43,68 @@ class OdooUtils:
         return domain
     
     @staticmethod
-    def batch_process(items: List[Any], batch_size: int = 100):
+    def batch_process(items: Iterable[Any], 
+                      batch_size: Union[int, 'AdaptiveBatcher'] = 100) -> Iterator[List[Any]]:
         """
-        Divide una lista en lotes para procesamiento por batch
+        Divide los elementos en lotes para procesamiento por batch
+        
+        Acepta cualquier iterable (listas, generadores, cursores): los
+        elementos se consumen a medida que se forman los lotes.
         
         Args:
-            items: Lista de elementos
-            batch_size: Tamaño del lote
+            items: Elementos a procesar
+            batch_size: Tamaño fijo del lote, o un AdaptiveBatcher que lo
+                ajusta según las duraciones registradas con record()
             
         Yields:
             List: Lote de elementos
         """
-        for i in range(0, len(items), batch_size):
-            yield items[i:i + batch_size]
+        if isinstance(batch_size, AdaptiveBatcher):
+            yield from batch_size.batches(items)
+            return
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    @staticmethod
+    def run_batches(items: Iterable[Any], batch_size: Union[int, 'AdaptiveBatcher'], 
+                    func: Callable[[List[Any]], Any], 
+                    connection=None) -> Iterator[Tuple[List[Any], Any]]:
+        """
+        Ejecuta func sobre cada lote y, con un AdaptiveBatcher, registra su
+        duración y los bytes que enviaron y recibieron las llamadas hechas
+        por func en este hilo. Un timeout o un 413 (lote demasiado grande)
+        reduce el lote con record_failure() antes de propagar el error.
+        
+        Args:
+            items: Elementos a procesar (cualquier iterable)
+            batch_size: Tamaño fijo o AdaptiveBatcher
+            func: Función que procesa un lote (normalmente una o varias
+                llamadas RPC)
+            connection: OdooConnection de la que leer thread_bytes (opcional)
+            
+        Yields:
+            Tuple[List, Any]: Lote y resultado de func
+        """
+        adaptive = isinstance(batch_size, AdaptiveBatcher)
+        for batch in OdooUtils.batch_process(items, batch_size):
+            sent, received = _thread_bytes(connection)
+            started = time.perf_counter()
+            try:
+                result = func(batch)
+            except requests.RequestException as e:
+                if adaptive and is_batch_overload(e):
+                    batch_size.record_failure()
+                raise
+            if adaptive:
+                seconds = time.perf_counter() - started
+                total_sent, total_received = _thread_bytes(connection)
+                batch_size.record(len(batch), seconds, total_received - received,
+                                  total_sent - sent)
+            yield batch, result
     
     @staticmethod
     def clean_data(data: Dict[str, Any]) -> Dict[str, Any]:
@@ -170,3 +227,140 @@ class OdooUtils:
             str: Fecha en formato de Odoo
         """
         return python_date.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class AdaptiveBatcher:
+    """
+    Tamaño de lote adaptativo para llamadas masivas
+    
+    Estima el coste por registro (segundos y bytes) con una media móvil de
+    las llamadas registradas y ajusta el lote para que cada llamada dure
+    cerca de target_seconds, sin superar max_bytes ni los límites de tamaño.
+    
+    Uso:
+        batcher = AdaptiveBatcher(target_seconds=2.0)
+        for batch in batcher.batches(ids):
+            started = time.perf_counter()
+            model.read(batch, fields)
+            batcher.record(len(batch), time.perf_counter() - started)
+    """
+    
+    def __init__(self, initial_size: int = 100, min_size: int = 10, 
+                 max_size: int = 5000, target_seconds: float = 1.0, 
+                 max_bytes: Optional[int] = 16 * 1024 * 1024, 
+                 smoothing: float = 0.3, max_growth: float = 2.0):
+        """
+        Inicializar batcher
+        
+        Args:
+            initial_size: Tamaño del primer lote
+            min_size: Tamaño mínimo
+            max_size: Tamaño máximo
+            target_seconds: Duración objetivo de cada llamada
+            max_bytes: Bytes máximos estimados por llamada (None sin límite)
+            smoothing: Peso de la última observación en la media móvil (0-1)
+            max_growth: Factor máximo de crecimiento entre dos lotes
+        """
+        if not 0 < min_size <= max_size:
+            raise ValueError(f"Límites de lote no válidos: {min_size}-{max_size}")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self.smoothing = smoothing
+        self.max_growth = max_growth
+        self.size = max(min_size, min(initial_size, max_size))
+        self.seconds_per_record: Optional[float] = None
+        self.bytes_per_record: Optional[float] = None
+        self.calls = 0
+        self.records = 0
+        self.seconds = 0.0
+        self.failures = 0
+        self._lock = threading.Lock()
+    
+    def batches(self, items: Iterable[Any]) -> Iterator[List[Any]]:
+        """
+        Divide los elementos en lotes del tamaño actual
+        
+        El tamaño se vuelve a leer antes de cada lote, de modo que las
+        observaciones registradas entre lotes se aplican de inmediato.
+        
+        Args:
+            items: Cualquier iterable
+            
+        Yields:
+            List: Lote de elementos
+        """
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, self.size))
+            if not batch:
+                return
+            yield batch
+    
+    def record(self, size: int, seconds: float, response_bytes: int = 0, 
+               request_bytes: int = 0):
+        """
+        Registra una llamada y recalcula el tamaño de lote
+        
+        Args:
+            size: Registros de la llamada
+            seconds: Duración de la llamada
+            response_bytes: Bytes recibidos
+            request_bytes: Bytes enviados
+        """
+        if size <= 0:
+            return
+        with self._lock:
+            self.calls += 1
+            self.records += size
+            self.seconds += seconds
+            self.seconds_per_record = self._average(self.seconds_per_record, seconds / size)
+            payload = request_bytes + response_bytes
+            if payload:
+                self.bytes_per_record = self._average(self.bytes_per_record, payload / size)
+            
+            target = (self.target_seconds / self.seconds_per_record 
+                      if self.seconds_per_record > 0 else self.max_size)
+            if self.max_bytes and self.bytes_per_record:
+                target = min(target, self.max_bytes / self.bytes_per_record)
+            # Crecer de forma gradual; reducir de inmediato
+            target = min(target, self.size * self.max_growth)
+            self.size = int(max(self.min_size, min(target, self.max_size)))
+    
+    def record_failure(self):
+        """Reduce el lote a la mitad tras un error (timeout, payload excesivo, ...)"""
+        with self._lock:
+            self.failures += 1
+            self.size = max(self.min_size, self.size // 2)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Resumen del batcher (tamaño actual y costes estimados)"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'calls': self.calls,
+                'records': self.records,
+                'seconds': self.seconds,
+                'failures': self.failures,
+                'seconds_per_record': self.seconds_per_record,
+                'bytes_per_record': self.bytes_per_record,
+            }
+    
+    def _average(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return value
+        return current + self.smoothing * (value - current)
+
+
+def is_batch_overload(error: Exception) -> bool:
+    """Si el error indica que el lote era demasiado lento o grande (timeout o 413)"""
+    if isinstance(error, requests.Timeout):
+        return True
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) in PAYLOAD_TOO_LARGE_STATUSES
+
+
+def _thread_bytes(connection) -> Tuple[int, int]:
+    """Bytes enviados y recibidos hasta ahora por el hilo actual en la conexión"""
+    return getattr(connection, 'thread_bytes', None) or (0, 0)
@@ -4,6 +4,7 @@ Utilidades generales del proyecto
 
 from .config_manager import ConfigManager
 from .logger import setup_logging
+from .tracing import Tracer
 from .validators import validate_config
 
-__all__ = ['ConfigManager', 'setup_logging', 'validate_config']
+__all__ = ['ConfigManager', 'setup_logging', 'Tracer', 'validate_config']
@@ -6,6 +6,11 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
+# Valores por defecto de get_rpc_config (sobrescribibles desde el .env)
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+
 class ConfigManager:
     """Gestiona la configuración del proyecto"""
     
@@ -39,6 +44,19 @@ class ConfigManager:
             'api_key': os.getenv('ODOO_API_KEY', '')
         }
     
+    def get_rpc_config(self) -> Dict[str, Any]:
+        """
+        Obtiene timeouts y reintentos de las llamadas JSON-RPC
+        
+        Returns:
+            Dict: Argumentos 'timeout' (conexión, lectura) y 'retries' de OdooConnection
+        """
+        return {
+            'timeout': (float(os.getenv('ODOO_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)),
+                        float(os.getenv('ODOO_TIMEOUT', DEFAULT_READ_TIMEOUT))),
+            'retries': int(os.getenv('ODOO_RETRIES', DEFAULT_RETRIES))
+        }
+    
     def get_postgres_config(self) -> Dict[str, str]:
         """
         Obtiene configuración de PostgreSQL
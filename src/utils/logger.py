@@ -1,46 +1,195 @@
 """
 Configuración de logging para el proyecto
 """
+import atexit
+import json
 import logging
 import logging.handlers
+import queue
+import threading
+import time
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
 
-def setup_logging(level: str = 'INFO', log_file: str = None) -> logging.Logger:
+# Mensajes pendientes como máximo en el modo con cola
+DEFAULT_QUEUE_SIZE = 10_000
+
+# Atributos estándar de LogRecord (el resto son campos 'extra')
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {
+    'message', 'asctime', 'taskName'}
+
+# Listener activo del modo con cola (uno por proceso)
+_listener: Optional['DrainingQueueListener'] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limita los registros repetidos desde una misma línea de código
+
+    Solo afecta a niveles <= max_level (por defecto DEBUG): cada punto del
+    código puede emitir 'rate' registros por 'per' segundos. El siguiente
+    registro admitido indica cuántos se descartaron (atributo 'suppressed').
+    """
+
+    def __init__(self, rate: int = 10, per: float = 1.0, max_level: int = logging.DEBUG):
+        """
+        Args:
+            rate: Registros admitidos por ventana y punto del código
+            per: Duración de la ventana en segundos
+            max_level: Nivel máximo al que se aplica el límite
+        """
+        super().__init__()
+        self.rate = rate
+        self.per = per
+        self.max_level = max_level
+        self._windows: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.per:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.rate:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+            record.msg = f"{record.msg} [{suppressed} similares omitidos]"
+        return True
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler con cola limitada y política de desbordamiento
+
+    El registro se encola sin formatear: el formato y la escritura ocurren
+    en el hilo del QueueListener. Los argumentos del mensaje no deben
+    modificarse tras la llamada al logger.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = 'drop'):
+        """
+        Args:
+            log_queue: Cola limitada compartida con el listener
+            overflow: 'drop' descarta los mensajes si la cola está llena;
+                'block' espera a que haya sitio
+        """
+        if overflow not in ('drop', 'block'):
+            raise ValueError(f"Política de desbordamiento no válida: {overflow}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Sin formatear aquí (QueueHandler.prepare llama a format)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener que espera sitio en la cola para la marca de parada
+
+    QueueListener.stop() la encola con put_nowait, que falla con la cola
+    llena (lo normal con la política 'drop'); aquí se espera a que el hilo
+    vacíe la cola para no perder los mensajes pendientes.
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def setup_logging(level: str = 'INFO', log_file: str = None, queued: bool = False,
+                  queue_size: int = DEFAULT_QUEUE_SIZE, overflow: str = 'drop',
+                  json_format: bool = False,
+                  debug_rate: Optional[Tuple[int, float]] = None) -> logging.Logger:
     """
     Configura el sistema de logging
-    
+
     Args:
         level: Nivel de logging ('DEBUG', 'INFO', 'WARNING', 'ERROR')
         log_file: Ruta al archivo de log (opcional)
-        
+        queued: Formatear y escribir en un hilo en segundo plano; las
+            llamadas al logger solo encolan el registro
+        queue_size: Tamaño máximo de la cola (modo con cola)
+        overflow: Con la cola llena, 'drop' descarta y 'block' espera
+        json_format: Escribir cada registro como una línea JSON
+        debug_rate: (registros, segundos) admitidos por línea de código en
+            nivel DEBUG, ej: (10, 1.0); None no limita
+
     Returns:
         logging.Logger: Logger configurado
     """
+    global _listener
+
     # Crear logger principal
     logger = logging.getLogger('odoo_api')
     logger.setLevel(getattr(logging, level.upper()))
-    
+
     # Evitar duplicar handlers
     if logger.handlers:
         return logger
-    
+
     # Formato de logs
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
+    if json_format:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+
+    handlers = []
+
     # Handler para consola
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
+    handlers.append(console_handler)
+
     # Handler para archivo (si se especifica)
     if log_file:
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
-        
+
         file_handler = logging.handlers.RotatingFileHandler(
             log_path,
             maxBytes=10*1024*1024,  # 10MB
@@ -48,17 +197,68 @@ def setup_logging(level: str = 'INFO', log_file: str = None) -> logging.Logger:
         )
         file_handler.setLevel(getattr(logging, level.upper()))
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    
+        handlers.append(file_handler)
+
+    rate_filter = RateLimitFilter(*debug_rate) if debug_rate else None
+
+    if queued:
+        # Los handlers reales los atiende el listener en su propio hilo
+        queue_handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size), overflow)
+        if rate_filter:
+            queue_handler.addFilter(rate_filter)
+        _listener = DrainingQueueListener(
+            queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+        logger.addHandler(queue_handler)
+    else:
+        for handler in handlers:
+            if rate_filter:
+                handler.addFilter(rate_filter)
+            logger.addHandler(handler)
+
     return logger
 
+def shutdown_logging():
+    """
+    Vacía la cola del modo con cola y detiene su hilo
+
+    Se registra con atexit; llamarla antes permite asegurar que los
+    mensajes pendientes se escriben (ej: antes de os._exit o un fork).
+    """
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+
+    # Desconectar antes de parar: con 'block' nadie debe esperar en una cola sin lector
+    logger = logging.getLogger('odoo_api')
+    queue_handlers = [handler for handler in logger.handlers
+                      if isinstance(handler, BoundedQueueHandler)]
+    for handler in queue_handlers:
+        logger.removeHandler(handler)
+    listener.stop()
+
+    for handler in queue_handlers:
+        if handler.dropped:
+            record = logger.makeRecord(
+                logger.name, logging.WARNING, __file__, 0,
+                f"{handler.dropped} mensajes de log descartados (cola llena)",
+                None, None)
+            for target in listener.handlers:
+                target.handle(record)
+    # El logger vuelve a escribir directamente en los handlers
+    for handler in listener.handlers:
+        logger.addHandler(handler)
+
 def get_logger(name: str) -> logging.Logger:
     """
     Obtiene un logger hijo
-    
+
     Args:
         name: Nombre del logger
-        
+
     Returns:
         logging.Logger: Logger hijo
     """
@@ -0,0 +1,269 @@
+"""
+Trazas por spans y perfilado con cProfile
+
+Los spans se guardan en el formato de eventos de Chrome (Trace Event
+Format), que se abre directamente en chrome://tracing, Perfetto
+(https://ui.perfetto.dev) o speedscope.
+"""
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# Eventos máximos en memoria (los siguientes se descartan y se cuentan)
+DEFAULT_MAX_EVENTS = 500_000
+
+
+class Tracer:
+    """Registro de spans seguro entre hilos con muestreo por traza"""
+
+    def __init__(self, path: Optional[str] = None, sample_rate: float = 1.0,
+                 profile_dir: Optional[str] = None,
+                 max_events: int = DEFAULT_MAX_EVENTS,
+                 process_name: Optional[str] = None):
+        """
+        Inicializar tracer
+
+        Args:
+            path: Archivo de traza escrito por write() (JSON de Chrome)
+            sample_rate: Fracción de trazas registradas (0.0 - 1.0); se decide
+                en el span raíz y los spans anidados heredan la decisión
+            profile_dir: Directorio de los .prof generados por profile()
+                (None desactiva cProfile; el span se registra igualmente)
+            max_events: Límite de eventos en memoria
+            process_name: Nombre del proceso en el visor
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"sample_rate debe estar entre 0 y 1: {sample_rate}")
+        self.path = Path(path) if path else None
+        self.sample_rate = sample_rate
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.max_events = max_events
+        self.process_name = process_name
+        self.dropped = 0
+        self._profiles = 0
+        self._events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # perf_counter es monótono pero sin origen: se ancla a la hora real
+        # para que los spans de otros procesos (add_span) queden alineados
+        self._epoch_offset = time.time() - time.perf_counter()
+
+    # ------------------------------------------------------------------
+    # Spans
+    # ------------------------------------------------------------------
+    @contextmanager
+    def span(self, name: str, cat: str = 'app', **args):
+        """
+        Mide un bloque como un span
+
+        Uso:
+            with tracer.span('serialize', cat='rpc', model='res.partner') as span_args:
+                body = json.dumps(payload)
+                span_args['bytes'] = len(body)
+
+        Args:
+            name: Nombre del span
+            cat: Categoría (permite filtrar en el visor)
+            **args: Atributos mostrados en el detalle del span
+
+        Yields:
+            Dict: Atributos del span (se pueden completar dentro del bloque)
+        """
+        state = self._state()
+        if state.depth == 0:
+            state.sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        state.depth += 1
+        started = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            state.depth -= 1
+            if state.sampled:
+                self._append({
+                    'name': name, 'cat': cat, 'ph': 'X',
+                    'ts': self._micros(started + self._epoch_offset),
+                    'dur': self._micros(duration),
+                    'pid': os.getpid(), 'tid': threading.get_ident(),
+                    'args': args,
+                })
+
+    def add_span(self, name: str, started_at: float, seconds: float, cat: str = 'app',
+                 pid: Optional[int] = None, tid: Optional[int] = None, **args):
+        """
+        Registra un span medido en otro lugar (ej: un proceso del pool)
+
+        Args:
+            name: Nombre del span
+            started_at: Inicio como time.time()
+            seconds: Duración
+            cat: Categoría
+            pid: Proceso que lo ejecutó (por defecto, el actual)
+            tid: Hilo que lo ejecutó (por defecto, el pid)
+            **args: Atributos del span
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        pid = pid or os.getpid()
+        self._append({
+            'name': name, 'cat': cat, 'ph': 'X',
+            'ts': self._micros(started_at), 'dur': self._micros(seconds),
+            'pid': pid, 'tid': tid or pid, 'args': args,
+        })
+
+    def instant(self, name: str, cat: str = 'app', **args):
+        """Registra un evento puntual (ej: un reintento o un fallback)"""
+        state = self._state()
+        if state.depth and not state.sampled:
+            return
+        self._append({
+            'name': name, 'cat': cat, 'ph': 'i', 's': 't',
+            'ts': self._micros(time.time()),
+            'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args,
+        })
+
+    # ------------------------------------------------------------------
+    # Perfilado
+    # ------------------------------------------------------------------
+    @contextmanager
+    def profile(self, name: str, cat: str = 'cpu', **args):
+        """
+        Span con cProfile para etapas limitadas por CPU
+
+        Con profile_dir configurado, guarda '<profile_dir>/<name>-<pid>-<n>.prof'
+        (abrir con snakeviz o pstats) y añade la ruta a los atributos del
+        span. Un perfil anidado en el mismo hilo solo registra el span.
+
+        Args:
+            name: Nombre del span y del archivo .prof
+            cat: Categoría del span
+            **args: Atributos del span
+        """
+        state = self._state()
+        profiler = None
+        if self.profile_dir is not None and not state.profiling:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Otro perfilador activo en el proceso (ej: sys.monitoring)
+                profiler = None
+
+        with self.span(name, cat=cat, **args) as span_args:
+            if profiler is None:
+                yield span_args
+                return
+            state.profiling = True
+            try:
+                yield span_args
+            finally:
+                profiler.disable()
+                state.profiling = False
+                path = self.profile_path(name)
+                profiler.dump_stats(str(path))
+                span_args['profile'] = str(path)
+
+    def profile_path(self, name: str) -> Optional[Path]:
+        """
+        Ruta para el .prof de una etapa (None si el perfilado está desactivado)
+
+        Permite que código ejecutado en otros procesos genere su propio perfil.
+        """
+        if self.profile_dir is None:
+            return None
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        safe_name = re.sub(r'[^\w.-]+', '_', name)
+        with self._lock:
+            self._profiles += 1
+            number = self._profiles
+        return self.profile_dir / f"{safe_name}-{os.getpid()}-{number}.prof"
+
+    # ------------------------------------------------------------------
+    # Exportación
+    # ------------------------------------------------------------------
+    def events(self) -> List[Dict[str, Any]]:
+        """Copia de los eventos registrados"""
+        with self._lock:
+            return list(self._events)
+
+    def clear(self):
+        """Descarta los eventos registrados"""
+        with self._lock:
+            self._events.clear()
+            self.dropped = 0
+
+    def write(self, path: Optional[str] = None) -> Path:
+        """
+        Escribe la traza en formato JSON de Chrome de forma atómica
+
+        Args:
+            path: Archivo destino (por defecto, el indicado al crear el tracer)
+
+        Returns:
+            Path: Archivo escrito
+        """
+        path = Path(path) if path else self.path
+        if path is None:
+            raise ValueError("No se indicó el archivo de traza")
+        events = self.events()
+        metadata = []
+        if self.process_name:
+            metadata.append({'name': 'process_name', 'ph': 'M', 'pid': os.getpid(),
+                             'tid': 0, 'args': {'name': self.process_name}})
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for tid in sorted({event['tid'] for event in events
+                           if event['pid'] == os.getpid()}):
+            if tid in thread_names:
+                metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(),
+                                 'tid': tid, 'args': {'name': thread_names[tid]}})
+
+        trace = {
+            'traceEvents': metadata + events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'sample_rate': self.sample_rate, 'dropped_events': self.dropped},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, default=str)
+        os.replace(tmp_path, path)
+        return path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.path is not None:
+            self.write()
+
+    # ------------------------------------------------------------------
+    # Utilidades
+    # ------------------------------------------------------------------
+    def _state(self):
+        state = self._local
+        if not hasattr(state, 'depth'):
+            state.depth = 0
+            state.sampled = True
+            state.profiling = False
+        return state
+
+    def _append(self, event: Dict[str, Any]):
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                return
+            self._events.append(event)
+
+    @staticmethod
+    def _micros(seconds: float) -> float:
+        return round(seconds * 1_000_000, 3)
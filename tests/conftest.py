@@ -0,0 +1,50 @@
+"""
+Configuración común de pytest: agrega src al path como los scripts y
+ofrece un PostgreSQL temporal para las pruebas de la réplica y un
+planificador que anota los turnos concedidos
+"""
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent / 'src'))
+
+from odoo_api import scheduler as scheduler_module  # noqa: E402
+from odoo_api.scheduler import PriorityScheduler  # noqa: E402
+
+
+class RecordingScheduler(PriorityScheduler):
+    """Planificador que anota (prioridad, trabajo, hilo) de cada turno concedido"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dispatched = []
+
+    @contextmanager
+    def slot(self, priority=None, job=None):
+        with super().slot(priority, job):
+            self.dispatched.append(scheduler_module._current.get()
+                                   + (threading.current_thread().name,))
+            yield
+
+
+@pytest.fixture
+def recording_scheduler() -> RecordingScheduler:
+    """Planificador con registro de turnos (4 llamadas simultáneas)"""
+    return RecordingScheduler(max_concurrency=4)
+
+
+@pytest.fixture(scope='session')
+def pg_server(tmp_path_factory):
+    """PostgreSQL temporal de la sesión de pruebas (requiere pgserver)"""
+    pgserver = pytest.importorskip('pgserver')
+    return pgserver.get_server(tmp_path_factory.mktemp('pgdata'), cleanup_mode='stop')
+
+
+@pytest.fixture(scope='session')
+def pg_socket_dir(pg_server) -> str:
+    """Directorio del socket del PostgreSQL temporal (usar como host)"""
+    return pg_server.get_uri().split('host=')[1]
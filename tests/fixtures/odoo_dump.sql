@@ -0,0 +1,416 @@
+--
+-- PostgreSQL database dump
+--
+
+-- Dumped from database version 16.2
+-- Dumped by pg_dump version 16.2
+
+SET statement_timeout = 0;
+SET lock_timeout = 0;
+SET idle_in_transaction_session_timeout = 0;
+SET client_encoding = 'UTF8';
+SET standard_conforming_strings = on;
+SELECT pg_catalog.set_config('search_path', '', false);
+SET check_function_bodies = false;
+SET xmloption = content;
+SET client_min_messages = warning;
+SET row_security = off;
+
+--
+-- Name: ir_sequence_001; Type: SEQUENCE; Schema: public; Owner: odoo
+--
+
+CREATE SEQUENCE public.ir_sequence_001
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER SEQUENCE public.ir_sequence_001 OWNER TO odoo;
+
+SET default_tablespace = '';
+
+SET default_table_access_method = heap;
+
+--
+-- Name: mail_followers; Type: TABLE; Schema: public; Owner: odoo
+--
+
+CREATE TABLE public.mail_followers (
+    id integer NOT NULL,
+    message_id integer,
+    partner_id integer
+);
+
+
+ALTER TABLE public.mail_followers OWNER TO odoo;
+
+--
+-- Name: mail_followers_id_seq; Type: SEQUENCE; Schema: public; Owner: odoo
+--
+
+CREATE SEQUENCE public.mail_followers_id_seq
+    AS integer
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER SEQUENCE public.mail_followers_id_seq OWNER TO odoo;
+
+--
+-- Name: mail_followers_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: odoo
+--
+
+ALTER SEQUENCE public.mail_followers_id_seq OWNED BY public.mail_followers.id;
+
+
+--
+-- Name: mail_message; Type: TABLE; Schema: public; Owner: odoo
+--
+
+CREATE TABLE public.mail_message (
+    id integer NOT NULL,
+    author_id integer,
+    body text
+);
+
+
+ALTER TABLE public.mail_message OWNER TO odoo;
+
+--
+-- Name: TABLE mail_message; Type: COMMENT; Schema: public; Owner: odoo
+--
+
+COMMENT ON TABLE public.mail_message IS 'Mensajes';
+
+
+--
+-- Name: mail_message_id_seq; Type: SEQUENCE; Schema: public; Owner: odoo
+--
+
+CREATE SEQUENCE public.mail_message_id_seq
+    AS integer
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER SEQUENCE public.mail_message_id_seq OWNER TO odoo;
+
+--
+-- Name: mail_message_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: odoo
+--
+
+ALTER SEQUENCE public.mail_message_id_seq OWNED BY public.mail_message.id;
+
+
+--
+-- Name: res_partner; Type: TABLE; Schema: public; Owner: odoo
+--
+
+CREATE TABLE public.res_partner (
+    id integer NOT NULL,
+    name character varying NOT NULL,
+    parent_id integer,
+    email character varying
+);
+
+
+ALTER TABLE public.res_partner OWNER TO odoo;
+
+--
+-- Name: COLUMN res_partner.name; Type: COMMENT; Schema: public; Owner: odoo
+--
+
+COMMENT ON COLUMN public.res_partner.name IS 'Nombre';
+
+
+--
+-- Name: partner_message_count; Type: VIEW; Schema: public; Owner: odoo
+--
+
+CREATE VIEW public.partner_message_count AS
+ SELECT p.id,
+    count(m.id) AS messages
+   FROM (public.res_partner p
+     LEFT JOIN public.mail_message m ON ((m.author_id = p.id)))
+  GROUP BY p.id;
+
+
+ALTER VIEW public.partner_message_count OWNER TO odoo;
+
+--
+-- Name: res_partner_id_seq; Type: SEQUENCE; Schema: public; Owner: odoo
+--
+
+CREATE SEQUENCE public.res_partner_id_seq
+    AS integer
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER SEQUENCE public.res_partner_id_seq OWNER TO odoo;
+
+--
+-- Name: res_partner_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: odoo
+--
+
+ALTER SEQUENCE public.res_partner_id_seq OWNED BY public.res_partner.id;
+
+
+--
+-- Name: res_users; Type: TABLE; Schema: public; Owner: odoo
+--
+
+CREATE TABLE public.res_users (
+    id integer NOT NULL,
+    login character varying NOT NULL,
+    partner_id integer NOT NULL
+);
+
+
+ALTER TABLE public.res_users OWNER TO odoo;
+
+--
+-- Name: res_users_id_seq; Type: SEQUENCE; Schema: public; Owner: odoo
+--
+
+CREATE SEQUENCE public.res_users_id_seq
+    AS integer
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER SEQUENCE public.res_users_id_seq OWNER TO odoo;
+
+--
+-- Name: res_users_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: odoo
+--
+
+ALTER SEQUENCE public.res_users_id_seq OWNED BY public.res_users.id;
+
+
+--
+-- Name: mail_followers id; Type: DEFAULT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.mail_followers ALTER COLUMN id SET DEFAULT nextval('public.mail_followers_id_seq'::regclass);
+
+
+--
+-- Name: mail_message id; Type: DEFAULT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.mail_message ALTER COLUMN id SET DEFAULT nextval('public.mail_message_id_seq'::regclass);
+
+
+--
+-- Name: res_partner id; Type: DEFAULT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.res_partner ALTER COLUMN id SET DEFAULT nextval('public.res_partner_id_seq'::regclass);
+
+
+--
+-- Name: res_users id; Type: DEFAULT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.res_users ALTER COLUMN id SET DEFAULT nextval('public.res_users_id_seq'::regclass);
+
+
+--
+-- Data for Name: mail_followers; Type: TABLE DATA; Schema: public; Owner: odoo
+--
+
+COPY public.mail_followers (id, message_id, partner_id) FROM stdin;
+1	1	2
+2	2	3
+\.
+
+
+--
+-- Data for Name: mail_message; Type: TABLE DATA; Schema: public; Owner: odoo
+--
+
+COPY public.mail_message (id, author_id, body) FROM stdin;
+1	1	<p>Hola</p>
+2	2	línea 1\nlínea 2
+3	\N	\\.
+\.
+
+
+--
+-- Data for Name: res_partner; Type: TABLE DATA; Schema: public; Owner: odoo
+--
+
+COPY public.res_partner (id, name, parent_id, email) FROM stdin;
+1	Insco	\N	info@insco.mx
+4	Tab\ty \\ barra	\N	x@y.z
+2	Ana	1	ana@insco.mx
+3	Luis	1	\N
+\.
+
+
+--
+-- Data for Name: res_users; Type: TABLE DATA; Schema: public; Owner: odoo
+--
+
+COPY public.res_users (id, login, partner_id) FROM stdin;
+1	admin	1
+2	ana	2
+\.
+
+
+--
+-- Name: ir_sequence_001; Type: SEQUENCE SET; Schema: public; Owner: odoo
+--
+
+SELECT pg_catalog.setval('public.ir_sequence_001', 41, true);
+
+
+--
+-- Name: mail_followers_id_seq; Type: SEQUENCE SET; Schema: public; Owner: odoo
+--
+
+SELECT pg_catalog.setval('public.mail_followers_id_seq', 2, true);
+
+
+--
+-- Name: mail_message_id_seq; Type: SEQUENCE SET; Schema: public; Owner: odoo
+--
+
+SELECT pg_catalog.setval('public.mail_message_id_seq', 3, true);
+
+
+--
+-- Name: res_partner_id_seq; Type: SEQUENCE SET; Schema: public; Owner: odoo
+--
+
+SELECT pg_catalog.setval('public.res_partner_id_seq', 4, true);
+
+
+--
+-- Name: res_users_id_seq; Type: SEQUENCE SET; Schema: public; Owner: odoo
+--
+
+SELECT pg_catalog.setval('public.res_users_id_seq', 2, true);
+
+
+--
+-- Name: mail_followers mail_followers_pkey; Type: CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.mail_followers
+    ADD CONSTRAINT mail_followers_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: mail_message mail_message_pkey; Type: CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.mail_message
+    ADD CONSTRAINT mail_message_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: res_partner res_partner_pkey; Type: CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.res_partner
+    ADD CONSTRAINT res_partner_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: res_users res_users_login_key; Type: CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.res_users
+    ADD CONSTRAINT res_users_login_key UNIQUE (login);
+
+
+--
+-- Name: res_users res_users_pkey; Type: CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.res_users
+    ADD CONSTRAINT res_users_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: mail_message_author_id_index; Type: INDEX; Schema: public; Owner: odoo
+--
+
+CREATE INDEX mail_message_author_id_index ON public.mail_message USING btree (author_id);
+
+
+--
+-- Name: res_partner_name_index; Type: INDEX; Schema: public; Owner: odoo
+--
+
+CREATE INDEX res_partner_name_index ON public.res_partner USING btree (name);
+
+
+--
+-- Name: mail_followers mail_followers_message_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.mail_followers
+    ADD CONSTRAINT mail_followers_message_id_fkey FOREIGN KEY (message_id) REFERENCES public.mail_message(id) ON DELETE CASCADE;
+
+
+--
+-- Name: mail_followers mail_followers_partner_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.mail_followers
+    ADD CONSTRAINT mail_followers_partner_id_fkey FOREIGN KEY (partner_id) REFERENCES public.res_partner(id);
+
+
+--
+-- Name: mail_message mail_message_author_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.mail_message
+    ADD CONSTRAINT mail_message_author_id_fkey FOREIGN KEY (author_id) REFERENCES public.res_partner(id);
+
+
+--
+-- Name: res_partner res_partner_parent_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.res_partner
+    ADD CONSTRAINT res_partner_parent_id_fkey FOREIGN KEY (parent_id) REFERENCES public.res_partner(id);
+
+
+--
+-- Name: res_users res_users_partner_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: odoo
+--
+
+ALTER TABLE ONLY public.res_users
+    ADD CONSTRAINT res_users_partner_id_fkey FOREIGN KEY (partner_id) REFERENCES public.res_partner(id);
+
+
+--
+-- Name: SCHEMA public; Type: ACL; Schema: -; Owner: pg_database_owner
+--
+
+GRANT ALL ON SCHEMA public TO odoo;
+
+
+--
+-- PostgreSQL database dump complete
+--
+
@@ -0,0 +1,70 @@
+"""
+Pruebas de la transferencia de adjuntos en streaming con el planificador
+"""
+import base64
+import hashlib
+import threading
+
+import pytest
+
+from odoo_api.connection import OdooConnection
+from odoo_api.mock_server import MockOdooServer
+
+
+@pytest.fixture
+def connection(recording_scheduler):
+    with MockOdooServer(datasets={'ir.attachment': 6}, binary_size=4096) as server:
+        connection = OdooConnection(server.url, server.db, 'tests', server.api_key,
+                                    scheduler=recording_scheduler)
+        assert connection.authenticate()
+        yield connection
+        connection.close()
+
+
+def test_download_attachments_keep_caller_priority(connection, tmp_path):
+    ids = connection.execute_kw('ir.attachment', 'search', [[]])
+    stored = connection.execute_kw('ir.attachment', 'read', [ids], {'fields': ['datas']})
+    scheduler = connection.scheduler
+    scheduler.dispatched.clear()
+    with connection.priority('bulk', job='sync-adjuntos'):
+        results = connection.download_attachments(ids, str(tmp_path), max_workers=3)
+
+    assert len(results) == len(ids) and not [r for r in results if 'error' in r]
+    for record, result in zip(stored, results):
+        with open(result['path'], 'rb') as f:
+            assert f.read() == base64.b64decode(record['datas'])
+
+    # Lectura de metadatos y una descarga en streaming por adjunto
+    assert len(scheduler.dispatched) == 1 + len(ids)
+    assert {call[:2] for call in scheduler.dispatched} == {('bulk', 'sync-adjuntos')}
+    assert {call[2] for call in scheduler.dispatched} - {threading.current_thread().name}
+
+
+def test_upload_attachments_keep_caller_priority(connection, tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f'adjunto_{index}.bin'
+        path.write_bytes(bytes([index]) * 10_000)
+        paths.append(str(path))
+    scheduler = connection.scheduler
+    scheduler.dispatched.clear()
+    with connection.priority('bulk', job='carga-adjuntos'):
+        results = connection.upload_attachments(paths, max_workers=3)
+
+    assert [result['checksum'] for result in results] == [
+        hashlib.sha1(bytes([index]) * 10_000).hexdigest() for index in range(3)]
+    # El create en streaming y la verificación posterior de cada archivo
+    assert len(scheduler.dispatched) == 2 * len(paths)
+    assert {call[:2] for call in scheduler.dispatched} == {('bulk', 'carga-adjuntos')}
+
+
+def test_streaming_download_waits_for_its_turn(connection, tmp_path):
+    attachment_id = connection.execute_kw('ir.attachment', 'search', [[]], {'limit': 1})[0]
+    scheduler = connection.scheduler
+    scheduler.dispatched.clear()
+    with connection.priority('interactive'):
+        connection.download_binary('ir.attachment', attachment_id, 'datas',
+                                   str(tmp_path / 'adjunto.bin'))
+
+    assert [call[:2] for call in scheduler.dispatched] == [('interactive', None)]
+    assert scheduler.stats()['in_flight'] == 0
@@ -0,0 +1,138 @@
+"""
+Pruebas de los cassettes: grabar contra el servidor simulado, reproducir
+sin red con los mismos resultados y fallar con claridad ante peticiones
+que no están grabadas
+"""
+import json
+
+import pytest
+
+from odoo_api.cassette import CassetteMiss, REDACTED, read_cassette, recorded_calls
+from odoo_api.connection import OdooConnection
+from odoo_api.mock_server import MockOdooServer
+
+FIELDS = ['name', 'email', 'credit_limit']
+
+
+def workload(connection: OdooConnection) -> dict:
+    """Lecturas, una escritura y la misma lectura antes y después de ella"""
+    assert connection.authenticate()
+    results = {
+        'before': connection.execute_kw('res.partner', 'search_count', [[]]),
+        'partners': connection.search_read('res.partner', [], FIELDS, limit=25),
+        'fields': connection.execute_kw('res.partner', 'fields_get', [],
+                                        {'attributes': ['type']}),
+    }
+    results['created'] = connection.create('res.partner', {'name': 'Cassette S.L.'})
+    results['after'] = connection.execute_kw('res.partner', 'search_count', [[]])
+    return results
+
+
+@pytest.fixture
+def server():
+    with MockOdooServer(datasets={'res.partner': 40}) as server:
+        yield server
+
+
+@pytest.fixture
+def recorded(server, tmp_path):
+    """Cassette grabado de workload() y los resultados obtenidos del servidor"""
+    path = tmp_path / 'cassettes' / 'partners.jsonl'
+    connection = OdooConnection(server.url, server.db, 'tests', server.api_key)
+    with connection.recording(str(path), compress_threshold=1024) as recorder:
+        results = workload(connection)
+    assert recorder.count == 6
+    return path, results
+
+
+def test_recording_returns_server_responses(server, recorded):
+    path, results = recorded
+    assert results['after'] == results['before'] + 1
+    assert len(results['partners']) == 25
+
+    header, interactions = read_cassette(str(path))
+    assert header['url'] == server.url and header['db'] == server.db
+    assert [interaction['seq'] for interaction in interactions] == list(range(6))
+    assert {interaction['status'] for interaction in interactions} == {200}
+    # Las respuestas grandes se guardan comprimidas
+    assert {interaction['response']['encoding'] for interaction in interactions} >= {
+        'utf-8', 'gzip+base64'}
+
+
+def test_recording_hides_the_api_key(server, recorded):
+    path, _ = recorded
+    assert server.api_key not in path.read_text()
+    calls = recorded_calls(str(path))
+    assert calls[0][:2] == ('common', 'authenticate')
+    assert all(args[2] == REDACTED for _, _, args in calls)
+
+
+def test_replay_returns_recorded_results_without_server(server, recorded):
+    path, results = recorded
+    server.stop()
+
+    replay = OdooConnection.from_cassette(str(path))
+    assert replay.api_key == 'replay'
+    assert workload(replay) == results
+    assert replay.transport.remaining == 0
+    replay.close()
+
+
+def test_replay_serves_repeated_requests_in_recorded_order(recorded):
+    path, results = recorded
+    replay = OdooConnection.from_cassette(str(path))
+    assert replay.authenticate()
+    # La misma petición antes y después de la escritura tiene dos respuestas
+    assert replay.execute_kw('res.partner', 'search_count', [[]]) == results['before']
+    assert replay.execute_kw('res.partner', 'search_count', [[]]) == results['after']
+
+
+def test_replay_ignores_the_jsonrpc_id(recorded):
+    path, results = recorded
+    replay = OdooConnection.from_cassette(str(path))
+    assert replay.authenticate()
+    payload = replay._jsonrpc_payload('object', 'execute_kw', replay._execute_kw_args(
+        'res.partner', 'search_count', [[]]))
+    payload['id'] = 99
+    response = replay.transport.post(replay.jsonrpc_url, data=json.dumps(payload))
+    assert response.json()['result'] == results['before']
+
+
+def test_unmatched_request_raises_clear_error(recorded):
+    path, _ = recorded
+    replay = OdooConnection.from_cassette(str(path), retries=3)
+    assert replay.authenticate()
+
+    with pytest.raises(CassetteMiss) as error:
+        replay.search_read('res.partner', [('is_company', '=', True)], FIELDS)
+    message = str(error.value)
+    assert str(path) in message
+    assert 'res.partner.search_read' in message
+    # El fallo no consume interacciones ni se reintenta
+    assert replay.transport.served == 1
+
+
+def test_exhausted_request_raises_clear_error(recorded):
+    path, _ = recorded
+    replay = OdooConnection.from_cassette(str(path))
+    assert replay.authenticate()
+    replay.create('res.partner', {'name': 'Cassette S.L.'})
+
+    with pytest.raises(CassetteMiss, match='res.partner.create'):
+        replay.create('res.partner', {'name': 'Cassette S.L.'})
+
+
+def test_non_strict_replay_falls_back_to_recorded_order(recorded):
+    path, results = recorded
+    replay = OdooConnection.from_cassette(str(path), strict=False)
+    assert replay.authenticate()
+    # Sin coincidencia exacta responde con la siguiente interacción pendiente
+    assert replay.search_read('res.partner', [('is_company', '=', True)]) == results['before']
+    assert replay.transport.remaining == 4
+
+
+def test_invalid_cassette_is_rejected(tmp_path):
+    path = tmp_path / 'otro.jsonl'
+    path.write_text(json.dumps({'jsonrpc': '2.0'}) + '\n')
+    with pytest.raises(ValueError, match='no es un cassette'):
+        OdooConnection.from_cassette(str(path))
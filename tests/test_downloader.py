@@ -0,0 +1,122 @@
+"""
+Pruebas de RangedDownloader contra el servidor de descargas simulado
+"""
+import hashlib
+import json
+import os
+
+import pytest
+import requests
+
+from database.downloader import DownloadError, RangedDownloader
+from database.mock_download_server import MockDownloadServer
+
+SEGMENT = 8 * 1024
+CONTENT = os.urandom(8 * SEGMENT + 123)
+
+
+def make_downloader(**kwargs):
+    return RangedDownloader(connections=1, segment_size=SEGMENT, buffer_size=1024,
+                            timeout=(5, 5), **kwargs)
+
+
+def segment_requests(server):
+    """Peticiones Range de segmentos (sin la sonda de un byte)"""
+    return [request for request in server.requests if request[0] != 'bytes=0-0']
+
+
+def test_download_in_parallel_segments(tmp_path):
+    with MockDownloadServer(CONTENT) as server:
+        result = RangedDownloader(connections=4, segment_size=SEGMENT).download(
+            server.url, tmp_path / 'backup.zip',
+            expected_sha256=hashlib.sha256(CONTENT).hexdigest())
+
+    assert (tmp_path / 'backup.zip').read_bytes() == CONTENT
+    assert result['size'] == len(CONTENT)
+    assert not result['resumed']
+    assert {status for _, _, status in segment_requests(server)} == {206}
+    assert not (tmp_path / 'backup.zip.part').exists()
+    assert not (tmp_path / 'backup.zip.part.json').exists()
+
+
+def test_download_without_range_support(tmp_path):
+    with MockDownloadServer(CONTENT, ranges=False) as server:
+        result = make_downloader().download(server.url, tmp_path / 'backup.zip')
+
+    assert (tmp_path / 'backup.zip').read_bytes() == CONTENT
+    assert result['sha256'] == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_resume_after_interruption(tmp_path):
+    def cut_third_segment(server, number):
+        # Petición 1: sonda; 2 y 3: segmentos 0 y 1; 4: segmento 2 (cortado)
+        if number == 4:
+            server.interruptions = 1
+
+    dest = tmp_path / 'backup.zip'
+    with MockDownloadServer(CONTENT, interrupt_after=100,
+                            on_request=cut_third_segment) as server:
+        with pytest.raises(requests.exceptions.RequestException):
+            make_downloader(retries=1).download(server.url, dest)
+        assert not dest.exists()
+        state = json.loads((tmp_path / 'backup.zip.part.json').read_text())
+        assert 2 not in state['done'] and {0, 1} <= set(state['done'])
+
+        server.requests.clear()
+        server.on_request = None
+        result = make_downloader().download(server.url, dest)
+
+    assert result['resumed']
+    assert dest.read_bytes() == CONTENT
+    # Solo se piden los segmentos que faltaban
+    missing = [index for index in range(9) if index not in state['done']]
+    assert [request[0] for request in segment_requests(server)] == [
+        f"bytes={index * SEGMENT}-{min((index + 1) * SEGMENT, len(CONTENT)) - 1}"
+        for index in missing]
+
+
+def test_interrupted_segment_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr('database.downloader.time.sleep', lambda seconds: None)
+    with MockDownloadServer(CONTENT, interrupt_after=100, interruptions=1) as server:
+        make_downloader(retries=2).download(server.url, tmp_path / 'backup.zip')
+
+    assert (tmp_path / 'backup.zip').read_bytes() == CONTENT
+    assert len(segment_requests(server)) == 10
+
+
+def test_etag_change_mid_download(tmp_path):
+    new_content = os.urandom(len(CONTENT) + SEGMENT)
+
+    def change_file(server, number):
+        if number == 4:
+            server.replace(new_content)
+
+    dest = tmp_path / 'backup.zip'
+    with MockDownloadServer(CONTENT, on_request=change_file) as server:
+        with pytest.raises(DownloadError, match='cambió'):
+            make_downloader().download(server.url, dest)
+        # El servidor ignoró el Range porque el If-Range ya no coincidía
+        assert segment_requests(server)[-1][2] == 200
+
+        server.on_request = None
+        result = make_downloader().download(server.url, dest)
+
+    assert not result['resumed']
+    assert dest.read_bytes() == new_content
+    assert result['etag'] == f'"{hashlib.md5(new_content).hexdigest()}"'
+
+
+def test_checksum_mismatch(tmp_path):
+    with MockDownloadServer(CONTENT) as server:
+        with pytest.raises(DownloadError, match='SHA256'):
+            make_downloader().download(server.url, tmp_path / 'backup.zip',
+                                       expected_sha256=hashlib.sha256(b'otro').hexdigest())
+    assert not (tmp_path / 'backup.zip').exists()
+
+
+def test_etag_md5_mismatch(tmp_path):
+    wrong_etag = f'"{hashlib.md5(b"otro").hexdigest()}"'
+    with MockDownloadServer(CONTENT, etag=wrong_etag) as server:
+        with pytest.raises(DownloadError, match='MD5'):
+            make_downloader().download(server.url, tmp_path / 'backup.zip')
+    assert not (tmp_path / 'backup.zip').exists()
@@ -0,0 +1,183 @@
+"""
+Pruebas del filtrado de dumps planos (filter_dump y TableFilter.keep) y de
+la restauración parcial de odoo_backup_restore.py con ON_ERROR_STOP sobre un
+dump real de pg_dump (requiere pgserver para las restauraciones)
+"""
+import importlib.util
+import os
+import subprocess
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from database.dump_parser import TableFilter, filter_dump, scan_dump
+
+ROOT = Path(__file__).parent.parent
+# pg_dump 16 de un esquema tipo Odoo: tablas con secuencias serial, índices,
+# FKs (también hacia tablas excluidas), una vista, comentarios, propietario
+# 'odoo' y datos COPY con tabuladores, barras y una fila '\.'
+DUMP = Path(__file__).parent / 'fixtures' / 'odoo_dump.sql'
+MAIL_TABLES = {'mail_message', 'mail_followers'}
+
+
+def filtered(table_filter: TableFilter) -> str:
+    with open(DUMP, 'rb') as f:
+        return b''.join(filter_dump(f, table_filter)).decode()
+
+
+def test_excluded_tables_lose_ddl_and_data():
+    table_filter = TableFilter(exclude=['mail_*'])
+    sql = filtered(table_filter)
+
+    for table in MAIL_TABLES:
+        assert f'CREATE TABLE public.{table}' not in sql
+        assert f'COPY public.{table}' not in sql
+        assert f'ALTER TABLE public.{table} OWNER' not in sql
+        assert f'OWNED BY public.{table}.id' not in sql
+        assert f'ALTER TABLE ONLY public.{table} ALTER COLUMN id' not in sql
+        assert f'{table}_pkey' not in sql
+    assert 'mail_message_author_id_index' not in sql
+    assert "'Mensajes'" not in sql
+    assert '<p>Hola</p>' not in sql
+    # FK desde una tabla conservada... y la vista que consulta mail_message
+    assert 'mail_followers_partner_id_fkey' not in sql
+    assert 'partner_message_count' not in sql
+    assert table_filter.skipped == MAIL_TABLES | {'partner_message_count'}
+
+
+def test_kept_tables_keep_indexes_fks_and_sequences():
+    sql = filtered(TableFilter(exclude=['mail.message', 'mail_followers']))
+
+    for name in ('res_partner_pkey', 'res_users_pkey', 'res_users_login_key',
+                 'res_partner_name_index', 'res_partner_parent_id_fkey',
+                 'res_users_partner_id_fkey', "COMMENT ON COLUMN public.res_partner.name"):
+        assert name in sql
+    assert 'COPY public.res_partner' in sql and 'COPY public.res_users' in sql
+    assert 'Tab\\ty \\\\ barra' in sql
+    # Las secuencias se conservan siempre, también las de tablas excluidas
+    assert 'CREATE SEQUENCE public.mail_message_id_seq' in sql
+    assert "setval('public.mail_message_id_seq'" in sql
+
+
+def test_filter_without_selection_is_identity():
+    assert filtered(TableFilter()).encode() == DUMP.read_bytes()
+
+
+def test_scan_dump_matches_filter():
+    index = scan_dump(str(DUMP), TableFilter(exclude=['mail_*']))
+
+    assert [block.name for block in index.data] == ['res_partner', 'res_users']
+    assert not [entry for entry in index.post_data + index.pre_data
+                if entry.name.split(' ', 1)[0] in MAIL_TABLES]
+
+
+@pytest.fixture(scope='module')
+def psql(pg_server, pg_socket_dir):
+    """Restaura un SQL en una BD nueva con psql -v ON_ERROR_STOP=1 --single-transaction"""
+    pgserver = pytest.importorskip('pgserver')
+    binary = Path(pgserver._commands.POSTGRES_BIN_PATH) / 'psql'
+    # Propietario de los objetos del dump
+    pg_server.psql("DO $$ BEGIN CREATE ROLE odoo; "
+                   "EXCEPTION WHEN duplicate_object THEN NULL; END $$;")
+
+    def _restore(database: str, sql: str) -> subprocess.CompletedProcess:
+        pg_server.psql(f'DROP DATABASE IF EXISTS "{database}";')
+        pg_server.psql(f'CREATE DATABASE "{database}";')
+        return subprocess.run([str(binary), '-q', '-v', 'ON_ERROR_STOP=1', '--single-transaction',
+                               '-h', pg_socket_dir, '-U', 'postgres', '-d', database],
+                              input=sql.encode(), capture_output=True)
+
+    return _restore
+
+
+def query(pg_socket_dir, database: str, sql: str):
+    psycopg2 = pytest.importorskip('psycopg2')
+    with psycopg2.connect(host=pg_socket_dir, user='postgres', dbname=database) as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            rows = cur.fetchall() if cur.description else None
+    conn.close()
+    return rows
+
+
+def schema(pg_socket_dir, database: str) -> dict:
+    """Tablas, índices, FKs y vistas de la BD restaurada"""
+    return {
+        'tables': {row[0] for row in query(pg_socket_dir, database,
+                                           "SELECT tablename FROM pg_tables "
+                                           "WHERE schemaname = 'public'")},
+        'indexes': {row[0] for row in query(pg_socket_dir, database,
+                                            "SELECT indexname FROM pg_indexes "
+                                            "WHERE schemaname = 'public'")},
+        'fks': {row[0] for row in query(pg_socket_dir, database,
+                                        "SELECT conname FROM pg_constraint WHERE contype = 'f'")},
+        'views': {row[0] for row in query(pg_socket_dir, database,
+                                          "SELECT viewname FROM pg_views "
+                                          "WHERE schemaname = 'public'")},
+    }
+
+
+def test_partial_restore_succeeds_under_on_error_stop(psql, pg_socket_dir):
+    result = psql('dump_partial', filtered(TableFilter(exclude=['mail_*'])))
+    assert result.returncode == 0, result.stderr.decode()
+
+    restored = schema(pg_socket_dir, 'dump_partial')
+    assert restored['tables'] == {'res_partner', 'res_users'}
+    assert restored['indexes'] == {'res_partner_pkey', 'res_partner_name_index',
+                                   'res_users_pkey', 'res_users_login_key'}
+    assert restored['fks'] == {'res_partner_parent_id_fkey', 'res_users_partner_id_fkey'}
+    assert restored['views'] == set()
+    assert query(pg_socket_dir, 'dump_partial',
+                 "SELECT name FROM res_partner WHERE id = 4") == [('Tab\ty \\ barra',)]
+    # Las secuencias siguen donde las dejó el dump y los defaults funcionan
+    assert query(pg_socket_dir, 'dump_partial',
+                 "INSERT INTO res_partner (name) VALUES ('Nuevo') RETURNING id") == [(5,)]
+    assert query(pg_socket_dir, 'dump_partial',
+                 "SELECT nextval('ir_sequence_001')") == [(42,)]
+
+
+def test_include_filter_drops_dependent_tables(psql, pg_socket_dir):
+    result = psql('dump_partners', filtered(TableFilter(include=['res.partner'])))
+    assert result.returncode == 0, result.stderr.decode()
+
+    restored = schema(pg_socket_dir, 'dump_partners')
+    assert restored['tables'] == {'res_partner'}
+    assert restored['fks'] == {'res_partner_parent_id_fkey'}
+
+
+def test_full_restore_matches_source(psql, pg_socket_dir):
+    result = psql('dump_full', DUMP.read_text())
+    assert result.returncode == 0, result.stderr.decode()
+
+    restored = schema(pg_socket_dir, 'dump_full')
+    assert restored['tables'] == {'res_partner', 'res_users'} | MAIL_TABLES
+    assert restored['views'] == {'partner_message_count'}
+    assert query(pg_socket_dir, 'dump_full',
+                 "SELECT body FROM mail_message WHERE id = 3") == [('\\.',)]
+
+
+def test_restore_backup_partial_path(psql, pg_server, pg_socket_dir, tmp_path, monkeypatch):
+    pgserver = pytest.importorskip('pgserver')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('PATH', f"{pgserver._commands.POSTGRES_BIN_PATH}{os.pathsep}"
+                               f"{os.environ['PATH']}")
+    spec = importlib.util.spec_from_file_location('odoo_backup_restore',
+                                                  ROOT / 'odoo_backup_restore.py')
+    restore = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(restore)
+    for name, value in {'LOCAL_DB': 'backup_partial', 'PG_USER': 'postgres', 'PG_PASSWORD': '',
+                        'PG_HOST': pg_socket_dir, 'PG_PORT': '5432',
+                        'RESTORE_TABLES': [], 'RESTORE_EXCLUDE_TABLES': ['mail_*']}.items():
+        monkeypatch.setattr(restore, name, value)
+
+    backup = tmp_path / 'backup.zip'
+    with zipfile.ZipFile(backup, 'w') as zf:
+        zf.write(DUMP, 'dump.sql')
+    # Una BD previa con datos: la restauración la recrea desde cero
+    psql('backup_partial', "CREATE TABLE res_partner (id int);")
+    restore.restore_backup(str(backup), include_filestore=False)
+
+    restored = schema(pg_socket_dir, 'backup_partial')
+    assert restored['tables'] == {'res_partner', 'res_users'}
+    assert restored['fks'] == {'res_partner_parent_id_fkey', 'res_users_partner_id_fkey'}
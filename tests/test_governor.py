@@ -0,0 +1,143 @@
+"""
+Pruebas deterministas del token bucket, del ajuste AIMD y de la latencia
+de referencia por tipo de llamada de RequestGovernor
+"""
+import pytest
+import requests
+
+from odoo_api import governor as governor_module
+from odoo_api.governor import AdaptiveConcurrency, RequestGovernor, TokenBucket
+
+FAST = ('res.partner', 'search_read')
+SLOW = ('sale.order', 'read_group')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj falso para monotonic y perf_counter del governor"""
+
+    class Clock:
+        now = 1000.0
+
+        def __call__(self):
+            return self.now
+
+        def advance(self, seconds: float):
+            self.now += seconds
+
+    fake = Clock()
+    monkeypatch.setattr(governor_module.time, 'monotonic', fake)
+    monkeypatch.setattr(governor_module.time, 'perf_counter', fake)
+    monkeypatch.setattr(governor_module.time, 'sleep', fake.advance)
+    return fake
+
+
+def call(governor, clock, seconds: float, key=None):
+    """Una petición que tarda 'seconds' dentro de governor.slot()"""
+    with governor.slot(key):
+        clock.advance(seconds)
+
+
+def overload(status: int = 429, retry_after=None) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return requests.HTTPError(f"{status}", response=response)
+
+
+def test_limit_grows_by_one_per_round(clock):
+    concurrency = AdaptiveConcurrency(initial=4, max_limit=64)
+    for expected in range(5, 15):
+        # Una ronda: tantas respuestas buenas como el límite actual
+        for _ in range(int(concurrency.limit)):
+            concurrency.acquire()
+            concurrency.release(0.05)
+        assert expected - 1 < concurrency.limit <= expected + 0.5
+    assert concurrency.decreases == 0
+
+
+def test_limit_does_not_exceed_max(clock):
+    concurrency = AdaptiveConcurrency(initial=4, max_limit=6)
+    for _ in range(200):
+        concurrency.acquire()
+        concurrency.release(0.05)
+
+    assert concurrency.limit == 6
+
+
+def test_overload_halves_the_limit_once_per_cooldown(clock):
+    governor = RequestGovernor(initial_concurrency=16, cooldown=1.0)
+    for _ in range(5):
+        with pytest.raises(requests.HTTPError):
+            with governor.slot(FAST):
+                raise overload(503)
+    assert governor.concurrency.limit == 8
+    assert governor.concurrency.decreases == 1
+
+    clock.advance(1.0)
+    with pytest.raises(requests.Timeout):
+        with governor.slot(FAST):
+            raise requests.Timeout("sin respuesta")
+    assert governor.concurrency.limit == 4
+    assert governor.stats()['in_flight'] == 0
+
+
+def test_non_overload_errors_keep_the_limit(clock):
+    governor = RequestGovernor(initial_concurrency=8)
+    with pytest.raises(requests.HTTPError):
+        with governor.slot(FAST):
+            raise overload(500)
+
+    assert governor.concurrency.limit == 8
+    assert governor.stats()['in_flight'] == 0
+
+
+def test_limit_never_drops_below_min(clock):
+    concurrency = AdaptiveConcurrency(initial=4, min_limit=2, cooldown=0.0)
+    for _ in range(10):
+        concurrency.acquire()
+        concurrency.release(None, congested=True)
+
+    assert concurrency.limit == 2
+
+
+def test_retry_after_pauses_the_bucket(clock):
+    governor = RequestGovernor(rate=10, burst=10, initial_concurrency=8)
+    with pytest.raises(requests.HTTPError):
+        with governor.slot(FAST):
+            raise overload(429, retry_after=2)
+
+    assert governor.bucket.try_acquire() == pytest.approx(2.0)
+    clock.advance(1.5)
+    assert governor.bucket.try_acquire() == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert governor.bucket.try_acquire() == 0.0
+    assert governor.concurrency.limit == 4
+
+
+def test_token_bucket_rate_and_burst(clock):
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == pytest.approx(0.1)
+
+    assert bucket.acquire() == pytest.approx(0.1)
+    assert bucket.try_acquire() == pytest.approx(0.1)
+
+
+def test_slow_key_is_not_congestion_for_a_fast_key(clock):
+    governor = RequestGovernor(initial_concurrency=8, cooldown=0.0)
+    for n in range(60):
+        if n % 3 == 0:
+            call(governor, clock, 0.5, SLOW)
+        else:
+            call(governor, clock, 0.02, FAST)
+
+    assert governor.concurrency.decreases == 0
+    assert governor.concurrency.limit > 8
+
+    # Una llamada rápida que tarda muchas veces su referencia sí es congestión
+    call(governor, clock, 0.2, FAST)
+    assert governor.concurrency.decreases == 1
+
@@ -0,0 +1,115 @@
+"""
+Pruebas del modo con cola de setup_logging: shutdown_logging vacía la
+cola, incluso llena, antes de detener el listener
+"""
+import logging
+import threading
+import time
+
+import pytest
+
+from utils import logger as logger_module
+from utils.logger import setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def odoo_logger():
+    """Logger 'odoo_api' sin handlers; se restaura al terminar"""
+    logger = logging.getLogger('odoo_api')
+    saved = logger.handlers[:], logger.level
+    logger.handlers.clear()
+    yield logger
+    shutdown_logging()
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers[:] = saved[0]
+    logger.setLevel(saved[1])
+
+
+def file_handler(listener) -> logging.Handler:
+    return next(handler for handler in listener.handlers
+                if isinstance(handler, logging.FileHandler))
+
+
+class GateFilter(logging.Filter):
+    """Filtro que detiene al listener hasta abrir la puerta"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+
+    def filter(self, record):
+        self.gate.wait(timeout=10)
+        return True
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "la condición no se cumplió a tiempo"
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize('overflow', ['drop', 'block'])
+def test_shutdown_writes_every_queued_record(odoo_logger, tmp_path, overflow):
+    log_file = tmp_path / 'run.log'
+    setup_logging('DEBUG', str(log_file), queued=True, queue_size=1000, overflow=overflow)
+
+    total = 500
+    for i in range(total):
+        odoo_logger.debug("registro %d", i)
+    shutdown_logging()
+
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == total
+    assert lines[-1].endswith(f"registro {total - 1}")
+
+
+def test_shutdown_drains_a_full_queue(odoo_logger, tmp_path):
+    log_file = tmp_path / 'run.log'
+    queue_size = 10
+    setup_logging('DEBUG', str(log_file), queued=True, queue_size=queue_size)
+    listener = logger_module._listener
+    queue_handler = odoo_logger.handlers[0]
+    target = file_handler(listener)
+
+    # Con la puerta cerrada el listener se queda con el primer registro y
+    # el resto llena la cola
+    gate = GateFilter()
+    target.addFilter(gate)
+    odoo_logger.debug("registro 0")
+    wait_until(listener.queue.empty)
+    for i in range(1, queue_size + 1):
+        odoo_logger.debug("registro %d", i)
+    assert listener.queue.full()
+    assert queue_handler.dropped == 0
+    # stop() debe esperar sitio para la marca de parada, no fallar
+    threading.Timer(0.2, gate.gate.set).start()
+    shutdown_logging()
+
+    lines = log_file.read_text().splitlines()
+    assert [line.rsplit(' ', 1)[-1] for line in lines] == [
+        str(i) for i in range(queue_size + 1)]
+    # El logger vuelve a escribir directamente en los handlers
+    assert queue_handler not in odoo_logger.handlers
+    assert target in odoo_logger.handlers
+
+
+def test_shutdown_reports_dropped_records(odoo_logger, tmp_path):
+    log_file = tmp_path / 'run.log'
+    setup_logging('DEBUG', str(log_file), queued=True, queue_size=2)
+    listener = logger_module._listener
+    target = file_handler(listener)
+
+    gate = GateFilter()
+    target.addFilter(gate)
+    odoo_logger.debug("registro 0")
+    wait_until(listener.queue.empty)
+    for i in range(1, 6):
+        odoo_logger.debug("registro %d", i)
+    threading.Timer(0.2, gate.gate.set).start()
+    shutdown_logging()
+
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == 4
+    assert "3 mensajes de log descartados" in lines[-1]
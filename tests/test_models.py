@@ -0,0 +1,53 @@
+"""
+Pruebas de la lectura planificada de OdooModel contra el servidor simulado
+"""
+import threading
+
+import pytest
+
+from odoo_api.connection import OdooConnection
+from odoo_api.fetch_planner import FetchPlanner
+from odoo_api.mock_server import MockOdooServer
+from odoo_api.models import Partner
+
+
+@pytest.fixture(scope='module')
+def server():
+    with MockOdooServer(datasets={'res.partner': 1000}) as server:
+        yield server
+
+
+@pytest.fixture
+def partners(server, recording_scheduler):
+    connection = OdooConnection(server.url, server.db, 'tests', server.api_key,
+                                scheduler=recording_scheduler)
+    assert connection.authenticate()
+    model = Partner(connection)
+    model.planner = FetchPlanner(shard_rows=100, workers=4, min_page=50)
+    yield model
+    connection.close()
+
+
+def test_sharded_fetch_honours_limit(partners):
+    records = partners.fetch([], fields=['name'], limit=10, strategy='sharded')
+
+    assert [record['id'] for record in records] == sorted(record['id'] for record in records)
+    assert len(records) == 10
+
+
+def test_sharded_fetch_matches_single_call(partners):
+    sharded = partners.fetch([], fields=['name'], strategy='sharded')
+    single = partners.fetch([], fields=['name'], strategy='single')
+
+    assert sharded == single
+
+
+def test_sharded_fetch_keeps_caller_priority(partners):
+    scheduler = partners.connection.scheduler
+    with partners.connection.priority('bulk', job='export-contactos'):
+        partners.fetch([], fields=['name'], strategy='sharded')
+
+    workers = [call for call in scheduler.dispatched
+               if call[2] != threading.current_thread().name]
+    assert workers, "el escaneo no se repartió entre hilos"
+    assert {call[:2] for call in scheduler.dispatched} == {('bulk', 'export-contactos')}
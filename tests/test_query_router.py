@@ -0,0 +1,194 @@
+"""
+Paridad de QueryRouter con la semántica de búsqueda de Odoo (16) sobre una
+réplica de prueba en un PostgreSQL temporal (requiere pgserver)
+
+Los resultados esperados son los que devuelve Odoo por JSON-RPC para los
+mismos datos: NULL en negaciones y '!=', active_test, caminos many2one y
+campos traducibles en jsonb.
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from database.query_router import QueryRouter
+from database.replica import ReplicaPool
+
+FIXTURE_SQL = """
+CREATE TABLE res_country (id serial PRIMARY KEY, code varchar, name jsonb);
+INSERT INTO res_country (id, code, name) VALUES
+    (1, 'MX', '{"en_US": "Mexico", "es_MX": "México"}'),
+    (2, 'US', '{"en_US": "United States", "es_MX": "Estados Unidos"}'),
+    (3, 'ES', '{"en_US": "Spain"}');
+
+CREATE TABLE res_partner (id serial PRIMARY KEY, name varchar, email varchar,
+                          is_company boolean, active boolean,
+                          country_id integer REFERENCES res_country, credit_limit numeric);
+INSERT INTO res_partner (id, name, email, is_company, active, country_id, credit_limit) VALUES
+    (1, 'Acme', 'acme@example.com', true, true, 1, 100),
+    (2, 'Beta', NULL, false, true, 2, NULL),
+    (3, 'Gamma', 'gamma@example.com', NULL, true, NULL, 50),
+    (4, 'Delta', 'delta@example.com', true, false, 1, 0),
+    (5, 'Epsilon', 'epsilon@example.com', false, true, 3, NULL);
+
+CREATE TABLE odoo_replica_info (snapshot_at timestamptz NOT NULL,
+                                restored_at timestamptz NOT NULL DEFAULT now(), source text);
+INSERT INTO odoo_replica_info (snapshot_at) VALUES (now());
+"""
+
+FIELDS = {
+    'res.partner': {
+        'id': {'type': 'integer', 'store': True},
+        'name': {'type': 'char', 'store': True},
+        'email': {'type': 'char', 'store': True},
+        'is_company': {'type': 'boolean', 'store': True},
+        'active': {'type': 'boolean', 'store': True},
+        'country_id': {'type': 'many2one', 'relation': 'res.country', 'store': True},
+        'credit_limit': {'type': 'float', 'store': True},
+        'total_invoiced': {'type': 'monetary', 'store': False},
+    },
+    'res.country': {
+        'id': {'type': 'integer', 'store': True},
+        'code': {'type': 'char', 'store': True},
+        'name': {'type': 'char', 'store': True},
+    },
+}
+
+
+class FakeOdooConnection:
+    """Conexión RPC de prueba: metadatos de campos y registro de llamadas"""
+
+    def __init__(self):
+        self.calls = []
+
+    def fields_get(self, model, attributes=None):
+        return FIELDS[model]
+
+    def execute_kw(self, model, method, args, kwargs=None):
+        self.calls.append((model, method, args, kwargs))
+        return 'rpc'
+
+
+@pytest.fixture(scope='module')
+def replica(pg_server, pg_socket_dir):
+    pg_server.psql('CREATE DATABASE router_fixture;')
+    pool = ReplicaPool('router_fixture', host=pg_socket_dir, user='postgres', maxconn=2)
+    with pool.connection() as conn:
+        conn.set_session(readonly=False)
+        with conn.cursor() as cur:
+            cur.execute(FIXTURE_SQL)
+        conn.commit()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def router(replica):
+    return QueryRouter(FakeOdooConnection(), replica, max_staleness=3600)
+
+
+def search(router, domain, **context):
+    kwargs = {'order': 'id'}
+    if context:
+        kwargs['context'] = context
+    result = router.execute_kw('res.partner', 'search', [domain], kwargs)
+    assert router.stats['fallback'] == 0 and not router.connection.calls
+    return result
+
+
+@pytest.mark.parametrize('domain, expected', [
+    # '!=' y las negaciones incluyen los NULL
+    ([['email', '!=', 'acme@example.com']], [2, 3, 5]),
+    (['!', ['email', '=', 'acme@example.com']], [2, 3, 5]),
+    ([['email', 'not ilike', 'example']], [2]),
+    (['!', ['name', 'ilike', 'eta']], [1, 3, 5]),
+    ([['email', '!=', False]], [1, 3, 5]),
+    ([['email', '=', False]], [2]),
+    # Booleanos: NULL cuenta como False
+    ([['is_company', '!=', True]], [2, 3, 5]),
+    ([['is_company', '=', False]], [2, 3, 5]),
+    (['!', ['is_company', '=', True]], [2, 3, 5]),
+    # many2one sin valor
+    ([['country_id', 'not in', [1]]], [2, 3, 5]),
+    (['!', ['country_id', 'in', [1, 2]]], [3, 5]),
+    ([['country_id', 'in', [2, False]]], [2, 3]),
+    ([['country_id', '=', False]], [3]),
+    # Las comparaciones nunca casan con NULL
+    ([['credit_limit', '>', 10]], [1, 3]),
+    (['!', ['credit_limit', '>', 10]], []),
+    (['|', ['email', '=', False], '!', ['is_company', '=', False]], [1, 2]),
+])
+def test_negation_and_null_semantics(router, domain, expected):
+    assert search(router, domain) == expected
+
+
+def test_active_test(router):
+    assert search(router, []) == [1, 2, 3, 5]
+    assert search(router, [], active_test=False) == [1, 2, 3, 4, 5]
+    # Un dominio que ya filtra por active desactiva el filtro implícito
+    assert search(router, [['active', '=', False]]) == [4]
+    assert router.execute_kw('res.partner', 'search_count', [[]]) == 4
+
+
+def test_many2one_paths(router):
+    assert search(router, [['country_id.code', '=', 'MX']]) == [1]
+    assert search(router, [['country_id.code', 'in', ['MX', 'US']]],
+                  active_test=False) == [1, 2, 4]
+    # Odoo 16 resuelve el camino negado como country_id IN (código != 'MX'):
+    # los contactos sin país no aparecen
+    assert search(router, ['!', ['country_id.code', '=', 'MX']]) == [2, 5]
+    assert search(router, [['country_id.code', '!=', 'MX']]) == [2, 5]
+
+
+def test_jsonb_translations(router):
+    assert search(router, [['country_id.name', 'ilike', 'mexico']]) == [1]
+    assert search(router, [['country_id.name', 'ilike', 'méxico']]) == []
+    assert search(router, [['country_id.name', 'ilike', 'méxico']], lang='es_MX') == [1]
+    # Sin traducción al idioma pedido se usa en_US
+    assert search(router, [['country_id.name', '=', 'Spain']], lang='es_MX') == [5]
+
+    countries = router.execute_kw('res.country', 'search_read', [[]], {
+        'fields': ['code', 'name'], 'order': 'id', 'context': {'lang': 'es_MX'}})
+    assert countries == [
+        {'id': 1, 'code': 'MX', 'name': 'México'},
+        {'id': 2, 'code': 'US', 'name': 'Estados Unidos'},
+        {'id': 3, 'code': 'ES', 'name': 'Spain'},
+    ]
+
+
+def test_search_read_values(router):
+    records = router.execute_kw('res.partner', 'search_read', [[]], {
+        'fields': ['name', 'email', 'is_company', 'country_id', 'credit_limit'],
+        'order': 'id', 'context': {'lang': 'es_MX'}})
+    assert records == [
+        {'id': 1, 'name': 'Acme', 'email': 'acme@example.com', 'is_company': True,
+         'country_id': [1, 'México'], 'credit_limit': 100.0},
+        {'id': 2, 'name': 'Beta', 'email': False, 'is_company': False,
+         'country_id': [2, 'Estados Unidos'], 'credit_limit': 0.0},
+        {'id': 3, 'name': 'Gamma', 'email': 'gamma@example.com', 'is_company': False,
+         'country_id': False, 'credit_limit': 50.0},
+        {'id': 5, 'name': 'Epsilon', 'email': 'epsilon@example.com', 'is_company': False,
+         'country_id': [3, 'Spain'], 'credit_limit': 0.0},
+    ]
+
+
+def test_read_group_by_many2one(router):
+    groups = router.execute_kw('res.partner', 'read_group',
+                               [[], ['credit_limit'], ['country_id']], {'lazy': False})
+    by_country = {tuple(group['country_id']) if group['country_id'] else False:
+                  (group['__count'], group['credit_limit']) for group in groups}
+    assert by_country == {(1, 'Mexico'): (1, 100.0), (2, 'United States'): (1, None),
+                          (3, 'Spain'): (1, None), False: (1, 50.0)}
+
+
+def test_unsupported_domain_falls_back_to_rpc(router):
+    result = router.execute_kw('res.partner', 'search', [[['total_invoiced', '>', 0]]])
+    assert result == 'rpc'
+    assert router.stats['fallback'] == 1
+    assert router.connection.calls[0][:2] == ('res.partner', 'search')
+
+
+def test_stale_replica_uses_rpc(replica):
+    router = QueryRouter(FakeOdooConnection(), replica, max_staleness=None)
+    assert router.execute_kw('res.partner', 'search', [[]]) == 'rpc'
+    assert router.stats == {'local': 0, 'rpc': 1, 'fallback': 0}
+    assert router.snapshot_time() <= datetime.now(timezone.utc)
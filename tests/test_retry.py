@@ -0,0 +1,187 @@
+"""
+Pruebas de la política de reintentos (ninguna escritura se repite tras un
+fallo ambiguo) y del presupuesto de peticiones duplicadas
+"""
+import http.client
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NameResolutionError, NewConnectionError, ProtocolError
+
+from odoo_api.connection import OdooConnection
+from odoo_api.retry import HedgePolicy, RetryPolicy
+
+READS = ['read', 'search_read', 'search_count', 'fields_get']
+WRITES = ['write', 'create', 'unlink', 'action_confirm', 'load', '']
+
+ALWAYS, ONLY_READS, NEVER = 'always', 'only_reads', 'never'
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(str(status), response=response)
+
+
+def connection_error(reason: Exception) -> requests.ConnectionError:
+    """ConnectionError como lo construye requests a partir de urllib3"""
+    return requests.ConnectionError(MaxRetryError(None, '/jsonrpc', reason))
+
+
+# (descripción, error, cuándo se reintenta)
+ERRORS = [
+    ('connect timeout', requests.ConnectTimeout("connect timeout"), ALWAYS),
+    ('connection refused',
+     connection_error(NewConnectionError(None, "Failed to establish a new connection: "
+                                               "[Errno 111] Connection refused")), ALWAYS),
+    ('dns', connection_error(NameResolutionError('odoo.invalid', None,
+                                                 socket.gaierror(-2, 'Name or service not known'))),
+     ALWAYS),
+    ('refused without urllib3', requests.ConnectionError(ConnectionRefusedError(111, 'refused')),
+     ALWAYS),
+    ('429', http_error(429), ALWAYS),
+    ('503', http_error(503), ALWAYS),
+    ('read timeout', requests.ReadTimeout("read timeout"), ONLY_READS),
+    ('truncated body', requests.exceptions.ChunkedEncodingError("cortada"), ONLY_READS),
+    ('connection aborted',
+     requests.ConnectionError(ProtocolError('Connection aborted.', http.client.RemoteDisconnected(
+         'Remote end closed connection without response'))), ONLY_READS),
+    ('connection reset',
+     requests.ConnectionError(ProtocolError('Connection aborted.', ConnectionResetError(
+         104, 'Connection reset by peer'))), ONLY_READS),
+    # El texto menciona un rechazo, pero nada prueba que no se enviara
+    ('misleading text', requests.ConnectionError("upstream: Connection refused"), ONLY_READS),
+    ('502', http_error(502), ONLY_READS),
+    ('504', http_error(504), ONLY_READS),
+    ('500', http_error(500), NEVER),
+    ('404', http_error(404), NEVER),
+    ('other', requests.RequestException("otro"), NEVER),
+]
+
+
+@pytest.mark.parametrize('method', READS + WRITES)
+@pytest.mark.parametrize('name, error, when', ERRORS, ids=[case[0] for case in ERRORS])
+def test_should_retry(name, error, when, method):
+    policy = RetryPolicy(retries=3)
+    expected = when == ALWAYS or (when == ONLY_READS and method in READS)
+
+    assert policy.should_retry(error, 1, method) is expected
+    assert policy.should_retry(error, 4, method) is False
+
+
+def test_retry_after_is_respected():
+    error = http_error(429)
+    error.response.headers['Retry-After'] = '7'
+
+    assert RetryPolicy(max_backoff=30).delay(1, error) == 7
+    assert RetryPolicy(max_backoff=5).delay(1, error) == 5
+    assert 0 <= RetryPolicy(backoff=0.5).delay(3) <= 2.0
+
+
+class _DroppingHandler(BaseHTTPRequestHandler):
+    """Lee la petición y cierra la conexión sin responder (fallo ambiguo)"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with self.server.lock:
+            self.server.posts += 1
+        self.close_connection = True
+
+
+@pytest.fixture
+def dropping_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _DroppingHandler)
+    server.posts, server.lock = 0, threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_connection(url: str, **kwargs) -> OdooConnection:
+    connection = OdooConnection(url, 'db', 'user', 'key', timeout=(2, 2),
+                                retries=RetryPolicy(retries=2, backoff=0), **kwargs)
+    connection.uid = 2
+    return connection
+
+
+@pytest.mark.parametrize('method, posts', [('search_read', 3), ('write', 1), ('create', 1)])
+def test_dropped_connection_only_retries_reads(dropping_server, method, posts):
+    host, port = dropping_server.server_address[:2]
+    connection = make_connection(f'http://{host}:{port}')
+    with pytest.raises(requests.ConnectionError):
+        connection.execute_kw('res.partner', method, [[]])
+
+    assert dropping_server.posts == posts
+
+
+def test_refused_connection_retries_writes():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    connection = make_connection(f'http://127.0.0.1:{port}')
+    attempts = []
+    connection.retry.delay = lambda attempt, error=None: attempts.append(attempt) or 0
+
+    with pytest.raises(requests.ConnectionError):
+        connection.execute_kw('res.partner', 'write', [[1], {'name': 'x'}])
+    assert attempts == [1, 2]
+
+
+class SlowTransport:
+    """Transporte falso: las primeras respuestas son rápidas y el resto lentas"""
+
+    def __init__(self, fast_calls: int, fast: float = 0.001, slow: float = 0.03):
+        self.fast_calls = fast_calls
+        self.fast = fast
+        self.slow = slow
+        self.posts = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, data=None, headers=None, stream=False, timeout=None):
+        with self._lock:
+            self.posts += 1
+            number = self.posts
+        time.sleep(self.fast if number <= self.fast_calls else self.slow)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': []}).encode()
+        return response
+
+
+def test_hedges_respect_the_budget():
+    transport = SlowTransport(fast_calls=10)
+    hedge = HedgePolicy(min_samples=10, budget=0.1, min_delay=0.001)
+    connection = make_connection('http://odoo.invalid', transport=transport, hedge=hedge)
+    calls = 60
+    for _ in range(calls):
+        connection.execute_kw('res.partner', 'search_read', [[]])
+    connection._hedge_pool().shutdown(wait=True)
+
+    stats = hedge.stats()
+    assert stats['calls'] == calls
+    assert 0 < stats['hedged'] <= hedge.budget * calls
+    assert transport.posts == calls + stats['hedged']
+
+
+def test_writes_are_never_hedged():
+    transport = SlowTransport(fast_calls=0)
+    hedge = HedgePolicy(min_samples=1, budget=1.0, min_delay=0.001)
+    hedge.observe('res.partner', 'write', 0.001)
+    connection = make_connection('http://odoo.invalid', transport=transport, hedge=hedge)
+    for _ in range(5):
+        connection.execute_kw('res.partner', 'write', [[1], {'name': 'x'}])
+
+    assert transport.posts == 5
+    assert hedge.stats()['hedged'] == 0
@@ -0,0 +1,128 @@
+"""
+Pruebas de PriorityScheduler: orden de prioridades, turno rotatorio entre
+trabajos, reserva interactiva y liberación de turnos
+"""
+import threading
+import time
+from contextlib import ExitStack
+
+import pytest
+
+from odoo_api.scheduler import PriorityScheduler
+
+TIMEOUT = 5.0
+
+
+def wait_until(condition, timeout: float = TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condición no cumplida a tiempo")
+        time.sleep(0.001)
+
+
+def queued(scheduler) -> int:
+    return sum(scheduler.stats()['queued'].values())
+
+
+class Caller:
+    """Hilos que piden turno en un orden controlado y anotan cuándo lo obtienen"""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.order = []
+        self.threads = []
+
+    def enqueue(self, label, priority='normal', job=None):
+        """Lanza una llamada y espera a que quede en cola"""
+        before = queued(self.scheduler)
+
+        def _call():
+            with self.scheduler.context(priority, job):
+                with self.scheduler.slot():
+                    self.order.append(label)
+
+        thread = threading.Thread(target=_call, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        wait_until(lambda: queued(self.scheduler) == before + 1)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join(TIMEOUT)
+            assert not thread.is_alive()
+
+
+def test_priorities_are_served_in_order():
+    scheduler = PriorityScheduler(max_concurrency=1, interactive_share=0)
+    caller = Caller(scheduler)
+    with scheduler.slot():
+        caller.enqueue('bulk', 'bulk')
+        caller.enqueue('normal', 'normal')
+        caller.enqueue('interactive', 'interactive')
+    caller.join()
+
+    assert caller.order == ['interactive', 'normal', 'bulk']
+
+
+def test_jobs_take_turns_within_a_priority():
+    scheduler = PriorityScheduler(max_concurrency=1, interactive_share=0)
+    caller = Caller(scheduler)
+    with scheduler.slot():
+        for label in ['A1', 'A2', 'A3', 'B1', 'B2', 'C1']:
+            caller.enqueue(label, 'bulk', job=label[0])
+    caller.join()
+
+    assert caller.order == ['A1', 'B1', 'C1', 'A2', 'B2', 'A3']
+
+
+def test_interactive_calls_use_the_reserved_share():
+    scheduler = PriorityScheduler(max_concurrency=4, interactive_share=0.25)
+    assert scheduler.capacity() == (4, 3)
+    caller = Caller(scheduler)
+    with ExitStack() as stack:
+        for _ in range(3):
+            stack.enter_context(scheduler.slot('bulk'))
+        caller.enqueue('bulk', 'bulk')
+        # Hay un hueco libre, pero solo para llamadas interactivas
+        with scheduler.slot('interactive'):
+            assert scheduler.stats()['in_flight'] == 4
+        assert caller.order == []
+    caller.join()
+
+    assert caller.order == ['bulk']
+
+
+def test_slot_is_released_when_the_call_raises():
+    scheduler = PriorityScheduler(max_concurrency=1, interactive_share=0)
+    with pytest.raises(RuntimeError):
+        with scheduler.slot('bulk', job='export'):
+            raise RuntimeError("fallo de la llamada")
+
+    stats = scheduler.stats()
+    assert stats['in_flight'] == 0
+    assert sum(stats['queued'].values()) == 0
+    # Con el turno sin liberar, esta llamada esperaría indefinidamente
+    granted = threading.Event()
+
+    def _call():
+        with scheduler.slot():
+            granted.set()
+
+    threading.Thread(target=_call, daemon=True).start()
+    assert granted.wait(TIMEOUT)
+
+
+def test_context_sets_priority_and_rejects_unknown_ones():
+    scheduler = PriorityScheduler(max_concurrency=2, interactive_share=0)
+    with scheduler.context('bulk', job='export'):
+        with scheduler.slot():
+            pass
+    with scheduler.slot():
+        pass
+
+    waits = scheduler.stats()['waits']
+    assert waits['bulk']['calls'] == 1 and waits['normal']['calls'] == 1
+    with pytest.raises(ValueError):
+        with scheduler.context('urgent'):
+            pass
@@ -0,0 +1,198 @@
+"""
+Pruebas de las colas de tareas con lease (SQLite y directorio), de
+ShardWorker y del script shard_worker.py
+"""
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from odoo_api import sharding
+from odoo_api.sharding import (DONE, FAILED, PENDING, RUNNING, FileTaskQueue,
+                               ShardWorker, SQLiteTaskQueue)
+
+LEASE = 30
+SCRIPT = Path(__file__).parent.parent / 'scripts' / 'shard_worker.py'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj de la cola que solo avanza al llamar a advance (parte de la hora real)"""
+    offset = [0.0]
+    real_time = time.time
+    monkeypatch.setattr(sharding.time, 'time', lambda: real_time() + offset[0])
+
+    class Clock:
+        @staticmethod
+        def advance(seconds: float):
+            offset[0] += seconds
+
+    return Clock
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def queue(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteTaskQueue(tmp_path / 'queue.db')
+    return FileTaskQueue(tmp_path / 'queue')
+
+
+def add(queue, count: int = 1, max_attempts: int = 3):
+    queue.add_tasks('job', 'noop', [{'n': n} for n in range(count)], max_attempts)
+
+
+def counts(queue):
+    return queue.progress('job')['tasks']
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue, clock):
+    add(queue)
+    first = queue.claim('worker-a', LEASE)
+    assert queue.claim('worker-b', LEASE) is None
+
+    clock.advance(LEASE + 1)
+    second = queue.claim('worker-b', LEASE)
+
+    assert second['id'] == first['id']
+    assert second['attempts'] == 2
+    assert queue.complete(second, 'worker-b', {'records': 1})
+    assert counts(queue)[DONE] == 1
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    # Hora real: el lease del directorio se mide con la fecha de modificación
+    add(queue)
+    task = queue.claim('worker-a', 0.5)
+    time.sleep(0.3)
+    assert queue.heartbeat(task, 'worker-a', 0.5, progress=10)
+    time.sleep(0.3)
+
+    assert queue.claim('worker-b', 0.5) is None
+    assert queue.progress('job')['records'] == 10
+    time.sleep(0.6)
+    assert queue.claim('worker-b', 0.5)['id'] == task['id']
+
+
+def test_lost_lease_rejects_complete_and_heartbeat(queue, clock):
+    add(queue)
+    stale = queue.claim('worker-a', LEASE)
+    clock.advance(LEASE + 1)
+    current = queue.claim('worker-b', LEASE)
+
+    assert not queue.heartbeat(stale, 'worker-a', LEASE, progress=5)
+    assert not queue.complete(stale, 'worker-a', {'records': 5})
+    assert queue.fail(stale, 'worker-a', 'tarde') == RUNNING
+    assert counts(queue)[RUNNING] == 1
+    assert queue.complete(current, 'worker-b', {'records': 1})
+
+
+def test_task_fails_after_max_attempts(queue):
+    add(queue, max_attempts=2)
+    task = queue.claim('worker-a', LEASE)
+    assert queue.fail(task, 'worker-a', 'error 1', retry_delay=0) == PENDING
+    task = queue.claim('worker-a', LEASE)
+    assert task['attempts'] == 2
+    assert queue.fail(task, 'worker-a', 'error 2', retry_delay=0) == FAILED
+
+    assert queue.claim('worker-a', LEASE) is None
+    progress = queue.progress('job')
+    assert progress['tasks'][FAILED] == 1 and progress['finished']
+    assert any('error 2' in error for error in progress['errors'])
+
+
+def test_last_attempt_dying_while_running_fails_the_task(queue, clock):
+    add(queue, max_attempts=2)
+    queue.claim('worker-a', LEASE)
+    clock.advance(LEASE + 1)
+    assert queue.claim('worker-b', LEASE)['attempts'] == 2
+    # El segundo worker también muere sin liberar la tarea
+    clock.advance(LEASE + 1)
+
+    assert queue.claim('worker-c', LEASE) is None
+    progress = queue.progress('job')
+    assert progress['tasks'][FAILED] == 1
+    assert any('Lease caducado' in error for error in progress['errors'])
+
+
+def test_failed_task_waits_for_retry_delay(queue, clock):
+    add(queue)
+    task = queue.claim('worker-a', LEASE)
+    assert queue.fail(task, 'worker-a', 'error', retry_delay=10) == PENDING
+
+    assert queue.claim('worker-a', LEASE) is None
+    clock.advance(11)
+    assert queue.claim('worker-a', LEASE)['attempts'] == 2
+
+
+def test_concurrent_file_claims_never_share_a_task(tmp_path):
+    queue = FileTaskQueue(tmp_path / 'queue')
+    add(queue, count=200)
+    claimed = []
+    lock = threading.Lock()
+    start = threading.Barrier(8)
+
+    def _worker(name):
+        # Cada hilo abre su propia cola, como un proceso de otra máquina
+        own = FileTaskQueue(tmp_path / 'queue')
+        start.wait()
+        while True:
+            task = own.claim(name, LEASE)
+            if task is None:
+                return
+            with lock:
+                claimed.append(task['id'])
+
+    threads = [threading.Thread(target=_worker, args=(f'worker-{n}',)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == 200
+    assert len(set(claimed)) == 200
+    assert counts(queue)[RUNNING] == 200
+
+
+def test_shard_worker_retries_and_completes(queue):
+    add(queue, count=3)
+    calls = []
+
+    def _flaky(params, context):
+        calls.append(params['n'])
+        if params['n'] == 1 and calls.count(1) == 1:
+            raise RuntimeError("fallo transitorio")
+        context.report(params['n'] + 1)
+        return {'records': params['n'] + 1}
+
+    worker = ShardWorker(queue, connection=None, handlers={'noop': _flaky},
+                         worker_id='worker-a', retry_delay=0)
+    assert worker.run('job') == {'completed': 3, 'failed': 1}
+
+    progress = queue.progress('job')
+    assert progress['tasks'][DONE] == 3 and progress['finished']
+    assert progress['records'] == 1 + 2 + 3
+    assert sorted(calls) == [0, 1, 1, 2]
+
+
+def test_shard_worker_script_plans_and_reports(tmp_path):
+    csv_path = tmp_path / 'contactos.csv'
+    csv_path.write_text('id,name\n' + ''.join(f'__import__.p{n},Contacto {n}\n'
+                                              for n in range(1000)))
+    queue_dir = tmp_path / 'queue'
+
+    def _run(*args):
+        return subprocess.run([sys.executable, str(SCRIPT), '--queue', str(queue_dir),
+                               '--log-level', 'WARNING', *args],
+                              capture_output=True, text=True, cwd=tmp_path, timeout=60)
+
+    planned = _run('plan-import', 'carga', 'res.partner', str(csv_path), '--chunk-mb', '0.005')
+    assert planned.returncode == 0, planned.stderr
+    tasks = FileTaskQueue(queue_dir).progress('carga')['task_count']
+    assert tasks > 1
+
+    status = _run('status', 'carga')
+    assert status.returncode == 0, status.stderr
+    assert f"{tasks} pendientes" in status.stdout
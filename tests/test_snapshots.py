@@ -0,0 +1,103 @@
+"""
+Refresco incremental de los snapshots de config/snapshots.yaml: tras
+modificar y eliminar registros origen debe coincidir con una reconstrucción
+completa (requiere pgserver)
+"""
+import pytest
+
+from database.postgresql_restore import PostgreSQLRestore
+from database.snapshots import DEFAULT_CONFIG_FILE, SnapshotBuilder
+
+FIXTURE_SQL = """
+CREATE TABLE sale_order (id serial PRIMARY KEY, partner_id integer, company_id integer,
+                         state varchar, date_order timestamp, write_date timestamp);
+CREATE TABLE sale_order_line (id serial PRIMARY KEY, order_id integer, product_id integer,
+                              product_uom_qty numeric, price_subtotal numeric,
+                              write_date timestamp);
+CREATE TABLE account_move (id serial PRIMARY KEY, company_id integer, move_type varchar,
+                           state varchar, invoice_date date, amount_untaxed_signed numeric,
+                           amount_total_signed numeric, amount_residual_signed numeric,
+                           write_date timestamp);
+
+INSERT INTO sale_order (id, partner_id, company_id, state, date_order, write_date) VALUES
+    (1, 10, 1, 'sale', '2024-01-15', '2024-02-01'),
+    (2, 10, 1, 'sale', '2024-01-20', '2024-02-01'),
+    (3, 20, 1, 'done', '2024-02-03', '2024-02-05'),
+    (4, 30, 1, 'sale', '2024-02-10', '2024-02-11');
+INSERT INTO sale_order_line (order_id, product_id, product_uom_qty, price_subtotal, write_date)
+SELECT id, 1, 2, 100 * id, write_date FROM sale_order;
+
+INSERT INTO account_move (id, company_id, move_type, state, invoice_date, amount_untaxed_signed,
+                          amount_total_signed, amount_residual_signed, write_date) VALUES
+    (1, 1, 'out_invoice', 'posted', '2024-01-10', 100, 116, 0, '2024-02-01'),
+    (2, 1, 'out_invoice', 'posted', '2024-01-12', 200, 232, 232, '2024-02-01'),
+    (3, 1, 'out_refund', 'posted', '2024-02-01', -50, -58, 0, '2024-02-02');
+"""
+
+# Cambios de clave, cambio de estado y borrado posteriores a la primera construcción
+CHANGES_SQL = """
+UPDATE sale_order SET partner_id = 40, write_date = '2024-03-01' WHERE id = 1;
+UPDATE sale_order SET date_order = '2024-03-02', write_date = '2024-03-02' WHERE id = 3;
+UPDATE sale_order SET state = 'cancel', write_date = '2024-03-03' WHERE id = 4;
+DELETE FROM sale_order_line WHERE order_id = 2;
+DELETE FROM sale_order WHERE id = 2;
+UPDATE account_move SET move_type = 'out_refund', write_date = '2024-03-01' WHERE id = 1;
+UPDATE account_move SET invoice_date = '2024-03-05', write_date = '2024-03-05' WHERE id = 2;
+DELETE FROM account_move WHERE id = 3;
+"""
+
+SNAPSHOTS = ['sales_by_month', 'invoices_by_month']
+
+
+@pytest.fixture
+def builder(pg_server, pg_socket_dir):
+    pg_server.psql('DROP DATABASE IF EXISTS snapshot_fixture;')
+    pg_server.psql('CREATE DATABASE snapshot_fixture;')
+    restorer = PostgreSQLRestore(host=pg_socket_dir, user='postgres')
+    definitions = SnapshotBuilder.load_config(DEFAULT_CONFIG_FILE)
+    builder = SnapshotBuilder(restorer, 'snapshot_fixture',
+                              {name: definitions[name] for name in SNAPSHOTS})
+    execute(builder, FIXTURE_SQL)
+    return builder
+
+
+def execute(builder, statements):
+    conn = builder.restorer.connect(builder.dbname)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(statements)
+    finally:
+        conn.close()
+
+
+def contents(builder, name):
+    conn = builder.restorer.connect(builder.dbname)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT * FROM {name} ORDER BY 1, 2, 3")
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('name', SNAPSHOTS)
+def test_incremental_matches_full_after_key_changes(builder, name):
+    assert builder.build(name)['mode'] == 'full'
+    execute(builder, CHANGES_SQL)
+
+    result = builder.build(name)
+    assert result['mode'] == 'incremental'
+    incremental = contents(builder, name)
+
+    assert builder.build(name, full=True)['mode'] == 'full'
+    assert incremental == contents(builder, name)
+
+
+def test_old_keys_are_removed(builder):
+    builder.build('sales_by_month')
+    execute(builder, CHANGES_SQL)
+    builder.build('sales_by_month')
+
+    # month, company_id, partner_id, orders
+    rows = {(str(row[0]), row[2]): row[3] for row in contents(builder, 'sales_by_month')}
+    assert rows == {('2024-01-01', 40): 1, ('2024-03-01', 20): 1}
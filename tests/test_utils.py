@@ -0,0 +1,159 @@
+"""
+Pruebas de AdaptiveBatcher y OdooUtils.run_batches: crecimiento gradual,
+reducción inmediata, reducción ante timeouts/413 y bytes por hilo
+"""
+import threading
+
+import pytest
+import requests
+
+from odoo_api.connection import OdooConnection
+from odoo_api.mock_server import MockOdooServer
+from odoo_api.utils import AdaptiveBatcher, OdooUtils
+
+
+class RecordingBatcher(AdaptiveBatcher):
+    """Batcher que anota los argumentos de cada record()"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorded = []
+
+    def record(self, size, seconds, response_bytes=0, request_bytes=0):
+        self.recorded.append((size, response_bytes, request_bytes))
+        super().record(size, seconds, response_bytes, request_bytes)
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(str(status), response=response)
+
+
+def test_batch_grows_gradually():
+    batcher = AdaptiveBatcher(initial_size=100, max_size=5000, target_seconds=1.0,
+                              max_growth=2.0)
+    sizes = []
+    for _ in range(7):
+        # Muy por debajo del objetivo: el lote podría ser mucho mayor
+        batcher.record(batcher.size, batcher.size * 0.0001)
+        sizes.append(batcher.size)
+
+    assert sizes == [200, 400, 800, 1600, 3200, 5000, 5000]
+
+
+def test_batch_shrinks_immediately():
+    batcher = AdaptiveBatcher(initial_size=1000, target_seconds=1.0)
+    batcher.record(1000, 10.0)
+
+    assert batcher.size == 100
+
+
+def test_batch_respects_max_bytes():
+    batcher = AdaptiveBatcher(initial_size=100, max_bytes=1024 * 1024)
+    batcher.record(100, 0.01, response_bytes=100 * 100 * 1024)
+
+    assert batcher.size == 10
+
+
+def test_record_failure_halves_down_to_min():
+    batcher = AdaptiveBatcher(initial_size=100, min_size=30)
+    batcher.record_failure()
+    assert batcher.size == 50
+    batcher.record_failure()
+    assert batcher.size == 30
+    assert batcher.stats()['failures'] == 2
+
+
+@pytest.mark.parametrize('error, shrinks', [
+    (requests.ReadTimeout("lento"), True),
+    (requests.ConnectTimeout("sin conexión"), True),
+    (http_error(413), True),
+    (http_error(500), False),
+    (requests.ConnectionError("cortada"), False),
+])
+def test_run_batches_shrinks_on_overload(error, shrinks):
+    batcher = AdaptiveBatcher(initial_size=100)
+
+    def _fail(batch):
+        raise error
+
+    with pytest.raises(type(error)):
+        list(OdooUtils.run_batches(range(1000), batcher, _fail))
+    assert batcher.size == (50 if shrinks else 100)
+    assert batcher.stats()['failures'] == (1 if shrinks else 0)
+
+
+def test_run_batches_uses_the_new_size_after_a_failure():
+    batcher = AdaptiveBatcher(initial_size=100, target_seconds=1000)
+    sizes = []
+
+    def _process(batch):
+        sizes.append(len(batch))
+        if len(sizes) == 1:
+            raise requests.ReadTimeout("lento")
+        return batch
+
+    with pytest.raises(requests.ReadTimeout):
+        list(OdooUtils.run_batches(range(1000), batcher, _process))
+    processed = list(OdooUtils.run_batches(range(1000), batcher, _process))
+
+    assert sizes[:2] == [100, 50]
+    assert sum(len(batch) for batch, _ in processed) == 1000
+
+
+@pytest.fixture(scope='module')
+def connection():
+    with MockOdooServer(datasets={'res.partner': 400}) as server:
+        connection = OdooConnection(server.url, server.db, 'tests', server.api_key)
+        assert connection.authenticate()
+        yield connection
+
+
+def test_run_batches_counts_every_call_of_the_batch(connection):
+    batcher = RecordingBatcher(initial_size=50, target_seconds=1000)
+    expected = []
+
+    def _read_twice(batch):
+        # Dos llamadas por lote: cuentan los bytes de ambas
+        connection.execute_kw('res.partner', 'read', [batch], {'fields': ['name']})
+        first = connection.last_call
+        connection.execute_kw('res.partner', 'read', [batch], {'fields': ['email']})
+        second = connection.last_call
+        expected.append((len(batch), first['response_bytes'] + second['response_bytes'],
+                         first['request_bytes'] + second['request_bytes']))
+
+    list(OdooUtils.run_batches(range(1, 201), batcher, _read_twice, connection))
+
+    assert batcher.recorded == expected
+
+
+def test_run_batches_bytes_are_per_thread(connection):
+    barrier = threading.Barrier(2, timeout=10)
+    results = {}
+
+    def _worker(fields):
+        batcher = RecordingBatcher(initial_size=20, min_size=20, max_size=20)
+        expected = []
+
+        def _read(batch):
+            barrier.wait()
+            connection.execute_kw('res.partner', 'read', [batch], {'fields': fields})
+            call = connection.last_call
+            expected.append((len(batch), call['response_bytes'], call['request_bytes']))
+            # El otro hilo termina su llamada antes de que se registre la nuestra
+            barrier.wait()
+
+        list(OdooUtils.run_batches(range(1, 201), batcher, _read, connection))
+        results[tuple(fields)] = (batcher.recorded, expected)
+
+    threads = [threading.Thread(target=_worker, args=(fields,))
+               for fields in (['id'], ['name', 'email', 'comment'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    small, large = results[('id',)], results[('name', 'email', 'comment')]
+    assert small[0] == small[1] and large[0] == large[1]
+    assert sum(item[1] for item in large[0]) > 2 * sum(item[1] for item in small[0])